@@ -0,0 +1,500 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+REPOSITORY_DIRECTORY = os.path.dirname(BENCHMARK_DIRECTORY)
+sys.path.insert(0, os.path.join(REPOSITORY_DIRECTORY, "src"))
+sys.path.insert(0, REPOSITORY_DIRECTORY)
+
+from test.adeck_data import (  # noqa: E402
+    ADECK_ALL_2024_14_20241009_RESPONSE,
+    ADECK_AVNO_2024_14L_20241009_RESPONSE,
+    ADECK_AVNO_2024_ALL_20241009_RESPONSE,
+)
+from test.status_json import (  # noqa: E402
+    COAMPS_CTCX_STATUS_JSON,
+    DEEPMIND_STATUS_JSON,
+    GEFS_STATUS_JSON,
+    GFS_STATUS_JSON,
+    HAFS_STATUS_JSON,
+    HWRF_STATUS_JSON,
+    JTWC_STATUS_JSON,
+    NHC_STATUS_JSON,
+)
+
+from metget.metget_adeck import (  # noqa: E402
+    print_table_all_models,
+    print_table_all_storms,
+    print_table_single_storm_single_model,
+)
+from metget.metget_adeck_stats import adeck_statistics  # noqa: E402
+from metget.metget_adeck_store import AdeckColumns  # noqa: E402
+from metget.metget_api import MetGetClient, ModelStatus  # noqa: E402
+from metget.metget_build import MetGetBuildRest  # noqa: E402
+from metget.metget_data import MODEL_TYPES  # noqa: E402
+from metget.metget_download import MetGetDownloader  # noqa: E402
+from metget.metget_mock_server import MetGetMockServer, mock_track  # noqa: E402
+from metget.metget_status import MetGetStatus  # noqa: E402
+
+# Default location of the tracked baseline
+BENCHMARK_BASELINE = os.path.join(BENCHMARK_DIRECTORY, "baseline.json")
+
+# Relative change from the baseline reported as a regression
+BENCHMARK_TOLERANCE = 0.5
+
+# Status fixtures rendered by the status benchmarks, keyed by model
+BENCHMARK_STATUS_FIXTURES = {
+    "gfs": GFS_STATUS_JSON,
+    "gefs": GEFS_STATUS_JSON,
+    "hwrf": HWRF_STATUS_JSON,
+    "hafsa": HAFS_STATUS_JSON,
+    "ctcx": COAMPS_CTCX_STATUS_JSON,
+    "nhc": NHC_STATUS_JSON,
+    "jtwc": JTWC_STATUS_JSON,
+    "deepmind": DEEPMIND_STATUS_JSON,
+}
+
+# Units of the metrics. Durations are better when lower, rates when higher
+BENCHMARK_HIGHER_IS_BETTER = {"s": False, "MB/s": True, "1/s": True}
+
+
+def measure(function: Callable[[], object], repeat: int) -> float:
+    """
+    Runs a function several times and returns the median duration
+
+    Args:
+        function (Callable): The function to time
+        repeat (int): Number of runs
+
+    Returns:
+        float: Median duration in seconds
+    """
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def benchmark_cli_cold_start(repeat: int) -> Dict[str, Tuple[float, str]]:
+    """
+    Times starting the command line client in a new interpreter
+
+    Args:
+        repeat (int): Number of runs
+
+    Returns:
+        Dict[str, Tuple[float, str]]: Metrics
+    """
+    environment = dict(os.environ, PYTHONPATH=os.path.join(REPOSITORY_DIRECTORY, "src"))
+
+    def run(code: str) -> Callable[[], None]:
+        return lambda: subprocess.run(
+            [sys.executable, "-c", code],
+            env=environment,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+
+    baseline = measure(run("pass"), repeat)
+    help_time = measure(
+        run(
+            "import sys\n"
+            "from metget import metget_client_cli\n"
+            "sys.argv = ['metget', 'status', '--help']\n"
+            "try:\n"
+            "    metget_client_cli()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+        ),
+        repeat,
+    )
+    return {
+        "cli_cold_start_status_help": (help_time, "s"),
+        "cli_cold_start_overhead": (max(help_time - baseline, 0.0), "s"),
+    }
+
+
+def benchmark_domains(repeat: int, n_domains: int) -> Dict[str, Tuple[float, str]]:
+    """
+    Times parsing command line domains and generating the request JSON for a
+    large number of domains
+
+    Args:
+        repeat (int): Number of runs
+        n_domains (int): Number of domains
+
+    Returns:
+        Dict[str, Tuple[float, str]]: Metrics
+    """
+    models = ["gfs", "nam", "hwrf-ian09l", "gefs-c00", "coamps-ian09l", "hrrr"]
+    domains = [
+        [models[i % len(models)], 0.25, -100 + i % 10, 10, -60 + i % 10, 40]
+        for i in range(n_domains)
+    ]
+    parsed = MetGetBuildRest.parse_command_line_domains(domains, 0)
+
+    def generate() -> dict:
+        return MetGetBuildRest.generate_request_json(
+            start_date=datetime(2023, 6, 1),
+            end_date=datetime(2023, 6, 2),
+            format="owi-ascii",
+            data_type="wind_pressure",
+            time_step=3600,
+            domains=parsed,
+            filename="benchmark",
+        )
+
+    parse_time = measure(
+        lambda: MetGetBuildRest.parse_command_line_domains(domains, 0), repeat
+    )
+    generate_time = measure(generate, repeat)
+    return {
+        f"parse_command_line_domains_{n_domains:d}": (parse_time, "s"),
+        f"generate_request_json_{n_domains:d}": (generate_time, "s"),
+        "domains_per_second": (n_domains / (parse_time + generate_time), "1/s"),
+    }
+
+
+def benchmark_status(
+    server: MetGetMockServer, repeat: int
+) -> Dict[str, Tuple[float, str]]:
+    """
+    Times rendering the status fixtures, and fetching, parsing, and
+    rendering them from the mock server
+
+    Args:
+        server (MetGetMockServer): Server returning the status fixtures
+        repeat (int): Number of runs
+
+    Returns:
+        Dict[str, Tuple[float, str]]: Metrics
+    """
+    metrics = {}
+    client = MetGetClient(server.endpoint, "benchmark")
+    for model, fixture in BENCHMARK_STATUS_FIXTURES.items():
+        args = argparse.Namespace(
+            model=model,
+            format="pretty",
+            start=None,
+            end=None,
+            complete=False,
+            storm=None,
+            ensemble_member=None,
+            year=None,
+            endpoint=server.endpoint,
+            apikey="benchmark",
+            api_version=2,
+        )
+        renderer = MetGetStatus(args, client=client)
+        status = ModelStatus(model, model, MODEL_TYPES[model], fixture["body"])
+
+        def render(renderer=renderer, status=status) -> None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                renderer.render(status)
+
+        def fetch(renderer=renderer) -> None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                renderer.get_status()
+
+        metrics[f"status_render_{model:s}"] = (measure(render, repeat), "s")
+        metrics[f"status_fetch_render_{model:s}"] = (measure(fetch, repeat), "s")
+    client.close()
+    return metrics
+
+
+def benchmark_adeck(repeat: int, n_tracks: int) -> Dict[str, Tuple[float, str]]:
+    """
+    Times rendering the A-Deck tables and computing the statistics of a
+    season of tracks
+
+    Args:
+        repeat (int): Number of runs
+        n_tracks (int): Number of synthetic tracks summarized together
+
+    Returns:
+        Dict[str, Tuple[float, str]]: Metrics
+    """
+    all_models = ADECK_ALL_2024_14_20241009_RESPONSE["body"]
+    all_storms = ADECK_AVNO_2024_ALL_20241009_RESPONSE["body"]
+    single = ADECK_AVNO_2024_14L_20241009_RESPONSE["body"]
+    tracks = [
+        AdeckColumns.from_geojson(
+            f"M{i % 50:02d}",
+            "",
+            mock_track(f"benchmark/{i:d}", datetime(2024, 10, 9), 21, "forecast_hour"),
+        )
+        for i in range(n_tracks)
+    ]
+    return {
+        "adeck_table_all_models": (
+            measure(lambda: str(print_table_all_models(all_models)), repeat),
+            "s",
+        ),
+        "adeck_table_all_storms": (
+            measure(lambda: str(print_table_all_storms(all_storms)), repeat),
+            "s",
+        ),
+        "adeck_table_single": (
+            measure(lambda: str(print_table_single_storm_single_model(single)), repeat),
+            "s",
+        ),
+        f"adeck_statistics_{n_tracks:d}_tracks": (
+            measure(lambda: adeck_statistics(tracks), repeat),
+            "s",
+        ),
+    }
+
+
+def benchmark_download(
+    repeat: int, sizes: List[int], capped_size: int
+) -> Dict[str, Tuple[float, str]]:
+    """
+    Measures download throughput from the mock server for several file
+    sizes, and of segmented downloads from a throughput capped server
+
+    Args:
+        repeat (int): Number of runs
+        sizes (List[int]): File sizes in bytes
+        capped_size (int): File size of the capped server benchmarks
+
+    Returns:
+        Dict[str, Tuple[float, str]]: Metrics
+    """
+    metrics = {}
+    cases = [(f"download_{size // 1024:d}KiB", size, None, 1) for size in sizes]
+    cases += [
+        (
+            f"download_{capped_size // 1024:d}KiB_capped_{segments:d}_segments",
+            capped_size,
+            16.0e6,
+            segments,
+        )
+        for segments in (1, 4)
+    ]
+    for name, size, throughput, segments in cases:
+        with MetGetMockServer(
+            file_size=size, throughput=throughput, polls_to_complete=1
+        ) as server:
+            client = MetGetClient(server.endpoint, "benchmark")
+            request_id = client.build(
+                {"domains": [{"name": "gfs"}], "filename": "benchmark"}
+            ).request_id
+            data_url = client.check(request_id).data_url
+            files = ["benchmark_00.pre", "benchmark_00.wnd"]
+
+            def download(
+                client=client, data_url=data_url, files=files, segments=segments
+            ) -> None:
+                with tempfile.TemporaryDirectory() as directory, contextlib.redirect_stdout(
+                    io.StringIO()
+                ):
+                    MetGetDownloader(
+                        max_workers=1,
+                        session=client.session,
+                        segments=segments,
+                        segment_min_size=1,
+                    ).download_files(data_url, files, directory)
+
+            duration = measure(download, repeat)
+            metrics[name] = (len(files) * size / duration / 1.0e6, "MB/s")
+            client.close()
+    return metrics
+
+
+def run_benchmarks(quick: bool = False) -> Dict[str, Tuple[float, str]]:
+    """
+    Runs all benchmarks
+
+    Args:
+        quick (bool): Run fewer repetitions and smaller cases
+
+    Returns:
+        Dict[str, Tuple[float, str]]: Metrics
+    """
+    repeat = 3 if quick else 7
+    metrics = {}
+    metrics.update(benchmark_cli_cold_start(repeat))
+    metrics.update(benchmark_domains(repeat, 2000))
+    with MetGetMockServer(status_responses=BENCHMARK_STATUS_FIXTURES) as server:
+        metrics.update(benchmark_status(server, repeat))
+    metrics.update(benchmark_adeck(repeat, 2000))
+    sizes = [64 * 1024, 1024 * 1024] + ([] if quick else [16 * 1024 * 1024])
+    metrics.update(benchmark_download(repeat, sizes, 8 * 1024 * 1024))
+    return metrics
+
+
+def compare_baseline(
+    metrics: Dict[str, Tuple[float, str]], baseline: dict, tolerance: float
+) -> List[str]:
+    """
+    Compares metrics with a baseline
+
+    Args:
+        metrics (Dict[str, Tuple[float, str]]): Metrics of this run
+        baseline (dict): Baseline results (see results_document)
+        tolerance (float): Relative change reported as a regression
+
+    Returns:
+        List[str]: Names of the regressed metrics
+    """
+    regressions = []
+    for name, (value, unit) in metrics.items():
+        reference = baseline.get("metrics", {}).get(name)
+        if reference is None or reference["unit"] != unit or reference["value"] <= 0:
+            continue
+        change = value / reference["value"] - 1.0
+        if BENCHMARK_HIGHER_IS_BETTER[unit]:
+            change = -change
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def results_document(metrics: Dict[str, Tuple[float, str]]) -> dict:
+    """
+    Returns the JSON document of a benchmark run
+
+    Args:
+        metrics (Dict[str, Tuple[float, str]]): Metrics
+
+    Returns:
+        dict: The results with the environment they were measured in
+    """
+    return {
+        "created": datetime.now().replace(microsecond=0).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "metrics": {
+            name: {"value": value, "unit": unit}
+            for name, (value, unit) in sorted(metrics.items())
+        },
+    }
+
+
+def print_results(
+    metrics: Dict[str, Tuple[float, str]],
+    baseline: Optional[dict],
+    regressions: List[str],
+) -> None:
+    """
+    Prints the metrics next to the baseline
+
+    Args:
+        metrics (Dict[str, Tuple[float, str]]): Metrics
+        baseline (dict, optional): Baseline results
+        regressions (List[str]): Names of the regressed metrics
+    """
+    reference = (baseline or {}).get("metrics", {})
+    for name, (value, unit) in sorted(metrics.items()):
+        line = f"{name:<50s} {value:>12.6g} {unit:<5s}"
+        if name in reference:
+            line += f" (baseline {reference[name]['value']:.6g})"
+        if name in regressions:
+            line += " REGRESSION"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Runs the benchmarks and compares them with the baseline
+
+    Args:
+        argv (List[str], optional): Command line arguments
+
+    Returns:
+        int: Exit status, 1 when a metric regressed
+    """
+    p = argparse.ArgumentParser(
+        description="Benchmarks of the MetGet client run against a local mock server"
+    )
+    p.add_argument("--quick", action="store_true", help="Fewer and smaller runs")
+    p.add_argument(
+        "--baseline", default=BENCHMARK_BASELINE, help="Baseline results (JSON)"
+    )
+    p.add_argument("--output", help="Write the results of this run (JSON)")
+    p.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="Replace the baseline with the results of this run",
+    )
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=BENCHMARK_TOLERANCE,
+        help="Relative change from the baseline reported as a regression",
+    )
+    args = p.parse_args(argv)
+
+    metrics = run_benchmarks(args.quick)
+    results = results_document(metrics)
+
+    baseline = None
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = (
+        [] if baseline is None else compare_baseline(metrics, baseline, args.tolerance)
+    )
+    print_results(metrics, baseline, regressions)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        return 0
+
+    if regressions:
+        print(
+            f"{len(regressions):d} metrics regressed by more than {args.tolerance:.0%}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -27,104 +27,377 @@
 #
 ###################################################################################################
 import argparse
-import contextlib
 import json
+import sys
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
 
-import requests
 from prettytable import PrettyTable
 
-from .metget_environment import get_metget_environment_variables
+from .metget_adeck_stats import adeck_statistics
+from .metget_adeck_store import AdeckColumns, metget_adeck_store_from_args
+from .metget_api import AdeckTracks, MetGetApiError, MetGetClient
+from .metget_session import MetGetSession
 
+# Number of A-Deck tracks downloaded concurrently when harvesting
+ADECK_HARVEST_WORKERS = 8
 
-def metget_adeck(args: argparse.Namespace) -> None:
+
+def metget_adeck(
+    args: argparse.Namespace,
+    session: Optional[MetGetSession] = None,
+    client: Optional[MetGetClient] = None,
+) -> None:
     """
     Get the A-Deck data from MetGet for the given parameters
 
     Args:
         args (argparse.Namespace): The arguments from the command line
+        session (MetGetSession, optional): Pooled session used for the request
+        client (MetGetClient, optional): Library client used for the request.
+            When given, the session is ignored
 
     Raises:
         ValueError: If the parameters are invalid
     """
-    env = get_metget_environment_variables(args)
-    headers = {"x-api-key": env["apikey"]}
-
-    storm = args.storm
-    year = args.year
-    basin = args.basin.upper()
-    model = args.model.upper()
-    cycle = args.cycle.strftime("%Y-%m-%dT%H:%M")
-
-    if basin not in ["AL", "EP", "CP", "WP", "IO", "SH"]:
-        msg = "Invalid basin. Must be one of AL, EP, CP, WP, IO, SH"
-        raise ValueError(msg)
-
-    with contextlib.suppress(ValueError):
-        storm = int(storm)
-
-    if isinstance(storm, str) and storm == "all":
-        url = env["endpoint"] + f"/adeck/{year}/{basin}/{model}/{storm}/{cycle}"
-    elif isinstance(storm, int):
-        url = env["endpoint"] + f"/adeck/{year}/{basin}/{model}/{storm:02d}/{cycle}"
-    else:
-        msg = "Invalid storm. Must be an integer or 'all'"
-        raise ValueError(msg)
-
-    response = requests.get(url, headers=headers)
-
-    if response.status_code != 200:
+    if getattr(args, "harvest", False):
+        harvest_adeck(args, session, client)
+        return
+
+    if client is None:
+        client = MetGetClient.from_args(args, session=session)
+
+    multiple = str(args.storm) == "all" or args.model.lower() == "all"
+    try:
+        if multiple:
+            tracks, items = client.iter_adeck(
+                args.year, args.basin, args.model, args.storm, args.cycle
+            )
+        else:
+            tracks = client.adeck(
+                args.year, args.basin, args.model, args.storm, args.cycle
+            )
+    except MetGetApiError as e:
         if (
-            "body" in response.json()
-            and "message" in response.json()["body"]
-            and response.json()["body"]["message"] == "No results found"
+            isinstance(e.body, dict)
+            and "message" in e.body.get("body", {})
+            and e.body["body"]["message"] == "No results found"
         ):
             if args.format == "json":
                 print(json.dumps({"message": "No results found"}))
             else:
                 print("No results found")
             msg = "No results found"
-            raise ValueError(msg)
+            raise ValueError(msg) from None
         else:
-            print(response.json())
+            print(e.body)
             msg = "Invalid request. Check the parameters and try again."
-            raise ValueError(msg)
-    response_data = response.json()
-
-    track_data = response_data["body"]
-
-    if args.format == "json":
-        if args.output:
-            with open(args.output, "w") as f:
-                if storm == "all" or model.lower() == "all":
-                    f.write(json.dumps(track_data["storm_tracks"]))
-                else:
-                    f.write(json.dumps(track_data["storm_track"]))
-        else:
-            if storm == "all" or model.lower() == "all":
-                print(json.dumps(track_data["storm_tracks"]))
-            else:
-                print(json.dumps(track_data["storm_track"]))
-    elif args.format == "pretty":
-        if storm == "all":
-            table = print_table_all_storms(track_data)
-        elif model.lower() == "all":
-            table = print_table_all_models(track_data)
+            raise ValueError(msg) from None
+
+    statistics = getattr(args, "stats", False)
+    if multiple:
+        print_adeck_items(
+            tracks, items, args.format, getattr(args, "output", None), statistics
+        )
+    else:
+        print_adeck(tracks, args.format, getattr(args, "output", None), statistics)
+
+
+def adeck_cycles(
+    start: datetime, end: Optional[datetime] = None, interval: int = 6
+) -> List[datetime]:
+    """
+    Get the forecast cycles from start to end (inclusive)
+
+    Args:
+        start (datetime): First cycle
+        end (datetime, optional): Last cycle. Defaults to the first cycle
+        interval (int): Hours between cycles
+
+    Returns:
+        List[datetime]: The cycles
+    """
+    if end is None:
+        end = start
+    if end < start:
+        msg = "The last cycle must not be before the first cycle"
+        raise ValueError(msg)
+    if interval <= 0:
+        msg = "The cycle interval must be a positive number of hours"
+        raise ValueError(msg)
+    cycles = []
+    cycle = start
+    while cycle <= end:
+        cycles.append(cycle)
+        cycle += timedelta(hours=interval)
+    return cycles
+
+
+def harvest_adeck(
+    args: argparse.Namespace,
+    session: Optional[MetGetSession] = None,
+    client: Optional[MetGetClient] = None,
+) -> None:
+    """
+    Get the A-Deck tracks of several models over a range of forecast cycles
+    and print them
+
+    Args:
+        args (argparse.Namespace): The arguments from the command line
+        session (MetGetSession, optional): Pooled session used for the requests
+        client (MetGetClient, optional): Library client used for the requests.
+            When given, the session is ignored
+    """
+    if client is None:
+        client = MetGetClient.from_args(
+            args,
+            min_pool_size=ADECK_HARVEST_WORKERS,
+            session=session,
+            adeck_store=metget_adeck_store_from_args(args),
+        )
+
+    models = [m.strip() for m in args.model.split(",") if m.strip()]
+    cycles = adeck_cycles(
+        args.cycle, getattr(args, "end", None), getattr(args, "interval", 6)
+    )
+    tracks, errors = client.harvest_adeck(
+        args.year,
+        args.basin,
+        args.storm,
+        models,
+        cycles,
+        ADECK_HARVEST_WORKERS,
+        getattr(args, "refresh", False),
+    )
+    print_adeck_harvest(
+        tracks,
+        errors,
+        args.format,
+        getattr(args, "output", None),
+        getattr(args, "stats", False),
+    )
+
+
+def print_adeck_harvest(
+    tracks: List[AdeckColumns],
+    errors: Dict[str, Exception],
+    output_format: str,
+    output: Optional[str] = None,
+    statistics: bool = False,
+) -> None:
+    """
+    Print (or write) harvested A-Deck tracks
+
+    Args:
+        tracks (List[AdeckColumns]): The tracks ordered by cycle and model
+        errors (Dict[str, Exception]): Failed downloads keyed by cycle/model
+        output_format (str): Output format (json or pretty)
+        output (str, optional): File to write the JSON output to
+        statistics (bool): Add the statistics of each track to the JSON output
+    """
+    if output_format == "json":
+        data = {"tracks": {}}
+        track_statistics = adeck_statistics(tracks) if statistics else None
+        for i, track in enumerate(tracks):
+            columns = track.to_dict()
+            if track_statistics is not None:
+                columns["statistics"] = track_statistics[i]
+            data["tracks"].setdefault(track.cycle, {})[track.model] = columns
+        if errors:
+            data["errors"] = {name: str(e) for name, e in errors.items()}
+        text = json.dumps(data, separators=(",", ":"))
+        if output:
+            with open(output, "w") as f:
+                f.write(text)
         else:
-            table = print_table_single_storm_single_model(track_data)
+            print(text)
+    elif output_format == "pretty":
+        table = PrettyTable(
+            [
+                "Cycle",
+                "Model",
+                "Points",
+                "Min Fcst Pressure (mb)",
+                "Max Fcst Wind Speed (mph)",
+                "Track Length (km)",
+            ]
+        )
+        for track, track_statistics in zip(tracks, adeck_statistics(tracks)):
+            table.add_row(
+                [
+                    track.cycle,
+                    track.model,
+                    track_statistics["points"],
+                    adeck_table_value(track_statistics["min_pressure_mb"]),
+                    adeck_table_value(track_statistics["max_wind_speed_mph"]),
+                    track_statistics["track_length_km"],
+                ]
+            )
         print(table)
+        for name, error in errors.items():
+            print(f"[ERROR]: {name:s}: {error!s}")
 
 
-def print_table_all_models(track_data: dict) -> PrettyTable:
+def adeck_table_value(value: Any) -> Any:
     """
-    Get a pretty table of all models for a given storm
+    Get the value of a statistic to show in a table
 
     Args:
-        track_data (dict): The track data from the MetGet API
+        value: The statistic or None when it is missing
 
     Returns:
-        PrettyTable: A pretty table of the track data
+        The statistic or 'N/A'
     """
-    table = PrettyTable(
+    return "N/A" if value is None else value
+
+
+def adeck_with_statistics(
+    model: str, cycle: str, track: dict, statistics: bool = True
+) -> dict:
+    """
+    Get a GeoJSON forecast track with its statistics added as a 'statistics'
+    member of the feature collection
+
+    Args:
+        model (str): A-Deck model name
+        cycle (str): Forecast cycle
+        track (dict): The GeoJSON forecast track
+        statistics (bool): Add the statistics. When False the track is
+            returned unchanged
+
+    Returns:
+        dict: The track
+    """
+    if not statistics:
+        return track
+    columns = AdeckColumns.from_geojson(model, cycle, track)
+    return {**track, "statistics": adeck_statistics([columns])[0]}
+
+
+def print_adeck(
+    tracks: AdeckTracks,
+    output_format: str,
+    output: Optional[str] = None,
+    statistics: bool = False,
+) -> None:
+    """
+    Print (or write) the A-Deck tracks returned by the MetGet client
+
+    Args:
+        tracks (AdeckTracks): The forecast tracks
+        output_format (str): Output format (json or pretty)
+        output (str, optional): File to write the JSON output to
+        statistics (bool): Add the statistics of each track to the JSON output
+    """
+    if tracks.multiple:
+        print_adeck_items(
+            tracks, iter(tracks.tracks.items()), output_format, output, statistics
+        )
+    elif output_format == "json":
+        track = adeck_with_statistics(
+            tracks.model, adeck_cycle_string(tracks), tracks.tracks, statistics
+        )
+        if output:
+            with open(output, "w") as f:
+                f.write(json.dumps(track))
+        else:
+            print(json.dumps(track))
+    elif output_format == "pretty":
+        print(print_table_single_storm_single_model({"storm_track": tracks.tracks}))
+
+
+def print_adeck_items(
+    tracks: AdeckTracks,
+    items: Iterator[Tuple[str, dict]],
+    output_format: str,
+    output: Optional[str] = None,
+    statistics: bool = False,
+) -> None:
+    """
+    Print (or write) the A-Deck tracks of all storms or all models one track
+    at a time, so that the tracks do not have to be held in memory together.
+    The tables only keep the columns of each track (see AdeckColumns) and
+    summarize all tracks together.
+
+    Args:
+        tracks (AdeckTracks): The A-Deck query
+        items (Iterator[Tuple[str, dict]]): Tracks keyed by storm or model
+        output_format (str): Output format (json or pretty)
+        output (str, optional): File to write the JSON output to
+        statistics (bool): Add the statistics of each track to the JSON output
+    """
+    cycle = adeck_cycle_string(tracks)
+    if output_format == "json":
+        if statistics:
+            items = (
+                (
+                    key,
+                    adeck_with_statistics(
+                        tracks.model if tracks.storm == "all" else key, cycle, track
+                    ),
+                )
+                for key, track in items
+            )
+        if output:
+            with open(output, "w") as f:
+                write_json_object(f, items)
+        else:
+            write_json_object(sys.stdout, items)
+            print(flush=True)
+    elif output_format == "pretty":
+        keys = []
+        columns = []
+        for key, track in items:
+            keys.append(key)
+            columns.append(
+                AdeckColumns.from_geojson(
+                    tracks.model if tracks.storm == "all" else key, cycle, track
+                )
+            )
+        if tracks.storm == "all":
+            print(adeck_all_storms_table_from_columns(keys, columns))
+        else:
+            print(adeck_all_models_table_from_columns(keys, columns))
+
+
+def adeck_cycle_string(tracks: AdeckTracks) -> str:
+    """
+    Get the forecast cycle of an A-Deck query as a string
+
+    Args:
+        tracks (AdeckTracks): The A-Deck query
+
+    Returns:
+        str: The cycle (YYYY-MM-DDThh:mm)
+    """
+    return tracks.cycle.strftime("%Y-%m-%dT%H:%M")
+
+
+def write_json_object(stream: TextIO, items: Iterator[Tuple[str, Any]]) -> None:
+    """
+    Writes key/value pairs as one JSON object, one value at a time. The output
+    is identical to json.dumps of the whole object.
+
+    Args:
+        stream (TextIO): Stream to write to
+        items (Iterator[Tuple[str, Any]]): The keys and values of the object
+    """
+    stream.write("{")
+    for i, (key, value) in enumerate(items):
+        if i > 0:
+            stream.write(", ")
+        stream.write(json.dumps(key) + ": " + json.dumps(value))
+    stream.write("}")
+
+
+def adeck_all_models_table() -> PrettyTable:
+    """
+    Get an empty pretty table of all models for a given storm
+
+    Returns:
+        PrettyTable: The table
+    """
+    return PrettyTable(
         [
             "Model",
             "Min Fcst Pressure (mb)",
@@ -133,42 +406,47 @@ def print_table_all_models(track_data: dict) -> PrettyTable:
         sortby="Model",
     )
 
-    for model in track_data["storm_tracks"]:
-        minimum_pressure = 9999
-        maximum_wind_speed = 0
 
-        for snap in track_data["storm_tracks"][model]["features"]:
-            if snap["properties"]["minimum_sea_level_pressure_mb"] != 0:
-                minimum_pressure = min(
-                    minimum_pressure,
-                    snap["properties"]["minimum_sea_level_pressure_mb"],
-                )
+def adeck_model_row_from_statistics(model: str, statistics: dict) -> list:
+    """
+    Get the row of a model in the table of all models
 
-            if snap["properties"]["max_wind_speed_mph"] != 0:
-                maximum_wind_speed = max(
-                    maximum_wind_speed, snap["properties"]["max_wind_speed_mph"]
-                )
+    Args:
+        model (str): The model name
+        statistics (dict): The statistics of the track of the model
+
+    Returns:
+        list: The table row
+    """
+    return [
+        model,
+        adeck_table_value(statistics["min_pressure_mb"]),
+        adeck_table_value(statistics["max_wind_speed_mph"]),
+    ]
 
-        if minimum_pressure == 9999:
-            minimum_pressure = "N/A"
 
-        if maximum_wind_speed == 0:
-            maximum_wind_speed = "N/A"
+def adeck_all_models_table_from_columns(
+    models: List[str], columns: List[AdeckColumns]
+) -> PrettyTable:
+    """
+    Get a pretty table of all models for a given storm
 
-        table.add_row(
-            [
-                model,
-                minimum_pressure,
-                maximum_wind_speed,
-            ]
-        )
+    Args:
+        models (List[str]): The model names
+        columns (List[AdeckColumns]): The track of each model
 
+    Returns:
+        PrettyTable: A pretty table of the track data
+    """
+    table = adeck_all_models_table()
+    for model, statistics in zip(models, adeck_statistics(columns)):
+        table.add_row(adeck_model_row_from_statistics(model, statistics))
     return table
 
 
-def print_table_all_storms(track_data: dict) -> PrettyTable:
+def print_table_all_models(track_data: dict) -> PrettyTable:
     """
-    Get a pretty table of all storms for a given model
+    Get a pretty table of all models for a given storm
 
     Args:
         track_data (dict): The track data from the MetGet API
@@ -176,7 +454,22 @@ def print_table_all_storms(track_data: dict) -> PrettyTable:
     Returns:
         PrettyTable: A pretty table of the track data
     """
-    table = PrettyTable(
+    models = list(track_data["storm_tracks"].keys())
+    columns = [
+        AdeckColumns.from_geojson(model, "", track)
+        for model, track in track_data["storm_tracks"].items()
+    ]
+    return adeck_all_models_table_from_columns(models, columns)
+
+
+def adeck_all_storms_table() -> PrettyTable:
+    """
+    Get an empty pretty table of all storms for a given model
+
+    Returns:
+        PrettyTable: The table
+    """
+    return PrettyTable(
         [
             "Storm",
             "Current Longitude",
@@ -187,43 +480,65 @@ def print_table_all_storms(track_data: dict) -> PrettyTable:
         sortby="Storm",
     )
 
-    for storm in track_data["storm_tracks"]:
-        minimum_pressure = 9999
-        maximum_wind_speed = 0
-        current_longitude = track_data["storm_tracks"][storm]["features"][0][
-            "geometry"
-        ]["coordinates"][0]
-        current_latitude = track_data["storm_tracks"][storm]["features"][0]["geometry"][
-            "coordinates"
-        ][1]
 
-        for snap in track_data["storm_tracks"][storm]["features"]:
-            pressure = snap["properties"]["minimum_sea_level_pressure_mb"]
-            if pressure != 0:
-                minimum_pressure = min(minimum_pressure, pressure)
+def adeck_storm_row_from_statistics(storm: str, statistics: dict) -> list:
+    """
+    Get the row of a storm in the table of all storms
 
-            wind_speed = snap["properties"]["max_wind_speed_mph"]
-            if wind_speed != 0:
-                maximum_wind_speed = max(maximum_wind_speed, wind_speed)
+    Args:
+        storm (str): The storm
+        statistics (dict): The statistics of the track of the storm
 
-        if minimum_pressure == 9999:
-            minimum_pressure = "N/A"
+    Returns:
+        list: The table row
+    """
+    current_longitude, current_latitude = statistics["first_position"]
+    return [
+        storm,
+        current_longitude,
+        current_latitude,
+        adeck_table_value(statistics["min_pressure_mb"]),
+        adeck_table_value(statistics["max_wind_speed_mph"]),
+    ]
+
+
+def adeck_all_storms_table_from_columns(
+    storms: List[str], columns: List[AdeckColumns]
+) -> PrettyTable:
+    """
+    Get a pretty table of all storms for a given model
 
-        if maximum_wind_speed == 0:
-            maximum_wind_speed = "N/A"
+    Args:
+        storms (List[str]): The storms
+        columns (List[AdeckColumns]): The track of each storm
 
-        table.add_row(
-            [
-                storm,
-                current_longitude,
-                current_latitude,
-                minimum_pressure,
-                maximum_wind_speed,
-            ],
-        )
+    Returns:
+        PrettyTable: A pretty table of the track data
+    """
+    table = adeck_all_storms_table()
+    for storm, statistics in zip(storms, adeck_statistics(columns)):
+        table.add_row(adeck_storm_row_from_statistics(storm, statistics))
     return table
 
 
+def print_table_all_storms(track_data: dict) -> PrettyTable:
+    """
+    Get a pretty table of all storms for a given model
+
+    Args:
+        track_data (dict): The track data from the MetGet API
+
+    Returns:
+        PrettyTable: A pretty table of the track data
+    """
+    storms = list(track_data["storm_tracks"].keys())
+    columns = [
+        AdeckColumns.from_geojson("", "", track)
+        for track in track_data["storm_tracks"].values()
+    ]
+    return adeck_all_storms_table_from_columns(storms, columns)
+
+
 def print_table_single_storm_single_model(track_data: dict) -> PrettyTable:
     """
     Get a pretty table of a single storm for a single model
@@ -0,0 +1,208 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import math
+from itertools import chain
+from typing import List, Optional
+
+from .metget_adeck_store import AdeckColumns
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Mean radius of the earth in kilometers used for track lengths
+EARTH_RADIUS_KM = 6371.0
+
+
+def adeck_statistics(tracks: List[AdeckColumns]) -> List[dict]:
+    """
+    Computes the summary statistics of A-Deck tracks. Pressures and wind
+    speeds of zero are missing values in the A-Deck and are ignored. When the
+    optional 'numpy' dependency is installed (pip install metget[stats]) the
+    tracks are concatenated into arrays once and all statistics are computed
+    as vectorized reductions over every track together. Otherwise each track
+    is summarized in turn (see adeck_track_statistics).
+
+    Args:
+        tracks (List[AdeckColumns]): The tracks
+
+    Returns:
+        List[dict]: The statistics of each track (see adeck_track_statistics)
+    """
+    if np is None:
+        return [adeck_track_statistics(t) for t in tracks]
+    if not tracks:
+        return []
+
+    counts = np.array([len(t.time) for t in tracks], dtype=np.int64)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    segment = np.repeat(np.arange(len(tracks)), counts)
+    n_tracks = len(tracks)
+
+    flat_pressure = list(chain.from_iterable(t.pressure for t in tracks))
+    flat_wind = list(chain.from_iterable(t.wind for t in tracks))
+    longitude = np.fromiter(
+        chain.from_iterable(t.longitude for t in tracks), dtype=float
+    )
+    latitude = np.fromiter(chain.from_iterable(t.latitude for t in tracks), dtype=float)
+    pressure = np.asarray(flat_pressure, dtype=float)
+    wind = np.asarray(flat_wind, dtype=float)
+
+    pressure_valid = pressure != 0
+    wind_valid = wind != 0
+    pressure_count = np.bincount(segment, weights=pressure_valid, minlength=n_tracks)
+    wind_count = np.bincount(segment, weights=wind_valid, minlength=n_tracks)
+    pressure_sum = np.bincount(
+        segment, weights=np.where(pressure_valid, pressure, 0.0), minlength=n_tracks
+    )
+    wind_sum = np.bincount(
+        segment, weights=np.where(wind_valid, wind, 0.0), minlength=n_tracks
+    )
+
+    # ...The first entry of each track after sorting by track and value is the
+    #    position of its minimum (missing values sort last)
+    non_empty = counts > 0
+    first = offsets[non_empty]
+    minimum_pressure = np.full(n_tracks, -1, dtype=np.int64)
+    maximum_wind = np.full(n_tracks, -1, dtype=np.int64)
+    if first.size:
+        order = np.lexsort((np.where(pressure_valid, pressure, np.inf), segment))
+        minimum_pressure[non_empty] = order[first]
+        order = np.lexsort((np.where(wind_valid, -wind, np.inf), segment))
+        maximum_wind[non_empty] = order[first]
+
+    # ...Great circle distance between consecutive points of the same track
+    phi = np.radians(latitude)
+    lam = np.radians(longitude)
+    a = (
+        np.sin(np.diff(phi) / 2.0) ** 2
+        + np.cos(phi[:-1]) * np.cos(phi[1:]) * np.sin(np.diff(lam) / 2.0) ** 2
+    )
+    distance = 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    distance = np.where(segment[1:] == segment[:-1], distance, 0.0)
+    length = np.bincount(segment[1:], weights=distance, minlength=n_tracks)
+
+    statistics = []
+    for i, track in enumerate(tracks):
+        if not non_empty[i]:
+            statistics.append(adeck_track_statistics(track))
+            continue
+        statistics.append(
+            {
+                "points": int(counts[i]),
+                "start_time": track.time[0],
+                "end_time": track.time[-1],
+                "first_position": [track.longitude[0], track.latitude[0]],
+                "last_position": [track.longitude[-1], track.latitude[-1]],
+                "min_pressure_mb": (
+                    flat_pressure[minimum_pressure[i]] if pressure_count[i] else None
+                ),
+                "max_wind_speed_mph": (
+                    flat_wind[maximum_wind[i]] if wind_count[i] else None
+                ),
+                "mean_pressure_mb": adeck_mean(pressure_sum[i], pressure_count[i]),
+                "mean_wind_speed_mph": adeck_mean(wind_sum[i], wind_count[i]),
+                "track_length_km": round(float(length[i]), 1),
+            }
+        )
+    return statistics
+
+
+def adeck_track_statistics(track: AdeckColumns) -> dict:
+    """
+    Computes the summary statistics of one A-Deck track without numpy
+
+    Args:
+        track (AdeckColumns): The track
+
+    Returns:
+        dict: The number of points, first and last time and position, the
+            minimum, maximum, and mean of the pressure (mb) and wind speed
+            (mph), and the track length (km). Statistics of values which are
+            all missing are None
+    """
+    if not track.time:
+        return {
+            "points": 0,
+            "start_time": None,
+            "end_time": None,
+            "first_position": None,
+            "last_position": None,
+            "min_pressure_mb": None,
+            "max_wind_speed_mph": None,
+            "mean_pressure_mb": None,
+            "mean_wind_speed_mph": None,
+            "track_length_km": 0.0,
+        }
+
+    pressure = [p for p in track.pressure if p != 0]
+    wind = [w for w in track.wind if w != 0]
+
+    length = 0.0
+    for i in range(1, len(track.time)):
+        phi0 = math.radians(track.latitude[i - 1])
+        phi1 = math.radians(track.latitude[i])
+        a = (
+            math.sin((phi1 - phi0) / 2.0) ** 2
+            + math.cos(phi0)
+            * math.cos(phi1)
+            * math.sin(math.radians(track.longitude[i] - track.longitude[i - 1]) / 2.0)
+            ** 2
+        )
+        length += 2.0 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(max(a, 0.0), 1.0)))
+
+    return {
+        "points": len(track.time),
+        "start_time": track.time[0],
+        "end_time": track.time[-1],
+        "first_position": [track.longitude[0], track.latitude[0]],
+        "last_position": [track.longitude[-1], track.latitude[-1]],
+        "min_pressure_mb": min(pressure) if pressure else None,
+        "max_wind_speed_mph": max(wind) if wind else None,
+        "mean_pressure_mb": adeck_mean(sum(pressure), len(pressure)),
+        "mean_wind_speed_mph": adeck_mean(sum(wind), len(wind)),
+        "track_length_km": round(length, 1),
+    }
+
+
+def adeck_mean(total: float, count: float) -> Optional[float]:
+    """
+    Returns a mean rounded to two decimals
+
+    Args:
+        total (float): Sum of the values
+        count (float): Number of values
+
+    Returns:
+        Optional[float]: The mean or None when there are no values
+    """
+    if not count:
+        return None
+    return round(float(total) / float(count), 2)
@@ -0,0 +1,299 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .metget_environment import get_metget_cache_directory
+
+# Name of the A-Deck store database in the cache directory
+ADECK_STORE_FILENAME = "adeck.sqlite"
+
+# Columns of a stored A-Deck track
+ADECK_COLUMNS = ("time", "longitude", "latitude", "pressure", "wind")
+
+
+@dataclass
+class AdeckColumns:
+    """
+    A-Deck forecast track of one model and cycle stored as columns
+    """
+
+    __slots__ = (
+        "cycle",
+        "latitude",
+        "longitude",
+        "model",
+        "pressure",
+        "time",
+        "wind",
+    )
+    model: str
+    cycle: str
+    time: List[str]
+    longitude: List[float]
+    latitude: List[float]
+    pressure: List[float]
+    wind: List[float]
+
+    @staticmethod
+    def from_geojson(model: str, cycle: str, geojson: dict) -> "AdeckColumns":
+        """
+        Creates the columns from a GeoJSON forecast track
+
+        Args:
+            model (str): A-Deck model name
+            cycle (str): Forecast cycle (YYYY-MM-DDThh:mm)
+            geojson (dict): The GeoJSON forecast track
+
+        Returns:
+            AdeckColumns: The columns
+        """
+        features = geojson["features"]
+        return AdeckColumns(
+            model,
+            cycle,
+            [f["properties"]["time_utc"] for f in features],
+            [f["geometry"]["coordinates"][0] for f in features],
+            [f["geometry"]["coordinates"][1] for f in features],
+            [f["properties"]["minimum_sea_level_pressure_mb"] for f in features],
+            [f["properties"]["max_wind_speed_mph"] for f in features],
+        )
+
+    def to_dict(self) -> dict:
+        """
+        Returns the columns as a dictionary of arrays
+
+        Returns:
+            dict: The time, longitude, latitude, pressure, and wind arrays
+        """
+        return {c: getattr(self, c) for c in ADECK_COLUMNS}
+
+
+class AdeckStore:
+    """
+    Local store of A-Deck forecast tracks indexed by year, basin, storm,
+    model, and cycle. Each track is kept as compact columns rather than
+    GeoJSON features.
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor
+
+        Args:
+            path (str): Path of the SQLite database
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                "year INTEGER NOT NULL, "
+                "basin TEXT NOT NULL, "
+                "storm TEXT NOT NULL, "
+                "model TEXT NOT NULL, "
+                "cycle TEXT NOT NULL, "
+                "time TEXT NOT NULL, "
+                "longitude TEXT NOT NULL, "
+                "latitude TEXT NOT NULL, "
+                "pressure TEXT NOT NULL, "
+                "wind TEXT NOT NULL, "
+                "PRIMARY KEY (year, basin, storm, cycle, model))"
+            )
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS cycles ("
+                "year INTEGER NOT NULL, "
+                "basin TEXT NOT NULL, "
+                "storm TEXT NOT NULL, "
+                "cycle TEXT NOT NULL, "
+                "PRIMARY KEY (year, basin, storm, cycle))"
+            )
+
+    def lookup(
+        self, year: int, basin: str, storm: str, model: str, cycle: str
+    ) -> Optional[AdeckColumns]:
+        """
+        Returns a stored track
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin
+            storm (str): Storm number (two digits)
+            model (str): A-Deck model name
+            cycle (str): Forecast cycle (YYYY-MM-DDThh:mm)
+
+        Returns:
+            AdeckColumns: The track or None
+        """
+        tracks = self.query(year, basin, storm, cycle, model)
+        return tracks[0] if tracks else None
+
+    def has_cycle(self, year: int, basin: str, storm: str, cycle: str) -> bool:
+        """
+        Returns whether the tracks of all models of a cycle are stored
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin
+            storm (str): Storm number (two digits)
+            cycle (str): Forecast cycle (YYYY-MM-DDThh:mm)
+
+        Returns:
+            bool: True if all models of the cycle were stored
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT 1 FROM cycles WHERE year = ? AND basin = ? AND storm = ? "
+                "AND cycle = ?",
+                (int(year), basin.upper(), storm, cycle),
+            ).fetchone()
+        return row is not None
+
+    def query(
+        self,
+        year: int,
+        basin: str,
+        storm: str,
+        cycle: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> List[AdeckColumns]:
+        """
+        Returns the stored tracks of a storm
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin
+            storm (str): Storm number (two digits)
+            cycle (str, optional): Only return the tracks of this cycle
+            model (str, optional): Only return the tracks of this model
+
+        Returns:
+            List[AdeckColumns]: The tracks ordered by cycle and model
+        """
+        sql = (
+            "SELECT model, cycle, time, longitude, latitude, pressure, wind "
+            "FROM tracks WHERE year = ? AND basin = ? AND storm = ?"
+        )
+        parameters = [int(year), basin.upper(), storm]
+        if cycle is not None:
+            sql += " AND cycle = ?"
+            parameters.append(cycle)
+        if model is not None:
+            sql += " AND model = ?"
+            parameters.append(model.upper())
+        sql += " ORDER BY cycle, model"
+        with self.__lock:
+            rows = self.__connection.execute(sql, parameters).fetchall()
+        return [
+            AdeckColumns(row[0], row[1], *(json.loads(c) for c in row[2:]))
+            for row in rows
+        ]
+
+    def store(
+        self,
+        year: int,
+        basin: str,
+        storm: str,
+        tracks: List[AdeckColumns],
+        all_models: bool = False,
+    ) -> None:
+        """
+        Stores tracks
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin
+            storm (str): Storm number (two digits)
+            tracks (List[AdeckColumns]): The tracks
+            all_models (bool): The tracks are all models of their cycle
+        """
+        with self.__lock, self.__connection:
+            self.__connection.executemany(
+                "INSERT OR REPLACE INTO tracks "
+                "(year, basin, storm, model, cycle, time, longitude, latitude, "
+                "pressure, wind) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        int(year),
+                        basin.upper(),
+                        storm,
+                        t.model.upper(),
+                        t.cycle,
+                        *(
+                            json.dumps(getattr(t, c), separators=(",", ":"))
+                            for c in ADECK_COLUMNS
+                        ),
+                    )
+                    for t in tracks
+                ],
+            )
+            if all_models:
+                self.__connection.executemany(
+                    "INSERT OR REPLACE INTO cycles (year, basin, storm, cycle) "
+                    "VALUES (?, ?, ?, ?)",
+                    [
+                        (int(year), basin.upper(), storm, cycle)
+                        for cycle in sorted({t.cycle for t in tracks})
+                    ],
+                )
+
+    def close(self) -> None:
+        """
+        Closes the database
+        """
+        self.__connection.close()
+
+    def __enter__(self) -> "AdeckStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def metget_adeck_store_from_args(args: argparse.Namespace) -> Optional[AdeckStore]:
+    """
+    Opens the A-Deck store unless it was disabled on the command line
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        AdeckStore: The A-Deck store or None when disabled
+    """
+    if not getattr(args, "adeck_store", False):
+        return None
+    return AdeckStore(os.path.join(get_metget_cache_directory(), ADECK_STORE_FILENAME))
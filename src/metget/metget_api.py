@@ -0,0 +1,1079 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import requests
+
+from .metget_adeck_store import AdeckColumns, AdeckStore
+from .metget_build import MetGetBuildRest, server_error_messages
+from .metget_data import MODEL_TYPES
+from .metget_download import MetGetDownloader
+from .metget_environment import get_metget_environment_variables
+from .metget_json import iter_response_items, response_body
+from .metget_query import adeck_path, status_query, track_query
+from .metget_session import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_POOL_SIZE,
+    MetGetApiError,
+    MetGetSession,
+    metget_session_from_args,
+)
+from .metget_status_cache import StatusCache, status_cache_key
+from .metget_track_store import TrackStore
+from .spinnerlogger import SpinnerLogger
+
+# Models reported by a status query for all models. The hindcast (era5) status
+# is not provided by the server.
+STATUS_ALL_MODELS = [m for m, c in MODEL_TYPES.items() if c != "hindcast"]
+
+
+def status_model_list(model: str) -> List[str]:
+    """
+    Parses the model argument of a status query, which is a single model,
+    a comma separated list of models, or 'all'
+
+    Args:
+        model (str): Model argument
+
+    Returns:
+        List[str]: The models to query
+    """
+    if model == "all":
+        return list(STATUS_ALL_MODELS)
+    models = [m.strip() for m in model.split(",") if m.strip()]
+    for m in models:
+        if m not in MODEL_TYPES:
+            msg = f"Unknown model: {m:s}"
+            raise ValueError(msg)
+    if not models:
+        msg = "No model specified"
+        raise ValueError(msg)
+    return list(dict.fromkeys(models))
+
+
+def track_advisories(
+    data: dict, year: int, basin: str, storm: Union[int, str]
+) -> List[str]:
+    """
+    Returns the forecast advisories of a storm listed in the status of a
+    track source (nhc, jtwc)
+
+    Args:
+        data (dict): Status of the track source
+        year (int): Storm year
+        basin (str): Basin
+        storm (Union[int, str]): Storm number
+
+    Returns:
+        List[str]: The advisories in issue order
+    """
+    storms = data.get("forecast", {}).get(str(year), {}).get(basin.lower(), {})
+    return sorted(storms.get(f"{int(storm):02d}", {}))
+
+
+@dataclass
+class CreditBalance:
+    """
+    Credit balance of an API key
+    """
+
+    __slots__ = ("credit_balance", "credit_limit", "credits_used")
+    credit_limit: float
+    credits_used: float
+    credit_balance: float
+
+    @property
+    def unlimited(self) -> bool:
+        """
+        Returns whether the API key has no credit limit
+
+        Returns:
+            bool: True if the credits are unlimited
+        """
+        return self.credit_limit == 0 and self.credit_balance == 0
+
+
+@dataclass
+class ModelStatus:
+    """
+    Data available on the server for a model
+    """
+
+    __slots__ = ("data", "model", "model_class", "server_model")
+    model: str
+    server_model: str
+    model_class: str
+    data: dict
+
+
+@dataclass
+class StormTrack:
+    """
+    Best track or forecast track of a storm
+    """
+
+    __slots__ = (
+        "advisory",
+        "basin",
+        "geojson",
+        "source",
+        "storm",
+        "track_type",
+        "year",
+    )
+    source: str
+    basin: str
+    storm: str
+    year: int
+    track_type: str
+    advisory: Optional[str]
+    geojson: dict
+
+
+@dataclass
+class AdeckTracks:
+    """
+    A-Deck forecast tracks for a forecast cycle
+    """
+
+    __slots__ = ("basin", "cycle", "model", "storm", "tracks", "year")
+    year: int
+    basin: str
+    model: str
+    storm: Union[int, str]
+    cycle: datetime
+    tracks: dict
+
+    @property
+    def multiple(self) -> bool:
+        """
+        Returns whether the tracks are keyed by storm or model ('all' was requested)
+
+        Returns:
+            bool: True if the tracks hold more than one storm or model
+        """
+        return self.storm == "all" or self.model.lower() == "all"
+
+
+@dataclass
+class SubmittedRequest:
+    """
+    A request submitted to MetGet
+    """
+
+    __slots__ = ("request_id", "status_code")
+    request_id: str
+    status_code: int
+
+
+@dataclass
+class RequestStatus:
+    """
+    Status of a request
+    """
+
+    __slots__ = ("data_url", "request_id", "status")
+    request_id: str
+    status: str
+    data_url: str
+
+
+class MetGetClient:
+    """
+    Library interface to the MetGet API. The client resolves its endpoint and
+    API key once, reuses one pooled session for all calls, and returns the
+    results as data classes instead of printing them, so that it can be used
+    from long running applications. The command line subcommands render the
+    results of this client.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        api_version: int = 2,
+        session: Optional[MetGetSession] = None,
+        status_cache: Optional[StatusCache] = None,
+        track_store: Optional[TrackStore] = None,
+        adeck_store: Optional[AdeckStore] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            endpoint (str): MetGet API endpoint
+            api_key (str): MetGet API key
+            api_version (int): MetGet API version. Must be 2
+            session (MetGetSession, optional): Pooled session used for all calls
+            status_cache (StatusCache, optional): Cache of status responses
+            track_store (TrackStore, optional): Local store of storm tracks
+            adeck_store (AdeckStore, optional): Local store of A-Deck tracks
+        """
+        if api_version != 2:
+            msg = "Only API version 2 is supported."
+            raise RuntimeError(msg)
+        self.__endpoint = endpoint
+        self.__status_cache = status_cache
+        self.__track_store = track_store
+        self.__adeck_store = adeck_store
+        self.__session = (
+            session
+            if session is not None
+            else MetGetSession(endpoint=endpoint, api_key=api_key)
+        )
+        self.__build = MetGetBuildRest(endpoint, api_key, api_version, self.__session)
+
+    @staticmethod
+    def from_environment(
+        endpoint: Optional[str] = None,
+        api_key: Optional[str] = None,
+        api_version: Optional[int] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ) -> "MetGetClient":
+        """
+        Creates a client using the METGET_ENDPOINT, METGET_API_KEY, and
+        METGET_API_VERSION environment variables for any value not given
+
+        Args:
+            endpoint (str, optional): MetGet API endpoint
+            api_key (str, optional): MetGet API key
+            api_version (int, optional): MetGet API version
+            pool_size (int): Number of connections to keep alive
+            max_retries (int): Number of retries for failed idempotent requests
+
+        Returns:
+            MetGetClient: The client
+        """
+        return MetGetClient.from_args(
+            argparse.Namespace(
+                endpoint=endpoint,
+                apikey=api_key,
+                api_version=api_version,
+                pool_size=pool_size,
+                retries=max_retries,
+            )
+        )
+
+    @staticmethod
+    def from_args(
+        args: argparse.Namespace,
+        min_pool_size: int = 1,
+        session: Optional[MetGetSession] = None,
+        status_cache: Optional[StatusCache] = None,
+        track_store: Optional[TrackStore] = None,
+        adeck_store: Optional[AdeckStore] = None,
+    ) -> "MetGetClient":
+        """
+        Creates a client from the command line arguments
+
+        Args:
+            args: The arguments passed to the command line
+            min_pool_size (int): Minimum number of pooled connections
+            session (MetGetSession, optional): Existing session to use instead
+                of creating one from the arguments
+            status_cache (StatusCache, optional): Cache of status responses
+            track_store (TrackStore, optional): Local store of storm tracks
+            adeck_store (AdeckStore, optional): Local store of A-Deck tracks
+
+        Returns:
+            MetGetClient: The client
+        """
+        environment = get_metget_environment_variables(args)
+        if session is None:
+            session = metget_session_from_args(args, environment, min_pool_size)
+        return MetGetClient(
+            environment["endpoint"],
+            environment["apikey"],
+            environment["api_version"],
+            session,
+            status_cache,
+            track_store,
+            adeck_store,
+        )
+
+    @property
+    def endpoint(self) -> str:
+        """
+        Returns the MetGet API endpoint
+
+        Returns:
+            str: The endpoint
+        """
+        return self.__endpoint
+
+    @property
+    def session(self) -> MetGetSession:
+        """
+        Returns the pooled session used by the client
+
+        Returns:
+            MetGetSession: The session
+        """
+        return self.__session
+
+    @property
+    def build_client(self) -> MetGetBuildRest:
+        """
+        Returns the request builder sharing this client's session
+
+        Returns:
+            MetGetBuildRest: The request builder
+        """
+        return self.__build
+
+    def close(self) -> None:
+        """
+        Closes the pooled session
+        """
+        self.__session.close()
+
+    def __enter__(self) -> "MetGetClient":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @staticmethod
+    def __raise_for_status(response) -> None:
+        """
+        Raises a MetGetApiError if the response is not successful
+
+        Args:
+            response: The server response
+        """
+        if response.status_code != 200:
+            try:
+                body = response.json()
+            except ValueError:
+                body = response.text
+            msg = f"MetGet returned status code {response.status_code:d}"
+            raise MetGetApiError(msg, response.status_code, body)
+
+    def __get(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        headers: Optional[dict] = None,
+    ) -> requests.Response:
+        """
+        Sends a GET request to the MetGet API. The response is streamed so
+        that its body can be parsed while it is read (see metget_json)
+
+        Args:
+            url (str): Request url
+            params (dict, optional): Query parameters
+            headers (dict, optional): Additional request headers
+
+        Returns:
+            requests.Response: The server response
+        """
+        return self.__session.get(url, params=params, headers=headers, stream=True)
+
+    def __get_body(self, url: str, params: Optional[dict] = None):
+        """
+        Sends a GET request to the MetGet API and returns the response body,
+        which is parsed exactly once
+
+        Args:
+            url (str): Request url
+            params (dict, optional): Query parameters
+
+        Returns:
+            The 'body' of the JSON response
+        """
+        response = self.__get(url, params)
+        MetGetClient.__raise_for_status(response)
+        return response_body(response)
+
+    def __get_status_body(self, params: dict, model_class: str, refresh: bool):
+        """
+        Gets the body of a status response, using the status cache when one is
+        configured. Cached entries younger than the time to live of the model
+        class are returned directly, older entries are revalidated with the
+        server using their ETag / Last-Modified validators.
+
+        Args:
+            params (dict): Query parameters of the status request
+            model_class (str): Model class (see MODEL_TYPES)
+            refresh (bool): Ignore the cached entry and fetch the full response
+
+        Returns:
+            The 'body' of the JSON response
+        """
+        url = self.__endpoint + "/status"
+        if self.__status_cache is None:
+            return self.__get_body(url, params)
+
+        key = status_cache_key(self.__endpoint, params)
+        entry = None if refresh else self.__status_cache.lookup(key)
+        if entry is not None and self.__status_cache.is_fresh(entry, model_class):
+            return entry.body
+
+        headers = entry.validators() if entry is not None else None
+        response = self.__get(url, params, headers)
+        if response.status_code == 304 and entry is not None:
+            # ...The body is not read, so the streamed response is closed to
+            # return its connection to the pool
+            response.close()
+            self.__status_cache.touch(key)
+            return entry.body
+
+        MetGetClient.__raise_for_status(response)
+        body = response_body(response)
+        self.__status_cache.store(
+            key,
+            body,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+        return body
+
+    def credits(self) -> CreditBalance:
+        """
+        Gets the credit balance of the API key
+
+        Returns:
+            CreditBalance: The credit balance
+        """
+        body = self.__get_body(self.__endpoint + "/credits")
+        return CreditBalance(
+            body["credit_limit"], body["credits_used"], body["credit_balance"]
+        )
+
+    def status(
+        self,
+        model: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        storm: Optional[str] = None,
+        basin: Optional[str] = None,
+        ensemble_member: Optional[str] = None,
+        year: Optional[Union[int, str]] = None,
+        refresh: bool = False,
+    ) -> ModelStatus:
+        """
+        Gets the data available on the server for a model. The filters which
+        apply depend on the type of the model (see MODEL_TYPES) and the others
+        are ignored.
+
+        Args:
+            model (str): Model name (see AVAILABLE_MODELS)
+            start (datetime, optional): Start of the period to report
+            end (datetime, optional): End of the period to report. Defaults to
+                today when a start is given
+            storm (str, optional): Storm name or number
+            basin (str, optional): Basin (track data)
+            ensemble_member (str, optional): Ensemble member
+            year (Union[int, str], optional): Storm year (ensemble track data)
+            refresh (bool): Bypass the status cache and fetch the full status
+
+        Returns:
+            ModelStatus: The status of the model
+        """
+        server_model, model_class, params = status_query(
+            model, start, end, storm, basin, ensemble_member
+        )
+        data = self.__get_status_body(params, model_class, refresh)
+
+        # ...The ensemble track status endpoint does not take year/basin/storm
+        # query parameters, so those filters are applied here
+        if model_class == "track-ensemble":
+            data = MetGetClient.__filter_track_ensemble(data, year, basin, storm)
+
+        return ModelStatus(model, server_model, model_class, data)
+
+    def status_many(
+        self,
+        models: List[str],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        refresh: bool = False,
+        max_workers: Optional[int] = None,
+    ) -> Tuple[Dict[str, ModelStatus], Dict[str, Exception]]:
+        """
+        Gets the status of several models concurrently over the pooled session.
+        The storm, basin, and ensemble member filters of status() are model
+        specific and are not available here.
+
+        Args:
+            models (List[str]): Model names (see status_model_list)
+            start (datetime, optional): Start of the period to report
+            end (datetime, optional): End of the period to report
+            refresh (bool): Bypass the status cache and fetch the full status
+            max_workers (int, optional): Number of concurrent queries. Defaults
+                to one per model
+
+        Returns:
+            Tuple[Dict[str, ModelStatus], Dict[str, Exception]]: The status of
+                each model which succeeded and the error of each which failed
+        """
+        results = {}
+        errors = {}
+        if not models:
+            return results, errors
+        with ThreadPoolExecutor(max_workers=max_workers or len(models)) as executor:
+            futures = {
+                m: executor.submit(
+                    self.status, m, start=start, end=end, refresh=refresh
+                )
+                for m in models
+            }
+            for m, future in futures.items():
+                try:
+                    results[m] = future.result()
+                except (MetGetApiError, RuntimeError, ValueError, OSError) as e:
+                    errors[m] = e
+        return results, errors
+
+    @staticmethod
+    def __filter_track_ensemble(
+        data: dict,
+        year: Optional[Union[int, str]],
+        basin: Optional[str],
+        storm: Optional[str],
+    ) -> dict:
+        """
+        Filters the ensemble track status (year -> basin -> storm)
+
+        Args:
+            data (dict): Status from the server
+            year (Union[int, str], optional): Year to keep
+            basin (str, optional): Basin to keep
+            storm (str, optional): Storm to keep
+
+        Returns:
+            dict: The filtered status
+        """
+        if year:
+            data = {k: v for k, v in data.items() if k == str(year)}
+        if basin:
+            data = {
+                y: {b: storms for b, storms in basins.items() if b == basin.lower()}
+                for y, basins in data.items()
+            }
+        if storm:
+            data = {
+                y: {
+                    b: {s: info for s, info in storms.items() if s == storm}
+                    for b, storms in basins.items()
+                }
+                for y, basins in data.items()
+            }
+        return data
+
+    def track(
+        self,
+        storm: Union[int, str],
+        track_type: str = "besttrack",
+        year: Optional[int] = None,
+        basin: Optional[str] = None,
+        advisory: Union[int, str, None] = None,
+        source: Optional[str] = None,
+        refresh: bool = False,
+    ) -> StormTrack:
+        """
+        Gets the best track or a forecast track of a storm
+
+        Args:
+            storm (Union[int, str]): Storm number
+            track_type (str): 'besttrack' or 'forecast'
+            year (int, optional): Storm year. Defaults to the current year
+            basin (str, optional): Basin. Defaults to 'al' for NHC tracks and
+                is required for JTWC tracks (wp, io, sh)
+            advisory (Union[int, str], optional): Advisory of a forecast track
+            source (str, optional): Track source, 'nhc' (default) or 'jtwc'
+            refresh (bool): Download the track even if it is in the track store
+
+        Returns:
+            StormTrack: The track. When a track store is configured, stored
+                tracks are returned without a request and downloaded tracks
+                are added to the store
+        """
+        year, basin, source = MetGetClient.__track_defaults(year, basin, source)
+        params = track_query(storm, track_type, year, basin, advisory, source)
+        storm_id = params["storm"]
+        advisory_id = params.get("advisory")
+
+        geojson = None
+        if self.__track_store is not None and not refresh:
+            geojson = self.__track_store.lookup(
+                source, basin, year, storm_id, advisory_id
+            )
+        if geojson is None:
+            body = self.__get_body(self.__endpoint + "/stormtrack", params)
+            geojson = body["geojson"]
+            if self.__track_store is not None:
+                self.__track_store.store(
+                    source, basin, year, storm_id, advisory_id, geojson
+                )
+        return StormTrack(
+            source, basin, storm_id, year, track_type, advisory_id, geojson
+        )
+
+    @staticmethod
+    def __track_defaults(
+        year: Optional[int], basin: Optional[str], source: Optional[str]
+    ) -> Tuple[int, str, str]:
+        """
+        Resolves the default year, basin, and source of a track query
+
+        Args:
+            year (int, optional): Storm year. Defaults to the current year
+            basin (str, optional): Basin. Defaults to 'al' for NHC tracks and
+                is required for JTWC tracks
+            source (str, optional): Track source. Defaults to 'nhc'
+
+        Returns:
+            Tuple[int, str, str]: The year, basin, and source
+        """
+        source = source or "nhc"
+        if not basin:
+            if source == "jtwc":
+                msg = "Basin must be specified for JTWC track data (wp, io, sh)"
+                raise ValueError(msg)
+            basin = "al"
+        if not year:
+            year = datetime.now().year
+        return year, basin, source
+
+    def __fetch_tracks(
+        self,
+        queries: Dict[str, tuple],
+        max_workers: int,
+        refresh: bool = False,
+    ) -> Tuple[Dict[str, StormTrack], Dict[str, Exception]]:
+        """
+        Gets several tracks concurrently
+
+        Args:
+            queries (Dict[str, tuple]): Arguments of the track method
+                (storm, track_type, year, basin, advisory, source) by name
+            max_workers (int): Number of concurrent downloads
+            refresh (bool): Download the tracks even if they are stored
+
+        Returns:
+            Tuple[Dict[str, StormTrack], Dict[str, Exception]]: The tracks
+                and the error of each track which failed, by name
+        """
+        tracks = {}
+        errors = {}
+        if not queries:
+            return tracks, errors
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                name: executor.submit(self.track, *query, refresh=refresh)
+                for name, query in queries.items()
+            }
+            for name, future in futures.items():
+                try:
+                    tracks[name] = future.result()
+                except (MetGetApiError, RuntimeError, ValueError, OSError) as e:
+                    errors[name] = e
+        return tracks, errors
+
+    def forecast_tracks(
+        self,
+        storm: Union[int, str],
+        advisories: Optional[Iterable[int]] = None,
+        year: Optional[int] = None,
+        basin: Optional[str] = None,
+        source: Optional[str] = None,
+        max_workers: int = 8,
+        refresh: bool = False,
+    ) -> Tuple[Dict[str, StormTrack], Dict[str, Exception]]:
+        """
+        Gets the forecast tracks of several advisories of a storm concurrently.
+        The advisories are discovered from the status of the track source so
+        that only advisories which were issued are requested.
+
+        Args:
+            storm (Union[int, str]): Storm number
+            advisories (Iterable[int], optional): Advisory numbers to get.
+                Defaults to all advisories of the storm
+            year (int, optional): Storm year. Defaults to the current year
+            basin (str, optional): Basin. Defaults to 'al' for NHC tracks and
+                is required for JTWC tracks (wp, io, sh)
+            source (str, optional): Track source, 'nhc' (default) or 'jtwc'
+            max_workers (int): Number of concurrent downloads
+            refresh (bool): Download the tracks even if they are stored
+
+        Returns:
+            Tuple[Dict[str, StormTrack], Dict[str, Exception]]: The tracks in
+                advisory order and the error of each advisory which failed
+        """
+        if not storm:
+            msg = "Storm must be specified for track data"
+            raise ValueError(msg)
+        year, basin, source = MetGetClient.__track_defaults(year, basin, source)
+        basin = basin.lower()
+
+        available = track_advisories(
+            self.status(source, basin=basin).data, year, basin, storm
+        )
+        if advisories is not None:
+            wanted = {int(a) for a in advisories}
+            available = [a for a in available if a.isdigit() and int(a) in wanted]
+
+        return self.__fetch_tracks(
+            {a: (storm, "forecast", year, basin, a, source) for a in available},
+            max_workers,
+            refresh,
+        )
+
+    def prefetch_season(
+        self,
+        year: int,
+        basin: str,
+        source: str = "nhc",
+        max_workers: int = 8,
+    ) -> Tuple[int, Dict[str, Exception]]:
+        """
+        Downloads the best tracks and all forecast advisories of a season into
+        the track store. The storms and advisories are discovered from the
+        status of the track source and tracks which are already stored are
+        skipped.
+
+        Args:
+            year (int): Season
+            basin (str): Basin
+            source (str): Track source, 'nhc' or 'jtwc'
+            max_workers (int): Number of concurrent downloads
+
+        Returns:
+            Tuple[int, Dict[str, Exception]]: The number of tracks downloaded
+                and the error of each track which failed
+        """
+        if self.__track_store is None:
+            msg = "A track store is required to prefetch tracks"
+            raise RuntimeError(msg)
+
+        basin = basin.lower()
+        data = self.status(source, basin=basin).data
+
+        wanted = []
+        for storm in data.get("best_track", {}).get(str(year), {}).get(basin, {}):
+            wanted.append((storm, "besttrack", None))
+        for storm in data.get("forecast", {}).get(str(year), {}).get(basin, {}):
+            wanted.extend(
+                (storm, "forecast", a)
+                for a in track_advisories(data, year, basin, storm)
+            )
+
+        missing = [
+            (storm, track_type, advisory)
+            for storm, track_type, advisory in wanted
+            if not self.__track_store.contains(
+                source,
+                basin,
+                year,
+                f"{int(storm):02d}",
+                None if advisory is None else f"{int(advisory):03d}",
+            )
+        ]
+
+        tracks, errors = self.__fetch_tracks(
+            {
+                f"{storm}/{advisory or 'best'}": (
+                    storm,
+                    track_type,
+                    year,
+                    basin,
+                    advisory,
+                    source,
+                )
+                for storm, track_type, advisory in missing
+            },
+            max_workers,
+        )
+        return len(tracks), errors
+
+    def __adeck_request(
+        self,
+        year: int,
+        basin: str,
+        model: str,
+        storm: Union[int, str],
+        cycle: datetime,
+    ) -> Tuple[str, AdeckTracks]:
+        """
+        Validates the parameters of an A-Deck query
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin (AL, EP, CP, WP, IO, SH)
+            model (str): A-Deck model name or 'all'
+            storm (Union[int, str]): Storm number or 'all'
+            cycle (datetime): Forecast cycle
+
+        Returns:
+            Tuple[str, AdeckTracks]: The request url and the (empty) result
+        """
+        path, basin, model, storm = adeck_path(year, basin, model, storm, cycle)
+        return self.__endpoint + path, AdeckTracks(year, basin, model, storm, cycle, {})
+
+    def adeck(
+        self,
+        year: int,
+        basin: str,
+        model: str,
+        storm: Union[int, str],
+        cycle: datetime,
+    ) -> AdeckTracks:
+        """
+        Gets the A-Deck forecast tracks for a forecast cycle
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin (AL, EP, CP, WP, IO, SH)
+            model (str): A-Deck model name or 'all'
+            storm (Union[int, str]): Storm number or 'all'
+            cycle (datetime): Forecast cycle
+
+        Returns:
+            AdeckTracks: The forecast tracks. When the storm or model is 'all'
+                the tracks are keyed by storm or model
+        """
+        url, tracks = self.__adeck_request(year, basin, model, storm, cycle)
+        body = self.__get_body(url)
+        tracks.tracks = body["storm_tracks"] if tracks.multiple else body["storm_track"]
+        return tracks
+
+    def iter_adeck(
+        self,
+        year: int,
+        basin: str,
+        model: str,
+        storm: Union[int, str],
+        cycle: datetime,
+    ) -> Tuple[AdeckTracks, Iterator[Tuple[str, dict]]]:
+        """
+        Gets the A-Deck forecast tracks of all storms or all models for a
+        forecast cycle one track at a time. The response is parsed as it is
+        read (see metget_json.iter_response_items), so only one track is held
+        in memory. The iterator should be consumed to release the connection.
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin (AL, EP, CP, WP, IO, SH)
+            model (str): A-Deck model name or 'all'
+            storm (Union[int, str]): Storm number or 'all'
+            cycle (datetime): Forecast cycle
+
+        Returns:
+            Tuple[AdeckTracks, Iterator[Tuple[str, dict]]]: The query (with no
+                tracks) and an iterator of the tracks keyed by storm or model
+        """
+        url, tracks = self.__adeck_request(year, basin, model, storm, cycle)
+        if not tracks.multiple:
+            msg = "Storm or model must be 'all' to iterate the A-Deck tracks"
+            raise ValueError(msg)
+        response = self.__get(url)
+        MetGetClient.__raise_for_status(response)
+        return tracks, iter_response_items(response, "body.storm_tracks")
+
+    def harvest_adeck(
+        self,
+        year: int,
+        basin: str,
+        storm: Union[int, str],
+        models: List[str],
+        cycles: List[datetime],
+        max_workers: int = 8,
+        refresh: bool = False,
+    ) -> Tuple[List[AdeckColumns], Dict[str, Exception]]:
+        """
+        Gets the A-Deck forecast tracks of several models over several forecast
+        cycles of a storm. The tracks are downloaded concurrently, one request
+        per model and cycle or one request per cycle when the models are
+        'all'. When an A-Deck store is configured, stored tracks are not
+        downloaded again and downloaded tracks are added to the store.
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin (AL, EP, CP, WP, IO, SH)
+            storm (Union[int, str]): Storm number
+            models (List[str]): A-Deck model names or ['all']
+            cycles (List[datetime]): Forecast cycles
+            max_workers (int): Number of concurrent downloads
+            refresh (bool): Download the tracks even if they are stored
+
+        Returns:
+            Tuple[List[AdeckColumns], Dict[str, Exception]]: The tracks ordered
+                by cycle and model and the error of each download which
+                failed, keyed by cycle/model
+        """
+        if str(storm) == "all":
+            msg = "A single storm must be specified to harvest A-Deck tracks"
+            raise ValueError(msg)
+        models = [m.upper() for m in models]
+        if not models or not cycles:
+            msg = "At least one model and one cycle must be specified"
+            raise ValueError(msg)
+        all_models = "ALL" in models
+        if all_models:
+            models = ["ALL"]
+        store = None if refresh else self.__adeck_store
+
+        basin = basin.upper()
+        storm_id = f"{int(storm):02d}"
+        tracks = []
+        queries = {}
+        for cycle in cycles:
+            cycle_str = cycle.strftime("%Y-%m-%dT%H:%M")
+            if all_models:
+                if store is not None and store.has_cycle(
+                    year, basin, storm_id, cycle_str
+                ):
+                    tracks.extend(store.query(year, basin, storm_id, cycle_str))
+                    continue
+                queries[f"{cycle_str}/ALL"] = ("ALL", cycle)
+                continue
+            for model in models:
+                stored = (
+                    None
+                    if store is None
+                    else store.lookup(year, basin, storm_id, model, cycle_str)
+                )
+                if stored is None:
+                    queries[f"{cycle_str}/{model}"] = (model, cycle)
+                else:
+                    tracks.append(stored)
+
+        errors = {}
+        if queries:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {
+                    name: executor.submit(self.adeck, year, basin, model, storm, cycle)
+                    for name, (model, cycle) in queries.items()
+                }
+                for name, future in futures.items():
+                    try:
+                        result = future.result()
+                    except (MetGetApiError, RuntimeError, ValueError, OSError) as e:
+                        errors[name] = e
+                        continue
+                    cycle_str = name.split("/")[0]
+                    if result.multiple:
+                        downloaded = [
+                            AdeckColumns.from_geojson(m, cycle_str, t)
+                            for m, t in result.tracks.items()
+                        ]
+                    else:
+                        downloaded = [
+                            AdeckColumns.from_geojson(
+                                result.model, cycle_str, result.tracks
+                            )
+                        ]
+                    tracks.extend(downloaded)
+                    if self.__adeck_store is not None:
+                        self.__adeck_store.store(
+                            year, basin, storm_id, downloaded, result.multiple
+                        )
+
+        tracks.sort(key=lambda t: (t.cycle, t.model))
+        return tracks, errors
+
+    def build(self, request_json: dict) -> SubmittedRequest:
+        """
+        Submits a request (see MetGetBuildRest.generate_request_json)
+
+        Args:
+            request_json (dict): Request JSON
+
+        Returns:
+            SubmittedRequest: Request id and the status code reported by MetGet
+
+        Raises:
+            MetGetApiError: The request was not accepted. The error messages
+                reported by the server are available in its errors attribute
+        """
+        request_id, status_code, body = self.__build.submit_metget_request(request_json)
+        if status_code != 200:
+            msg = f"MetGet rejected request {request_id:s} with status code {status_code:d}"
+            raise MetGetApiError(msg, status_code, body, server_error_messages(body))
+        return SubmittedRequest(request_id, status_code)
+
+    def check(self, request_id: str) -> RequestStatus:
+        """
+        Checks the status of a request
+
+        Args:
+            request_id (str): Request id
+
+        Returns:
+            RequestStatus: The status of the request
+        """
+        data_url, status = self.__build.check_metget_status(request_id)
+        return RequestStatus(request_id, status, data_url)
+
+    def download(
+        self,
+        request: RequestStatus,
+        output_directory: str,
+        max_workers: int = 4,
+        segments: int = 1,
+    ) -> List[str]:
+        """
+        Downloads the files of a completed request
+
+        Args:
+            request (RequestStatus): Status of the completed request
+            output_directory (str): Directory to write the files to
+            max_workers (int): Number of files downloaded concurrently
+            segments (int): Number of byte range segments used for large files
+
+        Returns:
+            List[str]: Paths of the downloaded files
+        """
+        if request.status != "completed":
+            msg = (
+                f"Request {request.request_id:s} is not completed ({request.status:s})"
+            )
+            raise RuntimeError(msg)
+        file_list = self.__build.get_request_file_list(request.data_url)
+        if file_list is None:
+            msg = "Could not retrieve the file list. The request may have expired"
+            raise RuntimeError(msg)
+        downloader = MetGetDownloader(
+            max_workers=max_workers,
+            spinner=SpinnerLogger(silent=True),
+            session=self.__session,
+            segments=segments,
+            label=request.request_id,
+        )
+        downloader.download_files(
+            request.data_url, file_list["output_files"], output_directory
+        )
+        return [os.path.join(output_directory, f) for f in file_list["output_files"]]
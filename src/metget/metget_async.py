@@ -0,0 +1,633 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple, Union
+
+from .metget_download import (
+    DOWNLOAD_CHUNK_SIZE,
+    JOURNAL_COMMIT_INTERVAL,
+    PARTIAL_FILE_SUFFIX,
+    DownloadJournal,
+)
+from .metget_polling import (
+    DEFAULT_CHECK_INTERVAL,
+    MAX_CONSECUTIVE_FAILURES,
+    FixedPollingPolicy,
+    PollingPolicy,
+)
+from .metget_query import adeck_path, status_query, track_query
+from .metget_session import (
+    DEFAULT_MAX_RETRIES,
+    DEFAULT_RETRY_BACKOFF,
+    RETRY_STATUS_CODES,
+    is_endpoint_url,
+)
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Default number of concurrent connections held by the async client
+DEFAULT_ASYNC_POOL_SIZE = 100
+
+
+class AsyncMetGetClient:
+    """
+    Asyncio client for the MetGet API. It provides the same operations as the
+    command line client (build, check, download, status, track, adeck, and
+    credits) as coroutines which return the parsed server responses, so that
+    many requests can be driven from a single event loop. Requires the
+    optional 'aiohttp' dependency (pip install metget[async]).
+
+    The client should be used as an async context manager, e.g.:
+
+        async with AsyncMetGetClient(endpoint, api_key) as client:
+            request_id, _ = await client.build(request_json)
+            await client.download_request(request_id, "output")
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: str,
+        api_version: int = 2,
+        pool_size: int = DEFAULT_ASYNC_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+    ):
+        """
+        Constructor
+
+        Args:
+            endpoint (str): MetGet API endpoint
+            api_key (str): MetGet API key
+            api_version (int): MetGet API version. Must be 2
+            pool_size (int): Maximum number of concurrent connections
+            max_retries (int): Number of retries for failed idempotent requests
+            retry_backoff (float): Backoff factor between retries
+        """
+        if aiohttp is None:
+            msg = "The async MetGet client requires the 'aiohttp' package (pip install metget[async])"
+            raise RuntimeError(msg)
+        if api_version != 2:
+            msg = f"Invalid MetGet API version. Must be 2. Got {api_version:d}"
+            raise RuntimeError(msg)
+        if pool_size < 1:
+            msg = f"Connection pool size must be at least 1. Got {pool_size:d}"
+            raise ValueError(msg)
+        self.__endpoint = endpoint.rstrip("/")
+        self.__api_key = api_key
+        self.__pool_size = pool_size
+        self.__max_retries = max_retries
+        self.__retry_backoff = retry_backoff
+        self.__session = None
+
+    async def __aenter__(self) -> "AsyncMetGetClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """
+        Opens the connection pool. Called automatically by the context manager
+        """
+        if self.__session is None:
+            self.__session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.__pool_size)
+            )
+
+    async def close(self) -> None:
+        """
+        Closes the connection pool
+        """
+        if self.__session is not None:
+            await self.__session.close()
+            self.__session = None
+
+    def __headers(self, url: str) -> dict:
+        """
+        Returns the headers for a url. The API key is only sent to the endpoint
+
+        Args:
+            url (str): Request url
+
+        Returns:
+            dict: Request headers
+        """
+        if is_endpoint_url(url, self.__endpoint):
+            return {"x-api-key": self.__api_key}
+        return {}
+
+    async def __request(
+        self, method: str, url: str, **kwargs
+    ) -> Tuple[int, Union[dict, list, str, None]]:
+        """
+        Sends a request and returns the status code and the decoded body. GET
+        requests failing with a transient status or connection error are
+        retried with exponential backoff
+
+        Args:
+            method (str): Http method
+            url (str): Request url
+            **kwargs: Passed to aiohttp (params, json)
+
+        Returns:
+            Tuple[int, Union[dict, list, str, None]]: Status code and the JSON
+                body (or text if the body is not JSON)
+        """
+        if self.__session is None:
+            msg = "The client is not open. Use 'async with AsyncMetGetClient(...)'"
+            raise RuntimeError(msg)
+
+        attempts = self.__max_retries + 1 if method == "GET" else 1
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                async with self.__session.request(
+                    method, url, headers=self.__headers(url), **kwargs
+                ) as response:
+                    if response.status in RETRY_STATUS_CODES and not last:
+                        await asyncio.sleep(self.__retry_backoff * 2**attempt)
+                        continue
+                    text = await response.text()
+                    try:
+                        return response.status, await response.json(content_type=None)
+                    except ValueError:
+                        return response.status, text
+            except aiohttp.ClientConnectionError:
+                if last:
+                    raise
+                await asyncio.sleep(self.__retry_backoff * 2**attempt)
+        msg = f"Request failed: {url:s}"
+        raise RuntimeError(msg)
+
+    async def __get_body(self, url: str, params: Optional[dict] = None):
+        """
+        Sends a GET request to the MetGet API and returns the response body
+
+        Args:
+            url (str): Request url
+            params (dict, optional): Query parameters
+
+        Returns:
+            The 'body' of the JSON response
+        """
+        status, data = await self.__request("GET", url, params=params)
+        if status != 200:
+            msg = f"Request to MetGet was returned status code = {status:d}: {data!s}"
+            raise RuntimeError(msg)
+        return data["body"]
+
+    async def build(self, request_json: dict) -> Tuple[str, int]:
+        """
+        Submits a request (see MetGetBuildRest.generate_request_json)
+
+        Args:
+            request_json (dict): Request JSON
+
+        Returns:
+            Tuple[str, int]: Request id and the status code reported by MetGet
+        """
+        status, data = await self.__request(
+            "POST", self.__endpoint + "/build", json=request_json
+        )
+        if status != 200:
+            msg = f"Request to MetGet was returned status code = {status:d}"
+            raise RuntimeError(msg)
+        return data["body"]["request_id"], data["statusCode"]
+
+    async def check(self, request_id: str) -> Tuple[str, str]:
+        """
+        Checks the status of a request
+
+        Args:
+            request_id (str): Request id
+
+        Returns:
+            Tuple[str, str]: Data url and status
+        """
+        body = await self.__get_body(
+            self.__endpoint + "/check", params={"request-id": request_id}
+        )
+        return body["destination"], body["status"]
+
+    async def wait(
+        self,
+        request_id: str,
+        max_wait: float = 24.0,
+        polling_policy: Optional[PollingPolicy] = None,
+    ) -> Tuple[str, str]:
+        """
+        Waits until a request completes, fails, or the maximum wait time expires
+
+        Args:
+            request_id (str): Request id
+            max_wait (float): Maximum time to wait in hours
+            polling_policy (PollingPolicy, optional): Policy determining the time
+                between status checks. Defaults to checking every
+                DEFAULT_CHECK_INTERVAL seconds
+
+        Returns:
+            Tuple[str, str]: Data url and the last status
+        """
+        if polling_policy is None:
+            polling_policy = FixedPollingPolicy(DEFAULT_CHECK_INTERVAL)
+        start = time.monotonic()
+        deadline = start + max_wait * 3600.0
+        checks = 0
+        failures = 0
+        data_url, status = None, None
+        while True:
+            checks += 1
+            try:
+                data_url, status = await self.check(request_id)
+                failures = 0
+            except (aiohttp.ClientError, RuntimeError, KeyError) as e:
+                failures += 1
+                if time.monotonic() >= deadline:
+                    raise
+                interval = polling_policy.failure_interval(failures)
+                if failures >= MAX_CONSECUTIVE_FAILURES:
+                    msg = f"Status checks for {request_id:s} failed repeatedly: {e!s}"
+                    raise RuntimeError(msg) from e
+            else:
+                if status == "completed":
+                    if checks > 1:
+                        polling_policy.complete()
+                    return data_url, status
+                if status == "error":
+                    return data_url, status
+                interval = polling_policy.next_interval(
+                    status, time.monotonic() - start
+                )
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return data_url, status
+            await asyncio.sleep(min(interval, remaining))
+
+    async def file_list(self, data_url: str) -> Optional[dict]:
+        """
+        Retrieves the file list (filelist.json) of a completed request
+
+        Args:
+            data_url (str): Url of the request data
+
+        Returns:
+            dict: The file list or None if it could not be retrieved
+        """
+        status, data = await self.__request("GET", data_url + "/filelist.json")
+        if status != 200 or not isinstance(data, dict):
+            return None
+        return data
+
+    async def __download_file(self, url: str, destination: str) -> None:
+        """
+        Downloads a single file. As in MetGetDownloader, data is streamed into
+        a partial file whose committed length is recorded in a DownloadJournal,
+        so a transfer which fails with a transient error is retried from where
+        it left off using an HTTP Range request. The partial file is renamed
+        to the destination once it is complete.
+
+        Args:
+            url (str): Url of the file
+            destination (str): Path to write the file to
+        """
+        part_file = destination + PARTIAL_FILE_SUFFIX
+        for attempt in range(self.__max_retries + 1):
+            journal = DownloadJournal.load(destination, url)
+            if journal.segments is not None:
+                # ...Segmented partial files are not resumed by the async
+                # client, so the download starts from the beginning
+                journal.discard()
+                journal = DownloadJournal(destination)
+            try:
+                await self.__download_stream(url, part_file, journal)
+                break
+            except aiohttp.ClientResponseError as e:
+                if e.status not in RETRY_STATUS_CODES or attempt == self.__max_retries:
+                    raise
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError):
+                if attempt == self.__max_retries:
+                    raise
+            await asyncio.sleep(self.__retry_backoff * 2**attempt)
+
+        if journal.size is not None and journal.offset != journal.size:
+            msg = (
+                f"Incomplete download ({journal.offset:d} of "
+                f"{journal.size:d} bytes received)"
+            )
+            raise RuntimeError(msg)
+        os.replace(part_file, destination)
+        journal.remove()
+
+    async def __download_stream(
+        self, url: str, part_file: str, journal: DownloadJournal
+    ) -> None:
+        """
+        Streams a file into the partial file, resuming from the journal offset
+
+        Args:
+            url (str): Url of the file
+            part_file (str): Path of the partial file
+            journal (DownloadJournal): Journal for the partial file
+        """
+        headers = self.__headers(url)
+        if journal.offset > 0:
+            headers["Range"] = f"bytes={journal.offset:d}-"
+            if journal.etag is not None:
+                headers["If-Range"] = journal.etag
+
+        async with self.__session.get(url, headers=headers) as response:
+            if response.status == 416 and journal.offset == journal.size:
+                # ...The partial file already holds the whole file
+                return
+
+            response.raise_for_status()
+            journal.url = url
+            journal.etag = response.headers.get("ETag")
+            if response.status == 206:
+                mode = "r+b"
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit():
+                    journal.size = int(total)
+            else:
+                journal.offset = 0
+                mode = "wb"
+                journal.size = response.content_length
+
+            # ...File writes, syncs, and journal commits block, so they are
+            # run in the default executor to keep the event loop responsive.
+            # Received data is buffered so that each write is a full chunk.
+            loop = asyncio.get_running_loop()
+            f = await loop.run_in_executor(
+                None,
+                AsyncMetGetClient.__open_part_file,
+                part_file,
+                mode,
+                journal.offset,
+            )
+            buffer = bytearray()
+            uncommitted = 0
+            try:
+                async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    buffer += chunk
+                    if len(buffer) < DOWNLOAD_CHUNK_SIZE:
+                        continue
+                    data, buffer = buffer, bytearray()
+                    await loop.run_in_executor(None, f.write, data)
+                    journal.offset += len(data)
+                    uncommitted += len(data)
+                    if uncommitted >= JOURNAL_COMMIT_INTERVAL:
+                        await loop.run_in_executor(
+                            None, AsyncMetGetClient.__commit_part_file, f, journal
+                        )
+                        uncommitted = 0
+            finally:
+                await loop.run_in_executor(
+                    None, AsyncMetGetClient.__close_part_file, f, buffer, journal
+                )
+
+    @staticmethod
+    def __open_part_file(part_file: str, mode: str, offset: int):
+        """
+        Opens the partial file and discards anything after the offset
+
+        Args:
+            part_file (str): Path of the partial file
+            mode (str): File mode used to open the partial file
+            offset (int): Number of bytes of the partial file to keep
+
+        Returns:
+            The open file handle
+        """
+        f = open(part_file, mode)  # noqa: SIM115
+        try:
+            f.seek(offset)
+            f.truncate()
+        except OSError:
+            f.close()
+            raise
+        return f
+
+    @staticmethod
+    def __commit_part_file(f, journal: DownloadJournal) -> None:
+        """
+        Flushes the partial file to disk and commits the journal
+
+        Args:
+            f: Open handle of the partial file
+            journal (DownloadJournal): Journal for the partial file
+        """
+        DownloadJournal.sync(f)
+        journal.commit()
+
+    @staticmethod
+    def __close_part_file(f, buffer: bytearray, journal: DownloadJournal) -> None:
+        """
+        Writes the remaining buffered data, commits the journal, and closes
+        the partial file
+
+        Args:
+            f: Open handle of the partial file
+            buffer (bytearray): Received data which has not been written yet
+            journal (DownloadJournal): Journal for the partial file
+        """
+        try:
+            f.write(buffer)
+            journal.offset += len(buffer)
+            AsyncMetGetClient.__commit_part_file(f, journal)
+        finally:
+            f.close()
+
+    async def download(
+        self,
+        data_url: str,
+        file_list: List[str],
+        output_directory: str,
+        max_concurrency: int = 4,
+    ) -> List[str]:
+        """
+        Downloads the files of a completed request
+
+        Args:
+            data_url (str): Url of the request data
+            file_list (List[str]): Files to download
+            output_directory (str): Directory to write the files to
+            max_concurrency (int): Number of files downloaded at the same time
+
+        Returns:
+            List[str]: Paths of the downloaded files
+        """
+        if self.__session is None:
+            msg = "The client is not open. Use 'async with AsyncMetGetClient(...)'"
+            raise RuntimeError(msg)
+        os.makedirs(output_directory, exist_ok=True)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        paths = [os.path.join(output_directory, f) for f in file_list]
+
+        async def fetch(filename: str, path: str) -> None:
+            async with semaphore:
+                await self.__download_file(data_url + "/" + filename, path)
+
+        results = await asyncio.gather(
+            *[fetch(f, p) for f, p in zip(file_list, paths)],
+            return_exceptions=True,
+        )
+        errors = [f for f, r in zip(file_list, results) if isinstance(r, BaseException)]
+        if errors:
+            msg = f"Failed to download {len(errors):d} of {len(file_list):d} files: {', '.join(errors)}"
+            raise RuntimeError(msg)
+        return paths
+
+    async def download_request(
+        self,
+        request_id: str,
+        output_directory: str,
+        max_wait: float = 24.0,
+        polling_policy: Optional[PollingPolicy] = None,
+        max_concurrency: int = 4,
+    ) -> List[str]:
+        """
+        Waits for a request to complete and downloads its files
+
+        Args:
+            request_id (str): Request id
+            output_directory (str): Directory to write the files to
+            max_wait (float): Maximum time to wait in hours
+            polling_policy (PollingPolicy, optional): Policy determining the time
+                between status checks
+            max_concurrency (int): Number of files downloaded at the same time
+
+        Returns:
+            List[str]: Paths of the downloaded files
+        """
+        data_url, status = await self.wait(request_id, max_wait, polling_policy)
+        if status != "completed":
+            msg = f"Request {request_id:s} did not complete (status: {status!s})"
+            raise RuntimeError(msg)
+        files = await self.file_list(data_url)
+        if files is None:
+            msg = "Could not retrieve the file list. The request may have expired"
+            raise RuntimeError(msg)
+        return await self.download(
+            data_url, files["output_files"], output_directory, max_concurrency
+        )
+
+    async def status(
+        self,
+        model: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        storm: Optional[str] = None,
+        basin: Optional[str] = None,
+        ensemble_member: Optional[str] = None,
+    ) -> dict:
+        """
+        Gets the status of a model on the server. As in MetGetClient.status,
+        only the filters which apply to the type of the model are sent
+
+        Args:
+            model (str): Model name (see AVAILABLE_MODELS)
+            start (datetime, optional): Start of the period to report
+            end (datetime, optional): End of the period to report
+            storm (str, optional): Storm name or number
+            basin (str, optional): Basin
+            ensemble_member (str, optional): Ensemble member
+
+        Returns:
+            dict: The status of the model
+        """
+        _, _, params = status_query(model, start, end, storm, basin, ensemble_member)
+        return await self.__get_body(self.__endpoint + "/status", params)
+
+    async def track(
+        self,
+        storm: Union[int, str],
+        year: int,
+        track_type: str = "besttrack",
+        basin: str = "al",
+        advisory: Union[int, str, None] = None,
+        source: str = "nhc",
+    ) -> dict:
+        """
+        Gets the best track or a forecast track of a storm
+
+        Args:
+            storm (Union[int, str]): Storm number
+            year (int): Storm year
+            track_type (str): 'besttrack' or 'forecast'
+            basin (str): Basin
+            advisory (Union[int, str], optional): Advisory of a forecast track
+            source (str): Track source ('nhc' or 'jtwc')
+
+        Returns:
+            dict: The track as geojson
+        """
+        params = track_query(storm, track_type, year, basin, advisory, source)
+        body = await self.__get_body(self.__endpoint + "/stormtrack", params)
+        return body["geojson"]
+
+    async def adeck(
+        self,
+        year: int,
+        basin: str,
+        model: str,
+        storm: Union[int, str],
+        cycle: datetime,
+    ) -> dict:
+        """
+        Gets the A-Deck forecast tracks of a model for a cycle
+
+        Args:
+            year (int): Storm year
+            basin (str): Basin (AL, EP, CP, WP, IO, SH)
+            model (str): A-Deck model name or 'all'
+            storm (Union[int, str]): Storm number or 'all'
+            cycle (datetime): Forecast cycle
+
+        Returns:
+            dict: The A-Deck data
+        """
+        path, _, _, _ = adeck_path(year, basin, model, storm, cycle)
+        return await self.__get_body(self.__endpoint + path)
+
+    async def credits(self) -> dict:
+        """
+        Gets the credit balance of the API key
+
+        Returns:
+            dict: Credit limit, credits used, and credit balance
+        """
+        return await self.__get_body(self.__endpoint + "/credits")
@@ -0,0 +1,781 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from .metget_build import MetGetBuildRest
+from .metget_data import AVAILABLE_FORMATS, AVAILABLE_VARIABLES
+from .metget_environment import get_metget_environment_variables
+from .metget_file_store import metget_file_store_from_args
+from .metget_polling import metget_polling_policy_from_args
+from .metget_request_cache import (
+    RequestCache,
+    copy_cached_files,
+    is_request_cacheable,
+    metget_request_cache_from_args,
+    request_cache_key,
+)
+from .metget_session import metget_session_from_args
+from .metget_watch import MetGetWatcher, print_watch_summary
+
+# Outcomes of a batch request which count as success
+BATCH_SUCCESS_STATUSES = ("downloaded", "copied", "dry run")
+
+# Values used for the options which are not given in a manifest request or
+# its defaults. These match the defaults of the 'build' command.
+BATCH_REQUEST_DEFAULTS = {
+    "format": "owi-ascii",
+    "variable": "wind_pressure",
+    "analysis": False,
+    "multiple_forecasts": False,
+    "initialization_skip": 0,
+    "backfill": False,
+    "strict": False,
+    "epsg": 4326,
+    "compression": False,
+    "dryrun": False,
+}
+
+# Options which may be given for each request in a manifest
+BATCH_REQUEST_KEYS = {
+    *BATCH_REQUEST_DEFAULTS,
+    "domain",
+    "start",
+    "end",
+    "timestep",
+    "output",
+    "output_directory",
+}
+
+
+class RateLimiter:
+    """
+    Thread safe limiter which spaces calls to acquire evenly so that no more
+    than the given number of calls per second are made
+    """
+
+    def __init__(self, rate: float):
+        """
+        Constructor
+
+        Args:
+            rate (float): Maximum calls per second. Zero or less disables the limit
+        """
+        self.__interval = 1.0 / rate if rate > 0 else 0.0
+        self.__next = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until the caller may proceed
+        """
+        if self.__interval <= 0:
+            return
+        with self.__lock:
+            now = time.monotonic()
+            wait = self.__next - now
+            self.__next = max(self.__next, now) + self.__interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class BatchEntry:
+    """
+    A single request from a batch manifest and its outcome
+    """
+
+    def __init__(
+        self, index: int, name: str, request_json: dict, output_directory: str
+    ):
+        """
+        Constructor
+
+        Args:
+            index (int): Position of the request in the manifest
+            name (str): Base name of the output data of the request
+            request_json (dict): Request JSON sent to MetGet
+            output_directory (str): Directory the request files are written to
+        """
+        self.index = index
+        self.name = name
+        self.request_json = request_json
+        self.output_directory = output_directory
+        self.request_id = None
+        self.status = "pending"
+        self.message = ""
+        self.files = 0
+        self.cache_key = None
+
+    def to_dict(self) -> dict:
+        """
+        Returns the outcome of the request as a dictionary
+
+        Returns:
+            dict: Outcome of the request
+        """
+        return {
+            "index": self.index,
+            "output": self.name,
+            "request_id": self.request_id,
+            "status": self.status,
+            "files": self.files,
+            "output_directory": self.output_directory,
+            "message": self.message,
+        }
+
+
+def read_batch_manifest(filename: str) -> List[dict]:
+    """
+    Reads a batch manifest. The manifest is a JSON or TOML (by file extension)
+    document with a list of 'requests' and an optional table of 'defaults'
+    which apply to every request. The options of each request are named after
+    the 'build' command line options, e.g.:
+
+        {
+            "defaults": {"timestep": 3600, "format": "owi-ascii"},
+            "requests": [
+                {
+                    "domain": [["gfs", 0.25, -100, 10, -60, 50]],
+                    "start": "2023-08-28 00:00",
+                    "end": "2023-09-02 00:00",
+                    "output": "idalia_gfs"
+                }
+            ]
+        }
+
+    Args:
+        filename (str): Path of the manifest
+
+    Returns:
+        List[dict]: Options of each request with the defaults applied
+    """
+    if filename.lower().endswith(".toml"):
+        try:
+            import tomllib as toml  # noqa: PLC0415
+        except ImportError:
+            try:
+                import tomli as toml  # noqa: PLC0415
+            except ImportError:
+                msg = "Reading TOML manifests requires Python 3.11+ or the 'tomli' package"
+                raise RuntimeError(msg) from None
+        with open(filename, "rb") as f:
+            manifest = toml.load(f)
+    else:
+        with open(filename) as f:
+            manifest = json.load(f)
+
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("requests"), list):
+        msg = f"Batch manifest must contain a list of 'requests': {filename:s}"
+        raise RuntimeError(msg)
+
+    defaults = {
+        **BATCH_REQUEST_DEFAULTS,
+        **normalize_batch_options(manifest.get("defaults", {})),
+    }
+    return [
+        {**defaults, **normalize_batch_options(request)}
+        for request in manifest["requests"]
+    ]
+
+
+def normalize_batch_options(options: dict) -> dict:
+    """
+    Normalizes the option names of a manifest request so that both the
+    command line spelling ('multiple-forecasts') and the python spelling
+    ('multiple_forecasts') are accepted
+
+    Args:
+        options (dict): Options of a manifest request
+
+    Returns:
+        dict: Options with normalized names
+    """
+    if not isinstance(options, dict):
+        msg = "Each request and the defaults in a batch manifest must be a table"
+        raise RuntimeError(msg)
+    normalized = {key.replace("-", "_"): value for key, value in options.items()}
+    unknown = sorted(set(normalized) - BATCH_REQUEST_KEYS)
+    if unknown:
+        msg = f"Unknown batch request option(s): {', '.join(unknown)}"
+        raise RuntimeError(msg)
+    return normalized
+
+
+def batch_request_json(options: dict) -> dict:
+    """
+    Validates the options of a manifest request and generates its request JSON
+    in the same way as the 'build' command
+
+    Args:
+        options (dict): Options of the request with the defaults applied
+
+    Returns:
+        dict: Request JSON
+    """
+    for key in ("domain", "start", "end", "timestep", "output"):
+        if not options.get(key):
+            msg = f"Must provide '{key:s}'"
+            raise RuntimeError(msg)
+
+    if options["format"] not in AVAILABLE_FORMATS:
+        msg = f"Invalid output format '{options['format']!s}' selected"
+        raise RuntimeError(msg)
+    output_format = AVAILABLE_FORMATS[options["format"]]
+
+    if options["variable"] not in AVAILABLE_VARIABLES:
+        msg = f"Invalid variable '{options['variable']!s}' selected"
+        raise RuntimeError(msg)
+
+    domains = batch_domains(options)
+    if output_format in ("delft3d", "hec-netcdf") and len(domains) > 1:
+        msg = f"{options['format']!s} does not support more than one domain"
+        raise RuntimeError(msg)
+
+    if "/" in options["output"] or "\\" in options["output"]:
+        msg = "Output filename must not contain slashes. Use 'output_directory' instead"
+        raise RuntimeError(msg)
+
+    return MetGetBuildRest.generate_request_json(
+        analysis=options["analysis"],
+        multiple_forecasts=options["multiple_forecasts"],
+        start_date=batch_datetime(options["start"]),
+        end_date=batch_datetime(options["end"]),
+        format=output_format,
+        data_type=options["variable"],
+        backfill=options["backfill"],
+        time_step=int(options["timestep"]),
+        domains=MetGetBuildRest.parse_command_line_domains(
+            domains, int(options["initialization_skip"])
+        ),
+        compression=options["compression"],
+        epsg=int(options["epsg"]),
+        filename=options["output"],
+        strict=options["strict"],
+        dry_run=options["dryrun"],
+    )
+
+
+def batch_domains(options: dict) -> List[list]:
+    """
+    Returns the domains of a manifest request in the command line form. Domains
+    may be given as lists or as whitespace separated strings.
+
+    Args:
+        options (dict): Options of the request
+
+    Returns:
+        List[list]: Domains as lists of 'model resolution x0 y0 x1 y1' strings
+    """
+    if not options.get("domain"):
+        msg = "Must provide 'domain'"
+        raise RuntimeError(msg)
+    domains = [
+        d.split() if isinstance(d, str) else [str(v) for v in d]
+        for d in options["domain"]
+    ]
+    for d in domains:
+        if len(d) != 6:
+            msg = f"Domain must be 'model resolution x0 y0 x1 y1': {' '.join(d)}"
+            raise RuntimeError(msg)
+    return domains
+
+
+def batch_datetime(value) -> datetime:
+    """
+    Converts a manifest date to a datetime. TOML manifests may give dates as
+    native datetimes, JSON manifests give them as ISO formatted strings
+
+    Args:
+        value: Date from the manifest
+
+    Returns:
+        datetime: The date
+    """
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+def build_batch_entries(
+    request_options: List[dict], output_directory: str
+) -> List[BatchEntry]:
+    """
+    Generates the request JSON of every manifest request. All requests are
+    validated before any is submitted. A request with an ensemble member range
+    (e.g. 'gefs-all') is expanded into one request per member, written to a
+    subdirectory named by the member with the member appended to its output name.
+
+    Args:
+        request_options (List[dict]): Options of each request
+        output_directory (str): Directory the request subdirectories are created in
+
+    Returns:
+        List[BatchEntry]: The batch requests
+    """
+    entries = []
+    directories = set()
+    for index, options in enumerate(request_options):
+        name = str(options.get("output", ""))
+        directory = os.path.join(
+            output_directory, options.get("output_directory") or name
+        )
+        try:
+            members = MetGetBuildRest.expand_ensemble_domains(batch_domains(options))
+            requests_json = [
+                (
+                    member,
+                    batch_request_json(
+                        {
+                            **options,
+                            "domain": domains,
+                            "output": f"{name:s}_{member:s}" if member else name,
+                        }
+                    ),
+                )
+                for member, domains in members
+            ]
+        except (RuntimeError, ValueError, KeyError, IndexError) as e:
+            msg = f"Invalid batch request {index:d} ({name:s}): {e!s}"
+            raise RuntimeError(msg) from e
+
+        for member, request_json in requests_json:
+            entry_directory = os.path.normpath(
+                os.path.join(directory, member) if member else directory
+            )
+            if entry_directory in directories:
+                msg = f"Batch requests must use different output directories: {entry_directory:s}"
+                raise RuntimeError(msg)
+            directories.add(entry_directory)
+            entries.append(
+                BatchEntry(
+                    index, request_json["filename"], request_json, entry_directory
+                )
+            )
+    return entries
+
+
+class MetGetBatch:
+    """
+    Submits many MetGet requests concurrently and hands each submitted request
+    to a MetGetWatcher, which polls and downloads the requests while the
+    remaining ones are still being submitted
+    """
+
+    def __init__(
+        self,
+        client: MetGetBuildRest,
+        watcher_factory,
+        submit_workers: int = 4,
+        submit_rate: float = 2.0,
+        request_cache: Optional[RequestCache] = None,
+        endpoint: str = "",
+    ):
+        """
+        Constructor
+
+        Args:
+            client (MetGetBuildRest): Client used to submit the requests
+            watcher_factory: Creates the MetGetWatcher from a function returning
+                the request JSON and submission time of a request id submitted
+                by the batch (None for reused requests)
+            submit_workers (int): Number of requests submitted concurrently
+            submit_rate (float): Maximum number of submissions per second
+            request_cache (RequestCache, optional): Cache used to reuse the
+                request ids of identical earlier requests
+            endpoint (str): MetGet API endpoint, used in the request cache key
+        """
+        if submit_workers < 1:
+            msg = "Number of submit workers must be at least 1"
+            raise ValueError(msg)
+        self.__client = client
+        self.__submit_workers = submit_workers
+        self.__rate_limiter = RateLimiter(submit_rate)
+        self.__request_cache = request_cache
+        self.__endpoint = endpoint
+        self.__submitted: Dict[str, Tuple[dict, float]] = {}
+        self.__watcher: MetGetWatcher = watcher_factory(self.__submitted.get)
+
+    def __watch(
+        self, entry: BatchEntry, request_id: str, submitted: Optional[float] = None
+    ) -> None:
+        """
+        Adds a submitted request to the watcher
+
+        Args:
+            entry (BatchEntry): The request
+            request_id (str): MetGet request id
+            submitted (float, optional): Time (seconds since the epoch) the
+                request was submitted. None if an earlier request is reused
+        """
+        entry.request_id = request_id
+        entry.status = "submitted"
+        if submitted is not None:
+            self.__submitted[request_id] = (entry.request_json, submitted)
+        self.__watcher.add(request_id, entry.output_directory)
+
+    def __reuse(self, entry: BatchEntry) -> bool:
+        """
+        Reuses an earlier identical request, either by copying its files if they
+        are still on disk or by waiting on its request id
+
+        Args:
+            entry (BatchEntry): The request
+
+        Returns:
+            bool: True if the request does not need to be submitted
+        """
+        if (
+            self.__request_cache is None
+            or entry.request_json["dry_run"]
+            or not is_request_cacheable(entry.request_json)
+        ):
+            return False
+        entry.cache_key = request_cache_key(entry.request_json, self.__endpoint)
+        cached = self.__request_cache.lookup(entry.cache_key)
+        if cached is None:
+            return False
+        if copy_cached_files(cached, entry.output_directory):
+            entry.request_id = cached.request_id
+            entry.status = "copied"
+            entry.files = len(cached.file_list)
+            entry.message = f"Copied from {cached.output_directory:s}"
+            return True
+        if self.__client.is_request_available(cached.request_id):
+            self.__watch(entry, cached.request_id)
+            return True
+        self.__request_cache.remove(entry.cache_key)
+        return False
+
+    def __submit(self, entry: BatchEntry) -> None:
+        """
+        Submits a single request and adds it to the watcher
+
+        Args:
+            entry (BatchEntry): Request to submit
+        """
+        if self.__reuse(entry):
+            return
+
+        self.__rate_limiter.acquire()
+        submitted = time.time()
+        try:
+            request_id, status_code = self.__client.make_metget_request(
+                entry.request_json
+            )
+        except (requests.exceptions.RequestException, RuntimeError, KeyError) as e:
+            entry.status = "submit failed"
+            entry.message = str(e)
+            return
+
+        entry.request_id = request_id
+        if status_code != 200:
+            entry.status = "submit failed"
+            entry.message = f"MetGet returned status code {status_code!s}"
+        elif entry.request_json["dry_run"]:
+            entry.status = "dry run"
+        else:
+            if entry.cache_key is not None:
+                self.__request_cache.store(entry.cache_key, request_id)
+            self.__watch(entry, request_id, submitted)
+
+    def __submit_all(self, entries: List[BatchEntry], done: threading.Event) -> None:
+        """
+        Submits all requests, then signals the watcher that no more will be added
+
+        Args:
+            entries (List[BatchEntry]): Requests to submit
+            done (threading.Event): Set once all requests have been submitted
+        """
+        try:
+            with ThreadPoolExecutor(max_workers=self.__submit_workers) as executor:
+                list(executor.map(self.__submit, entries))
+        finally:
+            done.set()
+            self.__watcher.wake()
+
+    def run(self, entries: List[BatchEntry]) -> List[BatchEntry]:
+        """
+        Submits, polls, and downloads all requests
+
+        Args:
+            entries (List[BatchEntry]): Requests to run
+
+        Returns:
+            List[BatchEntry]: Requests with their outcome
+        """
+        done = threading.Event()
+        producer = threading.Thread(
+            target=self.__submit_all, args=(entries, done), daemon=True
+        )
+        producer.start()
+        watched = self.__watcher.run(done)
+        producer.join()
+
+        for entry in entries:
+            request = watched.get(entry.request_id)
+            if request is None or entry.status != "submitted":
+                continue
+            entry.status = request.status
+            entry.message = request.message
+            entry.files = request.files
+            if entry.status != "downloaded":
+                continue
+            if os.path.abspath(entry.output_directory) != os.path.abspath(
+                request.output_directory
+            ):
+                # ...The watcher downloads each request id once, so an entry
+                # which shares its request id with an earlier entry receives
+                # a copy of the files of that entry
+                MetGetBatch.__copy_download(entry, request.output_directory)
+            elif entry.cache_key is not None:
+                self.__record_download(entry)
+        return entries
+
+    @staticmethod
+    def __copy_download(entry: BatchEntry, source_directory: str) -> None:
+        """
+        Copies the downloaded files of a request into the output directory of
+        another entry which shares its request id
+
+        Args:
+            entry (BatchEntry): The entry to copy the files to
+            source_directory (str): Directory the request was downloaded to
+        """
+        try:
+            with open(os.path.join(source_directory, "filelist.json")) as f:
+                file_list = json.load(f)
+            os.makedirs(entry.output_directory, exist_ok=True)
+            for filename in [*file_list["output_files"], "filelist.json"]:
+                shutil.copy2(
+                    os.path.join(source_directory, filename),
+                    os.path.join(entry.output_directory, filename),
+                )
+        except (OSError, ValueError, KeyError) as e:
+            entry.status = "copy failed"
+            entry.message = str(e)
+            return
+        entry.status = "copied"
+        entry.files = len(file_list["output_files"])
+        entry.message = f"Copied from {source_directory:s}"
+
+    def __record_download(self, entry: BatchEntry) -> None:
+        """
+        Records the downloaded files of a request in the request cache
+
+        Args:
+            entry (BatchEntry): The downloaded request
+        """
+        with open(os.path.join(entry.output_directory, "filelist.json")) as f:
+            file_list = json.load(f)
+        self.__request_cache.complete(
+            entry.cache_key, file_list, entry.output_directory
+        )
+
+    @property
+    def watcher(self) -> MetGetWatcher:
+        """
+        Returns the watcher polling the submitted requests
+
+        Returns:
+            MetGetWatcher: The watcher
+        """
+        return self.__watcher
+
+
+def run_metget_batch(args: argparse.Namespace, entries: List[BatchEntry]) -> None:
+    """
+    Submits, waits on, and downloads the given requests using a single pooled
+    session and prints a summary of the outcome
+
+    Args:
+        args: The arguments passed to the command line
+        entries (List[BatchEntry]): Requests to run
+
+    Returns:
+        None. Exits with status 1 if any request did not succeed
+    """
+    submit_workers = getattr(args, "submit_workers", 4)
+    max_concurrent_downloads = getattr(args, "max_concurrent_downloads", 2)
+    download_workers = getattr(args, "download_workers", 1)
+    download_segments = getattr(args, "download_segments", 1)
+
+    environment = get_metget_environment_variables(args)
+    session = metget_session_from_args(
+        args,
+        environment,
+        max(
+            submit_workers,
+            max_concurrent_downloads * download_workers * download_segments + 1,
+        ),
+    )
+    client = MetGetBuildRest(
+        environment["endpoint"],
+        environment["apikey"],
+        environment["api_version"],
+        session,
+    )
+
+    file_store = metget_file_store_from_args(args)
+
+    def watcher_factory(submitted) -> MetGetWatcher:
+        return MetGetWatcher(
+            client,
+            lambda request_id: metget_polling_policy_from_args(
+                args, *(submitted(request_id) or ())
+            ),
+            args.max_wait,
+            max_concurrent_downloads=max_concurrent_downloads,
+            download_workers=download_workers,
+            download_segments=download_segments,
+            file_store=file_store,
+        )
+
+    request_cache = metget_request_cache_from_args(args)
+    batch = MetGetBatch(
+        client,
+        watcher_factory,
+        submit_workers=submit_workers,
+        submit_rate=getattr(args, "submit_rate", 2.0),
+        request_cache=request_cache,
+        endpoint=environment["endpoint"],
+    )
+
+    print(f"Submitting {len(entries):d} requests", flush=True)
+    try:
+        batch.run(entries)
+    finally:
+        if request_cache is not None:
+            request_cache.close()
+        if file_store is not None:
+            file_store.close()
+    print_watch_summary(batch.watcher.requests)
+
+    for entry in entries:
+        if entry.status == "copied":
+            print(
+                f"Request {entry.index:d} ({entry.name:s}): {entry.message:s} "
+                f"(request {entry.request_id:s})"
+            )
+        elif entry.status == "submit failed":
+            print(
+                f"[ERROR]: Request {entry.index:d} ({entry.name:s}): {entry.message:s}"
+            )
+
+    if getattr(args, "results", None):
+        with open(args.results, "w") as f:
+            f.write(json.dumps([e.to_dict() for e in entries], indent=2))
+
+    failed = [e for e in entries if e.status not in BATCH_SUCCESS_STATUSES]
+    if failed:
+        print(
+            f"[ERROR]: {len(failed):d} of {len(entries):d} requests did not complete: "
+            + ", ".join(f"{e.index:d} ({e.name:s}): {e.status:s}" for e in failed)
+        )
+        sys.exit(1)
+
+
+def metget_batch(args: argparse.Namespace) -> None:
+    """
+    This method is used to submit, wait on, and download the MetGet requests
+    listed in a batch manifest
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        None
+    """
+    output_directory = args.output_directory or os.getcwd()
+    if not os.path.exists(output_directory):
+        msg = f"Output directory does not exist: {output_directory:s}"
+        raise RuntimeError(msg)
+
+    try:
+        entries = build_batch_entries(
+            read_batch_manifest(args.manifest), output_directory
+        )
+    except RuntimeError as e:
+        print(f"[ERROR]: {e!s}")
+        exit(1)
+
+    run_metget_batch(args, entries)
+
+
+def metget_build_members(args: argparse.Namespace) -> None:
+    """
+    This method is used by the build command when a domain selects a range of
+    ensemble members. One request is submitted per member and each member is
+    downloaded into a subdirectory of the output directory named by the member.
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        None
+    """
+    output_directory = args.output_directory or os.getcwd()
+    if not os.path.exists(output_directory):
+        msg = f"Output directory does not exist: {output_directory:s}"
+        raise RuntimeError(msg)
+
+    options = {
+        **BATCH_REQUEST_DEFAULTS,
+        **{
+            key: getattr(args, key)
+            for key in BATCH_REQUEST_DEFAULTS
+            if hasattr(args, key)
+        },
+        "domain": args.domain,
+        "start": args.start,
+        "end": args.end,
+        "timestep": args.timestep,
+        "output": args.output,
+        "output_directory": ".",
+    }
+    try:
+        entries = build_batch_entries([options], output_directory)
+    except RuntimeError as e:
+        print(f"[ERROR]: {e!s}")
+        exit(1)
+
+    if getattr(args, "save_json_request", False):
+        with open("request.json", "w") as f:
+            f.write(json.dumps([e.request_json for e in entries], indent=2))
+
+    run_metget_batch(args, entries)
@@ -32,11 +32,12 @@ import contextlib
 import getpass
 import json
 import os
+import re
 import socket
 import sys
 import time
 from datetime import datetime, timedelta, timezone
-from typing import Tuple, Union
+from typing import List, Optional, Tuple, Union
 
 import requests
 
@@ -44,15 +45,61 @@ from .metget_data import (
     AVAILABLE_FORMATS,
     AVAILABLE_MODELS,
     AVAILABLE_VARIABLES,
+    ENSEMBLE_MEMBERS,
+    MODEL_TYPES,
     RAW_ONLY_MODELS,
 )
+from .metget_download import MetGetDownloader
 from .metget_environment import get_metget_environment_variables
+from .metget_file_store import FileStore, metget_file_store_from_args
+from .metget_polling import (
+    MAX_CONSECUTIVE_FAILURES,
+    FixedPollingPolicy,
+    PollingPolicy,
+    metget_polling_policy_from_args,
+)
+from .metget_request_cache import (
+    copy_cached_files,
+    is_request_cacheable,
+    metget_request_cache_from_args,
+    request_cache_key,
+)
+from .metget_session import MetGetApiError, MetGetSession, metget_session_from_args
 from .spinnerlogger import SpinnerLogger
 
 
+def server_error_messages(body) -> List[str]:
+    """
+    Returns the error message and error detail list from the body of a MetGet
+    error response
+
+    Args:
+        body: The 'body' of the decoded JSON response
+
+    Returns:
+        List[str]: The error messages
+    """
+    if not isinstance(body, dict):
+        return []
+    errors = []
+    message = body.get("message")
+    if message and message != "empty":
+        errors.append(str(message))
+    error_text = body.get("error_text", [])
+    if isinstance(error_text, list):
+        errors.extend(str(error) for error in error_text)
+    elif error_text:
+        errors.append(str(error_text))
+    return errors
+
+
 class MetGetBuildRest:
     def __init__(
-        self, metget_api_server: str, metget_api_key: str, metget_api_version: int
+        self,
+        metget_api_server: str,
+        metget_api_key: str,
+        metget_api_version: int,
+        session: Optional[MetGetSession] = None,
     ):
         """
         Constructor
@@ -61,10 +108,24 @@ class MetGetBuildRest:
             metget_api_server (str): MetGet API server
             metget_api_key (str): MetGet API key
             metget_api_version (int): MetGet API version
+            session (MetGetSession, optional): Pooled session used for all requests
         """
         self.__metget_api_server = metget_api_server
         self.__metget_api_key = metget_api_key
         self.__metget_api_version = metget_api_version
+        if session is None:
+            session = MetGetSession(metget_api_server, metget_api_key)
+        self.__session = session
+
+    @property
+    def session(self) -> MetGetSession:
+        """
+        Returns the pooled session used by the client
+
+        Returns:
+            MetGetSession: The pooled session
+        """
+        return self.__session
 
     @staticmethod
     def parse_domain_data(domain_list: list, level: int, tau: int) -> dict:
@@ -297,6 +358,111 @@ class MetGetBuildRest:
             domains.append(j)
         return domains
 
+    @staticmethod
+    def is_member_expression(model: str) -> bool:
+        """
+        Returns whether the ensemble member of a domain model name selects more
+        than one member, i.e. 'all', a range ('p01:p10'), or a list ('c00,p01')
+
+        Args:
+            model (str): Model name of the domain, e.g. 'gefs-all'
+
+        Returns:
+            bool: True if the member must be expanded
+        """
+        keys = model.split("-")
+        if len(keys) < 2 or "ensemble" not in MODEL_TYPES.get(keys[0], ""):
+            return False
+        member = keys[-1]
+        return member == "all" or ":" in member or "," in member
+
+    @staticmethod
+    def expand_member_expression(model: str) -> List[str]:
+        """
+        Expands the ensemble member expression of a domain model name
+
+        Args:
+            model (str): Model name of the domain, e.g. 'deepmind-al-02-2026072206-F000:F049'
+
+        Returns:
+            List[str]: Ensemble members in the order given
+        """
+        base = model.split("-", maxsplit=1)[0]
+        members = []
+        for item in model.rsplit("-", maxsplit=1)[-1].split(","):
+            if item == "all":
+                if base not in ENSEMBLE_MEMBERS:
+                    msg = f"The {base:s} model has no fixed member list. Specify a member range such as '01:10'"
+                    raise RuntimeError(msg)
+                members.extend(ENSEMBLE_MEMBERS[base])
+            elif ":" in item:
+                first, last = item.split(":", 1)
+                m_first = re.fullmatch(r"([A-Za-z]*)(\d+)", first)
+                m_last = re.fullmatch(r"([A-Za-z]*)(\d+)", last)
+                if (
+                    m_first is None
+                    or m_last is None
+                    or m_first.group(1) != m_last.group(1)
+                    or int(m_first.group(2)) > int(m_last.group(2))
+                ):
+                    msg = f"Invalid ensemble member range '{item:s}'. Use the form 'p01:p10'"
+                    raise RuntimeError(msg)
+                prefix = m_first.group(1)
+                width = len(m_first.group(2))
+                members.extend(
+                    f"{prefix:s}{i:0{width}d}"
+                    for i in range(int(m_first.group(2)), int(m_last.group(2)) + 1)
+                )
+            elif item:
+                members.append(item)
+
+        if len(set(members)) != len(members):
+            msg = (
+                f"Ensemble member expression selects a member more than once: {model:s}"
+            )
+            raise RuntimeError(msg)
+        return members
+
+    @staticmethod
+    def expand_ensemble_domains(domain_list: list) -> List[Tuple[Optional[str], list]]:
+        """
+        Expands domains whose ensemble member is a member expression into one
+        domain list per member. Domains without a member expression are used
+        for every member. When several domains have a member expression, they
+        must select the same members.
+
+        Args:
+            domain_list (list): List of domains as given on the command line
+
+        Returns:
+            List[Tuple[Optional[str], list]]: Member and its domain list. The
+                member is None when no domain has a member expression
+        """
+        members = None
+        for d in domain_list:
+            if not MetGetBuildRest.is_member_expression(d[0]):
+                continue
+            domain_members = MetGetBuildRest.expand_member_expression(d[0])
+            if members is not None and domain_members != members:
+                msg = "All domains with an ensemble member range must select the same members"
+                raise RuntimeError(msg)
+            members = domain_members
+
+        if members is None:
+            return [(None, domain_list)]
+
+        expanded = []
+        for member in members:
+            member_domains = []
+            for d in domain_list:
+                if MetGetBuildRest.is_member_expression(d[0]):
+                    model = d[0].rsplit("-", maxsplit=1)[0] + "-" + member
+                    member_domains.append([model, *d[1:]])
+                else:
+                    member_domains.append(d)
+            expanded.append((member, member_domains))
+        return expanded
+
     @staticmethod
     def generate_request_json(**kwargs) -> dict:
         """
@@ -372,7 +538,9 @@ class MetGetBuildRest:
 
     def make_metget_request(self, request_json: dict) -> Tuple[str, int]:
         """
-        Makes a request to the MetGet API and returns the data id and status code
+        Makes a request to the MetGet API and returns the data id and status
+        code. The errors reported by the server for a failed or rejected
+        request are printed to the console.
 
         Args:
             request_json (dict): Request JSON
@@ -380,55 +548,64 @@ class MetGetBuildRest:
         Returns:
             Tuple[str, int]: Data id and status code
         """
-        headers = {"x-api-key": self.__metget_api_key}
-        r = requests.post(
-            self.__metget_api_server + "/build", headers=headers, json=request_json
-        )
+        try:
+            data_id, status_code, body = self.submit_metget_request(request_json)
+        except MetGetApiError as e:
+            MetGetBuildRest.__print_server_errors(e.errors)
+            raise
+        if status_code != 200:
+            MetGetBuildRest.__print_server_errors(server_error_messages(body))
+        return data_id, status_code
+
+    def submit_metget_request(self, request_json: dict) -> Tuple[str, int, dict]:
+        """
+        Submits a request to the MetGet API without writing to the console
+
+        Args:
+            request_json (dict): Request JSON
+
+        Returns:
+            Tuple[str, int, dict]: Data id, status code, and the body of the
+                response, which holds the errors of a rejected request
+        """
+        r = self.__session.post(self.__metget_api_server + "/build", json=request_json)
         if r.status_code != 200:
             if r.text:
-                with open("metget.debug", "a") as f:
-                    f.write(r.text)
-                self.__print_server_errors(r.text)
-            raise RuntimeError(
-                "Request to MetGet was returned status code = " + str(r.status_code)
-            )
+                self.__session.event(
+                    "build_failed", "error", status=r.status_code, body=r.text
+                )
+            try:
+                data = json.loads(r.text)
+            except json.JSONDecodeError:
+                data = r.text
+            body = data.get("body") if isinstance(data, dict) else None
+            msg = "Request to MetGet was returned status code = " + str(r.status_code)
+            raise MetGetApiError(msg, r.status_code, data, server_error_messages(body))
         return_data = json.loads(r.text)
-        data_id = return_data["body"]["request_id"]
+        body = return_data["body"]
+        data_id = body["request_id"]
         status_code = return_data["statusCode"]
         if status_code != 200:
-            with open("metget.debug", "a") as f:
-                f.write(
-                    "[WARNING]: MetGet returned status code " + str(status_code) + "\n"
-                )
-                f.write(str(return_data["body"]["error_text"]))
-            self.__print_server_errors(r.text)
-        return data_id, status_code
+            self.__session.event(
+                "build_rejected",
+                "warning",
+                request_id=data_id,
+                status=status_code,
+                error_text=body["error_text"],
+            )
+        return data_id, status_code, body
 
     @staticmethod
-    def __print_server_errors(response_text: str) -> None:
+    def __print_server_errors(errors: List[str]) -> None:
         """
-        Prints the error message and error detail list from a MetGet error
-        response body to the console so the user sees why the request was
-        rejected rather than only a status code.
+        Prints the errors reported by MetGet to the console so the user sees
+        why the request was rejected rather than only a status code.
 
         Args:
-            response_text (str): The raw response body text
+            errors (List[str]): Error messages (see server_error_messages)
         """
-        try:
-            body = json.loads(response_text)["body"]
-        except (json.JSONDecodeError, KeyError, TypeError):
-            return
-        if not isinstance(body, dict):
-            return
-        message = body.get("message")
-        if message and message != "empty":
-            print("[ERROR]: " + str(message))
-        error_text = body.get("error_text", [])
-        if isinstance(error_text, list):
-            for error in error_text:
-                print("[ERROR]: " + str(error))
-        elif error_text:
-            print("[ERROR]: " + str(error_text))
+        for error in errors:
+            print("[ERROR]: " + error)
 
     def download_metget_data(
         self,
@@ -436,7 +613,11 @@ class MetGetBuildRest:
         sleep_time: int,
         max_wait: int,
         output_directory: Union[str, None],
-    ) -> None:
+        download_workers: int = 1,
+        download_segments: int = 1,
+        polling_policy: Optional[PollingPolicy] = None,
+        file_store: Optional[FileStore] = None,
+    ) -> Optional[dict]:
         """
         Downloads the data from the MetGet API
 
@@ -445,9 +626,18 @@ class MetGetBuildRest:
             sleep_time (int): Time to sleep between status checks
             max_wait (int): Maximum time to wait for data to appear
             output_directory (Union[str, None]): Output directory
+            download_workers (int): Number of files to download concurrently
+            download_segments (int): Number of concurrent byte range segments
+                used for large files
+            polling_policy (PollingPolicy, optional): Policy determining the
+                time between status checks. Defaults to checking every sleep_time
+                seconds
+            file_store (FileStore, optional): Store of earlier downloads used
+                instead of downloading files again
 
         Returns:
-            None
+            Optional[dict]: The file list of the request once its files have
+                been downloaded, otherwise None
         """
         # ...Wait time
         end_time = datetime.now(timezone.utc) + timedelta(hours=max_wait)
@@ -455,11 +645,13 @@ class MetGetBuildRest:
         # ...Timing information
         request_start_time = datetime.now(timezone.utc)
 
+        if polling_policy is None:
+            polling_policy = FixedPollingPolicy(sleep_time)
+
         # ...Wait for request data to appear
         tries = 0
         data_ready = False
         status = None
-        max_consecutive_malformed = 10
         consecutive_malformed = 0
 
         spinner = SpinnerLogger()
@@ -480,31 +672,41 @@ class MetGetBuildRest:
                     KeyError,
                 ) as exc:
                     consecutive_malformed += 1
-                    with open("metget.debug", "a") as f:
-                        f.write(
-                            f"[WARNING]: Malformed status response "
-                            f"({consecutive_malformed}/{max_consecutive_malformed}): "
-                            f"{exc!r}\n"
-                        )
-                    if consecutive_malformed >= max_consecutive_malformed:
+                    self.__session.event(
+                        "malformed_status",
+                        "warning",
+                        request_id=data_id,
+                        count=consecutive_malformed,
+                        limit=MAX_CONSECUTIVE_FAILURES,
+                        error=repr(exc),
+                    )
+                    if consecutive_malformed >= MAX_CONSECUTIVE_FAILURES:
+                        event_log = self.__session.event_log
                         spinner.fail(
-                            f"Received {max_consecutive_malformed} consecutive "
-                            "malformed responses from the MetGet API. See "
-                            "metget.debug for details."
+                            f"Received {MAX_CONSECUTIVE_FAILURES} consecutive "
+                            "malformed responses from the MetGet API"
+                            + (
+                                f". See {event_log.path:s} for details."
+                                if event_log is not None
+                                else ": " + repr(exc)
+                            )
                         )
                         sys.exit(1)
-                    time.sleep(sleep_time)
+                    MetGetBuildRest.__poll_sleep(
+                        polling_policy.failure_interval(consecutive_malformed),
+                        end_time,
+                    )
                     continue
                 consecutive_malformed = 0
                 spinner.set_text(SpinnerLogger.standard_log(tries, status))
                 if status == "completed":
                     spinner.succeed()
+                    if tries > 1:
+                        polling_policy.complete()
                     # ...Parse the return to get data
                     data_ready = True
-                    flist_url = data_url + "/filelist.json"
-                    u = requests.get(flist_url)
-                    if u.status_code == 200:
-                        return_data = json.loads(u.text)
+                    return_data = self.get_request_file_list(data_url)
+                    if return_data is not None:
                         with open("filelist.json", "w") as jsonfile:
                             jsonfile.write(
                                 json.dumps(return_data, indent=2, sort_keys=True)
@@ -520,9 +722,13 @@ class MetGetBuildRest:
                         sys.exit(1)
                 elif status == "error":
                     spinner.fail("Request could not be completed")
-                    return
+                    return None
                 else:
-                    time.sleep(sleep_time)
+                    elapsed = datetime.now(timezone.utc) - request_start_time
+                    MetGetBuildRest.__poll_sleep(
+                        polling_policy.next_interval(status, elapsed.total_seconds()),
+                        end_time,
+                    )
                     continue
             except KeyboardInterrupt:
                 spinner.fail("Process was ended by the user")
@@ -530,26 +736,16 @@ class MetGetBuildRest:
 
         # ...Download files
         if data_ready:
-            file_list = return_data["output_files"]
-            for f in file_list:
-                if output_directory is not None:
-                    if not os.path.exists(output_directory):
-                        msg = f"Output directory does not exist: {output_directory:s}"
-                        raise RuntimeError(msg)
-                    ff = os.path.join(output_directory, f)
-                else:
-                    ff = f
-
-                time_stamp = datetime.now(timezone.utc).strftime(
-                    "%Y-%m-%d %H:%M:%S UTC"
-                )
-                spinner.start(f"[{time_stamp:s}]: Getting file: {f:s}")
-                with requests.get(data_url + "/" + f, stream=True) as r:
-                    r.raise_for_status()
-                    with open(ff, "wb") as wind_file:
-                        for chunk in r.iter_content(chunk_size=8192):
-                            wind_file.write(chunk)
-                spinner.succeed()
+            downloader = MetGetDownloader(
+                max_workers=download_workers,
+                spinner=spinner,
+                session=self.__session,
+                segments=download_segments,
+                file_store=file_store,
+            )
+            downloader.download_files(
+                data_url, return_data["output_files"], output_directory
+            )
 
             request_end_time = datetime.now(timezone.utc)
             request_duration = request_end_time - request_start_time
@@ -560,6 +756,7 @@ class MetGetBuildRest:
             spinner.succeed(
                 f"[{time_stamp:s}]: Elapsed time: {int(hours):d}h{int(minutes):02d}m{int(seconds):02d}s"
             )
+            return return_data
         else:
             if status == "restore":
                 print(
@@ -582,7 +779,55 @@ class MetGetBuildRest:
                 )
             else:
                 print("[ERROR]: Data has not become available due to an unknown error")
-            return
+            return None
+
+    def get_request_file_list(self, data_url: str) -> Optional[dict]:
+        """
+        Retrieves the file list (filelist.json) of a completed request
+
+        Args:
+            data_url (str): Url of the request data
+
+        Returns:
+            dict: The file list or None if it could not be retrieved
+        """
+        u = self.__session.get(data_url + "/filelist.json")
+        if u.status_code != 200:
+            return None
+        return json.loads(u.text)
+
+    def is_request_available(self, data_id: str) -> bool:
+        """
+        Checks whether an earlier request can still be waited on or downloaded
+
+        Args:
+            data_id (str): Data id
+
+        Returns:
+            bool: False if the request failed, is unknown, or its files have expired
+        """
+        try:
+            data_url, status = self.check_metget_status(data_id)
+        except (requests.exceptions.RequestException, ValueError, KeyError):
+            return False
+        if status == "error":
+            return False
+        if status == "completed":
+            return self.get_request_file_list(data_url) is not None
+        return True
+
+    @staticmethod
+    def __poll_sleep(interval: float, end_time: datetime) -> None:
+        """
+        Sleeps until the next status check without sleeping past the end of
+        the wait period
+
+        Args:
+            interval (float): Requested time to sleep in seconds
+            end_time (datetime): End of the wait period
+        """
+        remaining = (end_time - datetime.now(timezone.utc)).total_seconds()
+        time.sleep(max(min(interval, remaining), 0.0))
 
     def check_metget_status(
         self,
@@ -618,10 +863,9 @@ class MetGetBuildRest:
         Returns:
             str: response text
         """
-        headers = {"x-api-key": self.__metget_api_key}
         request_params = {"request-id": data_id}
-        response = requests.get(
-            self.__metget_api_server + "/check", headers=headers, params=request_params
+        response = self.__session.get(
+            self.__metget_api_server + "/check", params=request_params
         )
         response.raise_for_status()
         return response.text
@@ -640,9 +884,18 @@ def metget_build(args: argparse.Namespace) -> None:
     # ...Get the environment variables
     environment = get_metget_environment_variables(args)
 
-    # ...Initialize the metget client
+    # ...Initialize the metget client using a pooled session large enough
+    # for the concurrent downloads
+    session = metget_session_from_args(
+        args,
+        environment,
+        getattr(args, "download_workers", 1) * getattr(args, "download_segments", 1),
+    )
     client = MetGetBuildRest(
-        environment["endpoint"], environment["apikey"], environment["api_version"]
+        environment["endpoint"],
+        environment["apikey"],
+        environment["api_version"],
+        session,
     )
 
     # ...Check for required arguments
@@ -683,6 +936,13 @@ def metget_build(args: argparse.Namespace) -> None:
             )
             exit(1)
 
+        # ...Ensemble member ranges are submitted as one request per member
+        if any(MetGetBuildRest.is_member_expression(d[0]) for d in args.domain):
+            from .metget_batch import metget_build_members  # noqa: PLC0415
+
+            metget_build_members(args)
+            return
+
         # ...Building the request
         request_data = MetGetBuildRest.generate_request_json(
             analysis=args.analysis,
@@ -704,21 +964,80 @@ def metget_build(args: argparse.Namespace) -> None:
             save_json_request=args.save_json_request,
         )
 
-        data_id, status_code = client.make_metget_request(request_data)
-        if not args.dryrun and status_code == 200:
+        # ...Reuse an earlier identical request while it can still be downloaded.
+        # Requests ending in the future are always submitted again since the
+        # data they cover is still being produced
+        cache = (
+            None
+            if args.dryrun or not is_request_cacheable(request_data)
+            else metget_request_cache_from_args(args)
+        )
+        try:
+            output_directory = args.output_directory or os.getcwd()
+            data_id = None
+            status_code = 200
+            if cache is not None:
+                cache_key = request_cache_key(request_data, environment["endpoint"])
+                cached = cache.lookup(cache_key)
+                if cached is not None:
+                    if copy_cached_files(cached, output_directory, "filelist.json"):
+                        print(
+                            f"Copied the files of request {cached.request_id:s} "
+                            f"from {cached.output_directory:s}"
+                        )
+                        return
+                    if client.is_request_available(cached.request_id):
+                        data_id = cached.request_id
+                        print(
+                            f"Reusing request {data_id:s} made for an identical request"
+                        )
+                    else:
+                        cache.remove(cache_key)
+
+            submitted = None
+            if data_id is None:
+                submitted = time.time()
+                data_id, status_code = client.make_metget_request(request_data)
+                if cache is not None and status_code == 200:
+                    cache.store(cache_key, data_id)
+
+            if not args.dryrun and status_code == 200:
+                file_store = metget_file_store_from_args(args)
+                try:
+                    file_list = client.download_metget_data(
+                        data_id,
+                        args.check_interval,
+                        args.max_wait,
+                        args.output_directory,
+                        getattr(args, "download_workers", 1),
+                        getattr(args, "download_segments", 1),
+                        metget_polling_policy_from_args(args, request_data, submitted),
+                        file_store,
+                    )
+                finally:
+                    if file_store is not None:
+                        file_store.close()
+                if cache is not None and file_list is not None:
+                    cache.complete(cache_key, file_list, output_directory)
+            else:
+                print(status_code)
+        finally:
+            if cache is not None:
+                cache.close()
+
+    else:
+        file_store = metget_file_store_from_args(args)
+        try:
             client.download_metget_data(
-                data_id,
+                args.request,
                 args.check_interval,
                 args.max_wait,
                 args.output_directory,
+                getattr(args, "download_workers", 1),
+                getattr(args, "download_segments", 1),
+                metget_polling_policy_from_args(args),
+                file_store,
             )
-        else:
-            print(status_code)
-
-    else:
-        client.download_metget_data(
-            args.request,
-            args.check_interval,
-            args.max_wait,
-            args.output_directory,
-        )
+        finally:
+            if file_store is not None:
+                file_store.close()
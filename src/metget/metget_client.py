@@ -27,15 +27,34 @@
 #
 ###################################################################################################
 import argparse
+import importlib
 from datetime import datetime
+from typing import Callable
 
-from .metget_adeck import metget_adeck
-from .metget_build import metget_build
-from .metget_credits import metget_credits
 from .metget_data import get_metget_available_model_list
 from .metget_environment import metget_version
-from .metget_status import metget_status
-from .metget_track import metget_track
+
+
+def lazy_command(module: str, function: str) -> Callable[[argparse.Namespace], None]:
+    """
+    Returns a subcommand function which imports its module when it is called.
+    The subcommand modules import requests, prettytable, and yaspin, so they
+    are only loaded for the subcommand that is dispatched.
+
+    Args:
+        module: Name of the module in the metget package (i.e. metget_status)
+        function: Name of the subcommand function in the module
+
+    Returns:
+        Callable[[argparse.Namespace], None]: The subcommand function
+    """
+
+    def command(args: argparse.Namespace) -> None:
+        return getattr(importlib.import_module("." + module, __package__), function)(
+            args
+        )
+
+    return command
 
 
 def initialize_adeck_cli(subparsers):
@@ -51,7 +70,7 @@ def initialize_adeck_cli(subparsers):
     adeck_parser = subparsers.add_parser(
         "adeck", help="Get NHC A-Deck storm track data"
     )
-    adeck_parser.set_defaults(func=metget_adeck)
+    adeck_parser.set_defaults(func=lazy_command("metget_adeck", "metget_adeck"))
     adeck_parser.add_argument(
         "--year",
         help="NHC Storm year to get A-Deck data for",
@@ -75,7 +94,8 @@ def initialize_adeck_cli(subparsers):
     )
     adeck_parser.add_argument(
         "--model",
-        help="Model to get storm track data for or 'all' for all models",
+        help="Model to get storm track data for or 'all' for all models. With "
+        "--harvest, a comma separated list of models",
         type=str,
         metavar="s",
         required=True,
@@ -102,6 +122,44 @@ def initialize_adeck_cli(subparsers):
         required=False,
         metavar="s",
     )
+    adeck_parser.add_argument(
+        "--stats",
+        help="Add the statistics of each track (points, first and last position, "
+        "minimum, maximum, and mean intensity, track length) to the json output",
+        action="store_true",
+    )
+    adeck_parser.add_argument(
+        "--harvest",
+        help="Get the tracks of every cycle from --cycle to --end for a comma "
+        "separated list of models (or 'all') concurrently and keep them in the "
+        "local A-Deck store",
+        action="store_true",
+    )
+    adeck_parser.add_argument(
+        "--end",
+        help="Last model cycle to harvest (defaults to --cycle)",
+        type=datetime.fromisoformat,
+        metavar="YYYY-MM-DD hh:mm",
+    )
+    adeck_parser.add_argument(
+        "--interval",
+        help="Hours between harvested model cycles",
+        type=int,
+        metavar="n",
+        default=6,
+    )
+    adeck_parser.add_argument(
+        "--refresh",
+        help="Download harvested tracks even if they are in the local A-Deck store",
+        action="store_true",
+    )
+    adeck_parser.add_argument(
+        "--no-adeck-store",
+        dest="adeck_store",
+        action="store_false",
+        default=True,
+        help="Do not read or write the local A-Deck store",
+    )
 
 
 def initialize_build_cli(subparsers):
@@ -118,7 +176,7 @@ def initialize_build_cli(subparsers):
         name="build",
         help="Generate a MetGet build request",
     )
-    build.set_defaults(func=metget_build)
+    build.set_defaults(func=lazy_command("metget_build", "metget_build"))
 
     mlist = get_metget_available_model_list()
     build.add_argument(
@@ -127,7 +185,11 @@ def initialize_build_cli(subparsers):
         + mlist
         + "]. Resolution and corners are decimal degrees"
         " For HWRF/COAMPS, the model can be listed as 'hwrf-[stormname]' or 'coamps-[stormname]'."
-        " For GEFS, the ensemble member can be specified as 'gefs-[ensemble_member]'. For NHC/JTWC data"
+        " For GEFS, the ensemble member can be specified as 'gefs-[ensemble_member]'."
+        " For GEFS, REFS, CTCX, and DEEPMIND, the ensemble member may also select several members"
+        " as 'all' (GEFS and DEEPMIND only), a range ('gefs-p01:p10', 'F000:F049'), or a comma"
+        " separated list ('gefs-c00,p01'). One request is made per member and each member is"
+        " downloaded into a subdirectory of '--output-directory' named by the member. For NHC/JTWC data"
         " specify as 'nhc-basin-storm_number-advisory_number' (or 'jtwc-basin-storm_number-advisory_number')"
         " where basin is a two letter string denoting the basin (nhc: al, ep, cp; jtwc: wp, io, sh),"
         " storm number is the id of the storm (not the name), and the advisory number"
@@ -199,6 +261,22 @@ def initialize_build_cli(subparsers):
         default=10,
         type=float,
     )
+    build.add_argument(
+        "--poll-policy",
+        help="Policy used to schedule status checks. 'fixed' checks every "
+        "'--check-interval' seconds, 'adaptive' backs off while the request is "
+        "queued and checks more often as it nears its expected completion "
+        "(default=adaptive)",
+        choices=["fixed", "adaptive"],
+        default="adaptive",
+    )
+    build.add_argument(
+        "--max-check-interval",
+        help="Longest time between status checks with the adaptive policy (default=300s)",
+        metavar="t",
+        default=300,
+        type=float,
+    )
     build.add_argument(
         "--max-wait",
         help="Maximum wait time for the request to complete in hours (default=24)",
@@ -251,6 +329,43 @@ def initialize_build_cli(subparsers):
         default=None,
         help="Directory to save output files to",
     )
+    build.add_argument(
+        "--request-cache",
+        action="store_true",
+        help="Reuse the request id or downloaded files of an identical earlier "
+        "request made within three days instead of submitting a new request. "
+        "Requests ending in the future are always submitted",
+    )
+    build.add_argument(
+        "--file-cache",
+        action="store_true",
+        default=False,
+        help="Keep downloaded files in a shared store in the cache directory and "
+        "link them into the output directory instead of downloading them again",
+    )
+    build.add_argument(
+        "--file-cache-size",
+        type=float,
+        metavar="GB",
+        default=10.0,
+        help="Size limit of the shared file store. The least recently used files "
+        "are removed when it is exceeded (default=10GB)",
+    )
+    build.add_argument(
+        "--download-workers",
+        type=int,
+        metavar="n",
+        default=4,
+        help="Number of output files to download concurrently (default=4)",
+    )
+    build.add_argument(
+        "--download-segments",
+        type=int,
+        metavar="n",
+        default=4,
+        help="Number of concurrent byte range segments used to download large "
+        "output files when the server supports range requests (default=4)",
+    )
 
 
 def initialize_credits_cli(subparsers):
@@ -272,17 +387,22 @@ def initialize_credits_cli(subparsers):
         default="pretty",
         type=str,
     )
-    api_credits.set_defaults(func=metget_credits)
+    api_credits.set_defaults(func=lazy_command("metget_credits", "metget_credits"))
 
 
 def initialize_status_cli(subparsers):
     status = subparsers.add_parser(
         "status", help="Check the status of the available data"
     )
-    status.set_defaults(func=metget_status)
+    status.set_defaults(func=lazy_command("metget_status", "metget_status"))
     mlist = get_metget_available_model_list()
     status.add_argument(
-        "model", help="Name of model to get status for (" + mlist + ")", type=str
+        "model",
+        help="Name of model to get status for ("
+        + mlist
+        + "), a comma separated list of models, or 'all' for an overview of "
+        "every model",
+        type=str,
     )
     status.add_argument(
         "--start",
@@ -326,6 +446,25 @@ def initialize_status_cli(subparsers):
     status.add_argument(
         "--complete", help="Only show data which is complete", action="store_true"
     )
+    status.add_argument(
+        "--since-last",
+        help="Only report the cycles which are new or have completed since the "
+        "last query of the same model(s) using --since-last",
+        action="store_true",
+    )
+    status.add_argument(
+        "--refresh",
+        help="Fetch the full status from the server instead of using the local "
+        "status cache",
+        action="store_true",
+    )
+    status.add_argument(
+        "--no-status-cache",
+        dest="status_cache",
+        action="store_false",
+        default=True,
+        help="Do not read or write the local status cache",
+    )
 
 
 def initialize_track_cli(subparsers) -> None:
@@ -338,7 +477,7 @@ def initialize_track_cli(subparsers) -> None:
     track = subparsers.add_parser(
         "track", help="Get the storm track data for an NHC or JTWC storm"
     )
-    track.set_defaults(func=metget_track)
+    track.set_defaults(func=lazy_command("metget_track", "metget_track"))
     track.add_argument(
         "--source",
         help="Storm track source to get data for (nhc for al/ep/cp basins, "
@@ -362,7 +501,12 @@ def initialize_track_cli(subparsers) -> None:
         default=None,
     )
     track.add_argument(
-        "--advisory", help="Storm advisory to get", type=str, metavar="s"
+        "--advisory",
+        help="Storm advisory to get. Forecast tracks also accept a range of "
+        "advisories (e.g. 5-12) or 'all', which are downloaded concurrently and "
+        "printed as one JSON document",
+        type=str,
+        metavar="s",
     )
     track.add_argument(
         "--type",
@@ -370,6 +514,192 @@ def initialize_track_cli(subparsers) -> None:
         type=str,
         metavar="s",
     )
+    track.add_argument(
+        "--prefetch",
+        help="Download the best tracks and all forecast advisories of the --year "
+        "and --basin season into the local track store",
+        action="store_true",
+    )
+    track.add_argument(
+        "--refresh",
+        help="Download the track even if it is in the local track store",
+        action="store_true",
+    )
+    track.add_argument(
+        "--no-track-store",
+        dest="track_store",
+        action="store_false",
+        default=True,
+        help="Do not read or write the local track store",
+    )
+
+
+def initialize_watch_cli(subparsers) -> None:
+    """
+    This method is used to initialize the watch subparser
+
+    Returns:
+        None
+    """
+    watch = subparsers.add_parser(
+        "watch",
+        help="Wait on and download many MetGet requests from a single process",
+    )
+    watch.set_defaults(func=lazy_command("metget_watch", "metget_watch"))
+    watch.add_argument(
+        "request_ids", help="Request ids to wait on", nargs="*", metavar="request_id"
+    )
+    watch.add_argument(
+        "--request-file",
+        help="File containing request ids to wait on, one per line",
+        type=str,
+        metavar="s",
+    )
+    watch.add_argument(
+        "--output-directory",
+        type=str,
+        metavar="s",
+        default=None,
+        help="Directory to save output files to. Each request is written to a "
+        "subdirectory named by its request id (default=current directory)",
+    )
+    add_watch_arguments(watch)
+
+
+def initialize_batch_cli(subparsers) -> None:
+    """
+    This method is used to initialize the batch subparser
+
+    Returns:
+        None
+    """
+    batch = subparsers.add_parser(
+        "batch",
+        help="Submit, wait on, and download the MetGet requests listed in a "
+        "JSON or TOML manifest",
+    )
+    batch.set_defaults(func=lazy_command("metget_batch", "metget_batch"))
+    batch.add_argument(
+        "manifest",
+        help="JSON or TOML file with a list of 'requests' and optional 'defaults'. "
+        "Request options are named after the 'build' options",
+        metavar="manifest",
+    )
+    batch.add_argument(
+        "--output-directory",
+        type=str,
+        metavar="s",
+        default=None,
+        help="Directory to save output files to. Each request is written to a "
+        "subdirectory named by its 'output_directory' or 'output' option "
+        "(default=current directory)",
+    )
+    batch.add_argument(
+        "--submit-workers",
+        type=int,
+        metavar="n",
+        default=4,
+        help="Number of requests submitted concurrently (default=4)",
+    )
+    batch.add_argument(
+        "--submit-rate",
+        type=float,
+        metavar="r",
+        default=2.0,
+        help="Maximum number of requests submitted per second, 0 for no limit (default=2)",
+    )
+    batch.add_argument(
+        "--results",
+        type=str,
+        metavar="s",
+        default=None,
+        help="Write the request id and outcome of each request to this JSON file",
+    )
+    batch.add_argument(
+        "--request-cache",
+        action="store_true",
+        help="Reuse the request id or downloaded files of an identical earlier "
+        "request made within three days instead of submitting a new request. "
+        "Requests ending in the future are always submitted",
+    )
+    add_watch_arguments(batch)
+
+
+def add_watch_arguments(parser) -> None:
+    """
+    Adds the options which control how requests are polled and downloaded to
+    the watch and batch subparsers
+
+    Args:
+        parser: The subparser
+
+    Returns:
+        None
+    """
+    parser.add_argument(
+        "--check-interval",
+        help="Time between status checks (default=10s)",
+        metavar="t",
+        default=10,
+        type=float,
+    )
+    parser.add_argument(
+        "--poll-policy",
+        help="Policy used to schedule status checks (fixed, adaptive) (default=adaptive)",
+        choices=["fixed", "adaptive"],
+        default="adaptive",
+    )
+    parser.add_argument(
+        "--max-check-interval",
+        help="Longest time between status checks with the adaptive policy (default=300s)",
+        metavar="t",
+        default=300,
+        type=float,
+    )
+    parser.add_argument(
+        "--max-wait",
+        help="Maximum wait time for the requests to complete in hours (default=24)",
+        metavar="h",
+        default=24,
+        type=float,
+    )
+    parser.add_argument(
+        "--max-concurrent-downloads",
+        type=int,
+        metavar="n",
+        default=2,
+        help="Number of completed requests downloaded at the same time (default=2)",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        metavar="n",
+        default=4,
+        help="Number of output files per request to download concurrently (default=4)",
+    )
+    parser.add_argument(
+        "--download-segments",
+        type=int,
+        metavar="n",
+        default=4,
+        help="Number of concurrent byte range segments used to download large "
+        "output files when the server supports range requests (default=4)",
+    )
+    parser.add_argument(
+        "--file-cache",
+        action="store_true",
+        default=False,
+        help="Keep downloaded files in a shared store in the cache directory and "
+        "link them into the output directory instead of downloading them again",
+    )
+    parser.add_argument(
+        "--file-cache-size",
+        type=float,
+        metavar="GB",
+        default=10.0,
+        help="Size limit of the shared file store. The least recently used files "
+        "are removed when it is exceeded (default=10GB)",
+    )
 
 
 def metget_client_cli() -> None:
@@ -393,6 +723,39 @@ def metget_client_cli() -> None:
         help="MetGet API version. Default is 1. When using the k8s MetGet API, this should be 2.",
         metavar="n",
     )
+    p.add_argument(
+        "--pool-size",
+        type=int,
+        help="Number of HTTP connections kept alive to each host (default=10)",
+        metavar="n",
+    )
+    p.add_argument(
+        "--retries",
+        type=int,
+        help="Number of times failed requests to the MetGet API are retried (default=3)",
+        metavar="n",
+    )
+    p.add_argument(
+        "--event-log",
+        type=str,
+        help="File the structured (JSON lines) event log is written to. Can also be "
+        "set with METGET_EVENT_LOG (default=events.jsonl in the MetGet cache directory)",
+        metavar="path",
+    )
+    p.add_argument(
+        "--event-log-level",
+        type=str,
+        choices=["debug", "info", "warning", "error"],
+        help="Lowest level of the events recorded in the event log. Can also be set "
+        "with METGET_EVENT_LOG_LEVEL (default=info)",
+    )
+    p.add_argument(
+        "--no-event-log",
+        dest="event_log_enabled",
+        action="store_false",
+        default=True,
+        help="Do not write the event log",
+    )
 
     subparsers = p.add_subparsers(help="Sub-command help")
     initialize_build_cli(subparsers)
@@ -400,6 +763,8 @@ def metget_client_cli() -> None:
     initialize_track_cli(subparsers)
     initialize_adeck_cli(subparsers)
     initialize_credits_cli(subparsers)
+    initialize_watch_cli(subparsers)
+    initialize_batch_cli(subparsers)
 
     args = p.parse_args()
     if "func" in args:
@@ -28,52 +28,63 @@
 ###################################################################################################
 import argparse
 import json
+from typing import Optional
 
 import prettytable
-import requests
 
-from .metget_environment import get_metget_environment_variables
+from .metget_api import CreditBalance, MetGetClient
+from .metget_session import MetGetSession
 
 
-def metget_credits(args: argparse.Namespace) -> None:
+def metget_credits(
+    args: argparse.Namespace,
+    session: Optional[MetGetSession] = None,
+    client: Optional[MetGetClient] = None,
+) -> None:
     """
     This method is used to get the number of credits available
 
     Args:
         args: The arguments passed to the command line
+        session: Pooled session used for the request
+        client: Library client used for the request. When given, the session
+            is ignored
     """
-    env = get_metget_environment_variables(args)
+    if client is None:
+        client = MetGetClient.from_args(args, session=session)
+    print_credits(client.credits(), args.format)
 
-    url = env["endpoint"] + "/credits"
-    headers = {"x-api-key": env["apikey"]}
-    response = requests.get(url, headers=headers)
 
-    if args.format == "json":
-        credits_balance = response.json()["body"]
-        if (
-            credits_balance["credit_limit"] == 0
-            and credits_balance["credit_balance"] == 0
-        ):
-            credits_balance["credit_balance"] = "Unlimited"
-            credits_balance["credit_limit"] = "Unlimited"
-        print(json.dumps(credits_balance, indent=2))
-    elif args.format == "pretty":
+def print_credits(balance: CreditBalance, output_format: str) -> None:
+    """
+    This method is used to print the credit balance
+
+    Args:
+        balance: The credit balance returned by the MetGet client
+        output_format: Output format (json or pretty)
+    """
+    credit_limit = balance.credit_limit
+    credit_balance = balance.credit_balance
+    if balance.unlimited:
+        credit_limit = "Unlimited"
+        credit_balance = "Unlimited"
+
+    if output_format == "json":
+        print(
+            json.dumps(
+                {
+                    "credit_limit": credit_limit,
+                    "credits_used": balance.credits_used,
+                    "credit_balance": credit_balance,
+                },
+                indent=2,
+            )
+        )
+    elif output_format == "pretty":
         table = prettytable.PrettyTable(
             ["Credit Limit", "Credits Used", "Credit Balance"]
         )
-        credit_limit = response.json()["body"]["credit_limit"]
-        credit_balance = response.json()["body"]["credit_balance"]
-        if credit_limit == 0 and credit_balance == 0:
-            credit_limit = "Unlimited"
-            credit_balance = "Unlimited"
-        table.add_row(
-            [
-                credit_limit,
-                response.json()["body"]["credits_used"],
-                credit_balance,
-            ]
-        )
-        # print("Credit status for apikey: " + env["apikey"])
+        table.add_row([credit_limit, balance.credits_used, credit_balance])
         print(table)
     else:
-        raise RuntimeError("Invalid format: " + args.format)
+        raise RuntimeError("Invalid format: " + output_format)
@@ -101,6 +101,13 @@ AVAILABLE_FORMATS = {
     "delft3d": "delft3d",
 }
 
+# Ensemble members selected by 'all' in a member range (e.g. 'gefs-all'). Models
+# without a fixed member list (CTCX, REFS) must be given an explicit range
+ENSEMBLE_MEMBERS = {
+    "gefs": ["c00", *[f"p{i:02d}" for i in range(1, 31)]],
+    "deepmind": [f"F{i:03d}" for i in range(50)],
+}
+
 
 def get_metget_available_model_list() -> str:
     """
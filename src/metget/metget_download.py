@@ -0,0 +1,694 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import contextlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from .metget_file_store import FileStore
+from .metget_session import MetGetSession
+from .spinnerlogger import SpinnerLogger
+
+# Size of the chunks read from the download stream
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Minimum time between spinner progress updates while files are streaming
+PROGRESS_UPDATE_INTERVAL = 0.5
+
+# Suffix of files which are still being downloaded
+PARTIAL_FILE_SUFFIX = ".part"
+
+# Suffix of the journal recording the committed length of a partial file
+JOURNAL_FILE_SUFFIX = ".part.json"
+
+# Number of bytes written between journal commits
+JOURNAL_COMMIT_INTERVAL = 16 * 1024 * 1024
+
+# Files smaller than this are always downloaded as a single stream
+SEGMENT_MIN_SIZE = 64 * 1024 * 1024
+
+
+class DownloadJournal:
+    """
+    Sidecar journal for a partial download. It records the source url, the
+    number of bytes committed to the partial file and, when known, the total
+    size and ETag of the file so that the download can be resumed using an
+    HTTP Range request. Segmented downloads additionally record the
+    [start, end, next] byte positions of each segment.
+    """
+
+    def __init__(self, destination: str):
+        """
+        Constructor
+
+        Args:
+            destination (str): Final path of the downloaded file
+        """
+        self.__destination = destination
+        self.__lock = threading.Lock()
+        self.__discarded = False
+        self.url = None
+        self.offset = 0
+        self.size = None
+        self.etag = None
+        self.segments = None
+
+    @staticmethod
+    def load(destination: str, url: str) -> "DownloadJournal":
+        """
+        Loads the journal for a destination. If there is no usable journal, or it
+        belongs to a different url, an empty journal is returned so the download
+        starts from the beginning.
+
+        Args:
+            destination (str): Final path of the downloaded file
+            url (str): Url of the file being downloaded
+
+        Returns:
+            DownloadJournal: The journal
+        """
+        journal = DownloadJournal(destination)
+        journal_file = destination + JOURNAL_FILE_SUFFIX
+        part_file = destination + PARTIAL_FILE_SUFFIX
+        if not os.path.exists(journal_file) or not os.path.exists(part_file):
+            return journal
+
+        try:
+            with open(journal_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return journal
+
+        if data.get("url") != url:
+            return journal
+
+        journal.url = url
+        journal.size = data.get("size")
+        journal.etag = data.get("etag")
+        if data.get("segments") is not None:
+            # ...Segmented partial files are preallocated, so the progress is
+            # taken from the committed segment positions
+            journal.segments = [list(segment) for segment in data["segments"]]
+            journal.offset = sum(n - start for start, _, n in journal.segments)
+        else:
+            # ...Only bytes which were committed and are actually on disk count
+            journal.offset = min(int(data.get("offset", 0)), os.path.getsize(part_file))
+        return journal
+
+    @staticmethod
+    def sync(file_handle) -> None:
+        """
+        Flushes a file handle to disk
+
+        Args:
+            file_handle: Open file handle
+        """
+        file_handle.flush()
+        os.fsync(file_handle.fileno())
+
+    def commit(self) -> None:
+        """
+        Atomically writes the journal to disk
+        """
+        with self.__lock:
+            if self.__discarded:
+                return
+            journal_file = self.__destination + JOURNAL_FILE_SUFFIX
+            tmp_file = journal_file + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(
+                    {
+                        "url": self.url,
+                        "offset": self.offset,
+                        "size": self.size,
+                        "etag": self.etag,
+                        "segments": self.segments,
+                    },
+                    f,
+                )
+            os.replace(tmp_file, journal_file)
+
+    def commit_segment(self, index: int, position: int) -> None:
+        """
+        Records the next byte to be written for a segment and commits the journal
+
+        Args:
+            index (int): Index of the segment
+            position (int): Next byte position to be written in the segment
+        """
+        with self.__lock:
+            self.segments[index][2] = position
+            self.offset = sum(n - start for start, _, n in self.segments)
+        self.commit()
+
+    def remove(self) -> None:
+        """
+        Removes the journal once the download is complete
+        """
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.__destination + JOURNAL_FILE_SUFFIX)
+
+    def discard(self) -> None:
+        """
+        Removes the journal and ignores any further commits so that the next
+        attempt starts the download from the beginning
+        """
+        with self.__lock:
+            self.__discarded = True
+            self.remove()
+
+
+class MetGetDownloader:
+    """
+    Downloads the output files of a completed MetGet request using a bounded
+    pool of worker threads. Progress for all files in flight is aggregated into
+    a single SpinnerLogger line and errors are reported in file list order once
+    every transfer has finished.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        spinner: Optional[SpinnerLogger] = None,
+        session: Optional[MetGetSession] = None,
+        segments: int = 1,
+        segment_min_size: int = SEGMENT_MIN_SIZE,
+        label: Optional[str] = None,
+        file_store: Optional[FileStore] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            max_workers (int): Maximum number of files to download concurrently
+            spinner (SpinnerLogger, optional): Spinner used to report progress
+            session (MetGetSession, optional): Pooled session used for the downloads
+            segments (int): Number of concurrent byte range segments used for
+                large files when the server supports range requests
+            segment_min_size (int): Minimum file size in bytes for a segmented download
+            label (str, optional): Label identifying the download in progress messages
+            file_store (FileStore, optional): Store of earlier downloads. Files in
+                the store are linked into place instead of being downloaded and
+                downloaded files are added to it
+        """
+        if max_workers < 1:
+            msg = f"Number of download workers must be at least 1. Got {max_workers:d}"
+            raise ValueError(msg)
+        if segments < 1:
+            msg = f"Number of download segments must be at least 1. Got {segments:d}"
+            raise ValueError(msg)
+        self.__max_workers = max_workers
+        self.__segments = segments
+        self.__segment_min_size = segment_min_size
+        self.__label = label
+        self.__file_store = file_store
+        self.__spinner = spinner if spinner is not None else SpinnerLogger()
+        self.__session = (
+            session
+            if session is not None
+            else MetGetSession(pool_size=max_workers * segments)
+        )
+        self.__lock = threading.Lock()
+        self.__abort = threading.Event()
+        self.__bytes_received = {}
+        self.__files_complete = 0
+        self.__file_count = 0
+        self.__last_update = 0.0
+
+    @staticmethod
+    def __time_str() -> str:
+        """
+        Returns the current time in UTC
+
+        Returns:
+            str: Current time in UTC
+        """
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+    @staticmethod
+    def __format_bytes(n_bytes: int) -> str:
+        """
+        Formats a byte count for display
+
+        Args:
+            n_bytes (int): Number of bytes
+
+        Returns:
+            str: Human readable size
+        """
+        size = float(n_bytes)
+        for unit in ("B", "KiB", "MiB", "GiB"):
+            if size < 1024.0 or unit == "GiB":
+                return f"{size:.1f} {unit:s}"
+            size /= 1024.0
+        return f"{size:.1f} GiB"
+
+    def __progress_text(self) -> str:
+        """
+        Generates the aggregated progress message for the spinner
+
+        Returns:
+            str: Progress message
+        """
+        total_bytes = sum(self.__bytes_received.values())
+        label = f" for {self.__label:s}" if self.__label else ""
+        return (
+            f"[{MetGetDownloader.__time_str():s}]: Downloading files{label:s} "
+            f"({self.__files_complete:d}/{self.__file_count:d} complete, "
+            f"{MetGetDownloader.__format_bytes(total_bytes):s})"
+        )
+
+    def __update_progress(self, filename: str, n_bytes: int) -> None:
+        """
+        Records the bytes received for a file and refreshes the spinner text
+        when running interactively
+
+        Args:
+            filename (str): Name of the file being downloaded
+            n_bytes (int): Number of new bytes received
+        """
+        with self.__lock:
+            self.__bytes_received[filename] += n_bytes
+            now = time.monotonic()
+            if (
+                self.__spinner.is_tty
+                and now - self.__last_update > PROGRESS_UPDATE_INTERVAL
+            ):
+                self.__last_update = now
+                self.__spinner.set_text(self.__progress_text())
+
+    def __file_complete(self) -> None:
+        """
+        Marks a file as complete and refreshes the spinner text
+        """
+        with self.__lock:
+            self.__files_complete += 1
+            self.__spinner.set_text(self.__progress_text())
+
+    def __download_file(self, url: str, filename: str, destination: str) -> None:
+        """
+        Downloads a single file. Data is streamed into a partial file next to
+        the destination and the committed length is recorded in a journal so
+        that an interrupted download resumes where it left off. The partial
+        file is renamed to the destination once it is complete.
+
+        Args:
+            url (str): Url of the file to download
+            filename (str): Name of the file in the request file list
+            destination (str): Path to write the file to
+        """
+        if self.__abort.is_set():
+            return
+
+        if self.__fetch_stored(url, destination):
+            self.__file_complete()
+            return
+
+        part_file = destination + PARTIAL_FILE_SUFFIX
+        journal = DownloadJournal.load(destination, url)
+
+        if journal.segments is not None:
+            self.__download_segmented(url, filename, part_file, journal)
+        else:
+            self.__download_stream(url, filename, part_file, journal)
+
+        if journal.size is not None and journal.offset != journal.size:
+            msg = (
+                f"Incomplete download ({journal.offset:d} of "
+                f"{journal.size:d} bytes received)"
+            )
+            raise RuntimeError(msg)
+
+        os.replace(part_file, destination)
+        journal.remove()
+        if self.__file_store is not None:
+            self.__file_store.add(url, destination, journal.etag)
+        self.__file_complete()
+
+    def __fetch_stored(self, url: str, destination: str) -> bool:
+        """
+        Places a file from the file store at the destination. The file list of
+        a request only names its files, so the ETag and size of the file are
+        requested from the server first and the stored copy is only used if it
+        matches them.
+
+        Args:
+            url (str): Url of the file
+            destination (str): Path to place the file at
+
+        Returns:
+            bool: True if the file was placed from the store
+        """
+        if self.__file_store is None:
+            return False
+        try:
+            r = self.__session.head(url, allow_redirects=True)
+        except requests.exceptions.RequestException:
+            return False
+        if r.status_code != 200:
+            return False
+        etag = r.headers.get("ETag")
+        length = r.headers.get("Content-Length")
+        size = int(length) if length is not None and length.isdigit() else None
+        if etag is None and size is None:
+            return False
+        return self.__file_store.fetch(url, destination, etag=etag, size=size)
+
+    def __download_stream(
+        self, url: str, filename: str, part_file: str, journal: "DownloadJournal"
+    ) -> None:
+        """
+        Downloads a file as a single stream, resuming from the journal offset.
+        If the server advertises range support for a large file, the stream is
+        abandoned in favor of a segmented download.
+
+        Args:
+            url (str): Url of the file to download
+            filename (str): Name of the file in the request file list
+            part_file (str): Path of the partial file
+            journal (DownloadJournal): Journal for the partial file
+        """
+        headers = {}
+        if journal.offset > 0:
+            headers["Range"] = f"bytes={journal.offset:d}-"
+            if journal.etag is not None:
+                headers["If-Range"] = journal.etag
+
+        with self.__session.get(url, stream=True, headers=headers) as r:
+            if r.status_code == 416 and journal.offset == journal.size:
+                # ...The partial file already holds the whole file
+                self.__update_progress(filename, journal.offset)
+                return
+
+            r.raise_for_status()
+            journal.url = url
+            journal.etag = r.headers.get("ETag")
+            if r.status_code == 206:
+                self.__update_progress(filename, journal.offset)
+                mode = "r+b"
+                size = MetGetDownloader.__content_range_size(r)
+                if size is not None:
+                    journal.size = size
+            else:
+                journal.offset = 0
+                mode = "wb"
+                length = r.headers.get("Content-Length")
+                journal.size = int(length) if length is not None else None
+                if self.__use_segments(r, journal.size):
+                    journal.segments = MetGetDownloader.__split_segments(
+                        journal.size, self.__segments
+                    )
+
+            if journal.segments is None:
+                self.__stream_to_file(r, filename, part_file, mode, journal)
+                return
+
+        # ...Preallocate the partial file so the segments can be written in
+        # place, then fetch the segments
+        with open(part_file, "wb") as f:
+            f.truncate(journal.size)
+        journal.commit()
+        self.__download_segmented(url, filename, part_file, journal)
+
+    def __use_segments(self, response, size: Optional[int]) -> bool:
+        """
+        Determines if a file should be downloaded in byte range segments
+
+        Args:
+            response: Response to the initial request for the file
+            size (int): Size of the file in bytes, if known
+
+        Returns:
+            bool: True if the file should be downloaded in segments
+        """
+        return (
+            self.__segments > 1
+            and size is not None
+            and size >= self.__segment_min_size
+            and response.headers.get("Accept-Ranges", "").lower() == "bytes"
+        )
+
+    @staticmethod
+    def __split_segments(size: int, n_segments: int) -> List[List[int]]:
+        """
+        Splits a file into contiguous byte ranges
+
+        Args:
+            size (int): Size of the file in bytes
+            n_segments (int): Number of segments
+
+        Returns:
+            List[List[int]]: [start, end, next] byte positions of each segment
+        """
+        segment_size = -(-size // n_segments)
+        segments = []
+        for start in range(0, size, segment_size):
+            end = min(start + segment_size, size) - 1
+            segments.append([start, end, start])
+        return segments
+
+    def __download_segmented(
+        self, url: str, filename: str, part_file: str, journal: "DownloadJournal"
+    ) -> None:
+        """
+        Downloads the unfinished segments of a file concurrently
+
+        Args:
+            url (str): Url of the file to download
+            filename (str): Name of the file in the request file list
+            part_file (str): Path of the preallocated partial file
+            journal (DownloadJournal): Journal for the partial file
+        """
+        self.__update_progress(filename, journal.offset)
+        pending = [
+            i
+            for i, (_, end, position) in enumerate(journal.segments)
+            if position <= end
+        ]
+        with ThreadPoolExecutor(max_workers=self.__segments) as executor:
+            futures = [
+                executor.submit(
+                    self.__download_segment, url, filename, part_file, journal, i
+                )
+                for i in pending
+            ]
+            for future in futures:
+                future.result()
+
+    def __download_segment(
+        self,
+        url: str,
+        filename: str,
+        part_file: str,
+        journal: "DownloadJournal",
+        index: int,
+    ) -> None:
+        """
+        Downloads a single byte range segment into its position in the partial file
+
+        Args:
+            url (str): Url of the file to download
+            filename (str): Name of the file in the request file list
+            part_file (str): Path of the preallocated partial file
+            journal (DownloadJournal): Journal for the partial file
+            index (int): Index of the segment
+        """
+        _, end, position = journal.segments[index]
+        headers = {"Range": f"bytes={position:d}-{end:d}"}
+        if journal.etag is not None:
+            headers["If-Range"] = journal.etag
+
+        with self.__session.get(url, stream=True, headers=headers) as r:
+            r.raise_for_status()
+            if r.status_code != 206:
+                # ...The file changed on the server or ranges are no longer
+                # honored, so the next attempt must start over
+                journal.discard()
+                msg = "Server did not return the requested byte range"
+                raise RuntimeError(msg)
+
+            uncommitted = 0
+            with open(part_file, "r+b") as output_file:
+                output_file.seek(position)
+                try:
+                    for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if self.__abort.is_set():
+                            msg = "Download was cancelled"
+                            raise RuntimeError(msg)
+                        chunk = chunk[: end + 1 - position]  # noqa: PLW2901
+                        output_file.write(chunk)
+                        position += len(chunk)
+                        uncommitted += len(chunk)
+                        self.__update_progress(filename, len(chunk))
+                        if uncommitted >= JOURNAL_COMMIT_INTERVAL:
+                            DownloadJournal.sync(output_file)
+                            journal.commit_segment(index, position)
+                            uncommitted = 0
+                        if position > end:
+                            break
+                finally:
+                    DownloadJournal.sync(output_file)
+                    journal.commit_segment(index, position)
+
+        if position <= end:
+            msg = f"Incomplete download of byte range {position:d}-{end:d}"
+            raise RuntimeError(msg)
+
+    def __stream_to_file(
+        self,
+        response,
+        filename: str,
+        part_file: str,
+        mode: str,
+        journal: "DownloadJournal",
+    ) -> None:
+        """
+        Writes the response stream to the partial file starting at the journal
+        offset, periodically committing the offset to the journal
+
+        Args:
+            response: Streaming response to read from
+            filename (str): Name of the file in the request file list
+            part_file (str): Path of the partial file
+            mode (str): File mode used to open the partial file
+            journal (DownloadJournal): Journal for the partial file
+        """
+        uncommitted = 0
+        with open(part_file, mode) as output_file:
+            output_file.seek(journal.offset)
+            output_file.truncate()
+            try:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if self.__abort.is_set():
+                        msg = "Download was cancelled"
+                        raise RuntimeError(msg)
+                    output_file.write(chunk)
+                    journal.offset += len(chunk)
+                    uncommitted += len(chunk)
+                    self.__update_progress(filename, len(chunk))
+                    if uncommitted >= JOURNAL_COMMIT_INTERVAL:
+                        DownloadJournal.sync(output_file)
+                        journal.commit()
+                        uncommitted = 0
+            finally:
+                DownloadJournal.sync(output_file)
+                journal.commit()
+
+    @staticmethod
+    def __content_range_size(response) -> Optional[int]:
+        """
+        Returns the total size of the file from the Content-Range header of a
+        partial content response
+
+        Args:
+            response: The partial content response
+
+        Returns:
+            int: Total size of the file or None if it is not known
+        """
+        content_range = response.headers.get("Content-Range", "")
+        total = content_range.rpartition("/")[2]
+        return int(total) if total.isdigit() else None
+
+    def download_files(
+        self, data_url: str, file_list: List[str], output_directory: Optional[str]
+    ) -> None:
+        """
+        Downloads the files in the file list from the request data url
+
+        Args:
+            data_url (str): Base url of the request data
+            file_list (List[str]): Files to download
+            output_directory (str, optional): Directory to write the files to
+
+        Returns:
+            None
+        """
+        if output_directory is not None and not os.path.exists(output_directory):
+            msg = f"Output directory does not exist: {output_directory:s}"
+            raise RuntimeError(msg)
+
+        self.__bytes_received = dict.fromkeys(file_list, 0)
+        self.__files_complete = 0
+        self.__file_count = len(file_list)
+        self.__abort.clear()
+
+        n_workers = min(self.__max_workers, max(len(file_list), 1))
+        self.__spinner.start(self.__progress_text())
+
+        errors: Dict[str, Exception] = {}
+        futures: List[Tuple[str, Future]] = []
+        executor = ThreadPoolExecutor(max_workers=n_workers)
+        try:
+            for f in file_list:
+                destination = (
+                    os.path.join(output_directory, f)
+                    if output_directory is not None
+                    else f
+                )
+                futures.append(
+                    (
+                        f,
+                        executor.submit(
+                            self.__download_file, data_url + "/" + f, f, destination
+                        ),
+                    )
+                )
+
+            # ...Results are collected in file list order so that error
+            # reporting does not depend on which transfer finishes first
+            for f, future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    errors[f] = e
+        except KeyboardInterrupt:
+            self.__abort.set()
+            for _, future in futures:
+                future.cancel()
+            self.__spinner.fail("Download was ended by the user")
+            raise
+        finally:
+            executor.shutdown(wait=True)
+
+        if errors:
+            message = f"Failed to download {len(errors):d} of {len(file_list):d} files"
+            self.__spinner.fail(f"[{MetGetDownloader.__time_str():s}]: {message:s}")
+            if not self.__spinner.silent:
+                for f, e in errors.items():
+                    print(f"[ERROR]: {f:s}: {e!s}", flush=True)
+            raise RuntimeError(message + ": " + ", ".join(errors.keys()))
+
+        self.__spinner.succeed(self.__progress_text())
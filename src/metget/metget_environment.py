@@ -80,3 +80,21 @@ def get_metget_environment_variables(args: argparse.Namespace) -> dict:
         api_version = args.api_version
 
     return {"endpoint": endpoint, "apikey": apikey, "api_version": api_version}
+
+
+def get_metget_cache_directory() -> str:
+    """
+    This method is used to get the directory where the MetGet client keeps
+    its local state (request history, caches). The location can be set using
+    the METGET_CACHE_DIR environment variable and otherwise follows the XDG
+    cache directory convention.
+
+    Returns:
+        The path to the MetGet cache directory
+    """
+    if "METGET_CACHE_DIR" in os.environ:
+        return os.environ["METGET_CACHE_DIR"]
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "metget")
@@ -0,0 +1,265 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import atexit
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from .metget_environment import get_metget_cache_directory, metget_version
+
+# Name of the event log in the cache directory
+EVENT_LOG_FILENAME = "events.jsonl"
+
+# Severity of the event log levels. Events below the configured level are dropped
+EVENT_LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+# Default level of the event log
+EVENT_LOG_DEFAULT_LEVEL = "info"
+
+# Number of events held in memory before they are written to the log
+EVENT_LOG_BUFFER_SIZE = 64
+
+# Size in bytes at which the log is rotated
+EVENT_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# Number of rotated logs (events.jsonl.1, events.jsonl.2, ...) kept
+EVENT_LOG_BACKUP_COUNT = 5
+
+
+class EventLog:
+    """
+    Structured event log of the MetGet client. Each event is one JSON object
+    per line with the time, level, event name, and the id of the client run,
+    so the logs of many runs can be concatenated and analyzed together.
+    Events are buffered in memory and appended to the log when the buffer is
+    full, an error is recorded, or the log is flushed or closed. The log is
+    rotated once it exceeds the size limit.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        level: str = EVENT_LOG_DEFAULT_LEVEL,
+        buffer_size: int = EVENT_LOG_BUFFER_SIZE,
+        max_bytes: int = EVENT_LOG_MAX_BYTES,
+        backup_count: int = EVENT_LOG_BACKUP_COUNT,
+    ):
+        """
+        Constructor
+
+        Args:
+            path (str): Path of the log file
+            level (str): Lowest level recorded (debug, info, warning, error)
+            buffer_size (int): Number of events held before they are written
+            max_bytes (int): Size in bytes at which the log is rotated. 0
+                disables rotation
+            backup_count (int): Number of rotated logs kept
+        """
+        if level not in EVENT_LOG_LEVELS:
+            msg = f"Invalid event log level: {level}. Valid levels are {', '.join(EVENT_LOG_LEVELS)}"
+            raise ValueError(msg)
+        if buffer_size < 1:
+            msg = f"Event log buffer size must be at least 1. Got {buffer_size:d}"
+            raise ValueError(msg)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.__path = path
+        self.__level = EVENT_LOG_LEVELS[level]
+        self.__buffer_size = buffer_size
+        self.__max_bytes = max_bytes
+        self.__backup_count = backup_count
+        self.__run = uuid.uuid4().hex
+        self.__buffer: List[str] = []
+        self.__lock = threading.Lock()
+        atexit.register(self.flush)
+
+    @property
+    def path(self) -> str:
+        """
+        Returns the path of the log file
+
+        Returns:
+            str: Path of the log file
+        """
+        return self.__path
+
+    @property
+    def run(self) -> str:
+        """
+        Returns the id of the client run recorded with each event
+
+        Returns:
+            str: Run id
+        """
+        return self.__run
+
+    def enabled(self, level: str) -> bool:
+        """
+        Returns whether events of a level are recorded
+
+        Args:
+            level (str): Event level
+
+        Returns:
+            bool: True if the events are recorded
+        """
+        return EVENT_LOG_LEVELS[level] >= self.__level
+
+    def event(self, name: str, level: str = "info", **fields) -> None:
+        """
+        Records an event
+
+        Args:
+            name (str): Name of the event
+            level (str): Event level (debug, info, warning, error)
+            **fields: Data of the event. Values which are not JSON
+                serializable are recorded as strings
+        """
+        if not self.enabled(level):
+            return
+        record = {
+            "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "level": level,
+            "event": name,
+            "run": self.__run,
+            "pid": os.getpid(),
+            "version": metget_version(),
+        }
+        record.update(fields)
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self.__lock:
+            self.__buffer.append(line)
+            if (
+                len(self.__buffer) >= self.__buffer_size
+                or EVENT_LOG_LEVELS[level] >= EVENT_LOG_LEVELS["error"]
+            ):
+                self.__write()
+
+    def flush(self) -> None:
+        """
+        Writes the buffered events to the log
+        """
+        with self.__lock:
+            self.__write()
+
+    def close(self) -> None:
+        """
+        Writes the buffered events to the log. Events recorded afterwards are
+        written when the process exits
+        """
+        self.flush()
+
+    def __write(self) -> None:
+        """
+        Appends the buffered events to the log, rotating it first if it would
+        exceed the size limit. The lock must be held by the caller.
+        """
+        if not self.__buffer:
+            return
+        data = "\n".join(self.__buffer) + "\n"
+        self.__buffer = []
+        try:
+            if self.__max_bytes > 0 and os.path.exists(self.__path):
+                size = os.path.getsize(self.__path)
+                if size > 0 and size + len(data) > self.__max_bytes:
+                    self.__rotate()
+            with open(self.__path, "a") as f:
+                f.write(data)
+        except OSError:
+            # The log must never interrupt the client
+            pass
+
+    def __rotate(self) -> None:
+        """
+        Rotates the log files (events.jsonl -> events.jsonl.1 -> ...), dropping
+        the oldest one
+        """
+        if self.__backup_count < 1:
+            os.remove(self.__path)
+            return
+        for i in range(self.__backup_count - 1, 0, -1):
+            source = f"{self.__path}.{i:d}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.__path}.{i + 1:d}")
+        os.replace(self.__path, f"{self.__path}.1")
+
+    def __enter__(self) -> "EventLog":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def read_event_log(path: str) -> List[dict]:
+    """
+    Reads the events of a log file
+
+    Args:
+        path (str): Path of the log file
+
+    Returns:
+        List[dict]: The events in the order they were written
+    """
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def metget_event_log_from_args(args: argparse.Namespace) -> Optional[EventLog]:
+    """
+    Opens the event log unless it was disabled on the command line. The
+    location and level are taken from the command line, then the
+    METGET_EVENT_LOG and METGET_EVENT_LOG_LEVEL environment variables, and
+    default to events.jsonl in the cache directory at the info level.
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        EventLog: The event log or None when disabled
+    """
+    if not getattr(args, "event_log_enabled", False):
+        return None
+    path = (
+        getattr(args, "event_log", None)
+        or os.environ.get("METGET_EVENT_LOG")
+        or os.path.join(get_metget_cache_directory(), EVENT_LOG_FILENAME)
+    )
+    level = (
+        getattr(args, "event_log_level", None)
+        or os.environ.get("METGET_EVENT_LOG_LEVEL")
+        or EVENT_LOG_DEFAULT_LEVEL
+    )
+    return EventLog(path, level.lower())
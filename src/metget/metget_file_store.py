@@ -0,0 +1,272 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from .metget_environment import get_metget_cache_directory
+
+# Default size limit of the file store in gigabytes
+FILE_STORE_DEFAULT_SIZE = 10.0
+
+# Suffix of the temporary names used while linking files into place
+FILE_STORE_TEMP_SUFFIX = ".metget-tmp"
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """
+    Places a file at the destination as a hard link to the source, or as a
+    copy when the two are on different filesystems or links are not supported.
+    The destination is replaced atomically if it already exists. The file is
+    first placed under a unique temporary name in the destination directory,
+    so concurrent processes placing the same file do not interfere.
+
+    Args:
+        source (str): Existing file
+        destination (str): Path to create
+    """
+    fd, temp = tempfile.mkstemp(
+        prefix=os.path.basename(destination) + ".",
+        suffix=FILE_STORE_TEMP_SUFFIX,
+        dir=os.path.dirname(destination) or ".",
+    )
+    os.close(fd)
+    try:
+        os.remove(temp)
+        try:
+            os.link(source, temp)
+        except OSError:
+            shutil.copyfile(source, temp)
+        os.replace(temp, destination)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
+class FileStore:
+    """
+    Content addressed store of downloaded MetGet output files shared by all
+    output directories. Files are identified by their url, which contains the
+    request id and filename, and are verified against the recorded size (and
+    ETag when the server provides one). Files are hard linked into the output
+    directory when possible. The least recently used files are evicted when
+    the store exceeds its size limit.
+
+    Files placed by a hard link share their contents with the store, so output
+    files should be replaced rather than modified in place.
+    """
+
+    def __init__(self, directory: str, max_size: int):
+        """
+        Constructor
+
+        Args:
+            directory (str): Directory of the store
+            max_size (int): Maximum total size of the stored files in bytes
+        """
+        self.__directory = directory
+        self.__max_size = max_size
+        self.__lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self.__connection = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"),
+            timeout=30,
+            check_same_thread=False,
+        )
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "key TEXT PRIMARY KEY, "
+                "url TEXT NOT NULL, "
+                "size INTEGER NOT NULL, "
+                "etag TEXT, "
+                "last_used REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def key(url: str) -> str:
+        """
+        Returns the key of a file
+
+        Args:
+            url (str): Url of the file (request data url and filename)
+
+        Returns:
+            str: Hex encoded sha256 of the url
+        """
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def __object_path(self, key: str) -> str:
+        """
+        Returns the path of a stored file
+
+        Args:
+            key (str): Key of the file
+
+        Returns:
+            str: Path of the file in the store
+        """
+        return os.path.join(self.__directory, "objects", key[:2], key)
+
+    def fetch(
+        self,
+        url: str,
+        destination: str,
+        etag: Optional[str] = None,
+        size: Optional[int] = None,
+    ) -> bool:
+        """
+        Places a stored file at the destination. Entries which do not match
+        the expected ETag or size reported by the server are removed.
+
+        Args:
+            url (str): Url of the file
+            destination (str): Path to place the file at
+            etag (str, optional): Expected ETag of the file
+            size (int, optional): Expected size of the file in bytes
+
+        Returns:
+            bool: True if the file was in the store
+        """
+        key = FileStore.key(url)
+        path = self.__object_path(key)
+        with self.__lock, self.__connection:
+            row = self.__connection.execute(
+                "SELECT size, etag FROM files WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False
+            stored_size, stored_etag = row
+            valid = (
+                os.path.isfile(path)
+                and os.path.getsize(path) == stored_size
+                and (size is None or size == stored_size)
+                and (etag is None or stored_etag is None or etag == stored_etag)
+            )
+            if not valid:
+                self.__connection.execute("DELETE FROM files WHERE key = ?", (key,))
+                if os.path.exists(path):
+                    os.remove(path)
+                return False
+            self.__connection.execute(
+                "UPDATE files SET last_used = ? WHERE key = ?", (time.time(), key)
+            )
+        link_or_copy(path, destination)
+        return True
+
+    def add(self, url: str, source: str, etag: Optional[str] = None) -> None:
+        """
+        Adds a downloaded file to the store and evicts the least recently used
+        files if the store is over its size limit
+
+        Args:
+            url (str): Url of the file
+            source (str): Path of the downloaded file
+            etag (str, optional): ETag of the file reported by the server
+        """
+        size = os.path.getsize(source)
+        if size > self.__max_size:
+            return
+        key = FileStore.key(url)
+        path = self.__object_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        link_or_copy(source, path)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO files (key, url, size, etag, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, url, size, etag, time.time()),
+            )
+            self.__evict()
+
+    def __evict(self) -> None:
+        """
+        Removes the least recently used files until the store is within its
+        size limit. Must be called with the lock held.
+        """
+        total = self.__connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM files"
+        ).fetchone()[0]
+        if total <= self.__max_size:
+            return
+        for key, size in self.__connection.execute(
+            "SELECT key, size FROM files ORDER BY last_used ASC"
+        ).fetchall():
+            if total <= self.__max_size:
+                break
+            path = self.__object_path(key)
+            if os.path.exists(path):
+                os.remove(path)
+            self.__connection.execute("DELETE FROM files WHERE key = ?", (key,))
+            total -= size
+
+    @property
+    def size(self) -> int:
+        """
+        Returns the total size of the stored files
+
+        Returns:
+            int: Size in bytes
+        """
+        with self.__lock:
+            return self.__connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM files"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """
+        Closes the index
+        """
+        self.__connection.close()
+
+
+def metget_file_store_from_args(args: argparse.Namespace) -> Optional[FileStore]:
+    """
+    Opens the file store if it was enabled on the command line
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        FileStore: The file store or None when disabled
+    """
+    if not getattr(args, "file_cache", False):
+        return None
+    max_size = getattr(args, "file_cache_size", FILE_STORE_DEFAULT_SIZE)
+    return FileStore(
+        os.path.join(get_metget_cache_directory(), "files"),
+        int(max_size * 1024**3),
+    )
@@ -0,0 +1,103 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+from typing import Any, Iterator, Tuple
+
+import requests
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def response_body(response: requests.Response) -> Any:
+    """
+    Parses the 'body' of a MetGet response. When the optional 'ijson'
+    dependency is installed (pip install metget[stream]) and the response was
+    requested with stream=True, the body is parsed incrementally from the
+    socket, so the raw response text is never held in memory next to the
+    parsed data. Otherwise the response is parsed with response.json().
+
+    Args:
+        response (requests.Response): The server response
+
+    Returns:
+        The 'body' of the response
+    """
+    if not is_streaming_response(response):
+        return response.json()["body"]
+    response.raw.decode_content = True
+    bodies = list(ijson.items(response.raw, "body", use_float=True))
+    if not bodies:
+        msg = "The response does not contain a body"
+        raise RuntimeError(msg)
+    return bodies[0]
+
+
+def iter_response_items(
+    response: requests.Response, prefix: str
+) -> Iterator[Tuple[str, Any]]:
+    """
+    Iterates the key/value pairs of an object in a MetGet response, i.e. the
+    tracks in 'body.storm_tracks' keyed by storm. With the optional 'ijson'
+    dependency and a streamed response only one value is held in memory at a
+    time.
+
+    Args:
+        response (requests.Response): The server response
+        prefix (str): Dot separated path of the object in the response
+
+    Returns:
+        Iterator[Tuple[str, Any]]: The keys and values of the object
+    """
+    if is_streaming_response(response):
+        response.raw.decode_content = True
+        yield from ijson.kvitems(response.raw, prefix, use_float=True)
+        return
+    data = response.json()
+    for key in prefix.split("."):
+        data = data[key]
+    yield from data.items()
+
+
+def is_streaming_response(response: requests.Response) -> bool:
+    """
+    Returns whether the response can be parsed incrementally
+
+    Args:
+        response (requests.Response): The server response
+
+    Returns:
+        bool: True if ijson is available and the content has not been read
+    """
+    return (
+        ijson is not None
+        and response.raw is not None
+        and not getattr(response, "_content_consumed", True)
+    )
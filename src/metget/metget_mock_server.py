@@ -0,0 +1,1010 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .metget_data import MODEL_TYPES, STATUS_MODEL_ALIASES
+
+# Size in bytes of the generated output files of a request
+MOCK_SERVER_FILE_SIZE = 256 * 1024
+
+# Size in bytes of the blocks written to the socket (and throttled)
+MOCK_SERVER_CHUNK_SIZE = 16 * 1024
+
+# Number of status checks before a request is reported as completed
+MOCK_SERVER_POLLS_TO_COMPLETE = 3
+
+# Days of forecast cycles reported by the status endpoint
+MOCK_SERVER_STATUS_DAYS = 3
+
+# Models returned by the A-Deck endpoint for model 'all'
+MOCK_SERVER_ADECK_MODELS = ("AVNO", "CARQ", "HWRF", "HMON", "OFCL")
+
+# Ensemble members reported for ensemble models
+MOCK_SERVER_ENSEMBLE_MEMBERS = ("c00", "p01", "p02")
+
+
+class MetGetMockServer:
+    """
+    Local stand-in for the MetGet API built on the standard library http
+    server. It serves /build, /check, /status, /stormtrack, /adeck, and
+    /credits with synthetic but deterministic data shaped like the real
+    responses, and the file list and output files of each request under
+    /data/<request id>/. Latency, failures, and throughput can be injected
+    so that the client can be benchmarked and regression tested without a
+    network.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        api_key: Optional[str] = None,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 503,
+        throughput: Optional[float] = None,
+        polls_to_complete: int = MOCK_SERVER_POLLS_TO_COMPLETE,
+        file_size: int = MOCK_SERVER_FILE_SIZE,
+        fixtures_directory: Optional[str] = None,
+        reference_time: Optional[datetime] = None,
+        storm_count: int = 3,
+        advisory_count: int = 12,
+        seed: int = 0,
+        status_responses: Optional[Dict[str, dict]] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            host (str): Address to listen on
+            port (int): Port to listen on. 0 selects a free port
+            api_key (str, optional): API key required in the x-api-key header
+                of API calls. When None any key is accepted
+            latency (float): Seconds added before every response
+            jitter (float): Maximum random seconds added to the latency
+            failure_rate (float): Probability (0-1) that a request fails
+            failure_status (int): HTTP status of injected failures
+            throughput (float, optional): Maximum bytes per second written to
+                each response. Unlimited when None
+            polls_to_complete (int): Status checks before a request completes
+            file_size (int): Size in bytes of each generated output file
+            fixtures_directory (str, optional): Directory with file lists
+                (filelist_<domain name>.json, e.g. test/test_files). The
+                output files of a request whose first domain has a file list
+                are taken from it
+            reference_time (datetime, optional): Time of the latest forecast
+                cycle. Defaults to the current time
+            storm_count (int): Number of storms in each basin
+            advisory_count (int): Number of forecast advisories of each storm
+            seed (int): Seed of the injected failures and jitter
+            status_responses (Dict[str, dict], optional): Responses returned
+                verbatim by /status for a model instead of synthetic data,
+                e.g. recorded responses of the real server
+        """
+        if reference_time is None:
+            reference_time = datetime.now(timezone.utc).replace(tzinfo=None)
+        self.__reference_time = reference_time.replace(
+            hour=reference_time.hour - reference_time.hour % 6,
+            minute=0,
+            second=0,
+            microsecond=0,
+        )
+        self.__api_key = api_key
+        self.__latency = latency
+        self.__jitter = jitter
+        self.__failure_rate = failure_rate
+        self.__failure_status = failure_status
+        self.__throughput = throughput
+        self.__polls_to_complete = max(1, polls_to_complete)
+        self.__file_size = file_size
+        self.__fixtures_directory = fixtures_directory
+        self.__storm_count = storm_count
+        self.__advisory_count = advisory_count
+        self.__random = random.Random(seed)
+        self.__status_responses = dict(status_responses or {})
+
+        self.__lock = threading.Lock()
+        self.__requests: Dict[str, dict] = {}
+        self.__log: List[Tuple[str, str]] = []
+        self.__credits_used = 0.0
+
+        self.__server = ThreadingHTTPServer((host, port), MetGetMockRequestHandler)
+        self.__server.daemon_threads = True
+        self.__server.mock = self
+        self.__thread = None
+
+    @property
+    def endpoint(self) -> str:
+        """
+        Returns the url of the server
+
+        Returns:
+            str: The endpoint, i.e. http://127.0.0.1:<port>
+        """
+        host, port = self.__server.server_address[:2]
+        return f"http://{host:s}:{port:d}"
+
+    @property
+    def reference_time(self) -> datetime:
+        """
+        Returns the time of the latest forecast cycle
+
+        Returns:
+            datetime: The reference time
+        """
+        return self.__reference_time
+
+    @property
+    def request_log(self) -> List[Tuple[str, str]]:
+        """
+        Returns the method and path of every request received
+
+        Returns:
+            List[Tuple[str, str]]: The requests in the order received
+        """
+        with self.__lock:
+            return list(self.__log)
+
+    def request_count(self, prefix: str = "/") -> int:
+        """
+        Returns the number of requests received for paths with a prefix
+
+        Args:
+            prefix (str): Path prefix, e.g. '/check' or '/data/'
+
+        Returns:
+            int: The number of requests
+        """
+        with self.__lock:
+            return sum(1 for _, path in self.__log if path.startswith(prefix))
+
+    def start(self) -> "MetGetMockServer":
+        """
+        Starts serving in a background thread
+
+        Returns:
+            MetGetMockServer: The server
+        """
+        if self.__thread is None:
+            self.__thread = threading.Thread(
+                target=self.__server.serve_forever, daemon=True
+            )
+            self.__thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops the server
+        """
+        if self.__thread is not None:
+            self.__server.shutdown()
+            self.__thread.join()
+            self.__thread = None
+        self.__server.server_close()
+
+    def serve_forever(self) -> None:
+        """
+        Serves in the calling thread until interrupted
+        """
+        try:
+            self.__server.serve_forever()
+        finally:
+            self.__server.server_close()
+
+    def __enter__(self) -> "MetGetMockServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def record(self, method: str, path: str) -> None:
+        """
+        Records a request and waits for the configured latency
+
+        Args:
+            method (str): HTTP method
+            path (str): Request path
+        """
+        with self.__lock:
+            self.__log.append((method, path))
+            delay = self.__latency
+            if self.__jitter > 0:
+                delay += self.__random.uniform(0.0, self.__jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def injected_failure(self) -> Optional[int]:
+        """
+        Decides whether the current request fails
+
+        Returns:
+            Optional[int]: The HTTP status of the failure or None
+        """
+        if self.__failure_rate <= 0:
+            return None
+        with self.__lock:
+            failed = self.__random.random() < self.__failure_rate
+        return self.__failure_status if failed else None
+
+    def authorized(self, api_key: Optional[str]) -> bool:
+        """
+        Checks the API key of an API call
+
+        Args:
+            api_key (str, optional): Value of the x-api-key header
+
+        Returns:
+            bool: True if the key is accepted
+        """
+        return self.__api_key is None or api_key == self.__api_key
+
+    def write_body(self, handler: BaseHTTPRequestHandler, data: bytes) -> None:
+        """
+        Writes a response body in chunks, limited to the configured
+        throughput
+
+        Args:
+            handler (BaseHTTPRequestHandler): The request handler
+            data (bytes): The body
+        """
+        start = time.monotonic()
+        written = 0
+        for offset in range(0, len(data), MOCK_SERVER_CHUNK_SIZE):
+            chunk = data[offset : offset + MOCK_SERVER_CHUNK_SIZE]
+            try:
+                handler.wfile.write(chunk)
+            except (BrokenPipeError, ConnectionResetError):
+                # ...The client abandoned the response
+                handler.close_connection = True
+                return
+            written += len(chunk)
+            if self.__throughput:
+                ahead = written / self.__throughput - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def route(
+        self, method: str, path: str, query: Dict[str, str], body: bytes
+    ) -> Tuple[int, object]:
+        """
+        Answers an API call
+
+        Args:
+            method (str): HTTP method
+            path (str): Request path
+            query (Dict[str, str]): Query parameters
+            body (bytes): Request body
+
+        Returns:
+            Tuple[int, object]: HTTP status and JSON response
+        """
+        if method == "POST" and path == "/build":
+            return self.__build(body)
+        if method != "GET":
+            return 405, {"statusCode": 405, "body": {"message": "Method not allowed"}}
+        if path == "/check":
+            return self.__check(query.get("request-id"))
+        if path == "/credits":
+            return self.__credits()
+        if path == "/status":
+            return self.__status(query)
+        if path == "/stormtrack":
+            return self.__stormtrack(query)
+        match = re.fullmatch(r"/adeck/(\d{4})/(\w+)/([\w-]+)/(\w+)/([\w:-]+)", path)
+        if match:
+            return self.__adeck(*match.groups())
+        return 404, {"message": "Not Found"}
+
+    def file_list(self, request_id: str) -> Optional[dict]:
+        """
+        Returns the file list of a request
+
+        Args:
+            request_id (str): Request id
+
+        Returns:
+            dict: The file list (filelist.json) or None for an unknown request
+        """
+        with self.__lock:
+            request = self.__requests.get(request_id)
+        return None if request is None else request["filelist"]
+
+    def file_content(self, request_id: str, filename: str) -> Optional[bytes]:
+        """
+        Returns the content of an output file of a request. The content is
+        generated from the request id and file name, so it is identical
+        across downloads.
+
+        Args:
+            request_id (str): Request id
+            filename (str): Output file name
+
+        Returns:
+            bytes: The file content or None for an unknown file
+        """
+        file_list = self.file_list(request_id)
+        if file_list is None or filename not in file_list["output_files"]:
+            return None
+        block = hashlib.sha256(f"{request_id}/{filename}".encode()).hexdigest()
+        block = (block + "\n").encode() * 64
+        repeats = self.__file_size // len(block) + 1
+        return (block * repeats)[: self.__file_size]
+
+    def __build(self, body: bytes) -> Tuple[int, dict]:
+        """
+        Accepts a request
+
+        Args:
+            body (bytes): Request JSON
+
+        Returns:
+            Tuple[int, dict]: HTTP status and response
+        """
+        try:
+            request = json.loads(body)
+            domains = request["domains"]
+            filename = request.get("filename") or "metget_data"
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return 400, {
+                "statusCode": 400,
+                "body": {
+                    "message": "ERROR",
+                    "error_text": ["Invalid request JSON"],
+                },
+            }
+
+        request_id = str(uuid.uuid4())
+        request = dict(request, request_id=request_id)
+        file_list = self.__fixture_file_list(domains)
+        if file_list is None:
+            if request.get("format") in (None, "ascii", "owi-ascii"):
+                output_files = []
+                for i in range(len(domains)):
+                    output_files += [
+                        f"{filename}_{i:02d}.pre",
+                        f"{filename}_{i:02d}.wnd",
+                    ]
+            else:
+                output_files = [f"{filename}.nc"]
+            file_list = {"input_files": {}, "output_files": output_files}
+        file_list = dict(file_list, input=request)
+
+        with self.__lock:
+            self.__requests[request_id] = {"polls": 0, "filelist": file_list}
+            self.__credits_used += 1.0
+        return 200, {
+            "statusCode": 200,
+            "body": {
+                "request_id": request_id,
+                "status": "queued",
+                "message": "Request queued",
+            },
+        }
+
+    def __fixture_file_list(self, domains: list) -> Optional[dict]:
+        """
+        Reads the fixture file list of the first domain of a request
+
+        Args:
+            domains (list): Domains of the request
+
+        Returns:
+            dict: The file list or None when there is no fixture
+        """
+        if not self.__fixtures_directory or not domains:
+            return None
+        path = os.path.join(
+            self.__fixtures_directory, f"filelist_{domains[0].get('name', ''):s}.json"
+        )
+        if not os.path.isfile(path):
+            return None
+        with open(path) as f:
+            data = json.load(f)
+        return {
+            "input_files": data.get("input_files", {}),
+            "output_files": data["output_files"],
+        }
+
+    def __check(self, request_id: Optional[str]) -> Tuple[int, dict]:
+        """
+        Reports the status of a request. Requests are queued on the first
+        check, running until the configured number of checks, and completed
+        afterwards.
+
+        Args:
+            request_id (str, optional): Request id
+
+        Returns:
+            Tuple[int, dict]: HTTP status and response
+        """
+        with self.__lock:
+            request = self.__requests.get(request_id)
+            if request is not None:
+                request["polls"] += 1
+                polls = request["polls"]
+        if request is None:
+            return 400, {
+                "statusCode": 400,
+                "body": {"message": f"Request {request_id} not found"},
+            }
+
+        if polls >= self.__polls_to_complete:
+            status, message = "completed", "Request complete"
+        elif polls == 1:
+            status, message = "queued", "Request queued"
+        else:
+            status, message = "running", "Request running"
+        return 200, {
+            "statusCode": 200,
+            "body": {
+                "request_id": request_id,
+                "status": status,
+                "message": message,
+                "destination": f"{self.endpoint:s}/data/{request_id:s}",
+            },
+        }
+
+    def __credits(self) -> Tuple[int, dict]:
+        """
+        Reports the credit balance
+
+        Returns:
+            Tuple[int, dict]: HTTP status and response
+        """
+        limit = 100000.0
+        with self.__lock:
+            used = self.__credits_used
+        return 200, {
+            "statusCode": 200,
+            "body": {
+                "credit_limit": limit,
+                "credits_used": used,
+                "credit_balance": limit - used,
+            },
+        }
+
+    def __cycles(self, interval: int = 6) -> List[datetime]:
+        """
+        Returns the forecast cycles reported by the status endpoint
+
+        Args:
+            interval (int): Hours between cycles
+
+        Returns:
+            List[datetime]: The cycles, newest first
+        """
+        count = MOCK_SERVER_STATUS_DAYS * 24 // interval + 1
+        return [
+            self.__reference_time - timedelta(hours=i * interval) for i in range(count)
+        ]
+
+    @staticmethod
+    def __cycle_summary(cycles: List[datetime], duration: int) -> dict:
+        """
+        Returns the status of a series of forecast cycles. The newest cycle
+        is still being processed.
+
+        Args:
+            cycles (List[datetime]): The cycles, newest first
+            duration (int): Forecast length in hours
+
+        Returns:
+            dict: The status
+        """
+        fmt = "%Y-%m-%d %H:%M:%S"
+        complete = cycles[1:] if len(cycles) > 1 else cycles
+        partial = duration // 2 if len(cycles) > 1 else duration
+        return {
+            "min_forecast_date": cycles[-1].strftime(fmt),
+            "max_forecast_date": (cycles[0] + timedelta(hours=duration)).strftime(fmt),
+            "first_available_cycle": cycles[-1].strftime(fmt),
+            "latest_available_cycle": cycles[0].strftime(fmt),
+            "latest_available_cycle_length": partial,
+            "latest_complete_cycle": complete[0].strftime(fmt),
+            "complete_cycle_length": duration,
+            "cycles_complete": [c.strftime(fmt) for c in complete],
+            "cycles": [
+                {"cycle": c.strftime(fmt), "duration": partial if i == 0 else duration}
+                for i, c in enumerate(cycles)
+            ],
+        }
+
+    def __storms(self) -> List[str]:
+        """
+        Returns the storm numbers of each basin
+
+        Returns:
+            List[str]: The storm numbers (two digits)
+        """
+        return [f"{i:02d}" for i in range(1, self.__storm_count + 1)]
+
+    def __storm_start(self, storm: str) -> datetime:
+        """
+        Returns the time of the first best track point of a storm
+
+        Args:
+            storm (str): Storm number
+
+        Returns:
+            datetime: The start of the storm
+        """
+        return self.__reference_time - timedelta(
+            hours=6 * (self.__advisory_count + 4 * int(storm))
+        )
+
+    def __status(self, query: Dict[str, str]) -> Tuple[int, dict]:
+        """
+        Reports the status of a model
+
+        Args:
+            query (Dict[str, str]): Query parameters
+
+        Returns:
+            Tuple[int, dict]: HTTP status and response
+        """
+        model = query.get("model", "")
+        if model in self.__status_responses:
+            return 200, self.__status_responses[model]
+        aliases = {server: client for client, server in STATUS_MODEL_ALIASES.items()}
+        model_class = MODEL_TYPES.get(aliases.get(model, model))
+        if model_class is None or model_class == "hindcast":
+            return 400, {"statusCode": 400, "body": {"message": "Invalid model"}}
+
+        year = str(self.__reference_time.year)
+        cycles = self.__cycles()
+        if model_class == "synoptic":
+            body = dict(
+                self.__cycle_summary(cycles, 120),
+                meteorological_source=model,
+                request_limit_days=MOCK_SERVER_STATUS_DAYS,
+            )
+        elif model_class == "ensemble":
+            members = [query["member"]] if query.get("member") else None
+            body = {
+                m: self.__cycle_summary(cycles, 240)
+                for m in members or MOCK_SERVER_ENSEMBLE_MEMBERS
+            }
+        elif model_class == "synoptic-storm":
+            body = {
+                year: {
+                    f"storm{s:s}l": self.__cycle_summary(cycles[:4], 126)
+                    for s in self.__storms()
+                }
+            }
+        elif model_class == "ensemble-storm":
+            body = {
+                year: {
+                    f"{s:s}L": {
+                        str(m): self.__cycle_summary(cycles[:4], 126) for m in range(3)
+                    }
+                    for s in self.__storms()
+                }
+            }
+        elif model_class == "track":
+            basin = query.get("basin") or ("wp" if model == "jtwc" else "al")
+            body = self.__track_status(year, basin.lower())
+        else:
+            fmt = "%Y-%m-%d %H:%M:%S"
+            body = {
+                year: {
+                    "al": {
+                        s: {
+                            "first_cycle": cycles[3].strftime(fmt),
+                            "latest_cycle": cycles[0].strftime(fmt),
+                            "cycle_count": 4,
+                            "cycles": [c.strftime(fmt) for c in reversed(cycles[:4])],
+                            "members": ["F000", "F001", "mean"],
+                        }
+                        for s in self.__storms()
+                    }
+                }
+            }
+        return 200, {"statusCode": 200, "body": body}
+
+    def __track_status(self, year: str, basin: str) -> dict:
+        """
+        Reports the best tracks and forecast advisories of a track source
+
+        Args:
+            year (str): Season
+            basin (str): Basin
+
+        Returns:
+            dict: The status
+        """
+        fmt = "%Y-%m-%d %H:%M:%S"
+        best_track = {}
+        forecast = {}
+        for storm in self.__storms():
+            start = self.__storm_start(storm)
+            best_track[storm] = {
+                "best_track_start": start.strftime(fmt),
+                "best_track_end": self.__reference_time.strftime(fmt),
+                "duration": int(
+                    (self.__reference_time - start).total_seconds() // 3600
+                ),
+            }
+            forecast[storm] = {
+                f"{a:03d}": {
+                    "advisory_start": (start + timedelta(hours=6 * a)).strftime(fmt),
+                    "advisory_end": (start + timedelta(hours=6 * a + 120)).strftime(
+                        fmt
+                    ),
+                    "duration": 120,
+                }
+                for a in range(1, self.__advisory_count + 1)
+            }
+        return {
+            "best_track": {year: {basin: best_track}},
+            "forecast": {year: {basin: forecast}},
+        }
+
+    def __stormtrack(self, query: Dict[str, str]) -> Tuple[int, dict]:
+        """
+        Returns a best track or forecast track
+
+        Args:
+            query (Dict[str, str]): Query parameters
+
+        Returns:
+            Tuple[int, dict]: HTTP status and response
+        """
+        track_type = query.get("type")
+        storm = query.get("storm", "")
+        year = query.get("year", "")
+        if track_type not in ("best", "forecast") or not storm.isdigit():
+            return 400, {"statusCode": 400, "body": {"message": "Invalid query"}}
+        storm = f"{int(storm):02d}"
+        if year != str(self.__reference_time.year) or storm not in self.__storms():
+            return 404, {"statusCode": 404, "body": {"message": "No track found"}}
+
+        start = self.__storm_start(storm)
+        key = "/".join(query.get(k, "") for k in ("source", "basin", "year", "storm"))
+        if track_type == "best":
+            points = int((self.__reference_time - start).total_seconds() // 21600) + 1
+            geojson = mock_track(key, start, points, "storm_class")
+        else:
+            advisory = query.get("advisory", "")
+            if not advisory.isdigit() or not (
+                1 <= int(advisory) <= self.__advisory_count
+            ):
+                return 404, {"statusCode": 404, "body": {"message": "No track found"}}
+            geojson = mock_track(
+                f"{key}/{advisory}",
+                start + timedelta(hours=6 * int(advisory)),
+                21,
+                "storm_class",
+            )
+        return 200, {"statusCode": 200, "body": {"geojson": geojson}}
+
+    def __adeck(
+        self, year: str, basin: str, model: str, storm: str, cycle: str
+    ) -> Tuple[int, dict]:
+        """
+        Returns A-Deck forecast tracks
+
+        Args:
+            year (str): Storm year
+            basin (str): Basin
+            model (str): A-Deck model or 'all'
+            storm (str): Storm number or 'all'
+            cycle (str): Forecast cycle (YYYY-MM-DDThh:mm)
+
+        Returns:
+            Tuple[int, dict]: HTTP status and response
+        """
+        not_found = 404, {"statusCode": 404, "body": {"message": "No results found"}}
+        try:
+            cycle_time = datetime.strptime(cycle, "%Y-%m-%dT%H:%M")
+        except ValueError:
+            return 400, {"statusCode": 400, "body": {"message": "Invalid cycle"}}
+        if year != str(self.__reference_time.year):
+            return not_found
+
+        model = model.upper()
+        storms = self.__storms() if storm == "all" else [f"{int(storm):02d}"]
+        models = MOCK_SERVER_ADECK_MODELS if model == "ALL" else [model]
+        if any(s not in self.__storms() for s in storms):
+            return not_found
+
+        def track(m: str, s: str) -> dict:
+            return mock_track(
+                f"{year}/{basin.upper()}/{m}/{s}/{cycle}",
+                cycle_time,
+                21,
+                "forecast_hour",
+            )
+
+        body = {
+            "message": "Success",
+            "query": {
+                "year": year,
+                "basin": basin.upper(),
+                "cycle": cycle_time.strftime("%Y-%m-%d %H:%M"),
+            },
+        }
+        if model != "ALL":
+            body["query"]["model"] = model
+        if storm != "all":
+            body["query"]["storm"] = int(storm)
+        if storm == "all":
+            body["storm_tracks"] = {s: track(model, s) for s in storms}
+        elif model == "ALL":
+            body["storm_tracks"] = {m: track(m, storms[0]) for m in models}
+        else:
+            body["storm_track"] = track(model, storms[0])
+        return 200, {"statusCode": 200, "body": body}
+
+
+class MetGetMockRequestHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the MetGetMockServer
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    # Headers and body are written separately, so without TCP_NODELAY the
+    # delayed acknowledgement of keep-alive connections adds ~40 ms per request
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self.__handle("GET")
+
+    def do_POST(self) -> None:
+        self.__handle("POST")
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+    def __handle(self, method: str) -> None:
+        """
+        Dispatches a request to the server
+
+        Args:
+            method (str): HTTP method
+        """
+        mock = self.server.mock
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        mock.record(method, url.path)
+
+        failure = mock.injected_failure()
+        if failure is not None:
+            self.__send_json(failure, {"message": "Injected failure"})
+            return
+
+        if url.path.startswith("/data/"):
+            self.__send_data(url.path)
+            return
+
+        if not mock.authorized(self.headers.get("x-api-key")):
+            self.__send_json(403, {"message": "Forbidden"})
+            return
+
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        status, response = mock.route(method, url.path, query, body)
+        self.__send_json(status, response)
+
+    def __send_json(self, status: int, response: object) -> None:
+        """
+        Sends a JSON response
+
+        Args:
+            status (int): HTTP status
+            response (object): The response
+        """
+        data = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.server.mock.write_body(self, data)
+
+    def __send_data(self, path: str) -> None:
+        """
+        Sends the file list or an output file of a request, honoring byte
+        range requests
+
+        Args:
+            path (str): Request path (/data/<request id>/<file name>)
+        """
+        mock = self.server.mock
+        parts = path.split("/", 3)
+        if len(parts) != 4:
+            self.__send_json(404, {"message": "Not Found"})
+            return
+        request_id, filename = parts[2], parts[3]
+
+        if filename == "filelist.json":
+            file_list = mock.file_list(request_id)
+            if file_list is None:
+                self.__send_json(404, {"message": "Not Found"})
+            else:
+                self.__send_json(200, file_list)
+            return
+
+        content = mock.file_content(request_id, filename)
+        if content is None:
+            self.__send_json(404, {"message": "Not Found"})
+            return
+
+        etag = f'"{request_id:s}-{filename:s}"'
+        size = len(content)
+        start, end = 0, size - 1
+        status = 200
+        byte_range = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if byte_range and (if_range is None or if_range == etag):
+            match = re.fullmatch(r"bytes=(\d+)-(\d*)", byte_range.strip())
+            if match is None or int(match.group(1)) >= size:
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{size:d}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), size - 1)
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start:d}-{end:d}/{size:d}")
+        self.end_headers()
+        mock.write_body(self, content[start : end + 1])
+
+
+def mock_track(key: str, start: datetime, points: int, extra: str) -> dict:
+    """
+    Generates a GeoJSON storm track. The track is derived from the key, so
+    the same key always gives the same track. The pressure of the last point
+    of A-Deck tracks is missing (zero), as is common in the A-Deck.
+
+    Args:
+        key (str): Identifier of the track
+        start (datetime): Time of the first point
+        points (int): Number of 6-hourly points
+        extra (str): 'forecast_hour' for A-Deck tracks or 'storm_class' for
+            best and forecast tracks
+
+    Returns:
+        dict: The GeoJSON track
+    """
+    rng = random.Random(hashlib.sha256(key.encode()).hexdigest())
+    longitude = rng.uniform(-80.0, -40.0)
+    latitude = rng.uniform(10.0, 20.0)
+    pressure = rng.uniform(995.0, 1010.0)
+    features = []
+    for i in range(points):
+        wind = max(20.0, (1013.0 - pressure) * 2.3)
+        properties = {
+            "time_utc": (start + timedelta(hours=6 * i)).strftime("%Y-%m-%dT%H:%M:%S"),
+            "max_wind_speed_mph": round(wind, 2),
+            "minimum_sea_level_pressure_mb": round(pressure),
+            "radius_to_max_wind_nmi": 0,
+        }
+        if extra == "forecast_hour":
+            properties["forecast_hour"] = 6 * i
+            if i == points - 1:
+                properties["minimum_sea_level_pressure_mb"] = 0
+        else:
+            properties["storm_class"] = "HU" if wind >= 74.0 else "TS"
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [round(longitude, 1), round(latitude, 1)],
+                },
+                "properties": properties,
+            }
+        )
+        longitude -= rng.uniform(0.3, 1.0)
+        latitude += rng.uniform(0.1, 0.6)
+        pressure = min(1012.0, max(900.0, pressure + rng.uniform(-6.0, 3.0)))
+    return {"type": "FeatureCollection", "features": features}
+
+
+def metget_mock_server_cli(argv: Optional[List[str]] = None) -> None:
+    """
+    Runs the mock server from the command line, e.g.
+    python -m metget.metget_mock_server --port 8080 --latency 0.05
+
+    Args:
+        argv (List[str], optional): Command line arguments
+    """
+    p = argparse.ArgumentParser(description="Local mock MetGet API server")
+    p.add_argument("--host", type=str, default="127.0.0.1", help="Address")
+    p.add_argument("--port", type=int, default=8080, help="Port")
+    p.add_argument("--apikey", type=str, help="Required API key (any if omitted)")
+    p.add_argument("--latency", type=float, default=0.0, help="Seconds per request")
+    p.add_argument("--jitter", type=float, default=0.0, help="Random extra seconds")
+    p.add_argument(
+        "--failure-rate", type=float, default=0.0, help="Fraction of failed requests"
+    )
+    p.add_argument(
+        "--failure-status", type=int, default=503, help="Status of failed requests"
+    )
+    p.add_argument("--throughput", type=float, help="Bytes per second per response")
+    p.add_argument(
+        "--polls",
+        type=int,
+        default=MOCK_SERVER_POLLS_TO_COMPLETE,
+        help="Status checks before a request completes",
+    )
+    p.add_argument(
+        "--file-size",
+        type=int,
+        default=MOCK_SERVER_FILE_SIZE,
+        help="Size of generated output files in bytes",
+    )
+    p.add_argument("--fixtures", type=str, help="Directory of file list fixtures")
+    p.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = p.parse_args(argv)
+
+    server = MetGetMockServer(
+        host=args.host,
+        port=args.port,
+        api_key=args.apikey,
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+        throughput=args.throughput,
+        polls_to_complete=args.polls,
+        file_size=args.file_size,
+        fixtures_directory=args.fixtures,
+        seed=args.seed,
+    )
+    print(f"Serving a mock MetGet API at {server.endpoint:s}", flush=True)
+    with contextlib.suppress(KeyboardInterrupt):
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    metget_mock_server_cli()
@@ -0,0 +1,359 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from .metget_environment import get_metget_cache_directory
+
+# Default time between status checks (seconds)
+DEFAULT_CHECK_INTERVAL = 10.0
+
+# Number of consecutive failed status checks before a request is abandoned
+MAX_CONSECUTIVE_FAILURES = 10
+
+# Default upper bound on the time between status checks (seconds)
+DEFAULT_MAX_POLL_INTERVAL = 300.0
+
+# Default multiplier applied to the interval while the status does not change
+DEFAULT_POLL_BACKOFF = 1.5
+
+# Default fraction of the interval that is randomized
+DEFAULT_POLL_JITTER = 0.1
+
+# Number of past request durations kept per key
+DURATION_HISTORY_LENGTH = 25
+
+# Statuses for which the server is not yet working on the request
+WAITING_STATUSES = ("queued", "restore")
+
+
+class PollingPolicy(ABC):
+    """
+    Base class for the policies which determine how long the client waits
+    between status checks of a MetGet request
+    """
+
+    @abstractmethod
+    def next_interval(self, status: Optional[str], elapsed: float) -> float:
+        """
+        Returns the time to wait before the next status check
+
+        Args:
+            status (str): Status returned by the last check
+            elapsed (float): Seconds since the client started waiting
+
+        Returns:
+            float: Seconds to wait
+        """
+
+    @abstractmethod
+    def failure_interval(self, consecutive_failures: int) -> float:
+        """
+        Returns the time to wait after a failed or malformed status check
+
+        Args:
+            consecutive_failures (int): Number of consecutive failed checks
+
+        Returns:
+            float: Seconds to wait
+        """
+
+    def complete(self) -> None:  # noqa: B027
+        """
+        Called when the request is observed to complete
+        """
+
+
+class FixedPollingPolicy(PollingPolicy):
+    """
+    Polls at a fixed interval regardless of the request status
+    """
+
+    def __init__(self, interval: float):
+        """
+        Constructor
+
+        Args:
+            interval (float): Seconds between status checks
+        """
+        self.__interval = interval
+
+    def next_interval(self, status: Optional[str], elapsed: float) -> float:
+        return self.__interval
+
+    def failure_interval(self, consecutive_failures: int) -> float:
+        return self.__interval
+
+
+class RequestDurationHistory:
+    """
+    Persists the observed durations of past requests so that the completion
+    time of new requests can be estimated. Durations are grouped by a key
+    describing the type of request (e.g. output format and services).
+    """
+
+    def __init__(self, path: str):
+        """
+        Constructor
+
+        Args:
+            path (str): Path of the json file holding the history
+        """
+        self.__path = path
+        self.__lock = threading.Lock()
+
+    def __read(self) -> Dict[str, List[float]]:
+        """
+        Reads the history file
+
+        Returns:
+            Dict[str, List[float]]: Durations keyed by request type
+        """
+        try:
+            with open(self.__path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def estimate(self, key: str) -> Optional[float]:
+        """
+        Returns the median duration of past requests of a given type
+
+        Args:
+            key (str): Request type
+
+        Returns:
+            float: Estimated duration in seconds or None if there is no history
+        """
+        durations = self.__read().get(key)
+        if not durations:
+            return None
+        return statistics.median(durations)
+
+    def record(self, key: str, duration: float) -> None:
+        """
+        Records the duration of a completed request
+
+        Args:
+            key (str): Request type
+            duration (float): Duration in seconds
+        """
+        with self.__lock:
+            data = self.__read()
+            durations = data.get(key, [])
+            durations.append(round(duration, 1))
+            data[key] = durations[-DURATION_HISTORY_LENGTH:]
+            os.makedirs(os.path.dirname(self.__path) or ".", exist_ok=True)
+            tmp_file = self.__path + ".tmp"
+            with open(tmp_file, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.__path)
+
+
+class AdaptivePollingPolicy(PollingPolicy):
+    """
+    Polling policy which backs off while a request waits in the queue or for
+    data to be restored, polls at the base interval while a request is running
+    and close to its expected completion, and backs off exponentially after
+    failed status checks. All intervals are randomized by a jitter fraction so
+    that many clients do not poll in lockstep.
+    """
+
+    def __init__(
+        self,
+        base_interval: float,
+        max_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        backoff: float = DEFAULT_POLL_BACKOFF,
+        jitter: float = DEFAULT_POLL_JITTER,
+        history: Optional[RequestDurationHistory] = None,
+        history_key: Optional[str] = None,
+        submitted: Optional[float] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            base_interval (float): Shortest time between status checks
+            max_interval (float): Longest time between status checks
+            backoff (float): Multiplier applied while the status is unchanged
+            jitter (float): Fraction of the interval which is randomized
+            history (RequestDurationHistory, optional): Past request durations
+                used to estimate the completion time
+            history_key (str, optional): Request type used with the duration
+                history. None if the type of the request is unknown
+            submitted (float, optional): Time (seconds since the epoch) the
+                request was submitted. Durations are only recorded in the
+                history when both the submission time and request type are known
+        """
+        self.__base_interval = base_interval
+        self.__max_interval = max(max_interval, base_interval)
+        self.__backoff = backoff
+        self.__jitter = jitter
+        self.__history = history
+        self.__history_key = history_key
+        self.__submitted = submitted
+        self.__expected_duration = (
+            history.estimate(history_key)
+            if history is not None and history_key is not None
+            else None
+        )
+        self.__last_status = None
+        self.__same_status_count = 0
+
+    @property
+    def expected_duration(self) -> Optional[float]:
+        """
+        Returns the expected duration of the request estimated from the history
+
+        Returns:
+            float: Expected duration in seconds or None if unknown
+        """
+        return self.__expected_duration
+
+    def __apply_jitter(self, interval: float) -> float:
+        """
+        Randomizes an interval by the jitter fraction
+
+        Args:
+            interval (float): Interval in seconds
+
+        Returns:
+            float: Randomized interval in seconds
+        """
+        if self.__jitter <= 0:
+            return interval
+        return interval * random.uniform(1.0 - self.__jitter, 1.0 + self.__jitter)
+
+    def __backoff_interval(self, count: int) -> float:
+        """
+        Returns the base interval scaled by the backoff multiplier
+
+        Args:
+            count (int): Number of times the backoff has been applied
+
+        Returns:
+            float: Interval in seconds
+        """
+        return min(self.__base_interval * self.__backoff**count, self.__max_interval)
+
+    def next_interval(self, status: Optional[str], elapsed: float) -> float:
+        if status == self.__last_status:
+            self.__same_status_count += 1
+        else:
+            self.__last_status = status
+            self.__same_status_count = 0
+
+        if status in WAITING_STATUSES:
+            interval = self.__backoff_interval(self.__same_status_count)
+        elif self.__expected_duration is not None:
+            # ...Poll slowly while the request is far from its expected
+            # completion and at the base rate as it approaches it
+            remaining = self.__expected_duration - elapsed
+            interval = min(
+                max(remaining / 4.0, self.__base_interval), self.__max_interval
+            )
+        else:
+            interval = self.__base_interval
+
+        return self.__apply_jitter(interval)
+
+    def failure_interval(self, consecutive_failures: int) -> float:
+        return self.__apply_jitter(self.__backoff_interval(consecutive_failures))
+
+    def complete(self) -> None:
+        if (
+            self.__history is not None
+            and self.__history_key is not None
+            and self.__submitted is not None
+        ):
+            self.__history.record(self.__history_key, time.time() - self.__submitted)
+
+
+def request_duration_key(request_json: Optional[dict]) -> Optional[str]:
+    """
+    Generates the key used to group the durations of similar requests
+
+    Args:
+        request_json (dict, optional): The request sent to the MetGet API
+
+    Returns:
+        str: Key describing the output format and services of the request, or
+            None if the request is not known
+    """
+    if not request_json:
+        return None
+    services = sorted({d["service"] for d in request_json.get("domains") or []})
+    return "{:s}/{:s}".format(
+        str(request_json.get("format", "unknown")), "+".join(services)
+    )
+
+
+def metget_polling_policy_from_args(
+    args: argparse.Namespace,
+    request_json: Optional[dict] = None,
+    submitted: Optional[float] = None,
+) -> PollingPolicy:
+    """
+    Creates the polling policy selected on the command line
+
+    Args:
+        args: The arguments passed to the command line
+        request_json: The request sent to the MetGet API, if known
+        submitted: Time (seconds since the epoch) the request was submitted,
+            if it was submitted by this client
+
+    Returns:
+        PollingPolicy: The polling policy
+    """
+    policy = getattr(args, "poll_policy", None) or "fixed"
+    if policy == "fixed":
+        return FixedPollingPolicy(args.check_interval)
+    elif policy == "adaptive":
+        history = RequestDurationHistory(
+            os.path.join(get_metget_cache_directory(), "request_durations.json")
+        )
+        return AdaptivePollingPolicy(
+            args.check_interval,
+            max_interval=getattr(args, "max_check_interval", None)
+            or DEFAULT_MAX_POLL_INTERVAL,
+            history=history,
+            history_key=request_duration_key(request_json),
+            submitted=submitted,
+        )
+    else:
+        msg = f"Unknown polling policy: {policy:s}"
+        raise ValueError(msg)
@@ -0,0 +1,185 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+from datetime import datetime, timezone
+from typing import Optional, Tuple, Union
+
+from .metget_data import MODEL_TYPES, STATUS_MODEL_ALIASES
+
+# Basins for which A-Deck data is available
+ADECK_BASINS = ("AL", "EP", "CP", "WP", "IO", "SH")
+
+
+def status_query(
+    model: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    storm: Optional[str] = None,
+    basin: Optional[str] = None,
+    ensemble_member: Optional[str] = None,
+) -> Tuple[str, str, dict]:
+    """
+    Generates the query parameters of a status request. The filters which
+    apply depend on the type of the model (see MODEL_TYPES) and the others
+    are ignored.
+
+    Args:
+        model (str): Model name (see AVAILABLE_MODELS)
+        start (datetime, optional): Start of the period to report
+        end (datetime, optional): End of the period to report. Defaults to
+            today when a start is given
+        storm (str, optional): Storm name or number
+        basin (str, optional): Basin (track data)
+        ensemble_member (str, optional): Ensemble member
+
+    Returns:
+        Tuple[str, str, dict]: The server model name, the model class, and the
+            query parameters
+    """
+    if model not in MODEL_TYPES:
+        msg = f"Unknown model: {model:s}"
+        raise ValueError(msg)
+    model_class = MODEL_TYPES[model]
+    server_model = STATUS_MODEL_ALIASES.get(model, model)
+
+    params = {"model": server_model}
+    if start:
+        params["start"] = start.strftime("%Y-%m-%d")
+        params["end"] = (end or datetime.now(timezone.utc)).strftime("%Y-%m-%d")
+
+    if model_class == "track":
+        if storm:
+            params["storm"] = storm
+        if basin:
+            params["basin"] = basin
+    elif model_class in ("ensemble", "track-ensemble"):
+        if ensemble_member:
+            params["member"] = ensemble_member
+    elif model_class == "ensemble-storm":
+        if storm:
+            params["storm"] = storm
+            if ensemble_member:
+                params["member"] = ensemble_member
+    elif model_class == "synoptic-storm":
+        if storm:
+            params["storm"] = storm
+    elif model_class != "synoptic":
+        msg = "Unknown model type."
+        raise RuntimeError(msg)
+
+    return server_model, model_class, params
+
+
+def track_query(
+    storm: Union[int, str],
+    track_type: str,
+    year: int,
+    basin: str,
+    advisory: Union[int, str, None],
+    source: str,
+) -> dict:
+    """
+    Generates the query parameters of a storm track request
+
+    Args:
+        storm (Union[int, str]): Storm number
+        track_type (str): 'besttrack' or 'forecast'
+        year (int): Storm year
+        basin (str): Basin
+        advisory (Union[int, str], optional): Advisory of a forecast track
+        source (str): Track source ('nhc' or 'jtwc')
+
+    Returns:
+        dict: The query parameters
+    """
+    if not storm:
+        msg = "Storm must be specified for track data"
+        raise ValueError(msg)
+    if not track_type:
+        msg = "Type must be specified for track data"
+        raise ValueError(msg)
+
+    params = {
+        "source": source,
+        "storm": f"{int(storm):02d}",
+        "basin": basin,
+        "year": year,
+    }
+    if track_type == "besttrack":
+        params["type"] = "best"
+    elif track_type == "forecast":
+        if not advisory:
+            msg = "Advisory must be specified for forecast track data"
+            raise ValueError(msg)
+        params["type"] = "forecast"
+        params["advisory"] = f"{int(advisory):03d}"
+    else:
+        msg = "Type must be besttrack or forecast"
+        raise ValueError(msg)
+    return params
+
+
+def adeck_path(
+    year: int,
+    basin: str,
+    model: str,
+    storm: Union[int, str],
+    cycle: datetime,
+) -> Tuple[str, str, str, Union[int, str]]:
+    """
+    Validates the parameters of an A-Deck request and generates its path
+    relative to the endpoint
+
+    Args:
+        year (int): Storm year
+        basin (str): Basin (AL, EP, CP, WP, IO, SH)
+        model (str): A-Deck model name or 'all'
+        storm (Union[int, str]): Storm number or 'all'
+        cycle (datetime): Forecast cycle
+
+    Returns:
+        Tuple[str, str, str, Union[int, str]]: The path, and the normalized
+            basin, model, and storm
+    """
+    basin = basin.upper()
+    model = model.upper()
+    if basin not in ADECK_BASINS:
+        msg = f"Invalid basin. Must be one of {', '.join(ADECK_BASINS):s}"
+        raise ValueError(msg)
+
+    if isinstance(storm, str) and storm != "all":
+        try:
+            storm = int(storm)
+        except ValueError:
+            msg = "Invalid storm. Must be an integer or 'all'"
+            raise ValueError(msg) from None
+    storm_id = storm if storm == "all" else f"{storm:02d}"
+
+    cycle_str = cycle.strftime("%Y-%m-%dT%H:%M")
+    path = f"/adeck/{year}/{basin:s}/{model:s}/{storm_id:s}/{cycle_str:s}"
+    return path, basin, model, storm
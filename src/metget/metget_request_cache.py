@@ -0,0 +1,337 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from .metget_environment import get_metget_cache_directory
+
+# Time a request id is reused for an identical request body. Requests for data
+# which is still being produced (e.g. a forecast ending in the future) would
+# return more data when resubmitted later, so entries are not kept forever and
+# such requests are not cached at all (see is_request_cacheable).
+REQUEST_CACHE_TTL = 3 * 86400.0
+
+# Name of the request cache database in the cache directory
+REQUEST_CACHE_FILENAME = "requests.sqlite"
+
+
+def request_cache_key(request_json: dict, endpoint: str) -> str:
+    """
+    Generates the key of a request body. The body is serialized canonically
+    (sorted keys, no whitespace) without the 'creator' field so that the same
+    request made by different users or hosts maps to the same key. The endpoint
+    is included because request ids are only valid on the server which issued them.
+
+    Args:
+        request_json (dict): Request JSON sent to MetGet
+        endpoint (str): MetGet API endpoint
+
+    Returns:
+        str: Hex encoded sha256 of the canonical request
+    """
+    body = {k: v for k, v in request_json.items() if k != "creator"}
+    canonical = json.dumps(
+        {"endpoint": endpoint.rstrip("/"), "request": body},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_request_cacheable(request_json: dict) -> bool:
+    """
+    Returns whether a request may be answered from the request cache. A request
+    whose end date is later than now covers data which is still being produced,
+    so the same request body returns more data when it is submitted again.
+
+    Args:
+        request_json (dict): Request JSON sent to MetGet
+
+    Returns:
+        bool: True if the request ends in the past
+    """
+    try:
+        end_date = datetime.strptime(
+            str(request_json["end_date"]), "%Y-%m-%d %H:%M:%S"
+        ).replace(tzinfo=timezone.utc)
+    except (KeyError, ValueError):
+        return False
+    return end_date <= datetime.now(timezone.utc)
+
+
+class CachedRequest:
+    """
+    A request id recorded in the request cache
+    """
+
+    def __init__(
+        self,
+        request_id: str,
+        created: float,
+        expires: float,
+        file_list: Optional[dict],
+        output_directory: Optional[str],
+        file_sizes: Optional[Dict[str, int]],
+    ):
+        """
+        Constructor
+
+        Args:
+            request_id (str): MetGet request id
+            created (float): Time the request was submitted (epoch seconds)
+            expires (float): Time after which the entry is not reused (epoch seconds)
+            file_list (dict, optional): File list (filelist.json) once downloaded
+            output_directory (str, optional): Directory the files were downloaded to
+            file_sizes (Dict[str, int], optional): Size in bytes of each
+                downloaded file
+        """
+        self.request_id = request_id
+        self.created = created
+        self.expires = expires
+        self.file_list = file_list
+        self.output_directory = output_directory
+        self.file_sizes = file_sizes
+
+    def local_files(self) -> Optional[List[str]]:
+        """
+        Returns the paths of the downloaded files if all of them are still on
+        disk with the size they were downloaded with
+
+        Returns:
+            List[str]: Paths of the downloaded files or None
+        """
+        if not self.file_list or not self.output_directory or not self.file_sizes:
+            return None
+        names = self.file_list.get("output_files") or []
+        if not names or any(name not in self.file_sizes for name in names):
+            return None
+        paths = [os.path.join(self.output_directory, name) for name in names]
+        for name, path in zip(names, paths):
+            if (
+                not os.path.isfile(path)
+                or os.path.getsize(path) != self.file_sizes[name]
+            ):
+                return None
+        return paths
+
+
+class RequestCache:
+    """
+    Local index of submitted requests keyed by the canonical hash of the request
+    body, used to avoid submitting an identical request to MetGet again while
+    the earlier request can still be downloaded
+    """
+
+    def __init__(self, path: str, ttl: float = REQUEST_CACHE_TTL):
+        """
+        Constructor
+
+        Args:
+            path (str): Path of the SQLite database
+            ttl (float): Time in seconds a request id is reused
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__ttl = ttl
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS requests ("
+                "key TEXT PRIMARY KEY, "
+                "request_id TEXT NOT NULL, "
+                "created REAL NOT NULL, "
+                "expires REAL NOT NULL, "
+                "file_list TEXT, "
+                "output_directory TEXT, "
+                "file_sizes TEXT)"
+            )
+            columns = [
+                row[1]
+                for row in self.__connection.execute("PRAGMA table_info(requests)")
+            ]
+            if "file_sizes" not in columns:
+                self.__connection.execute(
+                    "ALTER TABLE requests ADD COLUMN file_sizes TEXT"
+                )
+
+    def lookup(self, key: str) -> Optional[CachedRequest]:
+        """
+        Returns the request recorded for a key unless it has expired
+
+        Args:
+            key (str): Request key from request_cache_key
+
+        Returns:
+            CachedRequest: The recorded request or None
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "DELETE FROM requests WHERE expires < ?", (time.time(),)
+            )
+            row = self.__connection.execute(
+                "SELECT request_id, created, expires, file_list, output_directory, "
+                "file_sizes FROM requests WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        file_list = json.loads(row[3]) if row[3] else None
+        if not isinstance(file_list, dict):
+            file_list = None
+        file_sizes = json.loads(row[5]) if row[5] else None
+        return CachedRequest(row[0], row[1], row[2], file_list, row[4], file_sizes)
+
+    def store(self, key: str, request_id: str) -> None:
+        """
+        Records a newly submitted request
+
+        Args:
+            key (str): Request key from request_cache_key
+            request_id (str): MetGet request id
+        """
+        now = time.time()
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO requests "
+                "(key, request_id, created, expires, file_list, output_directory, "
+                "file_sizes) VALUES (?, ?, ?, ?, NULL, NULL, NULL)",
+                (key, request_id, now, now + self.__ttl),
+            )
+
+    def complete(self, key: str, file_list: dict, output_directory: str) -> None:
+        """
+        Records the files of a request once they have been downloaded, along
+        with their sizes so that modified or truncated copies are not reused
+
+        Args:
+            key (str): Request key from request_cache_key
+            file_list (dict): File list (filelist.json) of the request
+            output_directory (str): Directory the files were downloaded to
+        """
+        file_sizes = {}
+        for name in file_list.get("output_files") or []:
+            path = os.path.join(output_directory, name)
+            if not os.path.isfile(path):
+                return
+            file_sizes[name] = os.path.getsize(path)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "UPDATE requests SET file_list = ?, output_directory = ?, "
+                "file_sizes = ? WHERE key = ?",
+                (
+                    json.dumps(file_list),
+                    os.path.abspath(output_directory),
+                    json.dumps(file_sizes),
+                    key,
+                ),
+            )
+
+    def remove(self, key: str) -> None:
+        """
+        Removes a request which can no longer be downloaded
+
+        Args:
+            key (str): Request key from request_cache_key
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute("DELETE FROM requests WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        """
+        Closes the database
+        """
+        self.__connection.close()
+
+    def __enter__(self) -> "RequestCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def copy_cached_files(
+    request: CachedRequest,
+    output_directory: str,
+    file_list_path: Optional[str] = None,
+) -> bool:
+    """
+    Copies the files of an earlier download into the output directory if they
+    are all still on disk unchanged, and writes the file list of the request
+    as a download would
+
+    Args:
+        request (CachedRequest): The recorded request
+        output_directory (str): Directory to copy the files to
+        file_list_path (str, optional): Path the file list (filelist.json) is
+            written to. Defaults to filelist.json in the output directory
+
+    Returns:
+        bool: True if the files are available in the output directory
+    """
+    paths = request.local_files()
+    if paths is None:
+        return False
+    os.makedirs(output_directory, exist_ok=True)
+    for path in paths:
+        destination = os.path.join(output_directory, os.path.basename(path))
+        if os.path.abspath(destination) != os.path.abspath(path):
+            shutil.copy2(path, destination)
+    if file_list_path is None:
+        file_list_path = os.path.join(output_directory, "filelist.json")
+    with open(file_list_path, "w") as f:
+        f.write(json.dumps(request.file_list, indent=2, sort_keys=True))
+    return True
+
+
+def metget_request_cache_from_args(args: argparse.Namespace) -> Optional[RequestCache]:
+    """
+    Opens the request cache if it was enabled on the command line
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        RequestCache: The request cache or None when disabled
+    """
+    if not getattr(args, "request_cache", False):
+        return None
+    return RequestCache(
+        os.path.join(get_metget_cache_directory(), REQUEST_CACHE_FILENAME)
+    )
@@ -0,0 +1,391 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import time
+from typing import List, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metget_event_log import EventLog, metget_event_log_from_args
+
+# Default number of pooled connections kept alive per host
+DEFAULT_POOL_SIZE = 10
+
+# Default number of retries for failed idempotent requests
+DEFAULT_MAX_RETRIES = 3
+
+# Default backoff factor between retries (seconds)
+DEFAULT_RETRY_BACKOFF = 0.5
+
+# Server responses which are considered transient and are retried
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def is_endpoint_url(url: str, endpoint: str) -> bool:
+    """
+    Returns whether a url belongs to the MetGet endpoint, i.e. has the same
+    scheme and host and a path below the path of the endpoint. Hosts which
+    only start with the endpoint host (metget.example.com.other.net) or paths
+    which only start with the endpoint path (/metget-other) do not match.
+
+    Args:
+        url (str): Url of a request
+        endpoint (str): MetGet API endpoint
+
+    Returns:
+        bool: True if the url belongs to the endpoint
+    """
+    target = urlsplit(url)
+    base = urlsplit(endpoint)
+    if (
+        target.scheme.lower() != base.scheme.lower()
+        or target.netloc.lower() != base.netloc.lower()
+    ):
+        return False
+    prefix = base.path.rstrip("/")
+    return not prefix or target.path == prefix or target.path.startswith(prefix + "/")
+
+
+class MetGetApiError(RuntimeError):
+    """
+    Raised when the MetGet API returns an unsuccessful response
+    """
+
+    def __init__(
+        self,
+        message: str,
+        status_code: int,
+        body,
+        errors: Optional[List[str]] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            message (str): Error message
+            status_code (int): Http status code of the response
+            body: Decoded JSON response (or text if the response is not JSON)
+            errors (List[str], optional): Error messages reported by the server
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+        self.errors = errors if errors is not None else []
+
+
+class MetGetSession:
+    """
+    Connection pooled HTTP session shared by the MetGet client subcommands.
+    Connections are kept alive between calls, failed idempotent requests are
+    retried with backoff, and the MetGet API key is attached to every request
+    sent to the MetGet endpoint (but not to other hosts such as the S3 bucket
+    the output files are served from). When an event log is attached, every
+    request is recorded with its status, size, latency, and retries.
+    """
+
+    def __init__(
+        self,
+        endpoint: Optional[str] = None,
+        api_key: Optional[str] = None,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
+        event_log: Optional[EventLog] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            endpoint (str, optional): MetGet API endpoint
+            api_key (str, optional): MetGet API key
+            pool_size (int): Number of connections to keep alive per host
+            max_retries (int): Number of retries for failed idempotent requests
+            retry_backoff (float): Backoff factor between retries
+            event_log (EventLog, optional): Log the requests are recorded in
+        """
+        if pool_size < 1:
+            msg = f"Connection pool size must be at least 1. Got {pool_size:d}"
+            raise ValueError(msg)
+
+        self.__endpoint = endpoint
+        self.__api_key = api_key
+        self.__pool_size = pool_size
+        self.__event_log = event_log
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=retry_backoff,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+        )
+
+        self.__session = requests.Session()
+        self.__session.mount("https://", adapter)
+        self.__session.mount("http://", adapter)
+
+    @property
+    def pool_size(self) -> int:
+        """
+        Returns the number of connections kept alive per host
+
+        Returns:
+            int: Connection pool size
+        """
+        return self.__pool_size
+
+    @property
+    def event_log(self) -> Optional[EventLog]:
+        """
+        Returns the event log the requests are recorded in
+
+        Returns:
+            EventLog: The event log or None
+        """
+        return self.__event_log
+
+    def event(self, name: str, level: str = "info", **fields) -> None:
+        """
+        Records an event in the event log, if one is attached
+
+        Args:
+            name (str): Name of the event
+            level (str): Event level (debug, info, warning, error)
+            **fields: Data of the event
+        """
+        if self.__event_log is not None:
+            self.__event_log.event(name, level, **fields)
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        Returns the underlying requests session
+
+        Returns:
+            requests.Session: The pooled session
+        """
+        return self.__session
+
+    def __headers(self, url: str, headers: Optional[dict]) -> dict:
+        """
+        Generates the headers for a request, adding the api key when the
+        request is sent to the MetGet endpoint
+
+        Args:
+            url (str): Url of the request
+            headers (dict, optional): Headers supplied by the caller
+
+        Returns:
+            dict: Headers for the request
+        """
+        request_headers = {}
+        if (
+            self.__api_key is not None
+            and self.__endpoint is not None
+            and is_endpoint_url(url, self.__endpoint)
+        ):
+            request_headers["x-api-key"] = self.__api_key
+        if headers:
+            request_headers.update(headers)
+        return request_headers
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a request using the pooled session
+
+        Args:
+            method (str): HTTP method
+            url (str): Url of the request
+            **kwargs: Additional arguments passed to requests
+
+        Returns:
+            requests.Response: The server response
+        """
+        kwargs["headers"] = self.__headers(url, kwargs.get("headers"))
+        if self.__event_log is None:
+            return self.__session.request(method, url, **kwargs)
+
+        start = time.perf_counter()
+        try:
+            r = self.__session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException as exc:
+            self.__event_log.event(
+                "http",
+                "error",
+                method=method,
+                url=MetGetSession.__log_url(url),
+                error=repr(exc),
+                elapsed=round(time.perf_counter() - start, 6),
+            )
+            raise
+        self.__record(method, url, r, time.perf_counter() - start, kwargs)
+        return r
+
+    def __record(
+        self,
+        method: str,
+        url: str,
+        response: requests.Response,
+        elapsed: float,
+        kwargs: dict,
+    ) -> None:
+        """
+        Records a completed request in the event log. Streamed responses are
+        recorded when their headers arrive, using the Content-Length header as
+        their size.
+
+        Args:
+            method (str): HTTP method
+            url (str): Url of the request
+            response (requests.Response): The server response
+            elapsed (float): Time in seconds spent in the request
+            kwargs (dict): Arguments passed to requests
+        """
+        streamed = bool(kwargs.get("stream", False))
+        if streamed:
+            length = response.headers.get("Content-Length")
+            size = int(length) if length is not None and length.isdigit() else None
+        else:
+            size = len(response.content)
+        retries = getattr(response.raw, "retries", None)
+        self.__event_log.event(
+            "http",
+            "warning" if response.status_code >= 400 else "info",
+            method=method,
+            url=MetGetSession.__log_url(url),
+            status=response.status_code,
+            bytes=size,
+            elapsed=round(elapsed, 6),
+            latency=round(response.elapsed.total_seconds(), 6),
+            retries=len(retries.history) if retries is not None else 0,
+            streamed=streamed,
+        )
+
+    @staticmethod
+    def __log_url(url: str) -> str:
+        """
+        Removes the query from a url before it is logged, since presigned
+        urls carry their credentials in the query
+
+        Args:
+            url (str): Url of the request
+
+        Returns:
+            str: The url without query and fragment
+        """
+        parts = urlsplit(url)
+        return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET request using the pooled session
+
+        Args:
+            url (str): Url of the request
+            **kwargs: Additional arguments passed to requests
+
+        Returns:
+            requests.Response: The server response
+        """
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a HEAD request using the pooled session
+
+        Args:
+            url (str): Url of the request
+            **kwargs: Additional arguments passed to requests
+
+        Returns:
+            requests.Response: The server response
+        """
+        return self.request("HEAD", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a POST request using the pooled session. POST requests are not
+        retried since they are not idempotent.
+
+        Args:
+            url (str): Url of the request
+            **kwargs: Additional arguments passed to requests
+
+        Returns:
+            requests.Response: The server response
+        """
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        """
+        Closes all pooled connections and writes the buffered events
+        """
+        self.__session.close()
+        if self.__event_log is not None:
+            self.__event_log.flush()
+
+    def __enter__(self) -> "MetGetSession":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def metget_session_from_args(
+    args: argparse.Namespace, environment: dict, min_pool_size: int = 1
+) -> MetGetSession:
+    """
+    Creates a MetGet session from the command line arguments and the MetGet
+    environment variables
+
+    Args:
+        args: The arguments passed to the command line
+        environment: The MetGet environment (endpoint, apikey, api_version)
+        min_pool_size: Minimum connection pool size required by the caller
+
+    Returns:
+        MetGetSession: The pooled session
+    """
+    pool_size = getattr(args, "pool_size", None) or DEFAULT_POOL_SIZE
+    max_retries = getattr(args, "retries", None)
+    if max_retries is None:
+        max_retries = DEFAULT_MAX_RETRIES
+    return MetGetSession(
+        environment["endpoint"],
+        environment["apikey"],
+        pool_size=max(pool_size, min_pool_size),
+        max_retries=max_retries,
+        event_log=metget_event_log_from_args(args),
+    )
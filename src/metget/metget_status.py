@@ -27,85 +27,308 @@
 #
 ###################################################################################################
 import argparse
+import bisect
 import json
-from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Union
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import prettytable
-import requests
 
-from .metget_data import MODEL_TYPES, STATUS_MODEL_ALIASES
-from .metget_environment import get_metget_environment_variables
+from .metget_api import MetGetClient, ModelStatus, status_model_list
+from .metget_session import MetGetSession
+from .metget_status_cache import metget_status_cache_from_args
+from .metget_status_index import metget_status_index_from_args
+
+
+class CycleIndex:
+    """
+    Index of the forecast cycles of a status response. Complete cycles are
+    held in a set and the cycle times are parsed once and kept sorted so that
+    a time window is selected by bisection instead of a scan.
+    """
+
+    def __init__(self, data: dict):
+        """
+        Constructor
+
+        Args:
+            data: Status with 'cycles' ({cycle, duration}) and 'cycles_complete'
+        """
+        self.__complete = frozenset(data.get("cycles_complete", []))
+        cycles = sorted(
+            (
+                (datetime.fromisoformat(c["cycle"]), c["cycle"], c["duration"])
+                for c in data.get("cycles", [])
+            ),
+            key=lambda c: c[0],
+        )
+        self.__times = [c[0] for c in cycles]
+        self.__cycles = cycles
+
+    def __len__(self) -> int:
+        return len(self.__cycles)
+
+    def is_complete(self, cycle: str) -> bool:
+        """
+        Returns whether a cycle is complete
+
+        Args:
+            cycle: Cycle as reported by the server (YYYY-mm-dd HH:MM:SS)
+
+        Returns:
+            True if the cycle is complete
+        """
+        return cycle in self.__complete
+
+    def window(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> Tuple[int, int]:
+        """
+        Returns the range of sorted cycles between two dates. The window covers
+        whole days, like the start/end parameters of the status query.
+
+        Args:
+            start: First day of the window (all cycles if not given)
+            end: Last day of the window (all later cycles if not given)
+
+        Returns:
+            The first and one past the last position of the cycles in the window
+        """
+        first = 0
+        last = len(self.__times)
+        if start is not None:
+            day = datetime(start.year, start.month, start.day)
+            first = bisect.bisect_left(self.__times, day)
+        if end is not None:
+            day = datetime(end.year, end.month, end.day) + timedelta(days=1)
+            last = bisect.bisect_left(self.__times, day)
+        return first, max(first, last)
+
+    def rows(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        only_complete: bool = False,
+    ) -> Iterator[Tuple[str, datetime, int, bool]]:
+        """
+        Iterates the cycles in a window, newest first
+
+        Args:
+            start: First day of the window
+            end: Last day of the window
+            only_complete: Skip the cycles which are not complete
+
+        Returns:
+            The cycle, the end time of the cycle, its duration (hours), and
+            whether it is complete
+        """
+        first, last = self.window(start, end)
+        for i in range(last - 1, first - 1, -1):
+            time, cycle, duration = self.__cycles[i]
+            complete = cycle in self.__complete
+            if complete or not only_complete:
+                yield cycle, time + timedelta(hours=duration), duration, complete
 
 
 class MetGetStatus:
-    def __init__(self, args: argparse.Namespace):
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        session: Optional[MetGetSession] = None,
+        client: Optional[MetGetClient] = None,
+    ):
         """
         This method is used to initialize the MetGet status command
 
         Args:
             args: The arguments passed to the command line
+            session: Pooled session used for requests to the MetGet API
+            client: Library client used to query the MetGet API. When given,
+                the session is ignored
 
         Returns:
             None
         """
         self.__args = args
-        self.__environment = get_metget_environment_variables(args)
+        self.__models = status_model_list(args.model)
+        if client is None:
+            client = MetGetClient.from_args(
+                args,
+                min_pool_size=len(self.__models),
+                session=session,
+                status_cache=metget_status_cache_from_args(args),
+            )
+        self.__client = client
+        self.__index = metget_status_index_from_args(args)
         self.__model_class = None
 
-        if self.__environment["api_version"] != 2:
-            msg = "Only API version 2 is supported."
-            raise RuntimeError(msg)
-
     def get_status(self) -> None:
         """
         This method is used to get the status of the metget data
         """
-        model = self.__args.model
-        self.__model_class = MODEL_TYPES[model]
+        if self.__index is not None:
+            self.__get_status_since_last()
+            return
+
+        if self.__is_many():
+            self.__get_status_many()
+            return
+
+        self.render(self.__get_status_single())
+
+    def __is_many(self) -> bool:
+        """
+        Returns whether more than one model was requested
+        """
+        return len(self.__models) > 1 or self.__args.model == "all"
+
+    def __get_status_single(self) -> ModelStatus:
+        """
+        This method is used to get the status of the requested model with the
+        model specific filters from the command line
+        """
+        return self.__client.status(
+            self.__args.model,
+            start=self.__args.start,
+            end=self.__args.end,
+            storm=getattr(self.__args, "storm", None),
+            basin=getattr(self.__args, "basin", None),
+            ensemble_member=getattr(self.__args, "ensemble_member", None),
+            year=getattr(self.__args, "year", None),
+            refresh=getattr(self.__args, "refresh", False),
+        )
+
+    def __get_status_since_last(self) -> None:
+        """
+        This method is used to print only the cycles which are new or have
+        completed since the last query of the same model(s)
+        """
+        if self.__is_many():
+            results, errors = self.__client.status_many(
+                self.__models,
+                start=self.__args.start,
+                end=self.__args.end,
+                refresh=getattr(self.__args, "refresh", False),
+            )
+        else:
+            results = {self.__models[0]: self.__get_status_single()}
+            errors = {}
+
+        events = []
+        with self.__index:
+            for model in self.__models:
+                if model in results:
+                    scope = self.__client.endpoint + "|" + model
+                    events.extend(self.__index.update(scope, results[model]))
+
+        if self.__args.format == "json":
+            output = {"events": events}
+            if errors:
+                output["errors"] = {m: str(e) for m, e in errors.items()}
+            print(json.dumps(output))
+        elif self.__args.format == "pretty":
+            for model, error in errors.items():
+                print(f"[ERROR]: {model:s}: {error!s}")
+            if not events:
+                print("No new cycles.")
+                return
+            table = prettytable.PrettyTable(["Model", "Series", "Cycle", "Status"])
+            for event in events:
+                series = "-".join(
+                    str(v)
+                    for k, v in event.items()
+                    if k not in ("model", "cycle", "status")
+                )
+                table.add_row(
+                    [event["model"], series or "-", event["cycle"], event["status"]]
+                )
+            print(table)
+        else:
+            msg = "Unknown format"
+            raise RuntimeError(msg)
+
+    def __get_status_many(self) -> None:
+        """
+        This method is used to get the status of several models concurrently
+        and print them as one table or one JSON document keyed by model
+        """
+        results, errors = self.__client.status_many(
+            self.__models,
+            start=self.__args.start,
+            end=self.__args.end,
+            refresh=getattr(self.__args, "refresh", False),
+        )
+
+        if self.__args.format == "json":
+            merged = {}
+            for model in self.__models:
+                if model in results:
+                    merged[model] = results[model].data
+                else:
+                    merged[model] = {"error": str(errors[model])}
+            print(json.dumps(merged))
+        elif self.__args.format == "pretty":
+            table = prettytable.PrettyTable(
+                [
+                    "Model",
+                    "Class",
+                    "Latest Cycle",
+                    "Latest Complete Cycle",
+                    "Available",
+                ]
+            )
+            table.align["Model"] = "l"
+            for model in self.__models:
+                if model in results:
+                    latest, complete, available = summarize_status(results[model])
+                    table.add_row(
+                        [
+                            model,
+                            results[model].model_class,
+                            latest or "-",
+                            complete or "-",
+                            available,
+                        ]
+                    )
+                else:
+                    table.add_row([model, "-", "-", "-", f"error: {errors[model]!s}"])
+            print(table)
+        else:
+            msg = "Unknown format"
+            raise RuntimeError(msg)
+
+    def render(self, status: ModelStatus) -> None:
+        """
+        This method is used to print the status returned by the MetGet client
 
-        # ...Some client model names differ from the server-side status name
-        # (e.g. grtofs -> rtofs)
-        model = STATUS_MODEL_ALIASES.get(model, model)
+        Args:
+            status: The status of the model
+
+        Returns:
+            None
+        """
+        self.__model_class = status.model_class
+        model = status.server_model
+        data = status.data
 
         if self.__model_class == "synoptic":
-            self.__status_synoptic(model)
+            self.__status_synoptic(model, data)
         elif self.__model_class == "synoptic-storm":
-            self.__status_synoptic_storm(model)
+            self.__status_synoptic_storm(model, data)
         elif self.__model_class == "ensemble":
-            self.__status_ensemble(model)
+            self.__status_ensemble(model, data)
         elif self.__model_class == "ensemble-storm":
-            self.__status_ensemble_storm(model)
+            self.__status_ensemble_storm(model, data)
         # elif self.__model_class == "hindcast":
         #     self.__status_hindcast(model)
         elif self.__model_class == "track":
-            self.__status_track(model)
+            self.__status_track(data)
         elif self.__model_class == "track-ensemble":
-            self.__status_track_ensemble(model)
+            self.__status_track_ensemble(data)
         else:
             msg = "Unknown model type."
             raise RuntimeError(msg)
 
-    def __add_url_start_end_parameters(self, url):
-        """
-        This method is used to add the start and end parameters to the url
-
-        Args:
-            url: The url to add the start and end parameters to
-
-        Returns:
-            The url with the start and end parameters added
-        """
-        if self.__args.start:
-            url += "&start={:s}".format(self.__args.start.strftime("%Y-%m-%d"))
-            if not self.__args.end:
-                url += "&end={:s}".format(
-                    datetime.now(timezone.utc).strftime("%Y-%m-%d")
-                )
-            else:
-                url += "&end={:s}".format(self.__args.end.strftime("%Y-%m-%d"))
-        return url
-
     # TODO: ERA5 Hindcast
     # def __status_hindcast(self, model: str) -> None:
     #
@@ -139,25 +362,13 @@ class MetGetStatus:
     #
     #         print(table)
 
-    def __status_track(self, model: str) -> None:
+    def __status_track(self, data: dict) -> None:
         """
-        This method is used to get the status of the track data (NHC)
+        This method is used to print the status of the track data (NHC)
 
         Args:
-            model: The model to get the status for
+            data: The status returned by the server
         """
-        url = "{:s}/status?model={:s}".format(self.__environment["endpoint"], model)
-        url = self.__add_url_start_end_parameters(url)
-        if self.__args.storm:
-            url += f"&storm={self.__args.storm:s}"
-        if self.__args.basin:
-            url += f"&basin={self.__args.basin:s}"
-
-        response = requests.get(
-            url, headers={"x-api-key": self.__environment["apikey"]}
-        )
-        data = response.json()["body"]
-
         if self.__args.format == "json":
             print(json.dumps(data))
         elif self.__args.format == "pretty":
@@ -235,51 +446,16 @@ class MetGetStatus:
             msg = "Unknown format"
             raise RuntimeError(msg)
 
-    def __status_track_ensemble(self, model: str) -> None:
+    def __status_track_ensemble(self, data: dict) -> None:
         """
-        This method is used to get the status of ensemble track data (DeepMind). The
-        server response is nested year -> basin -> storm, each with the available
-        forecast cycles and ensemble members.
+        This method is used to print the status of ensemble track data (DeepMind).
+        The server response is nested year -> basin -> storm, each with the
+        available forecast cycles and ensemble members.
 
         Args:
-            model: The model to get the status for
+            data: The status returned by the server, filtered by year, basin,
+                and storm
         """
-        url = "{:s}/status?model={:s}".format(self.__environment["endpoint"], model)
-        url = self.__add_url_start_end_parameters(url)
-        if self.__args.ensemble_member:
-            url += f"&member={self.__args.ensemble_member:s}"
-
-        response = requests.get(
-            url, headers={"x-api-key": self.__environment["apikey"]}
-        )
-        data = response.json()["body"]
-
-        # ...The deepmind status endpoint does not take year/basin/storm query
-        # parameters, so those command line filters are applied client-side
-        if self.__args.year:
-            data = {k: v for k, v in data.items() if k == str(self.__args.year)}
-        if self.__args.basin:
-            data = {
-                year: {
-                    basin: storms
-                    for basin, storms in basins.items()
-                    if basin == self.__args.basin.lower()
-                }
-                for year, basins in data.items()
-            }
-        if self.__args.storm:
-            data = {
-                year: {
-                    basin: {
-                        storm: info
-                        for storm, info in storms.items()
-                        if storm == self.__args.storm
-                    }
-                    for basin, storms in basins.items()
-                }
-                for year, basins in data.items()
-            }
-
         if self.__args.format == "json":
             print(json.dumps(data))
         elif self.__args.format == "pretty":
@@ -294,9 +470,9 @@ class MetGetStatus:
                     "Members",
                 ]
             )
-            for year in data:
-                for basin in data[year]:
-                    for storm, info in data[year][basin].items():
+            for year, basins in data.items():
+                for basin, storms in basins.items():
+                    for storm, info in storms.items():
                         members = info["members"]
                         if len(members) > 6:
                             members = [*members[:3], "...", *members[-3:]]
@@ -319,28 +495,17 @@ class MetGetStatus:
             msg = "Unknown format"
             raise RuntimeError(msg)
 
-    def __status_ensemble_storm(self, model: str) -> None:
+    def __status_ensemble_storm(self, model: str, data: dict) -> None:
         """
-        This method is used to get the status of the ensemble storm data
+        This method is used to print the status of the ensemble storm data
 
         Args:
             model: The model to get the status for
+            data: The status returned by the server
 
         Returns:
             None
         """
-        url = "{:s}/status?model={:s}".format(self.__environment["endpoint"], model)
-        url = self.__add_url_start_end_parameters(url)
-        if self.__args.storm:
-            url += f"&storm={self.__args.storm:s}"
-            if self.__args.ensemble_member:
-                url += f"&member={self.__args.ensemble_member:s}"
-
-        response = requests.get(
-            url, headers={"x-api-key": self.__environment["apikey"]}
-        )
-        data = response.json()["body"]
-
         if self.__args.format == "json":
             print(json.dumps(data))
         elif self.__args.format == "pretty":
@@ -367,13 +532,13 @@ class MetGetStatus:
                 )
                 table.align["Ensemble Members"] = "l"
 
-                for year in data:
-                    for storm in data[year]:
+                for storms in data.values():
+                    for storm, members in storms.items():
                         ensemble_members = []
 
                         break_counter = 0
                         ensemble_members_str = ""
-                        for ensemble_member in data[year][storm]:
+                        for ensemble_member in members:
                             ensemble_members.append(ensemble_member)
                             if break_counter == 0:
                                 ensemble_members_str += f"{ensemble_member:s}"
@@ -386,103 +551,68 @@ class MetGetStatus:
                         table.add_row(
                             [
                                 storm,
-                                data[year][storm][ensemble_members[0]][
-                                    "first_available_cycle"
-                                ],
-                                data[year][storm][ensemble_members[0]][
-                                    "latest_available_cycle"
-                                ],
-                                data[year][storm][ensemble_members[0]][
-                                    "min_forecast_date"
-                                ],
-                                data[year][storm][ensemble_members[0]][
-                                    "max_forecast_date"
-                                ],
-                                len(data[year][storm][ensemble_members[0]]["cycles"]),
+                                members[ensemble_members[0]]["first_available_cycle"],
+                                members[ensemble_members[0]]["latest_available_cycle"],
+                                members[ensemble_members[0]]["min_forecast_date"],
+                                members[ensemble_members[0]]["max_forecast_date"],
+                                len(members[ensemble_members[0]]["cycles"]),
                                 ensemble_members_str,
                             ]
                         )
                 print(table)
 
-    def __status_ensemble(self, model: str) -> None:
+    def __status_ensemble(self, model: str, data: dict) -> None:
         """
-        This method is used to get the status of the ensemble data
+        This method is used to print the status of the ensemble data
 
         Args:
             model: The model to get the status for
+            data: The status returned by the server
 
         Returns:
             None
         """
-        url = "{:s}/status?model={:s}".format(self.__environment["endpoint"], model)
-        url = self.__add_url_start_end_parameters(url)
-        if self.__args.ensemble_member:
-            url += f"&member={self.__args.ensemble_member:s}"
-        response = requests.get(
-            url, headers={"x-api-key": self.__environment["apikey"]}
-        )
-
         if self.__args.ensemble_member:
             model_name = f"{model:s}-{self.__args.ensemble_member:s}"
             self.__print_status_generic(
                 model_name,
-                response.json()["body"][self.__args.ensemble_member],
+                data[self.__args.ensemble_member],
                 self.__args.complete,
             )
         else:
-            self.__print_status_multi("ensemble", model, response.json()["body"])
+            self.__print_status_multi("ensemble", model, data)
 
-    def __status_synoptic(self, model: str) -> None:
+    def __status_synoptic(self, model: str, data: dict) -> None:
         """
-        This method is used to get the status of the synoptic data
+        This method is used to print the status of the synoptic data
 
         Args:
             model: The model to get the status for
+            data: The status returned by the server
 
         Returns:
             None
         """
-        url = "{:s}/status?model={:s}".format(self.__environment["endpoint"], model)
-        url = self.__add_url_start_end_parameters(url)
-
-        # ...Get the json from the endpoint
-        response = requests.get(
-            url, headers={"x-api-key": self.__environment["apikey"]}
-        )
-
-        self.__print_status_generic(
-            model.upper(), response.json()["body"], self.__args.complete
-        )
+        self.__print_status_generic(model.upper(), data, self.__args.complete)
 
-    def __status_synoptic_storm(self, model: str) -> None:
+    def __status_synoptic_storm(self, model: str, data: dict) -> None:
         """
-        This method is used to get the status of the synoptic data for storms
+        This method is used to print the status of the synoptic data for storms
 
         Args:
             model: The model to get the status for
+            data: The status returned by the server
 
         Returns:
             None
         """
-        url = "{:s}/status?model={:s}".format(self.__environment["endpoint"], model)
-        url = self.__add_url_start_end_parameters(url)
-
-        if self.__args.storm:
-            url += f"&storm={self.__args.storm:s}"
-
-        # ...Get the json from the endpoint
-        response = requests.get(
-            url, headers={"x-api-key": self.__environment["apikey"]}
-        )
-
-        # ...Print
-        if response.json()["body"] == {}:
+        if data == {}:
             if self.__args.format == "json":
-                print(json.dumps(response.json()["body"]))
+                print(json.dumps(data))
             else:
                 print("No data found.")
         else:
-            self.__print_status_multi("storm", model, response.json()["body"])
+            self.__print_status_multi("storm", model, data)
 
     def __print_status_multi(
         self, data_type: str, model: str, data: Union[Dict, List[Dict]]
@@ -597,7 +727,6 @@ class MetGetStatus:
         if self.__args.format == "json":
             print(json.dumps(data))
         elif self.__args.format == "pretty":
-            complete_cycles = data["cycles_complete"]
             complete_cycle_length = data["complete_cycle_length"]
 
             print(
@@ -606,25 +735,83 @@ class MetGetStatus:
             )
             table = prettytable.PrettyTable(["Forecast Cycle", "End Time", "Status"])
 
-            for cycle in data["cycles"]:
-                if cycle["cycle"] in complete_cycles:
+            index = CycleIndex(data)
+            for cycle, end_time, duration, complete in index.rows(
+                self.__args.start, self.__args.end, only_complete
+            ):
+                if complete:
                     status = "complete"
                 else:
-                    status = "incomplete ({:d})".format(cycle["duration"])
-
-                if status == "complete" or not only_complete:
-                    table.add_row(
-                        [
-                            cycle["cycle"],
-                            datetime.strptime(cycle["cycle"], "%Y-%m-%d %H:%M:%S")
-                            + timedelta(hours=cycle["duration"]),
-                            status,
-                        ]
-                    )
+                    status = f"incomplete ({duration:d})"
+                table.add_row([cycle, end_time, status])
 
             print(table)
 
 
+def summarize_status(status: ModelStatus) -> Tuple[Optional[str], Optional[str], str]:
+    """
+    This method is used to summarize the status of a model as one row of the
+    status overview of several models
+
+    Args:
+        status: The status of the model
+
+    Returns:
+        The latest cycle, the latest complete cycle, and a description of the
+        available data (number of cycles, ensemble members, or storms)
+    """
+    data = status.data
+    model_class = status.model_class
+    if model_class == "synoptic":
+        leaves = [data] if data else []
+        available = "{:d} cycles".format(len(data.get("cycles", [])))
+    elif model_class == "ensemble":
+        leaves = list(data.values())
+        available = f"{len(leaves):d} members"
+    elif model_class == "synoptic-storm":
+        leaves = [s for storms in data.values() for s in storms.values()]
+        available = f"{len(leaves):d} storms"
+    elif model_class == "ensemble-storm":
+        storms = [s for year in data.values() for s in year.values()]
+        leaves = [m for storm in storms for m in storm.values()]
+        available = f"{len(storms):d} storms"
+    elif model_class == "track":
+        leaves = [
+            s
+            for basins in data.get("best_track", {}).values()
+            for storms in basins.values()
+            for s in storms.values()
+        ]
+        available = f"{len(leaves):d} storms"
+    elif model_class == "track-ensemble":
+        leaves = [
+            s
+            for basins in data.values()
+            for storms in basins.values()
+            for s in storms.values()
+        ]
+        available = f"{len(leaves):d} storms"
+    else:
+        msg = "Unknown model type."
+        raise RuntimeError(msg)
+
+    latest_key = {"track": "best_track_end", "track-ensemble": "latest_cycle"}.get(
+        model_class, "latest_available_cycle"
+    )
+    latest = max(
+        (leaf[latest_key] for leaf in leaves if leaf.get(latest_key)), default=None
+    )
+    complete = max(
+        (
+            leaf["latest_complete_cycle"]
+            for leaf in leaves
+            if leaf.get("latest_complete_cycle")
+        ),
+        default=None,
+    )
+    return latest, complete, available
+
+
 def metget_status(args: argparse.Namespace) -> None:
     """
     This method is used to get the status of the metget data
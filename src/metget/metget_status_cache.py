@@ -0,0 +1,271 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from .metget_environment import get_metget_cache_directory
+
+# Time in seconds a status response is used without asking the server again,
+# by model class. Synoptic and ensemble status only changes as the files of a
+# new cycle are processed, while track and storm status changes with each
+# advisory during an active storm.
+STATUS_CACHE_TTL = {
+    "synoptic": 300.0,
+    "ensemble": 600.0,
+    "synoptic-storm": 180.0,
+    "ensemble-storm": 180.0,
+    "track": 120.0,
+    "track-ensemble": 600.0,
+}
+
+# Entries which have not been used for this long are removed from the cache
+STATUS_CACHE_MAX_AGE = 7 * 86400.0
+
+# Name of the status cache database in the cache directory
+STATUS_CACHE_FILENAME = "status.sqlite"
+
+
+def status_cache_key(endpoint: str, params: dict) -> str:
+    """
+    Generates the key of a status query from the endpoint and the full set of
+    query parameters
+
+    Args:
+        endpoint (str): MetGet API endpoint
+        params (dict): Query parameters of the status request
+
+    Returns:
+        str: Hex encoded sha256 of the canonical query
+    """
+    canonical = json.dumps(
+        {"endpoint": endpoint.rstrip("/"), "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CachedStatus:
+    """
+    A status response recorded in the status cache
+    """
+
+    def __init__(
+        self,
+        body: dict,
+        fetched: float,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ):
+        """
+        Constructor
+
+        Args:
+            body (dict): The 'body' of the status response
+            fetched (float): Time the response was last validated (epoch seconds)
+            etag (str, optional): ETag header of the response
+            last_modified (str, optional): Last-Modified header of the response
+        """
+        self.body = body
+        self.fetched = fetched
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def validators(self) -> Dict[str, str]:
+        """
+        Returns the conditional request headers used to revalidate the entry
+
+        Returns:
+            Dict[str, str]: If-None-Match and If-Modified-Since headers
+        """
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class StatusCache:
+    """
+    On-disk cache of status responses keyed by the status query. Entries are
+    used directly while they are younger than the time to live of the model
+    class and are revalidated with the server (ETag / Last-Modified) afterwards.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[Dict[str, float]] = None,
+        max_age: float = STATUS_CACHE_MAX_AGE,
+    ):
+        """
+        Constructor
+
+        Args:
+            path (str): Path of the SQLite database
+            ttl (Dict[str, float], optional): Time to live in seconds by model
+                class. Defaults to STATUS_CACHE_TTL
+            max_age (float): Time in seconds after which unused entries are removed
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__ttl = ttl if ttl is not None else STATUS_CACHE_TTL
+        self.__max_age = max_age
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS status ("
+                "key TEXT PRIMARY KEY, "
+                "body TEXT NOT NULL, "
+                "fetched REAL NOT NULL, "
+                "etag TEXT, "
+                "last_modified TEXT)"
+            )
+
+    def ttl(self, model_class: str) -> float:
+        """
+        Returns the time to live of a model class
+
+        Args:
+            model_class (str): Model class (see MODEL_TYPES)
+
+        Returns:
+            float: Time to live in seconds
+        """
+        return self.__ttl.get(model_class, 0.0)
+
+    def is_fresh(self, entry: CachedStatus, model_class: str) -> bool:
+        """
+        Returns whether an entry can be used without revalidating it
+
+        Args:
+            entry (CachedStatus): The cached status
+            model_class (str): Model class (see MODEL_TYPES)
+
+        Returns:
+            bool: True if the entry is younger than the time to live
+        """
+        return time.time() - entry.fetched < self.ttl(model_class)
+
+    def lookup(self, key: str) -> Optional[CachedStatus]:
+        """
+        Returns the status recorded for a key
+
+        Args:
+            key (str): Status key from status_cache_key
+
+        Returns:
+            CachedStatus: The recorded status or None
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "DELETE FROM status WHERE fetched < ?",
+                (time.time() - self.__max_age,),
+            )
+            row = self.__connection.execute(
+                "SELECT body, fetched, etag, last_modified FROM status WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedStatus(json.loads(row[0]), row[1], row[2], row[3])
+
+    def store(
+        self,
+        key: str,
+        body: dict,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """
+        Records a status response
+
+        Args:
+            key (str): Status key from status_cache_key
+            body (dict): The 'body' of the status response
+            etag (str, optional): ETag header of the response
+            last_modified (str, optional): Last-Modified header of the response
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO status "
+                "(key, body, fetched, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(body), time.time(), etag, last_modified),
+            )
+
+    def touch(self, key: str) -> None:
+        """
+        Marks an entry as revalidated (the server answered 304 Not Modified)
+
+        Args:
+            key (str): Status key from status_cache_key
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "UPDATE status SET fetched = ? WHERE key = ?", (time.time(), key)
+            )
+
+    def close(self) -> None:
+        """
+        Closes the database
+        """
+        self.__connection.close()
+
+    def __enter__(self) -> "StatusCache":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def metget_status_cache_from_args(args: argparse.Namespace) -> Optional[StatusCache]:
+    """
+    Opens the status cache unless it was disabled on the command line
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        StatusCache: The status cache or None when disabled
+    """
+    if not getattr(args, "status_cache", False):
+        return None
+    return StatusCache(
+        os.path.join(get_metget_cache_directory(), STATUS_CACHE_FILENAME)
+    )
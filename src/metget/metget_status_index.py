@@ -0,0 +1,220 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .metget_api import ModelStatus
+from .metget_environment import get_metget_cache_directory
+
+# Name of the index of seen status cycles in the cache directory
+STATUS_INDEX_FILENAME = "status_index.sqlite"
+
+# Cycles which have not been reported by the server for this long are removed
+# from the index
+STATUS_INDEX_MAX_AGE = 90 * 86400.0
+
+
+def status_cycle_streams(
+    status: ModelStatus,
+) -> List[Tuple[Dict[str, str], List[str], Set[str]]]:
+    """
+    Splits a status response into its independent series of forecast cycles
+    (the model itself, or one per ensemble member, storm, or storm and member)
+
+    Track data reports forecast advisories in place of cycles. Advisories and
+    ensemble track cycles are only listed once they are available, so they are
+    treated as complete.
+
+    Args:
+        status: The status of the model
+
+    Returns:
+        List[Tuple[Dict[str, str], List[str], Set[str]]]: The labels of each
+            series (i.e. {"member": "p01"}), its cycles, and its complete cycles
+    """
+    data = status.data
+    model_class = status.model_class
+
+    def cycles(d: dict) -> Tuple[List[str], Set[str]]:
+        return [c["cycle"] for c in d.get("cycles", [])], set(
+            d.get("cycles_complete", [])
+        )
+
+    streams = []
+    if model_class == "synoptic":
+        if data:
+            streams.append(({}, *cycles(data)))
+    elif model_class == "ensemble":
+        for member, d in data.items():
+            streams.append(({"member": member}, *cycles(d)))
+    elif model_class == "synoptic-storm":
+        for year, storms in data.items():
+            for storm, d in storms.items():
+                streams.append(({"year": year, "storm": storm}, *cycles(d)))
+    elif model_class == "ensemble-storm":
+        for year, storms in data.items():
+            for storm, members in storms.items():
+                for member, d in members.items():
+                    labels = {"year": year, "storm": storm, "member": member}
+                    streams.append((labels, *cycles(d)))
+    elif model_class == "track":
+        for year, basins in data.get("forecast", {}).items():
+            for basin, storms in basins.items():
+                for storm, advisories in storms.items():
+                    labels = {"year": year, "basin": basin, "storm": storm}
+                    streams.append((labels, list(advisories), set(advisories)))
+    elif model_class == "track-ensemble":
+        for year, basins in data.items():
+            for basin, storms in basins.items():
+                for storm, d in storms.items():
+                    labels = {"year": year, "basin": basin, "storm": storm}
+                    streams.append((labels, d["cycles"], set(d["cycles"])))
+    else:
+        msg = "Unknown model type."
+        raise RuntimeError(msg)
+    return streams
+
+
+class StatusIndex:
+    """
+    Local index of the forecast cycles already reported for each model, used
+    to report only the cycles which are new or have completed since the last
+    status query
+    """
+
+    def __init__(self, path: str, max_age: float = STATUS_INDEX_MAX_AGE):
+        """
+        Constructor
+
+        Args:
+            path (str): Path of the SQLite database
+            max_age (float): Time in seconds after which cycles no longer
+                reported by the server are removed
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__max_age = max_age
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS cycles ("
+                "scope TEXT NOT NULL, "
+                "stream TEXT NOT NULL, "
+                "cycle TEXT NOT NULL, "
+                "complete INTEGER NOT NULL, "
+                "last_seen REAL NOT NULL, "
+                "PRIMARY KEY (scope, stream, cycle))"
+            )
+
+    def update(self, scope: str, status: ModelStatus) -> List[dict]:
+        """
+        Records the cycles of a status response and returns the changes since
+        the previous update of the same scope
+
+        Args:
+            scope (str): Identifies the series of queries (i.e. endpoint and model)
+            status: The status of the model
+
+        Returns:
+            List[dict]: One event per cycle which is new ('new') or which has
+                completed ('complete'), with the model, the labels of its
+                series, and the cycle
+        """
+        now = time.time()
+        events = []
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "DELETE FROM cycles WHERE last_seen < ?", (now - self.__max_age,)
+            )
+            for labels, stream_cycles, complete in status_cycle_streams(status):
+                stream = json.dumps(labels, sort_keys=True)
+                seen = dict(
+                    self.__connection.execute(
+                        "SELECT cycle, complete FROM cycles "
+                        "WHERE scope = ? AND stream = ?",
+                        (scope, stream),
+                    ).fetchall()
+                )
+                rows = []
+                for cycle in stream_cycles:
+                    is_complete = cycle in complete
+                    if cycle not in seen or (is_complete and not seen[cycle]):
+                        events.append(
+                            {
+                                "model": status.model,
+                                **labels,
+                                "cycle": cycle,
+                                "status": "complete" if is_complete else "new",
+                            }
+                        )
+                    # ...A completed cycle stays complete in the index
+                    is_complete = is_complete or bool(seen.get(cycle, 0))
+                    rows.append((scope, stream, cycle, int(is_complete), now))
+                self.__connection.executemany(
+                    "INSERT OR REPLACE INTO cycles "
+                    "(scope, stream, cycle, complete, last_seen) VALUES (?, ?, ?, ?, ?)",
+                    rows,
+                )
+        return events
+
+    def close(self) -> None:
+        """
+        Closes the database
+        """
+        self.__connection.close()
+
+    def __enter__(self) -> "StatusIndex":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def metget_status_index_from_args(args: argparse.Namespace) -> Optional[StatusIndex]:
+    """
+    Opens the index of seen status cycles when --since-last is used
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        StatusIndex: The index or None when not requested
+    """
+    if not getattr(args, "since_last", False):
+        return None
+    return StatusIndex(
+        os.path.join(get_metget_cache_directory(), STATUS_INDEX_FILENAME)
+    )
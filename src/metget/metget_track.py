@@ -29,10 +29,56 @@
 import argparse
 import json
 from datetime import datetime
+from typing import Optional, Union
 
-import requests
+from .metget_api import MetGetApiError, MetGetClient
+from .metget_session import MetGetSession
+from .metget_track_store import metget_track_store_from_args
 
-from .metget_environment import get_metget_environment_variables
+# Number of tracks downloaded concurrently when prefetching a season or
+# getting several forecast advisories
+TRACK_PREFETCH_WORKERS = 8
+
+
+def is_advisory_selection(advisory: Union[int, str, None]) -> bool:
+    """
+    Returns whether an advisory argument selects several advisories, i.e. it
+    is 'all' or a range such as '5-12'
+
+    Args:
+        advisory (Union[int, str, None]): Advisory argument
+
+    Returns:
+        bool: True if several advisories are selected
+    """
+    if not isinstance(advisory, str):
+        return False
+    return advisory.strip().lower() == "all" or "-" in advisory
+
+
+def advisory_selection(advisory: str) -> Optional[range]:
+    """
+    Parses an advisory argument which selects several advisories
+
+    Args:
+        advisory (str): 'all' or an inclusive range such as '5-12'
+
+    Returns:
+        Optional[range]: The advisory numbers or None for all advisories
+    """
+    advisory = advisory.strip().lower()
+    if advisory == "all":
+        return None
+    first, _, last = advisory.partition("-")
+    try:
+        first, last = int(first), int(last)
+    except ValueError:
+        msg = f"Invalid advisory range: {advisory:s}"
+        raise ValueError(msg) from None
+    if first < 1 or last < first:
+        msg = f"Invalid advisory range: {advisory:s}"
+        raise ValueError(msg)
+    return range(first, last + 1)
 
 
 class MetGetTrack:
@@ -40,76 +86,112 @@ class MetGetTrack:
     This class is used to generate a MetGet track data from the api
     """
 
-    def __init__(self, args: argparse.Namespace):
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        session: Optional[MetGetSession] = None,
+        client: Optional[MetGetClient] = None,
+    ):
         self.__args = args
-        self.__environment = get_metget_environment_variables(args)
+        if client is None:
+            client = MetGetClient.from_args(
+                args,
+                min_pool_size=TRACK_PREFETCH_WORKERS,
+                session=session,
+                track_store=metget_track_store_from_args(args),
+            )
+        self.__client = client
 
     def get_track(self):
         """
         This method is used to get the track data from the api
         """
-        url = self.__environment["endpoint"] + "/stormtrack"
-
-        if not self.__args.storm:
-            msg = "Storm must be specified for track data"
-            raise ValueError(msg)
-
-        if not self.__args.type:
-            msg = "Type must be specified for track data"
-            raise ValueError(msg)
+        if getattr(self.__args, "prefetch", False):
+            self.__prefetch()
+            return
+
+        advisory = getattr(self.__args, "advisory", None)
+        if self.__args.type == "forecast" and is_advisory_selection(advisory):
+            self.__get_forecast_tracks(advisory_selection(advisory))
+            return
+
+        try:
+            track = self.__client.track(
+                self.__args.storm,
+                self.__args.type,
+                year=self.__args.year,
+                basin=self.__args.basin,
+                advisory=getattr(self.__args, "advisory", None),
+                source=getattr(self.__args, "source", None),
+                refresh=getattr(self.__args, "refresh", False),
+            )
+        except MetGetApiError as e:
+            print(f"Error: {e.status_code}")
+            print(json.dumps(e.body))
+            return
+
+        # ...Record the defaults the client resolved (basin, year)
+        self.__args.basin = track.basin
+        self.__args.year = track.year
+
+        print(json.dumps(track.geojson))
+
+    def __get_forecast_tracks(self, advisories: Optional[range]) -> None:
+        """
+        This method is used to get several forecast advisories of a storm and
+        print them as one compact JSON document
 
-        # ...Default source is the NHC
+        Args:
+            advisories (Optional[range]): Advisory numbers or None for all
+        """
+        try:
+            tracks, errors = self.__client.forecast_tracks(
+                self.__args.storm,
+                advisories,
+                year=self.__args.year,
+                basin=self.__args.basin,
+                source=getattr(self.__args, "source", None),
+                max_workers=TRACK_PREFETCH_WORKERS,
+                refresh=getattr(self.__args, "refresh", False),
+            )
+        except MetGetApiError as e:
+            print(f"Error: {e.status_code}")
+            print(json.dumps(e.body))
+            return
+
+        output = {}
+        if tracks:
+            first = next(iter(tracks.values()))
+            output.update(source=first.source, basin=first.basin, year=first.year)
+        output["storm"] = f"{int(self.__args.storm):02d}"
+        output["advisories"] = {a: t.geojson for a, t in tracks.items()}
+        if errors:
+            output["errors"] = {a: str(e) for a, e in errors.items()}
+        print(json.dumps(output, separators=(",", ":")))
+
+    def __prefetch(self) -> None:
+        """
+        This method is used to download the tracks of a whole season into the
+        local track store
+        """
         source = getattr(self.__args, "source", None) or "nhc"
-
-        # ...Default basin. The NHC covers the Atlantic (al); the JTWC basins
-        # (wp/io/sh) have no sensible default, so require the user to specify one.
-        if not self.__args.basin:
+        basin = self.__args.basin
+        if not basin:
             if source == "jtwc":
                 msg = "Basin must be specified for JTWC track data (wp, io, sh)"
                 raise ValueError(msg)
-            self.__args.basin = "al"
-
-        # ...Default year is the current year
-        if not self.__args.year:
-            self.__args.year = datetime.now().year
-
-        storm_id = f"{int(self.__args.storm):02d}"
-
-        if self.__args.type == "besttrack":
-            params = {
-                "type": "best",
-                "source": source,
-                "storm": storm_id,
-                "basin": self.__args.basin,
-                "year": self.__args.year,
-            }
-        elif self.__args.type == "forecast":
-            if not self.__args.advisory:
-                msg = "Advisory must be specified for forecast track data"
-                raise ValueError(msg)
-
-            advisory_id = f"{int(self.__args.advisory):03d}"
-            params = {
-                "type": "forecast",
-                "source": source,
-                "storm": storm_id,
-                "basin": self.__args.basin,
-                "advisory": advisory_id,
-                "year": self.__args.year,
-            }
-        else:
-            msg = "Type must be besttrack or forecast"
-            raise ValueError(msg)
-
-        # Get the track data with the requests library
-        response = requests.get(url, params=params)
-
-        # Check the response status code
-        if response.status_code == 200:
-            print(json.dumps(response.json()["body"]["geojson"]))
-        else:
-            print(f"Error: {response.status_code}")
-            print(json.dumps(response.json()))
+            basin = "al"
+        year = self.__args.year or datetime.now().year
+
+        count, errors = self.__client.prefetch_season(
+            year, basin, source, TRACK_PREFETCH_WORKERS
+        )
+        print(
+            f"Prefetched {count:d} tracks for {source:s} {basin:s} {year:d}",
+            flush=True,
+        )
+        for name, error in errors.items():
+            print(f"[ERROR]: {name:s}: {error!s}")
 
 
 def metget_track(args: argparse.Namespace) -> None:
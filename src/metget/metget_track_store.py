@@ -0,0 +1,201 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from .metget_environment import get_metget_cache_directory
+
+# Time in seconds a stored best track is used before it is downloaded again.
+# Best tracks are extended with each advisory while a storm is active, while
+# forecast advisories never change once they are issued and are kept forever.
+TRACK_STORE_BEST_TRACK_TTL = 6 * 3600.0
+
+# Name of the track store database in the cache directory
+TRACK_STORE_FILENAME = "tracks.sqlite"
+
+
+class TrackStore:
+    """
+    Local store of best track and forecast track GeoJSON indexed by source,
+    basin, year, storm, and advisory
+    """
+
+    def __init__(self, path: str, best_track_ttl: float = TRACK_STORE_BEST_TRACK_TTL):
+        """
+        Constructor
+
+        Args:
+            path (str): Path of the SQLite database
+            best_track_ttl (float): Time in seconds a best track is used
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.__best_track_ttl = best_track_ttl
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS tracks ("
+                "source TEXT NOT NULL, "
+                "basin TEXT NOT NULL, "
+                "year INTEGER NOT NULL, "
+                "storm TEXT NOT NULL, "
+                "advisory TEXT NOT NULL, "
+                "geojson TEXT NOT NULL, "
+                "fetched REAL NOT NULL, "
+                "PRIMARY KEY (source, basin, year, storm, advisory))"
+            )
+
+    def lookup(
+        self,
+        source: str,
+        basin: str,
+        year: int,
+        storm: str,
+        advisory: Optional[str] = None,
+    ) -> Optional[dict]:
+        """
+        Returns a stored track. Best tracks older than the time to live are
+        not returned.
+
+        Args:
+            source (str): Track source (nhc, jtwc)
+            basin (str): Basin
+            year (int): Storm year
+            storm (str): Storm number (two digits)
+            advisory (str, optional): Advisory (three digits) of a forecast
+                track. None for the best track
+
+        Returns:
+            dict: The GeoJSON track or None
+        """
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT geojson, fetched FROM tracks WHERE source = ? AND basin = ? "
+                "AND year = ? AND storm = ? AND advisory = ?",
+                (source, basin.lower(), int(year), storm, advisory or ""),
+            ).fetchone()
+        if row is None:
+            return None
+        if advisory is None and time.time() - row[1] > self.__best_track_ttl:
+            return None
+        return json.loads(row[0])
+
+    def contains(
+        self,
+        source: str,
+        basin: str,
+        year: int,
+        storm: str,
+        advisory: Optional[str] = None,
+    ) -> bool:
+        """
+        Returns whether a usable track is stored (see lookup)
+
+        Args:
+            source (str): Track source (nhc, jtwc)
+            basin (str): Basin
+            year (int): Storm year
+            storm (str): Storm number (two digits)
+            advisory (str, optional): Advisory (three digits) of a forecast track
+
+        Returns:
+            bool: True if the track is stored
+        """
+        return self.lookup(source, basin, year, storm, advisory) is not None
+
+    def store(
+        self,
+        source: str,
+        basin: str,
+        year: int,
+        storm: str,
+        advisory: Optional[str],
+        geojson: dict,
+    ) -> None:
+        """
+        Stores a track
+
+        Args:
+            source (str): Track source (nhc, jtwc)
+            basin (str): Basin
+            year (int): Storm year
+            storm (str): Storm number (two digits)
+            advisory (str, optional): Advisory (three digits) of a forecast
+                track. None for the best track
+            geojson (dict): The GeoJSON track
+        """
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO tracks "
+                "(source, basin, year, storm, advisory, geojson, fetched) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    source,
+                    basin.lower(),
+                    int(year),
+                    storm,
+                    advisory or "",
+                    json.dumps(geojson),
+                    time.time(),
+                ),
+            )
+
+    def close(self) -> None:
+        """
+        Closes the database
+        """
+        self.__connection.close()
+
+    def __enter__(self) -> "TrackStore":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def metget_track_store_from_args(args: argparse.Namespace) -> Optional[TrackStore]:
+    """
+    Opens the track store unless it was disabled on the command line
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        TrackStore: The track store or None when disabled
+    """
+    if not getattr(args, "track_store", False):
+        return None
+    return TrackStore(os.path.join(get_metget_cache_directory(), TRACK_STORE_FILENAME))
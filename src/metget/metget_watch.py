@@ -0,0 +1,470 @@
+###################################################################################################
+# MIT License
+#
+# Copyright (c) 2023 The Water Institute
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# Author: Zach Cobell
+# Contact: zcobell@thewaterinstitute.org
+# Organization: The Water Institute
+#
+###################################################################################################
+import argparse
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import prettytable
+import requests
+
+from .metget_build import MetGetBuildRest
+from .metget_download import MetGetDownloader
+from .metget_environment import get_metget_environment_variables
+from .metget_file_store import FileStore, metget_file_store_from_args
+from .metget_polling import (
+    MAX_CONSECUTIVE_FAILURES,
+    PollingPolicy,
+    metget_polling_policy_from_args,
+)
+from .metget_session import metget_session_from_args
+from .spinnerlogger import SpinnerLogger
+
+# Order in which requests due for a status check at the same time are polled.
+# Requests which are closest to completion are checked first.
+STATUS_PRIORITY = {"running": 0, "restore": 1, "queued": 2}
+
+
+class WatchedRequest:
+    """
+    State of a single request tracked by the MetGetWatcher
+    """
+
+    def __init__(self, request_id: str, output_directory: str, policy: PollingPolicy):
+        """
+        Constructor
+
+        Args:
+            request_id (str): MetGet request id
+            output_directory (str): Directory the request files are written to
+            policy (PollingPolicy): Policy scheduling the status checks
+        """
+        self.request_id = request_id
+        self.output_directory = output_directory
+        self.policy = policy
+        self.status = None
+        self.checks = 0
+        self.failures = 0
+        self.files = 0
+        self.message = ""
+        self.download = None
+
+
+class MetGetWatcher:
+    """
+    Waits on many MetGet requests from a single process. All requests share one
+    client (and its pooled session); status checks are scheduled by a priority
+    queue keyed on the next check time of each request, and the files of each
+    request are downloaded as soon as that request completes while the others
+    continue to be polled. Requests may be added from other threads while the
+    watcher is running.
+    """
+
+    def __init__(
+        self,
+        client: MetGetBuildRest,
+        policy_factory: Callable[[str], PollingPolicy],
+        max_wait: float,
+        max_concurrent_downloads: int = 2,
+        download_workers: int = 1,
+        download_segments: int = 1,
+        file_store: Optional[FileStore] = None,
+    ):
+        """
+        Constructor
+
+        Args:
+            client (MetGetBuildRest): Client used to check and download requests
+            policy_factory (Callable[[str], PollingPolicy]): Creates the polling
+                policy for a request id
+            max_wait (float): Maximum time to wait for the requests in hours
+            max_concurrent_downloads (int): Number of requests downloaded at once
+            download_workers (int): Number of files downloaded concurrently per request
+            download_segments (int): Number of byte range segments used for large files
+            file_store (FileStore, optional): Store of earlier downloads used
+                instead of downloading files again
+        """
+        self.__client = client
+        self.__policy_factory = policy_factory
+        self.__max_wait = max_wait
+        self.__max_concurrent_downloads = max_concurrent_downloads
+        self.__download_workers = download_workers
+        self.__download_segments = download_segments
+        self.__file_store = file_store
+        self.__requests: Dict[str, WatchedRequest] = {}
+        self.__queue: List[tuple] = []
+        self.__sequence = 0
+        self.__lock = threading.Lock()
+        self.__wakeup = threading.Event()
+
+    def add(self, request_id: str, output_directory: str) -> None:
+        """
+        Adds a request to the watch list
+
+        Args:
+            request_id (str): MetGet request id
+            output_directory (str): Directory the request files are written to
+        """
+        with self.__lock:
+            if request_id in self.__requests:
+                return
+            self.__requests[request_id] = WatchedRequest(
+                request_id, output_directory, self.__policy_factory(request_id)
+            )
+            self.__schedule(request_id, time.monotonic())
+        self.__wakeup.set()
+
+    def wake(self) -> None:
+        """
+        Wakes the watcher if it is waiting for the next status check
+        """
+        self.__wakeup.set()
+
+    def __schedule(self, request_id: str, when: float) -> None:
+        """
+        Schedules the next status check of a request
+
+        Args:
+            request_id (str): MetGet request id
+            when (float): Monotonic time of the next check
+        """
+        status = self.__requests[request_id].status
+        priority = STATUS_PRIORITY.get(status, len(STATUS_PRIORITY))
+        self.__sequence += 1
+        heapq.heappush(self.__queue, (when, priority, self.__sequence, request_id))
+
+    def __reschedule(self, request_id: str, when: float) -> None:
+        """
+        Schedules the next status check of a request from the polling loop
+
+        Args:
+            request_id (str): MetGet request id
+            when (float): Monotonic time of the next check
+        """
+        with self.__lock:
+            self.__schedule(request_id, when)
+
+    def __due_requests(self, now: float) -> List[str]:
+        """
+        Removes the requests which are due for a status check from the queue
+
+        Args:
+            now (float): Current monotonic time
+
+        Returns:
+            List[str]: Due request ids, closest to completion first
+        """
+        due = []
+        with self.__lock:
+            while self.__queue and self.__queue[0][0] <= now:
+                due.append(heapq.heappop(self.__queue))
+        due.sort(key=lambda item: (item[1], item[0], item[2]))
+        return [item[3] for item in due]
+
+    def __check(self, request: WatchedRequest, elapsed: float, now: float, executor):
+        """
+        Checks the status of a request and either schedules the next check or
+        starts the download
+
+        Args:
+            request (WatchedRequest): Request to check
+            elapsed (float): Seconds since the watcher started
+            now (float): Current monotonic time
+            executor: Executor the downloads are submitted to
+        """
+        request.checks += 1
+        try:
+            data_url, request.status = self.__client.check_metget_status(
+                request.request_id
+            )
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            request.failures += 1
+            if request.failures >= MAX_CONSECUTIVE_FAILURES:
+                request.status = "failed"
+                request.message = f"Status check failed: {e!s}"
+                return
+            self.__reschedule(
+                request.request_id,
+                now + request.policy.failure_interval(request.failures),
+            )
+            return
+
+        request.failures = 0
+        if request.status == "completed":
+            if request.checks > 1:
+                request.policy.complete()
+            request.download = executor.submit(self.__download, request, data_url)
+        elif request.status == "error":
+            request.message = "Request could not be completed"
+        else:
+            self.__reschedule(
+                request.request_id,
+                now + request.policy.next_interval(request.status, elapsed),
+            )
+
+    def __download(self, request: WatchedRequest, data_url: str) -> None:
+        """
+        Downloads the files of a completed request
+
+        Args:
+            request (WatchedRequest): The completed request
+            data_url (str): Url of the request data
+        """
+        file_list = self.__client.get_request_file_list(data_url)
+        if file_list is None:
+            msg = "Could not retrieve the file list. The request may have expired"
+            raise RuntimeError(msg)
+
+        os.makedirs(request.output_directory, exist_ok=True)
+        with open(os.path.join(request.output_directory, "filelist.json"), "w") as f:
+            f.write(json.dumps(file_list, indent=2, sort_keys=True))
+
+        downloader = MetGetDownloader(
+            max_workers=self.__download_workers,
+            spinner=SpinnerLogger(animated=False),
+            session=self.__client.session,
+            segments=self.__download_segments,
+            label=request.request_id,
+            file_store=self.__file_store,
+        )
+        downloader.download_files(
+            data_url, file_list["output_files"], request.output_directory
+        )
+        request.files = len(file_list["output_files"])
+
+    def __pending(self, producer_done: Optional[threading.Event]) -> bool:
+        """
+        Returns whether there are requests left to check or more may be added
+
+        Args:
+            producer_done (threading.Event, optional): Set once no more
+                requests will be added
+
+        Returns:
+            bool: True if the polling loop should continue
+        """
+        with self.__lock:
+            if self.__queue:
+                return True
+        return producer_done is not None and not producer_done.is_set()
+
+    def run(
+        self, producer_done: Optional[threading.Event] = None
+    ) -> Dict[str, WatchedRequest]:
+        """
+        Polls all requests until they complete, fail, or the maximum wait time
+        expires, downloading each request as it completes
+
+        Args:
+            producer_done (threading.Event, optional): When given, the watcher
+                keeps running until this event is set so that requests can be
+                added by another thread while earlier ones are polled
+
+        Returns:
+            Dict[str, WatchedRequest]: Final state of each request
+        """
+        start = time.monotonic()
+        deadline = start + self.__max_wait * 3600.0
+
+        with ThreadPoolExecutor(
+            max_workers=self.__max_concurrent_downloads
+        ) as executor:
+            while self.__pending(producer_done):
+                now = time.monotonic()
+                if now > deadline:
+                    break
+                self.__wakeup.clear()
+                for request_id in self.__due_requests(now):
+                    self.__check(
+                        self.__requests[request_id],
+                        now - start,
+                        time.monotonic(),
+                        executor,
+                    )
+                if not self.__pending(producer_done):
+                    break
+                with self.__lock:
+                    next_check = self.__queue[0][0] if self.__queue else deadline
+                self.__wakeup.wait(
+                    max(min(next_check, deadline) - time.monotonic(), 0.0)
+                )
+
+            for request in self.__requests.values():
+                MetGetWatcher.__finish(request)
+
+        return self.__requests
+
+    @staticmethod
+    def __finish(request: WatchedRequest) -> None:
+        """
+        Waits for the download of a request and records its outcome
+
+        Args:
+            request (WatchedRequest): The request
+        """
+        download: Optional[Future] = request.download
+        if download is None:
+            if request.status in STATUS_PRIORITY or request.status is None:
+                request.message = "Max wait time expired before the request completed"
+            return
+        try:
+            download.result()
+            request.status = "downloaded"
+        except Exception as e:
+            request.status = "download failed"
+            request.message = str(e)
+
+    @property
+    def requests(self) -> Dict[str, WatchedRequest]:
+        """
+        Returns the watched requests
+
+        Returns:
+            Dict[str, WatchedRequest]: Watched requests keyed by request id
+        """
+        return self.__requests
+
+
+def read_request_id_file(filename: str) -> List[str]:
+    """
+    Reads request ids from a file containing one id per line. Blank lines and
+    lines starting with '#' are ignored.
+
+    Args:
+        filename (str): Path of the file
+
+    Returns:
+        List[str]: Request ids
+    """
+    with open(filename) as f:
+        return [
+            line.strip()
+            for line in f
+            if line.strip() and not line.strip().startswith("#")
+        ]
+
+
+def print_watch_summary(requests_state: Dict[str, WatchedRequest]) -> None:
+    """
+    Prints a table summarizing the outcome of each watched request
+
+    Args:
+        requests_state (Dict[str, WatchedRequest]): Final state of each request
+    """
+    table = prettytable.PrettyTable(
+        ["Request", "Status", "Checks", "Files", "Output Directory", "Message"]
+    )
+    table.align["Message"] = "l"
+    for request in requests_state.values():
+        table.add_row(
+            [
+                request.request_id,
+                request.status,
+                request.checks,
+                request.files,
+                request.output_directory,
+                request.message,
+            ]
+        )
+    time_stamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    print(f"[{time_stamp:s}]: Request summary")
+    print(table)
+
+
+def metget_watch(args: argparse.Namespace) -> None:
+    """
+    This method is used to wait on and download many MetGet requests from a
+    single process
+
+    Args:
+        args: The arguments passed to the command line
+
+    Returns:
+        None. Exits with status 1 if any request was not downloaded
+    """
+    request_ids = list(args.request_ids or [])
+    if args.request_file:
+        request_ids += read_request_id_file(args.request_file)
+    if not request_ids:
+        print("[ERROR]: Must provide request ids or '--request-file'")
+        exit(1)
+
+    output_directory = args.output_directory or os.getcwd()
+    if not os.path.exists(output_directory):
+        msg = f"Output directory does not exist: {output_directory:s}"
+        raise RuntimeError(msg)
+
+    environment = get_metget_environment_variables(args)
+    session = metget_session_from_args(
+        args,
+        environment,
+        args.max_concurrent_downloads * args.download_workers * args.download_segments
+        + 1,
+    )
+    client = MetGetBuildRest(
+        environment["endpoint"],
+        environment["apikey"],
+        environment["api_version"],
+        session,
+    )
+
+    file_store = metget_file_store_from_args(args)
+    watcher = MetGetWatcher(
+        client,
+        lambda _: metget_polling_policy_from_args(args),
+        args.max_wait,
+        max_concurrent_downloads=args.max_concurrent_downloads,
+        download_workers=args.download_workers,
+        download_segments=args.download_segments,
+        file_store=file_store,
+    )
+    for request_id in request_ids:
+        watcher.add(request_id, os.path.join(output_directory, request_id))
+
+    print(f"Waiting for {len(watcher.requests):d} requests", flush=True)
+    try:
+        requests_state = watcher.run()
+    finally:
+        if file_store is not None:
+            file_store.close()
+    print_watch_summary(requests_state)
+
+    failed = [r.request_id for r in requests_state.values() if r.status != "downloaded"]
+    if failed:
+        print(
+            f"[ERROR]: {len(failed):d} of {len(requests_state):d} requests were not "
+            f"downloaded: {', '.join(failed):s}"
+        )
+        sys.exit(1)
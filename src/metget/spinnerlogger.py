@@ -36,16 +36,23 @@ class SpinnerLogger:
     Class to handle the spinner animation and logging
     """
 
-    def __init__(self):
+    def __init__(self, animated: bool = True, silent: bool = False):
         """
         Constructor
+
+        Args:
+            animated (bool): Animate the spinner when writing to a terminal.
+                When False, messages are always printed line by line.
+            silent (bool): Do not write anything to the console
         """
+        self.__silent = silent
+        animated = animated and not silent
         try:
             from yaspin import yaspin  # noqa: PLC0415
 
-            self.__is_tty = stdout.isatty()
+            self.__is_tty = stdout.isatty() and animated
         except ImportError:
-            if stdout.isatty():
+            if stdout.isatty() and animated:
                 print(
                     "[WARNING]: Halo package not found. Disabling animation.",
                     flush=True,
@@ -57,6 +64,26 @@ class SpinnerLogger:
         if self.__is_tty:
             self.__spinner = yaspin(text=self.__current_text, color="green")
 
+    @property
+    def is_tty(self) -> bool:
+        """
+        Returns whether the spinner animation is active
+
+        Returns:
+            bool: True if output is an interactive terminal
+        """
+        return self.__is_tty
+
+    @property
+    def silent(self) -> bool:
+        """
+        Returns whether console output is disabled
+
+        Returns:
+            bool: True if nothing is written to the console
+        """
+        return self.__silent
+
     @staticmethod
     def __time_str() -> str:
         """
@@ -84,7 +111,7 @@ class SpinnerLogger:
             self.__spinner.text = self.__current_text
         else:
             if text is not None:
-                SpinnerLogger.__standard_print(self.__current_text)
+                self.__standard_print(self.__current_text)
 
     def set_text(self, text: str) -> None:
         """
@@ -101,7 +128,7 @@ class SpinnerLogger:
             self.__spinner.text = self.__current_text
         else:
             if text is not None:
-                SpinnerLogger.__standard_print(self.__current_text)
+                self.__standard_print(self.__current_text)
 
     def succeed(self, text: Optional[str] = None) -> None:
         """
@@ -121,7 +148,7 @@ class SpinnerLogger:
             self.__spinner.ok("\ue63f")
         else:
             if text is not None:
-                SpinnerLogger.__standard_print(self.__current_text)
+                self.__standard_print(self.__current_text)
 
     def info(self, text: Optional[str] = None) -> None:
         """
@@ -140,7 +167,7 @@ class SpinnerLogger:
             self.__spinner.text = self.__current_text
         else:
             if text is not None:
-                SpinnerLogger.__standard_print(self.__current_text)
+                self.__standard_print(self.__current_text)
 
     def fail(self, text: Optional[str] = None) -> None:
         """
@@ -160,12 +187,11 @@ class SpinnerLogger:
             self.__spinner.fail("\uf00d")
         else:
             if text is not None:
-                SpinnerLogger.__standard_print(self.__current_text)
+                self.__standard_print(self.__current_text)
 
-    @staticmethod
-    def __standard_print(text: str) -> None:
+    def __standard_print(self, text: str) -> None:
         """
-        Prints the given text to stdout
+        Prints the given text to stdout unless the logger is silent
 
         Args:
             text (str): Text to print
@@ -173,7 +199,8 @@ class SpinnerLogger:
         Returns:
             None
         """
-        print(text, flush=True)
+        if not self.__silent:
+            print(text, flush=True)
 
     @staticmethod
     def standard_log(count: int, status: str) -> str:
@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def metget_cache_directory(tmp_path, monkeypatch):
+    """
+    Points the MetGet cache directory at a temporary directory for every test
+    so that the event log, request cache, and other local stores which are
+    used by default do not write to the cache directory of the user
+    """
+    monkeypatch.setenv("METGET_CACHE_DIR", str(tmp_path / "metget_cache"))
+    monkeypatch.delenv("METGET_EVENT_LOG", raising=False)
+    monkeypatch.delenv("METGET_EVENT_LOG_LEVEL", raising=False)
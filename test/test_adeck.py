@@ -3,6 +3,7 @@ import json
 import os
 from datetime import datetime
 
+import pytest
 import requests_mock
 
 from metget.metget_adeck import metget_adeck
@@ -255,3 +256,162 @@ def test_adeck_all_models_one_storm_pretty(capfd) -> None:
 
         # Check the output
         assert screen_output == ADECK_ALL_2024_14_20241009_PRETTYTABLE
+
+
+def test_adeck_harvest(capfd, monkeypatch, tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates harvesting A-deck tracks of several models over several cycles
+    **MODULE**: metget_adeck.harvest_adeck, metget_adeck_store.AdeckStore
+    **SCENARIO**: Harvest AVNO and HWRF for two cycles, then all models of one cycle, twice each
+    **INPUT**: Storm 14, year 2024, basin AL, cycles 2024-10-09T00:00 to 2024-10-09T06:00
+    **EXPECTED**: Each track is downloaded once, repeated harvests are read from the local store,
+        failed downloads are reported, and the JSON output holds one set of columns per model and cycle
+    **COVERAGE**: Tests cycle ranges, model lists, the A-Deck store, and columnar output
+    """
+    monkeypatch.setenv("METGET_CACHE_DIR", str(tmp_path))
+
+    args = argparse.Namespace(
+        storm="14",
+        year="2024",
+        basin="AL",
+        model="AVNO,HWRF",
+        cycle=datetime(2024, 10, 9, 0, 0),
+        end=datetime(2024, 10, 9, 6, 0),
+        interval=6,
+        harvest=True,
+        adeck_store=True,
+        format="json",
+        output=None,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+
+    with requests_mock.Mocker() as m:
+        for model in ("AVNO", "HWRF"):
+            for cycle in ("2024-10-09T00:00", "2024-10-09T06:00"):
+                m.get(
+                    f"{METGET_DMY_ENDPOINT}/adeck/2024/AL/{model}/14/{cycle}",
+                    json=ADECK_AVNO_2024_14L_20241009_RESPONSE,
+                )
+        m.get(
+            f"{METGET_DMY_ENDPOINT}/adeck/2024/AL/HWRF/14/2024-10-09T06:00",
+            status_code=404,
+            json={"statusCode": 404, "body": {"message": "No results found"}},
+        )
+        m.get(
+            f"{METGET_DMY_ENDPOINT}/adeck/2024/AL/ALL/14/2024-10-09T00:00",
+            json=ADECK_ALL_2024_14_20241009_RESPONSE,
+        )
+
+        metget_adeck(args)
+        assert m.call_count == 4
+        data = json.loads(capfd.readouterr().out)
+        assert list(data["tracks"].keys()) == ["2024-10-09T00:00", "2024-10-09T06:00"]
+        assert list(data["tracks"]["2024-10-09T00:00"].keys()) == ["AVNO", "HWRF"]
+        assert list(data["tracks"]["2024-10-09T06:00"].keys()) == ["AVNO"]
+        assert list(data["errors"].keys()) == ["2024-10-09T06:00/HWRF"]
+
+        features = ADECK_AVNO_2024_14L_20241009_RESPONSE["body"]["storm_track"][
+            "features"
+        ]
+        columns = data["tracks"]["2024-10-09T00:00"]["AVNO"]
+        assert columns["time"] == [f["properties"]["time_utc"] for f in features]
+        assert columns["longitude"] == [
+            f["geometry"]["coordinates"][0] for f in features
+        ]
+        assert columns["wind"] == [
+            f["properties"]["max_wind_speed_mph"] for f in features
+        ]
+
+        # ...Only the failed download is requested again
+        metget_adeck(args)
+        assert m.call_count == 5
+        assert json.loads(capfd.readouterr().out)["tracks"] == data["tracks"]
+
+        args.model = "all"
+        args.end = None
+        args.format = "pretty"
+        metget_adeck(args)
+        metget_adeck(args)
+        assert m.call_count == 6
+        out = capfd.readouterr().out
+        models = ADECK_ALL_2024_14_20241009_RESPONSE["body"]["storm_tracks"]
+        assert out.count("2024-10-09T00:00") == 2 * len(models)
+        assert "Max Fcst Wind Speed (mph)" in out
+
+
+def test_adeck_statistics(capfd, monkeypatch) -> None:
+    """
+    **TEST PURPOSE**: Validates the A-deck track statistics added to the JSON output
+    **MODULE**: metget_adeck_stats.adeck_statistics, metget_adeck.print_adeck_items
+    **SCENARIO**: Request all models of Hurricane 14L with --stats, with and without numpy
+    **INPUT**: Storm 14, year 2024, basin AL, model 'all', cycle 2024-10-09T00:00, format JSON
+    **EXPECTED**: Each track carries statistics that ignore zero pressures and wind speeds,
+        and the vectorized and fallback computations agree
+    **COVERAGE**: Tests missing value masks, intensity and position statistics, and the numpy fallback
+    """
+    import metget.metget_adeck_stats  # noqa: PLC0415
+
+    args = argparse.Namespace(
+        storm="14",
+        year="2024",
+        basin="AL",
+        model="all",
+        cycle=datetime(2024, 10, 9, 0, 0),
+        format="json",
+        output=None,
+        stats=True,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+
+    outputs = []
+    with requests_mock.Mocker() as m:
+        m.get(
+            f"{METGET_DMY_ENDPOINT}/adeck/2024/AL/all/14/2024-10-09T00:00",
+            json=ADECK_ALL_2024_14_20241009_RESPONSE,
+        )
+        metget_adeck(args)
+        outputs.append(json.loads(capfd.readouterr().out))
+
+        monkeypatch.setattr(metget.metget_adeck_stats, "np", None)
+        metget_adeck(args)
+        outputs.append(json.loads(capfd.readouterr().out))
+
+    tracks = ADECK_ALL_2024_14_20241009_RESPONSE["body"]["storm_tracks"]
+    for output in outputs:
+        assert list(output.keys()) == list(tracks.keys())
+        for model, track in tracks.items():
+            statistics = output[model]["statistics"]
+            geojson = {k: v for k, v in output[model].items() if k != "statistics"}
+            assert geojson == track
+
+            features = track["features"]
+            pressure = [
+                f["properties"]["minimum_sea_level_pressure_mb"]
+                for f in features
+                if f["properties"]["minimum_sea_level_pressure_mb"] != 0
+            ]
+            wind = [
+                f["properties"]["max_wind_speed_mph"]
+                for f in features
+                if f["properties"]["max_wind_speed_mph"] != 0
+            ]
+            assert statistics["points"] == len(features)
+            assert statistics["start_time"] == features[0]["properties"]["time_utc"]
+            assert (
+                statistics["last_position"] == features[-1]["geometry"]["coordinates"]
+            )
+            assert statistics["min_pressure_mb"] == (
+                min(pressure) if pressure else None
+            )
+            assert statistics["max_wind_speed_mph"] == (max(wind) if wind else None)
+            if wind:
+                assert statistics["mean_wind_speed_mph"] == pytest.approx(
+                    sum(wind) / len(wind), abs=0.01
+                )
+            assert statistics["track_length_km"] >= 0.0
+
+    assert outputs[0] == outputs[1]
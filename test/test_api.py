@@ -0,0 +1,174 @@
+import io
+import json
+from datetime import datetime
+
+import pytest
+import requests_mock
+
+from metget.metget_adeck import write_json_object
+from metget.metget_api import (
+    CreditBalance,
+    MetGetApiError,
+    MetGetClient,
+    ModelStatus,
+    RequestStatus,
+    StormTrack,
+)
+
+from .adeck_data import ADECK_AVNO_2024_ALL_20241009_RESPONSE
+from .status_json import DEEPMIND_STATUS_JSON
+from .track_json import NHC_IAN_BESTRACK_JSON
+
+METGET_DMY_ENDPOINT = "https://metget.server.dmy"
+METGET_DMY_APIKEY = "1234567890"
+METGET_API_VERSION = 2
+
+
+def test_api_client_results() -> None:
+    """
+    **TEST PURPOSE**: Validates that the library client returns typed results without printing
+    **MODULE**: metget_api.MetGetClient
+    **SCENARIO**: Query credits, status, and a best track through one client instance
+    **INPUT**: Mocked credits, deepmind status, and storm track responses
+    **EXPECTED**: Slotted data classes holding the server data, with client-side status filters applied
+    **COVERAGE**: Tests credits/status/track result types, deepmind year/basin filtering, and track defaults
+    """
+    with requests_mock.Mocker() as m, MetGetClient(
+        METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, METGET_API_VERSION
+    ) as client:
+        m.get(
+            METGET_DMY_ENDPOINT + "/credits",
+            json={
+                "body": {
+                    "credit_limit": 0.0,
+                    "credits_used": 10.0,
+                    "credit_balance": 0.0,
+                }
+            },
+        )
+        balance = client.credits()
+        assert isinstance(balance, CreditBalance)
+        assert balance.unlimited
+        assert balance.credits_used == 10.0
+        assert not hasattr(balance, "__dict__")
+
+        m.get(METGET_DMY_ENDPOINT + "/status", json=DEEPMIND_STATUS_JSON)
+        status = client.status("deepmind", year=2026, basin="AL")
+        assert isinstance(status, ModelStatus)
+        assert status.model_class == "track-ensemble"
+        assert list(status.data["2026"].keys()) == ["al"]
+        assert m.last_request.qs == {"model": ["deepmind"]}
+
+        m.get(METGET_DMY_ENDPOINT + "/stormtrack", json=NHC_IAN_BESTRACK_JSON)
+        track = client.track(9, "besttrack", year=2022)
+        assert isinstance(track, StormTrack)
+        assert track.basin == "al"
+        assert track.storm == "09"
+        assert track.geojson == NHC_IAN_BESTRACK_JSON["body"]["geojson"]
+        assert m.last_request.headers["x-api-key"] == METGET_DMY_APIKEY
+
+
+def test_api_client_errors() -> None:
+    """
+    **TEST PURPOSE**: Validates that unsuccessful responses are raised with their status and body
+    **MODULE**: metget_api.MetGetClient
+    **SCENARIO**: Request A-Deck data that does not exist and use an invalid basin
+    **INPUT**: Mocked 404 A-Deck response, basin 'XX'
+    **EXPECTED**: MetGetApiError carrying the status code and body; ValueError for the basin
+    **COVERAGE**: Tests error propagation and parameter validation in the library client
+    """
+    client = MetGetClient(METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, METGET_API_VERSION)
+    body = {"statusCode": 404, "body": {"message": "No results found"}}
+    with requests_mock.Mocker() as m:
+        m.get(
+            METGET_DMY_ENDPOINT + "/adeck/2023/AL/OFCL/10/2023-08-29T00:00",
+            status_code=404,
+            json=body,
+        )
+        with pytest.raises(MetGetApiError) as e:
+            client.adeck(2023, "al", "ofcl", "10", datetime(2023, 8, 29))
+        assert e.value.status_code == 404
+        assert e.value.body == body
+
+    with pytest.raises(ValueError, match="Invalid basin"):
+        client.adeck(2023, "xx", "ofcl", 10, datetime(2023, 8, 29))
+    client.close()
+
+
+def test_api_client_streamed_adeck() -> None:
+    """
+    **TEST PURPOSE**: Validates the one-track-at-a-time A-Deck path and the streamed JSON writer
+    **MODULE**: metget_api.MetGetClient.iter_adeck, metget_adeck.write_json_object
+    **SCENARIO**: Iterate the tracks of all storms of a cycle and write them back as one object
+    **INPUT**: Mocked all-storm A-Deck response
+    **EXPECTED**: One item per storm, written output identical to json.dumps of the whole object
+    **COVERAGE**: Tests incremental response parsing (ijson when installed) and streamed output
+    """
+    client = MetGetClient(METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, METGET_API_VERSION)
+    expected = ADECK_AVNO_2024_ALL_20241009_RESPONSE["body"]["storm_tracks"]
+    with requests_mock.Mocker() as m:
+        m.get(
+            f"{METGET_DMY_ENDPOINT}/adeck/2024/AL/AVNO/all/2024-10-09T00:00",
+            json=ADECK_AVNO_2024_ALL_20241009_RESPONSE,
+        )
+        query, items = client.iter_adeck(
+            2024, "al", "avno", "all", datetime(2024, 10, 9)
+        )
+        assert query.multiple
+        stream = io.StringIO()
+        write_json_object(stream, items)
+        assert stream.getvalue() == json.dumps(expected)
+
+    with pytest.raises(ValueError, match="must be 'all'"):
+        client.iter_adeck(2024, "al", "avno", 14, datetime(2024, 10, 9))
+    client.close()
+
+
+def test_api_client_build_download_silent(tmp_path, capfd) -> None:
+    """
+    **TEST PURPOSE**: Validates that submitting and downloading through the library client does not print
+    **MODULE**: metget_api.MetGetClient.build, metget_api.MetGetClient.download
+    **SCENARIO**: Submit a request which the server rejects, an http error, and download a completed request
+    **INPUT**: Mocked build responses with error text and a completed request with one file
+    **EXPECTED**: MetGetApiError carrying the server errors, the downloaded file, and no console output
+    **COVERAGE**: Tests the silent submit and download paths of the library client
+    """
+    client = MetGetClient(METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, METGET_API_VERSION)
+    data_url = "https://metget.data.dmy/request_1"
+    with requests_mock.Mocker() as m:
+        m.post(
+            METGET_DMY_ENDPOINT + "/build",
+            json={
+                "statusCode": 400,
+                "body": {
+                    "request_id": "request_1",
+                    "error_text": ["Domain 0 is outside of the model extent"],
+                },
+            },
+        )
+        with pytest.raises(MetGetApiError) as e:
+            client.build({"filename": "rejected"})
+        assert e.value.status_code == 400
+        assert e.value.errors == ["Domain 0 is outside of the model extent"]
+
+        m.post(
+            METGET_DMY_ENDPOINT + "/build",
+            status_code=401,
+            json={"statusCode": 401, "body": {"message": "Invalid API key"}},
+        )
+        with pytest.raises(MetGetApiError) as e:
+            client.build({"filename": "unauthorized"})
+        assert e.value.status_code == 401
+        assert e.value.errors == ["Invalid API key"]
+
+        m.get(data_url + "/filelist.json", json={"output_files": ["a.wnd"]})
+        m.get(data_url + "/a.wnd", content=b"wind")
+        paths = client.download(
+            RequestStatus("request_1", "completed", data_url), str(tmp_path)
+        )
+        assert paths == [str(tmp_path / "a.wnd")]
+        assert (tmp_path / "a.wnd").read_bytes() == b"wind"
+    client.close()
+
+    out, err = capfd.readouterr()
+    assert out == ""
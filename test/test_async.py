@@ -0,0 +1,268 @@
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+from metget.metget_download import DownloadJournal
+from metget.metget_polling import FixedPollingPolicy
+
+aiohttp = pytest.importorskip("aiohttp")
+web = pytest.importorskip("aiohttp.web")
+
+from metget.metget_async import AsyncMetGetClient  # noqa: E402
+
+METGET_DMY_APIKEY = "1234567890"
+METGET_DMY_REQUEST_ID = "5f9b5b3c-5b7a-4c5e-8b0a-1b5b3c5d7e8f"
+LARGE_FILE_SIZE = 8 * 1024 * 1024
+
+
+def mock_server_app(calls: dict):
+    """
+    Creates a minimal MetGet server. Every request is recorded by path and API
+    calls must carry the API key
+    """
+    statuses = ["queued", "running", "completed"]
+
+    def body(data, status=200):
+        return web.json_response({"statusCode": status, "body": data}, status=status)
+
+    @web.middleware
+    async def record(request, handler):
+        calls.setdefault(request.path, []).append(request)
+        if not request.path.startswith("/data/"):
+            assert request.headers.get("x-api-key") == METGET_DMY_APIKEY
+        return await handler(request)
+
+    async def build(request):
+        request_json = await request.json()
+        assert request_json["filename"] == "async_test"
+        return body({"request_id": METGET_DMY_REQUEST_ID, "error_text": []})
+
+    async def check(request):
+        # ...The first status check fails with a transient error and is retried
+        if len(calls["/check"]) == 1:
+            return web.Response(status=503)
+        status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        destination = str(request.url.with_path(f"/data/{METGET_DMY_REQUEST_ID:s}"))
+        return body({"status": status, "destination": destination})
+
+    async def filelist(request):
+        return web.json_response({"output_files": ["a.wnd", "a.pre"]})
+
+    async def data_file(request):
+        name = request.match_info["name"]
+        if name == "large.bin":
+            return web.Response(body=bytes(LARGE_FILE_SIZE))
+        data = ("content of " + name).encode()
+        # ...The first download of a.pre fails with a transient error
+        if name == "a.pre" and len(calls[request.path]) == 1:
+            return web.Response(status=503)
+        if "Range" in request.headers:
+            start = int(request.headers["Range"][len("bytes=") : -1])
+            return web.Response(
+                body=data[start:],
+                status=206,
+                headers={
+                    "Content-Range": f"bytes {start:d}-{len(data) - 1:d}/{len(data):d}"
+                },
+            )
+        return web.Response(body=data)
+
+    async def status(request):
+        return body({"model": request.query["model"], "start": request.query["start"]})
+
+    async def track(request):
+        return body({"geojson": dict(request.query)})
+
+    async def adeck(request):
+        return body(dict(request.match_info))
+
+    async def credits(request):
+        return body({"credit_limit": 10, "credits_used": 1, "credit_balance": 9})
+
+    app = web.Application(middlewares=[record])
+    app.router.add_post("/build", build)
+    app.router.add_get("/check", check)
+    app.router.add_get("/data/{request_id}/filelist.json", filelist)
+    app.router.add_get("/data/{request_id}/{name}", data_file)
+    app.router.add_get("/status", status)
+    app.router.add_get("/stormtrack", track)
+    app.router.add_get("/adeck/{year}/{basin}/{model}/{storm}/{cycle}", adeck)
+    app.router.add_get("/credits", credits)
+    return app
+
+
+def test_async_client(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates the async client against a local MetGet server
+    **MODULE**: metget_async.AsyncMetGetClient
+    **SCENARIO**: Submit a request, wait for it, download its files, and query
+                  status, track, adeck, and credits from one event loop
+    **INPUT**: A local aiohttp server implementing the MetGet endpoints
+    **EXPECTED**: All coroutines return the parsed server responses, transient
+                  errors are retried, and the API key is sent to the API
+    **COVERAGE**: Tests every coroutine of the async client
+    """
+    calls = {}
+
+    async def run():
+        runner = web.AppRunner(mock_server_app(calls))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        endpoint = f"http://127.0.0.1:{port:d}"
+        try:
+            async with AsyncMetGetClient(
+                endpoint, METGET_DMY_APIKEY, retry_backoff=0.01
+            ) as client:
+                request_id, status_code = await client.build({"filename": "async_test"})
+                paths = await client.download_request(
+                    request_id,
+                    str(tmp_path),
+                    polling_policy=FixedPollingPolicy(0.01),
+                )
+                results = await asyncio.gather(
+                    client.status("gfs", start=datetime(2024, 1, 1)),
+                    client.track(5, 2023, "forecast", advisory=12),
+                    client.adeck(2023, "al", "ofcl", 5, datetime(2023, 8, 28, 6)),
+                    client.credits(),
+                )
+        finally:
+            await runner.cleanup()
+        return request_id, status_code, paths, results
+
+    request_id, status_code, paths, results = asyncio.run(run())
+    status, track, adeck, api_credits = results
+
+    assert request_id == METGET_DMY_REQUEST_ID
+    assert status_code == 200
+    assert [p.split("/")[-1] for p in paths] == ["a.wnd", "a.pre"]
+    assert (tmp_path / "a.wnd").read_text() == "content of a.wnd"
+    assert len(calls["/check"]) == 4
+    assert status == {"model": "gfs", "start": "2024-01-01"}
+    assert track["storm"] == "05"
+    assert track["advisory"] == "012"
+    assert track["type"] == "forecast"
+    assert adeck["cycle"] == "2023-08-28T06:00"
+    assert adeck["basin"] == "AL"
+    assert api_credits["credit_balance"] == 9
+
+
+def test_async_download_resume(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates async downloads resume partial files and retry
+    **MODULE**: metget_async.AsyncMetGetClient
+    **SCENARIO**: Download two files where one has a partial file and journal
+                  left by an interrupted run and the other fails once with a
+                  transient error
+    **INPUT**: A local aiohttp server which honors Range requests
+    **EXPECTED**: The partial file is completed with a Range request, the
+                  failed file is retried, and no partial files remain
+    **COVERAGE**: Tests the DownloadJournal resume and retry of async downloads
+    """
+    calls = {}
+    data_url = f"/data/{METGET_DMY_REQUEST_ID:s}"
+
+    async def run():
+        runner = web.AppRunner(mock_server_app(calls))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        endpoint = f"http://127.0.0.1:{port:d}"
+
+        destination = str(tmp_path / "a.wnd")
+        (tmp_path / "a.wnd.part").write_text("content ")
+        journal = DownloadJournal(destination)
+        journal.url = endpoint + data_url + "/a.wnd"
+        journal.offset = 8
+        journal.commit()
+
+        try:
+            async with AsyncMetGetClient(
+                endpoint, METGET_DMY_APIKEY, retry_backoff=0.01
+            ) as client:
+                await client.download(
+                    endpoint + data_url, ["a.wnd", "a.pre"], str(tmp_path)
+                )
+        finally:
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+    assert (tmp_path / "a.wnd").read_text() == "content of a.wnd"
+    assert (tmp_path / "a.pre").read_text() == "content of a.pre"
+    assert calls[data_url + "/a.wnd"][0].headers["Range"] == "bytes=8-"
+    assert len(calls[data_url + "/a.pre"]) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pre", "a.wnd"]
+
+
+def test_async_download_does_not_block(tmp_path, monkeypatch) -> None:
+    """
+    **TEST PURPOSE**: Validates file writes of async downloads do not block the event loop
+    **MODULE**: metget_async.AsyncMetGetClient
+    **SCENARIO**: Download a large file on a slow disk while another coroutine ticks
+    **INPUT**: A local aiohttp server serving an 8 MB file, journal syncs slowed to 0.5 s
+    **EXPECTED**: The file is downloaded and the other coroutine keeps running
+                  while the partial file is synced
+    **COVERAGE**: Tests that file I/O of async downloads runs in an executor
+    """
+    sync = DownloadJournal.sync
+
+    def slow_sync(file_handle) -> None:
+        time.sleep(0.5)
+        sync(file_handle)
+
+    monkeypatch.setattr(DownloadJournal, "sync", staticmethod(slow_sync))
+    calls = {}
+
+    async def run():
+        runner = web.AppRunner(mock_server_app(calls))
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        endpoint = f"http://127.0.0.1:{port:d}"
+        ticks = []
+        downloading = True
+
+        async def ticker():
+            while downloading:
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        try:
+            async with AsyncMetGetClient(endpoint, METGET_DMY_APIKEY) as client:
+                task = asyncio.ensure_future(ticker())
+                await client.download(
+                    f"{endpoint:s}/data/{METGET_DMY_REQUEST_ID:s}",
+                    ["large.bin"],
+                    str(tmp_path),
+                )
+                downloading = False
+                await task
+        finally:
+            await runner.cleanup()
+        return ticks
+
+    ticks = asyncio.run(run())
+
+    assert (tmp_path / "large.bin").stat().st_size == LARGE_FILE_SIZE
+    assert ticks[-1] - ticks[0] >= 0.5
+    assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.25
+
+
+def test_async_client_requires_open_session() -> None:
+    """
+    **TEST PURPOSE**: Validates the client reports use outside of its context manager
+    **MODULE**: metget_async.AsyncMetGetClient
+    **SCENARIO**: A coroutine is awaited before the client is opened
+    **INPUT**: An unopened client
+    **EXPECTED**: RuntimeError explaining the client must be opened
+    **COVERAGE**: Tests session lifecycle validation
+    """
+    client = AsyncMetGetClient("http://127.0.0.1:1", METGET_DMY_APIKEY)
+    with pytest.raises(RuntimeError, match="not open"):
+        asyncio.run(client.credits())
@@ -0,0 +1,370 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+import pytest
+import requests_mock
+
+from metget.metget_batch import (
+    RateLimiter,
+    build_batch_entries,
+    metget_batch,
+    metget_build_members,
+    read_batch_manifest,
+)
+
+METGET_DMY_ENDPOINT = "https://metget.server.dmy"
+METGET_DMY_APIKEY = "1234567890"
+METGET_API_VERSION = 2
+
+
+def build_callback(request, context) -> dict:
+    """
+    Returns a request id derived from the output filename of the request
+    """
+    request_json = request.json()
+    context.status_code = 200
+    return {
+        "statusCode": 200,
+        "body": {"request_id": "req-" + request_json["filename"], "error_text": []},
+    }
+
+
+def mock_request(m, request_id: str, statuses: list) -> None:
+    """
+    Registers the status sequence and output file of a request
+    """
+    data_url = f"https://s3.amazonaws.com/metget/{request_id:s}"
+    m.get(
+        f"{METGET_DMY_ENDPOINT}/check?request-id={request_id:s}",
+        [
+            {
+                "json": {
+                    "statusCode": 200,
+                    "body": {
+                        "request_id": request_id,
+                        "status": status,
+                        "message": "",
+                        "destination": data_url,
+                    },
+                },
+                "status_code": 200,
+            }
+            for status in statuses
+        ],
+    )
+    m.get(data_url + "/filelist.json", json={"output_files": [f"{request_id:s}.wnd"]})
+    m.get(data_url + f"/{request_id:s}.wnd", text=f"{request_id:s} wind")
+
+
+def test_metget_batch_manifest(tmp_path, capfd) -> None:
+    """
+    **TEST PURPOSE**: Validates many requests are submitted, polled, and downloaded from a manifest
+    **MODULE**: metget_batch.metget_batch
+    **SCENARIO**: A JSON manifest with defaults, two regular requests, and a dry run
+    **INPUT**: Mocked /build, /check, and output files for each request
+    **EXPECTED**: Each request is built with the defaults applied, downloaded into
+                  its own directory, and reported in the results file
+    **COVERAGE**: Tests manifest parsing, concurrent submission, and the pipelined watcher
+    """
+    manifest = {
+        "defaults": {"timestep": 1800, "multiple-forecasts": True},
+        "requests": [
+            {
+                "domain": [["gfs", 0.25, -100, 10, -60, 50]],
+                "start": "2023-08-28 00:00",
+                "end": "2023-08-29 00:00",
+                "output": "idalia_gfs",
+            },
+            {
+                "domain": [
+                    "hwrf-idalia10l 0.1 -90 20 -80 30",
+                    "gfs 0.25 -100 10 -60 50",
+                ],
+                "start": "2023-08-28 00:00",
+                "end": "2023-08-29 00:00",
+                "output": "idalia_hwrf",
+                "output_directory": "hwrf",
+                "timestep": 900,
+            },
+            {
+                "domain": [["nam", 0.1, -100, 10, -60, 50]],
+                "start": "2023-08-28 00:00",
+                "end": "2023-08-29 00:00",
+                "output": "idalia_nam",
+                "dryrun": True,
+            },
+        ],
+    }
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps(manifest))
+    results_file = tmp_path / "results.json"
+
+    args = argparse.Namespace(
+        manifest=str(manifest_file),
+        output_directory=str(tmp_path),
+        submit_workers=2,
+        submit_rate=0,
+        results=str(results_file),
+        check_interval=0.01,
+        poll_policy="fixed",
+        max_check_interval=1.0,
+        max_wait=1.0 / 60.0,
+        max_concurrent_downloads=2,
+        download_workers=1,
+        download_segments=1,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+
+    with requests_mock.Mocker() as m:
+        build = m.post(METGET_DMY_ENDPOINT + "/build", json=build_callback)
+        mock_request(m, "req-idalia_gfs", ["queued", "completed"])
+        mock_request(m, "req-idalia_hwrf", ["completed"])
+        metget_batch(args)
+
+    submitted = {r.json()["filename"]: r.json() for r in build.request_history}
+    assert set(submitted) == {"idalia_gfs", "idalia_hwrf", "idalia_nam"}
+    assert submitted["idalia_gfs"]["time_step"] == 1800
+    assert submitted["idalia_gfs"]["multiple_forecasts"] is True
+    assert submitted["idalia_hwrf"]["time_step"] == 900
+    assert submitted["idalia_hwrf"]["domains"][0]["storm"] == "idalia10l"
+    assert submitted["idalia_nam"]["dry_run"] is True
+
+    assert (tmp_path / "idalia_gfs" / "req-idalia_gfs.wnd").exists()
+    assert (tmp_path / "hwrf" / "req-idalia_hwrf.wnd").exists()
+    assert not (tmp_path / "idalia_nam").exists()
+
+    results = json.loads(results_file.read_text())
+    assert [r["status"] for r in results] == ["downloaded", "downloaded", "dry run"]
+    assert results[1]["request_id"] == "req-idalia_hwrf"
+
+    out, _ = capfd.readouterr()
+    assert "Submitting 3 requests" in out
+
+
+def test_metget_batch_exit_status(tmp_path, capfd) -> None:
+    """
+    **TEST PURPOSE**: Validates the batch command fails when a request does not complete
+    **MODULE**: metget_batch.metget_batch
+    **SCENARIO**: A manifest with one request that completes and one that ends in error
+    **INPUT**: Mocked /build and /check responses
+    **EXPECTED**: The results file is written, the failed request is named, and the
+                  command exits with status 1
+    **COVERAGE**: Tests the exit status of the batch entry point
+    """
+    manifest = {
+        "requests": [
+            {
+                "domain": [["gfs", 0.25, -100, 10, -60, 50]],
+                "start": "2023-08-28 00:00",
+                "end": "2023-08-29 00:00",
+                "output": output,
+                "timestep": 3600,
+            }
+            for output in ("good", "bad")
+        ],
+    }
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps(manifest))
+    results_file = tmp_path / "results.json"
+
+    args = argparse.Namespace(
+        manifest=str(manifest_file),
+        output_directory=str(tmp_path),
+        submit_workers=2,
+        submit_rate=0,
+        results=str(results_file),
+        check_interval=0.01,
+        poll_policy="fixed",
+        max_check_interval=1.0,
+        max_wait=1.0 / 60.0,
+        max_concurrent_downloads=2,
+        download_workers=1,
+        download_segments=1,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+
+    with requests_mock.Mocker() as m:
+        m.post(METGET_DMY_ENDPOINT + "/build", json=build_callback)
+        mock_request(m, "req-good", ["completed"])
+        mock_request(m, "req-bad", ["running", "error"])
+        with pytest.raises(SystemExit) as exc_info:
+            metget_batch(args)
+
+    assert exc_info.value.code == 1
+    results = json.loads(results_file.read_text())
+    assert [r["status"] for r in results] == ["downloaded", "error"]
+    out, _ = capfd.readouterr()
+    assert "1 of 2 requests did not complete: 1 (bad): error" in out
+
+
+def test_metget_batch_shared_request(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates identical requests written to different directories
+    **MODULE**: metget_batch.MetGetBatch
+    **SCENARIO**: A manifest with two identical requests which only differ in their
+                  output directory, run with the request cache enabled
+    **INPUT**: Mocked /build, /check, and output files for a single request id
+    **EXPECTED**: The request is submitted once and both directories receive the
+                  files and file list of the request
+    **COVERAGE**: Tests entries which share a request id in the watcher
+    """
+    manifest = {
+        "requests": [
+            {
+                "domain": [["gfs", 0.25, -100, 10, -60, 50]],
+                "start": "2023-08-28 00:00",
+                "end": "2023-08-29 00:00",
+                "output": "shared",
+                "output_directory": directory,
+                "timestep": 3600,
+            }
+            for directory in ("first", "second")
+        ],
+    }
+    manifest_file = tmp_path / "manifest.json"
+    manifest_file.write_text(json.dumps(manifest))
+    results_file = tmp_path / "results.json"
+
+    args = argparse.Namespace(
+        manifest=str(manifest_file),
+        output_directory=str(tmp_path),
+        submit_workers=1,
+        submit_rate=0,
+        results=str(results_file),
+        check_interval=0.01,
+        poll_policy="fixed",
+        max_check_interval=1.0,
+        max_wait=1.0 / 60.0,
+        max_concurrent_downloads=2,
+        download_workers=1,
+        download_segments=1,
+        request_cache=True,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+
+    with requests_mock.Mocker() as m:
+        build = m.post(METGET_DMY_ENDPOINT + "/build", json=build_callback)
+        mock_request(m, "req-shared", ["queued", "completed"])
+        metget_batch(args)
+
+    assert len(build.request_history) == 1
+    for directory in ("first", "second"):
+        assert (tmp_path / directory / "req-shared.wnd").read_text() == (
+            "req-shared wind"
+        )
+        assert (tmp_path / directory / "filelist.json").exists()
+
+    results = json.loads(results_file.read_text())
+    assert [r["status"] for r in results] == ["downloaded", "copied"]
+    assert [r["request_id"] for r in results] == ["req-shared", "req-shared"]
+    assert [r["files"] for r in results] == [1, 1]
+
+
+def test_batch_manifest_toml_and_validation(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates TOML manifests and the validation of manifest requests
+    **MODULE**: metget_batch.read_batch_manifest, metget_batch.build_batch_entries
+    **SCENARIO**: A TOML manifest with native dates, and manifests with invalid requests
+    **INPUT**: TOML and JSON manifest files
+    **EXPECTED**: Valid requests produce request JSON; invalid ones fail before
+                  anything is submitted, naming the offending request
+    **COVERAGE**: Tests TOML parsing, option validation, and the rate limiter
+    """
+    if sys.version_info < (3, 11):
+        pytest.importorskip("tomli")
+
+    manifest_file = tmp_path / "manifest.toml"
+    manifest_file.write_text(
+        "[defaults]\n"
+        'format = "owi-netcdf"\n'
+        "timestep = 3600\n"
+        "[[requests]]\n"
+        'domain = ["gfs 0.25 -100 10 -60 50"]\n'
+        "start = 2023-08-28T00:00:00\n"
+        "end = 2023-08-29T00:00:00\n"
+        'output = "idalia"\n'
+    )
+    entries = build_batch_entries(read_batch_manifest(str(manifest_file)), "out")
+    assert len(entries) == 1
+    assert entries[0].request_json["format"] == "owi-netcdf"
+    assert entries[0].request_json["start_date"] == "2023-08-28 00:00:00"
+    assert entries[0].output_directory.endswith("idalia")
+
+    bad_manifest = tmp_path / "bad.json"
+    bad_manifest.write_text(
+        json.dumps({"requests": [{"output": "missing_domain", "timestep": 3600}]})
+    )
+    with pytest.raises(RuntimeError, match=r"request 0 \(missing_domain\)"):
+        build_batch_entries(read_batch_manifest(str(bad_manifest)), "out")
+
+    bad_manifest.write_text(json.dumps({"requests": [{"stepsize": 3600}]}))
+    with pytest.raises(RuntimeError, match="Unknown batch request option"):
+        read_batch_manifest(str(bad_manifest))
+
+    limiter = RateLimiter(50.0)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start >= 0.04
+
+
+def test_metget_build_ensemble_members(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates a build with a member range submits one request per member
+    **MODULE**: metget_batch.metget_build_members
+    **SCENARIO**: A GEFS member range on a build request
+    **INPUT**: Build arguments with the domain 'gefs-c00,p01:p02'
+    **EXPECTED**: Three requests are submitted with the member in their domain and
+                  output name, and each is downloaded into a per-member directory
+    **COVERAGE**: Tests the fan-out from the build command to the batch pipeline
+    """
+    args = argparse.Namespace(
+        domain=[["gefs-c00,p01:p02", "0.5", "-100", "10", "-60", "50"]],
+        start=datetime(2023, 8, 28),
+        end=datetime(2023, 8, 29),
+        timestep=3600,
+        output="idalia_gefs",
+        format="owi-ascii",
+        variable="wind_pressure",
+        analysis=False,
+        multiple_forecasts=False,
+        initialization_skip=0,
+        backfill=False,
+        strict=False,
+        epsg=4326,
+        compression=False,
+        dryrun=False,
+        save_json_request=False,
+        output_directory=str(tmp_path),
+        check_interval=0.01,
+        poll_policy="fixed",
+        max_wait=1.0 / 60.0,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+
+    with requests_mock.Mocker() as m:
+        build = m.post(METGET_DMY_ENDPOINT + "/build", json=build_callback)
+        for member in ("c00", "p01", "p02"):
+            mock_request(m, f"req-idalia_gefs_{member:s}", ["running", "completed"])
+        metget_build_members(args)
+
+    submitted = {r.json()["filename"]: r.json() for r in build.request_history}
+    assert sorted(submitted) == [
+        "idalia_gefs_c00",
+        "idalia_gefs_p01",
+        "idalia_gefs_p02",
+    ]
+    assert submitted["idalia_gefs_p01"]["domains"][0]["ensemble_member"] == "p01"
+    for member in ("c00", "p01", "p02"):
+        assert (tmp_path / member / f"req-idalia_gefs_{member:s}.wnd").exists()
@@ -1400,3 +1400,51 @@ def test_build_deepmind_domain_errors() -> None:
         MetGetBuildRest.parse_domain_data(
             ["deepmind-al-02-garbage-F007", 0.1, -90, 15, -80, 25], 0, 0
         )
+
+
+def test_build_ensemble_member_expansion() -> None:
+    """
+    **TEST PURPOSE**: Validates ensemble member ranges expand into one domain list per member
+    **MODULE**: metget_build.MetGetBuildRest.expand_ensemble_domains
+    **SCENARIO**: 'all', ranges, and lists for GEFS, DeepMind, and CTCX; plus malformed ranges
+    **EXPECTED**: Members are expanded in order, domains without a range are shared,
+                  and invalid or mismatched ranges raise with a clear message
+    """
+    gfs = ["gfs", "0.25", "-100", "10", "-60", "50"]
+    expanded = MetGetBuildRest.expand_ensemble_domains(
+        [["gefs-all", "0.5", "-100", "10", "-60", "50"], gfs]
+    )
+    assert len(expanded) == 31
+    assert expanded[0][0] == "c00"
+    assert expanded[-1][1][0][0] == "gefs-p30"
+    assert expanded[5][1][1] is gfs
+
+    expanded = MetGetBuildRest.expand_ensemble_domains(
+        [["deepmind-al-02-2026072206-F000:F049", "0.1", "-90", "15", "-80", "25"]]
+    )
+    assert [m for m, _ in expanded][:2] == ["F000", "F001"]
+    assert expanded[49][1][0][0] == "deepmind-al-02-2026072206-F049"
+
+    expanded = MetGetBuildRest.expand_ensemble_domains(
+        [["ctcx-idalia10l-01:03,mean", "0.1", "-90", "15", "-80", "25"]]
+    )
+    assert [m for m, _ in expanded] == ["01", "02", "03", "mean"]
+
+    assert MetGetBuildRest.expand_ensemble_domains([gfs]) == [(None, [gfs])]
+    assert not MetGetBuildRest.is_member_expression("hrrr-alaska")
+
+    with pytest.raises(RuntimeError, match="no fixed member list"):
+        MetGetBuildRest.expand_ensemble_domains(
+            [["ctcx-idalia10l-all", "0.1", "-90", "15", "-80", "25"]]
+        )
+    with pytest.raises(RuntimeError, match="Invalid ensemble member range"):
+        MetGetBuildRest.expand_ensemble_domains(
+            [["gefs-p10:c01", "0.5", "-100", "10", "-60", "50"]]
+        )
+    with pytest.raises(RuntimeError, match="same members"):
+        MetGetBuildRest.expand_ensemble_domains(
+            [
+                ["gefs-p01:p02", "0.5", "-100", "10", "-60", "50"],
+                ["gefs-p01:p03", "0.25", "-90", "20", "-80", "30"],
+            ]
+        )
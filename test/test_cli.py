@@ -1,10 +1,16 @@
+import json
+import subprocess
 import sys
 from unittest.mock import patch
 
 import pytest
+import requests_mock
 
 from metget.metget_client import metget_client_cli
 
+METGET_DMY_ENDPOINT = "https://metget.server.dmy"
+METGET_DMY_APIKEY = "1234567890"
+
 
 def test_cli():
     """
@@ -21,3 +27,70 @@ def test_cli():
         with pytest.raises(SystemExit) as exc_info:
             metget_client_cli()
         assert exc_info.value.code == 0
+
+
+def test_cli_lazy_imports():
+    """
+    **TEST PURPOSE**: Guards the CLI startup time against eager imports of the subcommand modules
+    **MODULE**: metget_client
+    **SCENARIO**: Import the CLI module in a fresh interpreter with python -X importtime
+    **INPUT**: python -X importtime -c 'import metget.metget_client'
+    **EXPECTED**: requests, prettytable, yaspin, and the subcommand modules are not imported
+    **COVERAGE**: Tests that subcommand modules and third party packages load only on dispatch
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import metget.metget_client"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {
+        line.split("|")[-1].strip()
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    assert "metget.metget_client" in modules
+    for module in [
+        "requests",
+        "prettytable",
+        "yaspin",
+        "metget.metget_build",
+        "metget.metget_status",
+        "metget.metget_session",
+    ]:
+        assert module not in modules
+
+
+def test_cli_dispatch(capfd):
+    """
+    **TEST PURPOSE**: Validates that a lazily imported subcommand is dispatched
+    **MODULE**: metget_client.metget_client_cli
+    **SCENARIO**: Run the credits subcommand through the command line entry point
+    **INPUT**: Command line arguments ['metget', '--endpoint', ..., 'credits', '--format', 'json']
+    **EXPECTED**: The credits module is imported on dispatch and prints the balance
+    **COVERAGE**: Tests the lazy subcommand resolution in the argument parser
+    """
+    argv = [
+        "metget",
+        "--endpoint",
+        METGET_DMY_ENDPOINT,
+        "--apikey",
+        METGET_DMY_APIKEY,
+        "credits",
+        "--format",
+        "json",
+    ]
+    with requests_mock.Mocker() as m, patch.object(sys, "argv", argv):
+        m.get(
+            METGET_DMY_ENDPOINT + "/credits",
+            json={
+                "body": {
+                    "credit_limit": 10.0,
+                    "credits_used": 4.0,
+                    "credit_balance": 6.0,
+                }
+            },
+        )
+        metget_client_cli()
+        out, err = capfd.readouterr()
+        assert json.loads(out)["credit_balance"] == 6.0
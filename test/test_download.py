@@ -0,0 +1,276 @@
+import re
+
+import pytest
+import requests_mock
+
+from metget.metget_download import DownloadJournal, MetGetDownloader
+from metget.metget_file_store import FileStore
+
+METGET_DMY_DATA_URL = "https://s3.amazonaws.com/metget/5f9b5b3c"
+
+
+def test_download_files_parallel(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates concurrent download of all files in a request file list
+    **MODULE**: metget_download.MetGetDownloader
+    **SCENARIO**: Download eight output files using four worker threads
+    **INPUT**: Mocked file list where each file contains its own name
+    **EXPECTED**: Every file is written to the output directory with the correct content
+    **COVERAGE**: Tests the thread pool download stage and output directory handling
+    """
+    files = [f"test_file_{i:02d}.wnd" for i in range(8)]
+
+    with requests_mock.Mocker() as m:
+        for f in files:
+            m.get(f"{METGET_DMY_DATA_URL}/{f}", text=f"content of {f}")
+
+        downloader = MetGetDownloader(max_workers=4)
+        downloader.download_files(METGET_DMY_DATA_URL, files, str(tmp_path))
+
+    for f in files:
+        assert (tmp_path / f).read_text() == f"content of {f}"
+
+
+def test_download_files_error_order(tmp_path, capfd) -> None:
+    """
+    **TEST PURPOSE**: Validates deterministic error reporting for failed downloads
+    **MODULE**: metget_download.MetGetDownloader
+    **SCENARIO**: Two of four files return HTTP errors while the others succeed
+    **INPUT**: Mocked file list with 404 responses for the second and fourth file
+    **EXPECTED**: Successful files are written and a RuntimeError lists the failed
+                  files in file list order
+    **COVERAGE**: Tests error collection and reporting in the download stage
+    """
+    files = ["a.pre", "b.pre", "c.pre", "d.pre"]
+
+    with requests_mock.Mocker() as m:
+        m.get(f"{METGET_DMY_DATA_URL}/a.pre", text="a")
+        m.get(f"{METGET_DMY_DATA_URL}/b.pre", status_code=404)
+        m.get(f"{METGET_DMY_DATA_URL}/c.pre", text="c")
+        m.get(f"{METGET_DMY_DATA_URL}/d.pre", status_code=404)
+
+        downloader = MetGetDownloader(max_workers=3)
+        with pytest.raises(RuntimeError, match=re.escape("2 of 4 files: b.pre, d.pre")):
+            downloader.download_files(METGET_DMY_DATA_URL, files, str(tmp_path))
+
+    out, _ = capfd.readouterr()
+    assert out.index("[ERROR]: b.pre") < out.index("[ERROR]: d.pre")
+    assert (tmp_path / "a.pre").read_text() == "a"
+    assert (tmp_path / "c.pre").read_text() == "c"
+
+
+def test_download_invalid_worker_count() -> None:
+    """
+    **TEST PURPOSE**: Validates the worker count is checked on construction
+    **MODULE**: metget_download.MetGetDownloader
+    **SCENARIO**: Construct a downloader with zero workers
+    **INPUT**: max_workers=0
+    **EXPECTED**: ValueError is raised
+    **COVERAGE**: Tests constructor argument validation
+    """
+    with pytest.raises(ValueError, match="at least 1"):
+        MetGetDownloader(max_workers=0)
+
+
+def test_download_resume_partial_file(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates an interrupted download resumes with a Range request
+    **MODULE**: metget_download.MetGetDownloader and metget_download.DownloadJournal
+    **SCENARIO**: A partial file and journal exist from an earlier interrupted run
+    **INPUT**: Partial file holding the first 10 bytes and a journal committing them
+    **EXPECTED**: The client requests only the remaining bytes, the partial file is
+                  renamed to the destination and the journal is removed
+    **COVERAGE**: Tests partial file journaling, range resume and atomic rename
+    """
+    content = b"0123456789abcdefghij"
+    url = f"{METGET_DMY_DATA_URL}/big.nc"
+    destination = tmp_path / "big.nc"
+
+    (tmp_path / "big.nc.part").write_bytes(content[:10])
+    journal = DownloadJournal(str(destination))
+    journal.url = url
+    journal.offset = 10
+    journal.size = len(content)
+    journal.commit()
+
+    def range_response(request, context):
+        start = int(request.headers["Range"].split("=")[1].rstrip("-"))
+        context.status_code = 206
+        context.headers["Content-Range"] = (
+            f"bytes {start:d}-{len(content) - 1:d}/{len(content):d}"
+        )
+        return content[start:]
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=range_response)
+        MetGetDownloader().download_files(
+            METGET_DMY_DATA_URL, ["big.nc"], str(tmp_path)
+        )
+        assert m.request_history[0].headers["Range"] == "bytes=10-"
+
+    assert destination.read_bytes() == content
+    assert not (tmp_path / "big.nc.part").exists()
+    assert not (tmp_path / "big.nc.part.json").exists()
+
+
+def test_download_failure_keeps_partial_file(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates a failed transfer leaves a resumable partial file
+    **MODULE**: metget_download.MetGetDownloader
+    **SCENARIO**: The server closes the stream before the advertised length is sent
+    **INPUT**: Content-Length of 20 bytes with only 8 bytes in the body
+    **EXPECTED**: The download fails, the destination is not created, and the
+                  journal records the 8 committed bytes
+    **COVERAGE**: Tests journal commit on failure and size verification
+    """
+    url = f"{METGET_DMY_DATA_URL}/short.nc"
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=b"01234567", headers={"Content-Length": "20"})
+        with pytest.raises(RuntimeError, match=re.escape("short.nc")):
+            MetGetDownloader().download_files(
+                METGET_DMY_DATA_URL, ["short.nc"], str(tmp_path)
+            )
+
+    assert not (tmp_path / "short.nc").exists()
+    journal = DownloadJournal.load(str(tmp_path / "short.nc"), url)
+    assert journal.offset == 8
+    assert journal.size == 20
+
+
+def test_download_segmented(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates large files are fetched in concurrent byte range segments
+    **MODULE**: metget_download.MetGetDownloader
+    **SCENARIO**: Server advertises range support for a file above the segment threshold
+    **INPUT**: 1000 byte file, 4 segments, 100 byte minimum segmented size
+    **EXPECTED**: Four range requests cover the file exactly and the reassembled
+                  file matches the source
+    **COVERAGE**: Tests segment splitting, preallocation and positional writes
+    """
+    content = bytes(i % 251 for i in range(1000))
+    url = f"{METGET_DMY_DATA_URL}/raw.nc"
+
+    def ranged(request, context):
+        context.headers["Accept-Ranges"] = "bytes"
+        if "Range" not in request.headers:
+            context.headers["Content-Length"] = str(len(content))
+            return content
+        start, end = request.headers["Range"].split("=")[1].split("-")
+        context.status_code = 206
+        context.headers["Content-Range"] = f"bytes {start}-{end}/{len(content):d}"
+        return content[int(start) : int(end) + 1]
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=ranged)
+        MetGetDownloader(segments=4, segment_min_size=100).download_files(
+            METGET_DMY_DATA_URL, ["raw.nc"], str(tmp_path)
+        )
+        ranges = sorted(
+            r.headers["Range"] for r in m.request_history if "Range" in r.headers
+        )
+
+    assert ranges == [
+        "bytes=0-249",
+        "bytes=250-499",
+        "bytes=500-749",
+        "bytes=750-999",
+    ]
+    assert (tmp_path / "raw.nc").read_bytes() == content
+    assert not (tmp_path / "raw.nc.part.json").exists()
+
+
+def test_download_segmented_fallback(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates a single stream is used when ranges are unsupported
+    **MODULE**: metget_download.MetGetDownloader
+    **SCENARIO**: Large file served without an Accept-Ranges header
+    **INPUT**: 1000 byte file, 4 segments, 100 byte minimum segmented size
+    **EXPECTED**: Exactly one request is made and the file is written intact
+    **COVERAGE**: Tests the single stream fallback of the segmented download
+    """
+    content = b"x" * 1000
+    url = f"{METGET_DMY_DATA_URL}/raw.nc"
+
+    with requests_mock.Mocker() as m:
+        m.get(url, content=content, headers={"Content-Length": "1000"})
+        MetGetDownloader(segments=4, segment_min_size=100).download_files(
+            METGET_DMY_DATA_URL, ["raw.nc"], str(tmp_path)
+        )
+        assert m.call_count == 1
+
+    assert (tmp_path / "raw.nc").read_bytes() == content
+
+
+def test_download_file_store(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates downloaded files are reused from the shared file store
+    **MODULE**: metget_download.MetGetDownloader and metget_file_store.FileStore
+    **SCENARIO**: The same request is downloaded into two output directories and a
+                  third file pushes the store over its size limit
+    **INPUT**: Mocked output files and a store limited to 25 bytes
+    **EXPECTED**: The second download links the files from the store after only a
+                  HEAD request, a file whose ETag changed on the server is downloaded
+                  again, and the least recently used file is evicted
+    **COVERAGE**: Tests store lookup and verification, linking into place, and LRU eviction
+    """
+    store = FileStore(str(tmp_path / "store"), max_size=25)
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    first.mkdir()
+    second.mkdir()
+
+    with requests_mock.Mocker() as m:
+        for name, etag in (("a.wnd", '"wnd-1"'), ("a.pre", '"pre-1"')):
+            m.head(
+                f"{METGET_DMY_DATA_URL}/{name:s}",
+                headers={"ETag": etag, "Content-Length": "10"},
+            )
+        wnd = m.get(
+            f"{METGET_DMY_DATA_URL}/a.wnd",
+            text="0123456789",
+            headers={"ETag": '"wnd-1"'},
+        )
+        pre = m.get(
+            f"{METGET_DMY_DATA_URL}/a.pre",
+            text="9876543210",
+            headers={"ETag": '"pre-1"'},
+        )
+        MetGetDownloader(file_store=store).download_files(
+            METGET_DMY_DATA_URL, ["a.wnd", "a.pre"], str(first)
+        )
+        MetGetDownloader(file_store=store).download_files(
+            METGET_DMY_DATA_URL, ["a.wnd", "a.pre"], str(second)
+        )
+        assert wnd.call_count == 1
+        assert pre.call_count == 1
+        assert (second / "a.wnd").read_text() == "0123456789"
+        assert (second / "a.pre").read_text() == "9876543210"
+        assert store.size == 20
+
+        m.head(
+            f"{METGET_DMY_DATA_URL}/a.pre",
+            headers={"ETag": '"pre-2"', "Content-Length": "10"},
+        )
+        pre = m.get(
+            f"{METGET_DMY_DATA_URL}/a.pre",
+            text="0000000000",
+            headers={"ETag": '"pre-2"'},
+        )
+        MetGetDownloader(file_store=store).download_files(
+            METGET_DMY_DATA_URL, ["a.pre"], str(second)
+        )
+        assert pre.call_count == 1
+        assert (second / "a.pre").read_text() == "0000000000"
+
+        m.head(f"{METGET_DMY_DATA_URL}/b.wnd", headers={"Content-Length": "10"})
+        m.get(f"{METGET_DMY_DATA_URL}/b.wnd", text="abcdefghij")
+        MetGetDownloader(file_store=store).download_files(
+            METGET_DMY_DATA_URL, ["b.wnd"], str(first)
+        )
+
+    assert store.size == 20
+    assert not store.fetch(f"{METGET_DMY_DATA_URL}/a.wnd", str(tmp_path / "x"))
+    assert store.fetch(f"{METGET_DMY_DATA_URL}/b.wnd", str(tmp_path / "b.wnd"))
+    assert (first / "a.wnd").read_text() == "0123456789"
+    store.close()
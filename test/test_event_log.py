@@ -0,0 +1,135 @@
+import argparse
+import os
+
+import pytest
+import requests_mock
+
+from metget.metget_build import MetGetBuildRest
+from metget.metget_event_log import (
+    EventLog,
+    metget_event_log_from_args,
+    read_event_log,
+)
+from metget.metget_session import MetGetSession
+
+METGET_DMY_ENDPOINT = "https://metget.server.dmy"
+METGET_DMY_APIKEY = "1234567890"
+METGET_API_VERSION = 2
+
+
+def test_event_log_buffering_levels_and_rotation(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates buffering, level filtering, and rotation of the event log
+    **MODULE**: metget_event_log.EventLog
+    **SCENARIO**: Record events of several levels with a small buffer and size limit
+    **INPUT**: Log with a buffer of 3 events, a 600 byte limit, and 2 backups
+    **EXPECTED**: Debug events are dropped, events are held until the buffer is full
+                  or an error is recorded, every line is a JSON object carrying the
+                  run id, and the log is rotated keeping at most 2 backups
+    **COVERAGE**: Tests EventLog.event, flush, rotation, and read_event_log
+    """
+    path = str(tmp_path / "logs" / "events.jsonl")
+    log = EventLog(path, "info", buffer_size=3, max_bytes=600, backup_count=2)
+
+    log.event("ignored", "debug", value=1)
+    log.event("first", value=1)
+    log.event("second", value=2)
+    assert not os.path.exists(path)
+
+    log.event("third", value=3)
+    events = read_event_log(path)
+    assert [e["event"] for e in events] == ["first", "second", "third"]
+    assert all(e["run"] == log.run and e["level"] == "info" for e in events)
+    assert events[1]["value"] == 2
+
+    log.event("failure", "error", error="boom")
+    assert read_event_log(path)[-1]["event"] == "failure"
+
+    for i in range(20):
+        log.event("filler", "warning", index=i)
+    log.close()
+
+    assert os.path.exists(path + ".1")
+    assert os.path.exists(path + ".2")
+    assert not os.path.exists(path + ".3")
+    assert os.path.getsize(path) <= 600
+    assert read_event_log(path)[-1]["index"] == 19
+
+    with pytest.raises(ValueError, match="Invalid event log level"):
+        EventLog(path, "verbose")
+
+
+def test_event_log_http_requests(tmp_path, monkeypatch) -> None:
+    """
+    **TEST PURPOSE**: Validates HTTP requests and client errors are recorded in the event log
+    **MODULE**: metget_session.MetGetSession, metget_build.MetGetBuildRest
+    **SCENARIO**: Send a request, a streamed request, and a rejected build through a
+                  session created from the command line arguments
+    **INPUT**: Mocked MetGet endpoint and presigned S3 url, METGET_EVENT_LOG set
+    **EXPECTED**: Each request is recorded with method, url without query, status,
+                  size, and timing; the rejected build is recorded as an error
+                  instead of being appended to metget.debug; disabling the event
+                  log records nothing
+    **COVERAGE**: Tests metget_event_log_from_args and request recording in MetGetSession
+    """
+    path = str(tmp_path / "events.jsonl")
+    monkeypatch.setenv("METGET_EVENT_LOG", path)
+    monkeypatch.chdir(tmp_path)
+
+    assert metget_event_log_from_args(argparse.Namespace()) is None
+    assert (
+        metget_event_log_from_args(argparse.Namespace(event_log_enabled=False)) is None
+    )
+
+    args = argparse.Namespace(
+        event_log_enabled=True, event_log=None, event_log_level="debug"
+    )
+    log = metget_event_log_from_args(args)
+    assert log.path == path
+
+    session = MetGetSession(METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, event_log=log)
+    client = MetGetBuildRest(
+        METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, METGET_API_VERSION, session=session
+    )
+    with requests_mock.Mocker() as m:
+        m.get(METGET_DMY_ENDPOINT + "/credits", json={"body": {"credit_limit": 1}})
+        m.get(
+            "https://s3.amazonaws.com/metget/file.wnd",
+            content=b"0123456789",
+            headers={"Content-Length": "10"},
+        )
+        m.post(
+            METGET_DMY_ENDPOINT + "/build",
+            status_code=400,
+            json={"statusCode": 400, "body": {"message": "bad request"}},
+        )
+
+        session.get(METGET_DMY_ENDPOINT + "/credits")
+        with session.get(
+            "https://s3.amazonaws.com/metget/file.wnd?X-Amz-Signature=secret",
+            stream=True,
+        ) as r:
+            assert r.content == b"0123456789"
+        with pytest.raises(RuntimeError):
+            client.make_metget_request({})
+    session.close()
+
+    events = read_event_log(path)
+    http = [e for e in events if e["event"] == "http"]
+    assert [e["method"] for e in http] == ["GET", "GET", "POST"]
+    assert http[0]["url"] == METGET_DMY_ENDPOINT + "/credits"
+    assert http[0]["status"] == 200
+    assert http[0]["bytes"] == len('{"body": {"credit_limit": 1}}')
+    assert http[0]["elapsed"] >= 0.0
+    assert not http[0]["streamed"]
+    assert http[1]["url"] == "https://s3.amazonaws.com/metget/file.wnd"
+    assert http[1]["bytes"] == 10
+    assert http[1]["streamed"]
+    assert http[2]["status"] == 400
+    assert http[2]["level"] == "warning"
+
+    failed = [e for e in events if e["event"] == "build_failed"]
+    assert len(failed) == 1
+    assert failed[0]["level"] == "error"
+    assert failed[0]["status"] == 400
+    assert not os.path.exists(tmp_path / "metget.debug")
@@ -0,0 +1,160 @@
+import os
+import time
+
+import pytest
+
+from metget.metget_api import STATUS_ALL_MODELS, MetGetApiError, MetGetClient
+from metget.metget_download import MetGetDownloader
+from metget.metget_mock_server import MetGetMockServer
+
+METGET_DMY_APIKEY = "1234567890"
+METGET_API_VERSION = 2
+
+TEST_FILES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "test_files")
+
+
+def test_mock_server_build_download(capfd, monkeypatch, tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates the full request lifecycle against the local mock server
+    **MODULE**: metget_mock_server.MetGetMockServer, metget_build.MetGetBuildRest
+    **SCENARIO**: Submit a GFS request, poll it to completion, and download its files in segments
+    **INPUT**: Mock server using the filelist_gfs.json fixture, completing on the second check
+    **EXPECTED**: The fixture output files are downloaded with the content served by the mock
+    **COVERAGE**: Tests /build, /check, the file list, byte range downloads, and credit accounting
+    """
+    monkeypatch.chdir(tmp_path)
+    with MetGetMockServer(
+        api_key=METGET_DMY_APIKEY,
+        polls_to_complete=2,
+        file_size=200 * 1024,
+        fixtures_directory=TEST_FILES,
+    ) as server:
+        client = MetGetClient(server.endpoint, METGET_DMY_APIKEY, METGET_API_VERSION)
+        builder = client.build_client
+        request = builder.generate_request_json(
+            analysis=False,
+            multiple_forecasts=True,
+            start_date="2023-06-01 00:00:00",
+            end_date="2023-06-02 00:00:00",
+            format="owi-ascii",
+            data_type="wind_pressure",
+            backfill=False,
+            time_step=3600,
+            domains=builder.parse_command_line_domains(
+                [["gfs", 0.25, -100, 10, -80, 30]], 0
+            ),
+            compression=False,
+            epsg=4326,
+            filename="test_build_gfs",
+            dry_run=False,
+            strict=False,
+        )
+        submitted = client.build(request)
+        assert submitted.status_code == 200
+
+        assert client.check(submitted.request_id).status == "queued"
+        status = client.check(submitted.request_id)
+        assert status.status == "completed"
+
+        file_list = builder.get_request_file_list(status.data_url)
+        assert file_list["output_files"] == [
+            "test_build_gfs_00.pre",
+            "test_build_gfs_00.wnd",
+        ]
+        assert file_list["input"]["request_id"] == submitted.request_id
+
+        downloader = MetGetDownloader(
+            max_workers=2,
+            session=client.session,
+            segments=4,
+            segment_min_size=1,
+        )
+        downloader.download_files(
+            status.data_url, file_list["output_files"], str(tmp_path)
+        )
+        for filename in file_list["output_files"]:
+            with open(tmp_path / filename, "rb") as f:
+                assert f.read() == server.file_content(submitted.request_id, filename)
+
+        # ...One request for the file list and at least two per segmented file
+        assert server.request_count("/data/") > 1 + len(file_list["output_files"])
+        assert server.request_count("/check") == 2
+        assert client.credits().credits_used == 1.0
+        client.close()
+    capfd.readouterr()
+
+
+def test_mock_server_api() -> None:
+    """
+    **TEST PURPOSE**: Validates that the mock server answers every query endpoint of the client
+    **MODULE**: metget_mock_server.MetGetMockServer, metget_api.MetGetClient
+    **SCENARIO**: Query the status of all models, storm tracks, and A-Deck tracks
+    **INPUT**: Mock server with three storms of twelve advisories
+    **EXPECTED**: Responses are parsed by the client and the API key is enforced
+    **COVERAGE**: Tests /status, /stormtrack, /adeck, /credits, and authorization
+    """
+    with MetGetMockServer(api_key=METGET_DMY_APIKEY) as server:
+        year = server.reference_time.year
+        with MetGetClient(server.endpoint, METGET_DMY_APIKEY) as client:
+            statuses, errors = client.status_many(STATUS_ALL_MODELS)
+            assert not errors
+            assert sorted(statuses) == sorted(STATUS_ALL_MODELS)
+
+            tracks, errors = client.forecast_tracks(2, year=year)
+            assert not errors
+            assert list(tracks) == [f"{a:03d}" for a in range(1, 13)]
+            assert client.track(2, "besttrack", year=year).geojson["features"]
+
+            adeck = client.adeck(year, "al", "all", 1, server.reference_time)
+            assert sorted(adeck.tracks) == ["AVNO", "CARQ", "HMON", "HWRF", "OFCL"]
+            with pytest.raises(MetGetApiError) as e:
+                client.adeck(year, "al", "AVNO", 9, server.reference_time)
+            assert e.value.body["body"]["message"] == "No results found"
+
+        with MetGetClient(server.endpoint, "wrong") as client:
+            with pytest.raises(MetGetApiError) as e:
+                client.credits()
+            assert e.value.status_code == 403
+
+
+def test_mock_server_fault_injection() -> None:
+    """
+    **TEST PURPOSE**: Validates the latency, failure, and throughput controls of the mock server
+    **MODULE**: metget_mock_server.MetGetMockServer
+    **SCENARIO**: Send requests to servers configured with latency, failures, and a throughput cap
+    **INPUT**: 0.1 s latency, a failure rate of one, and a 1 MB/s cap on a 256 KiB response
+    **EXPECTED**: Requests are delayed, failed with the configured status, and throttled
+    **COVERAGE**: Tests the injected latency, failures, and throughput limits
+    """
+    with MetGetMockServer(latency=0.1) as server:
+        client = MetGetClient.from_environment(
+            server.endpoint, METGET_DMY_APIKEY, METGET_API_VERSION, max_retries=0
+        )
+        start = time.monotonic()
+        client.credits()
+        assert time.monotonic() - start >= 0.1
+        client.close()
+
+    with MetGetMockServer(failure_rate=1.0, failure_status=502) as server:
+        client = MetGetClient.from_environment(
+            server.endpoint, METGET_DMY_APIKEY, METGET_API_VERSION, max_retries=0
+        )
+        with pytest.raises(MetGetApiError) as e:
+            client.credits()
+        assert e.value.status_code == 502
+        client.close()
+
+    with MetGetMockServer(throughput=1.0e6, file_size=256 * 1024) as server:
+        client = MetGetClient.from_environment(
+            server.endpoint, METGET_DMY_APIKEY, METGET_API_VERSION, max_retries=0
+        )
+        request_id = client.build(
+            {"domains": [{"name": "gfs"}], "filename": "throughput"}
+        ).request_id
+        start = time.monotonic()
+        response = client.session.get(
+            f"{server.endpoint:s}/data/{request_id:s}/throughput_00.pre"
+        )
+        assert len(response.content) == 256 * 1024
+        assert time.monotonic() - start >= 0.2
+        client.close()
@@ -0,0 +1,119 @@
+import argparse
+import time
+
+import pytest
+
+from metget.metget_polling import (
+    AdaptivePollingPolicy,
+    FixedPollingPolicy,
+    PollingPolicy,
+    RequestDurationHistory,
+    metget_polling_policy_from_args,
+    request_duration_key,
+)
+
+
+def test_adaptive_policy_backoff_while_queued() -> None:
+    """
+    **TEST PURPOSE**: Validates the adaptive policy backs off while a request waits
+    **MODULE**: metget_polling.AdaptivePollingPolicy
+    **SCENARIO**: Repeated 'queued' statuses followed by a 'running' status
+    **INPUT**: Base interval of 10s, backoff of 2, max interval of 60s, no jitter
+    **EXPECTED**: Intervals grow 10, 20, 40, 60 while queued and reset to 10 when running
+    **COVERAGE**: Tests queued backoff, max interval cap, and reset on status change
+    """
+    policy = AdaptivePollingPolicy(10.0, max_interval=60.0, backoff=2.0, jitter=0.0)
+    intervals = [policy.next_interval("queued", 0.0) for _ in range(4)]
+    assert intervals == [10.0, 20.0, 40.0, 60.0]
+    assert policy.next_interval("running", 0.0) == 10.0
+
+    assert policy.failure_interval(1) == 20.0
+    assert policy.failure_interval(10) == 60.0
+
+
+def test_adaptive_policy_expected_completion(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates polling speeds up as the expected completion nears
+    **MODULE**: metget_polling.AdaptivePollingPolicy and RequestDurationHistory
+    **SCENARIO**: History of past durations gives an expected duration of 600s
+    **INPUT**: Durations 500, 600, 700 recorded for the request type
+    **EXPECTED**: Long interval early in the request, base interval near completion;
+                  the duration since submission is recorded on completion, and
+                  nothing is recorded when the submission time or request type
+                  is unknown
+    **COVERAGE**: Tests duration history persistence and completion-aware intervals
+    """
+    history = RequestDurationHistory(str(tmp_path / "durations.json"))
+    for duration in (500.0, 600.0, 700.0):
+        history.record("owi-ascii/gfs-ncep", duration)
+    assert history.estimate("owi-ascii/gfs-ncep") == 600.0
+    assert history.estimate("raw/rtofs") is None
+
+    policy = AdaptivePollingPolicy(
+        10.0,
+        max_interval=300.0,
+        jitter=0.0,
+        history=history,
+        history_key="owi-ascii/gfs-ncep",
+        submitted=time.time() - 800.0,
+    )
+    assert policy.expected_duration == 600.0
+    assert policy.next_interval("running", 0.0) == 150.0
+    assert policy.next_interval("running", 590.0) == 10.0
+
+    policy.complete()
+    assert history.estimate("owi-ascii/gfs-ncep") == 650.0
+
+    AdaptivePollingPolicy(
+        10.0, history=history, history_key="owi-ascii/gfs-ncep"
+    ).complete()
+    AdaptivePollingPolicy(10.0, history=history, submitted=time.time()).complete()
+    assert history.estimate("owi-ascii/gfs-ncep") == 650.0
+    assert history.estimate("default") is None
+
+
+def test_adaptive_policy_jitter() -> None:
+    """
+    **TEST PURPOSE**: Validates intervals are randomized within the jitter bounds
+    **MODULE**: metget_polling.AdaptivePollingPolicy
+    **SCENARIO**: Many intervals drawn while a request is running
+    **INPUT**: Base interval of 10s with 20% jitter
+    **EXPECTED**: All intervals fall between 8s and 12s and are not all identical
+    **COVERAGE**: Tests jitter application
+    """
+    policy = AdaptivePollingPolicy(10.0, jitter=0.2)
+    intervals = [policy.next_interval("running", 0.0) for _ in range(50)]
+    assert all(8.0 <= i <= 12.0 for i in intervals)
+    assert len(set(intervals)) > 1
+
+
+def test_polling_policy_from_args(tmp_path, monkeypatch) -> None:
+    """
+    **TEST PURPOSE**: Validates the command line selection of the polling policy
+    **MODULE**: metget_polling.metget_polling_policy_from_args
+    **SCENARIO**: Select fixed, adaptive, and an unknown policy
+    **INPUT**: argparse namespaces with poll_policy set
+    **EXPECTED**: Matching policy types are returned and unknown names raise ValueError;
+                  the abstract base policy cannot be instantiated
+    **COVERAGE**: Tests policy factory and request type key generation
+    """
+    monkeypatch.setenv("METGET_CACHE_DIR", str(tmp_path))
+    args = argparse.Namespace(check_interval=5.0)
+    assert isinstance(metget_polling_policy_from_args(args), FixedPollingPolicy)
+
+    args.poll_policy = "adaptive"
+    assert isinstance(metget_polling_policy_from_args(args), AdaptivePollingPolicy)
+
+    args.poll_policy = "sometimes"
+    with pytest.raises(ValueError, match="Unknown polling policy"):
+        metget_polling_policy_from_args(args)
+
+    request = {
+        "format": "owi-ascii",
+        "domains": [{"service": "hwrf"}, {"service": "gfs-ncep"}],
+    }
+    assert request_duration_key(request) == "owi-ascii/gfs-ncep+hwrf"
+    assert request_duration_key(None) is None
+
+    with pytest.raises(TypeError):
+        PollingPolicy()
@@ -0,0 +1,170 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+import requests_mock
+
+from metget.metget_build import MetGetBuildRest, metget_build
+from metget.metget_request_cache import (
+    RequestCache,
+    is_request_cacheable,
+    request_cache_key,
+)
+
+METGET_DMY_ENDPOINT = "https://metget.server.dmy"
+METGET_DMY_APIKEY = "1234567890"
+METGET_API_VERSION = 2
+METGET_DMY_REQUEST_ID = "5f9b5b3c-5b7a-4c5e-8b0a-1b5b3c5d7e8f"
+
+
+def test_request_cache_key_and_expiry(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates the request key and the lifetime of cache entries
+    **MODULE**: metget_request_cache.RequestCache, metget_request_cache.request_cache_key
+    **SCENARIO**: Identical requests from different creators, a changed request,
+                  and an entry past its time to live
+    **INPUT**: Request JSON dictionaries
+    **EXPECTED**: The creator and key order do not change the key; other fields do.
+                  Recorded files are returned while they keep their size and until
+                  the entry expires. Requests ending in the future are not cacheable
+    **COVERAGE**: Tests canonical hashing, store, complete, lookup, and expiry
+    """
+    request = MetGetBuildRest.generate_request_json(
+        start_date=datetime(2023, 6, 1),
+        end_date=datetime(2023, 6, 2),
+        domains=MetGetBuildRest.parse_command_line_domains(
+            [["gfs", 0.25, -100, 10, -80, 30]], 0
+        ),
+        username="user_a",
+    )
+    reordered = dict(reversed(list({**request, "creator": "user_b"}.items())))
+    key = request_cache_key(request, METGET_DMY_ENDPOINT)
+    assert request_cache_key(reordered, METGET_DMY_ENDPOINT + "/") == key
+    assert request_cache_key({**request, "time_step": 900}, METGET_DMY_ENDPOINT) != key
+    assert request_cache_key(request, "https://other.server") != key
+    assert is_request_cacheable(request)
+    future = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1)
+    assert not is_request_cacheable(
+        {**request, "end_date": future.strftime("%Y-%m-%d %H:%M:%S")}
+    )
+
+    with RequestCache(str(tmp_path / "requests.sqlite")) as cache:
+        assert cache.lookup(key) is None
+        cache.store(key, "req-1")
+        assert cache.lookup(key).file_list is None
+        cache.complete(key, {"output_files": ["a.wnd"]}, str(tmp_path))
+        assert cache.lookup(key).file_list is None
+        (tmp_path / "a.wnd").write_text("wind")
+        cache.complete(key, {"output_files": ["a.wnd"]}, str(tmp_path))
+        cached = cache.lookup(key)
+        assert cached.request_id == "req-1"
+        assert cached.file_list == {"output_files": ["a.wnd"]}
+        assert cached.file_sizes == {"a.wnd": 4}
+        assert cached.local_files() == [str(tmp_path / "a.wnd")]
+        (tmp_path / "a.wnd").write_text("truncated wind")
+        assert cached.local_files() is None
+
+    with RequestCache(str(tmp_path / "requests.sqlite"), ttl=-1.0) as cache:
+        cache.store(key, "req-2")
+        time.sleep(0.01)
+        assert cache.lookup(key) is None
+
+
+def test_build_reuses_identical_request(tmp_path, monkeypatch) -> None:
+    """
+    **TEST PURPOSE**: Validates a repeated build does not submit the request again
+    **MODULE**: metget_build.metget_build
+    **SCENARIO**: The same build is run three times. The files of the first run
+                  are deleted before the third run
+    **INPUT**: Mocked /build, /check, and output files
+    **EXPECTED**: Only the first run posts to /build. The second run copies the
+                  files of the first and writes filelist.json, the third downloads
+                  the earlier request id again. A request ending in the future is
+                  always submitted
+    **COVERAGE**: Tests the request cache lookup, local copy, and request id reuse
+    """
+    monkeypatch.setenv("METGET_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.chdir(tmp_path)
+    for run in ("run1", "run2", "run3"):
+        (tmp_path / run).mkdir()
+
+    args = argparse.Namespace(
+        request=None,
+        domain=[["gfs", "0.25", "-100", "10", "-80", "30"]],
+        start=datetime(2023, 6, 1),
+        end=datetime(2023, 6, 2),
+        timestep=3600,
+        output="cached_gfs",
+        format="owi-ascii",
+        variable="wind_pressure",
+        analysis=False,
+        multiple_forecasts=True,
+        initialization_skip=0,
+        backfill=False,
+        compression=False,
+        epsg=4326,
+        strict=False,
+        dryrun=False,
+        save_json_request=False,
+        check_interval=0.01,
+        poll_policy="fixed",
+        max_wait=1.0 / 60.0,
+        request_cache=True,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+    data_url = f"https://s3.amazonaws.com/metget/{METGET_DMY_REQUEST_ID:s}"
+
+    with requests_mock.Mocker() as m:
+        build = m.post(
+            METGET_DMY_ENDPOINT + "/build",
+            json={
+                "statusCode": 200,
+                "body": {"request_id": METGET_DMY_REQUEST_ID, "error_text": []},
+            },
+        )
+        check = m.get(
+            METGET_DMY_ENDPOINT + f"/check?request-id={METGET_DMY_REQUEST_ID:s}",
+            json={
+                "statusCode": 200,
+                "body": {
+                    "request_id": METGET_DMY_REQUEST_ID,
+                    "status": "completed",
+                    "destination": data_url,
+                },
+            },
+        )
+        m.get(data_url + "/filelist.json", json={"output_files": ["cached_gfs.wnd"]})
+        m.get(data_url + "/cached_gfs.wnd", text="wind")
+
+        args.output_directory = str(tmp_path / "run1")
+        metget_build(args)
+        assert build.call_count == 1
+        assert (tmp_path / "run1" / "cached_gfs.wnd").read_text() == "wind"
+
+        checks = check.call_count
+        (tmp_path / "filelist.json").unlink()
+        args.output_directory = str(tmp_path / "run2")
+        metget_build(args)
+        assert build.call_count == 1
+        assert check.call_count == checks
+        assert (tmp_path / "run2" / "cached_gfs.wnd").read_text() == "wind"
+        assert (tmp_path / "filelist.json").exists()
+
+        (tmp_path / "run1" / "cached_gfs.wnd").unlink()
+        args.output_directory = str(tmp_path / "run3")
+        metget_build(args)
+        assert build.call_count == 1
+        assert check.call_count > checks
+        assert (tmp_path / "run3" / "cached_gfs.wnd").read_text() == "wind"
+
+        args.request_cache = False
+        metget_build(args)
+        assert build.call_count == 2
+
+        args.request_cache = True
+        args.end = datetime.now(timezone.utc).replace(tzinfo=None) + timedelta(days=1)
+        metget_build(args)
+        metget_build(args)
+        assert build.call_count == 4
@@ -0,0 +1,64 @@
+import pytest
+import requests_mock
+
+from metget.metget_session import MetGetSession, is_endpoint_url
+
+METGET_DMY_ENDPOINT = "https://metget.server.dmy"
+METGET_DMY_APIKEY = "1234567890"
+
+
+def test_session_api_key_scope() -> None:
+    """
+    **TEST PURPOSE**: Validates the api key is only sent to the MetGet endpoint
+    **MODULE**: metget_session.MetGetSession
+    **SCENARIO**: Send one request to the MetGet endpoint and one to the S3 bucket
+    **INPUT**: Session configured with endpoint and api key
+    **EXPECTED**: The x-api-key header is present only on the MetGet API request
+    **COVERAGE**: Tests default header handling in the pooled session and is_endpoint_url
+    """
+    session = MetGetSession(METGET_DMY_ENDPOINT, METGET_DMY_APIKEY)
+    with requests_mock.Mocker() as m:
+        m.get(METGET_DMY_ENDPOINT + "/credits", json={})
+        m.get("https://s3.amazonaws.com/metget/file.wnd", text="data")
+
+        session.get(METGET_DMY_ENDPOINT + "/credits")
+        session.get("https://s3.amazonaws.com/metget/file.wnd")
+
+        assert m.request_history[0].headers["x-api-key"] == METGET_DMY_APIKEY
+        assert "x-api-key" not in m.request_history[1].headers
+    session.close()
+
+    assert is_endpoint_url(METGET_DMY_ENDPOINT, METGET_DMY_ENDPOINT)
+    assert is_endpoint_url("HTTPS://METGET.server.dmy/status", METGET_DMY_ENDPOINT)
+    assert not is_endpoint_url(
+        "https://metget.server.dmy.attacker.net/status", METGET_DMY_ENDPOINT
+    )
+    assert not is_endpoint_url("http://metget.server.dmy/status", METGET_DMY_ENDPOINT)
+    assert is_endpoint_url(
+        "https://metget.server.dmy/metget/status", "https://metget.server.dmy/metget/"
+    )
+    assert not is_endpoint_url(
+        "https://metget.server.dmy/metget-other/status",
+        "https://metget.server.dmy/metget",
+    )
+
+
+def test_session_connection_reuse() -> None:
+    """
+    **TEST PURPOSE**: Validates a single pooled session is reused across requests
+    **MODULE**: metget_session.MetGetSession
+    **SCENARIO**: Issue several requests through the same session
+    **INPUT**: Session with a pool size of 4
+    **EXPECTED**: All requests go through one requests.Session with a mounted
+                  adapter sized to the pool and configured with retries
+    **COVERAGE**: Tests pool and retry adapter configuration
+    """
+    with MetGetSession(METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, pool_size=4) as session:
+        adapter = session.session.get_adapter(METGET_DMY_ENDPOINT)
+        assert adapter._pool_maxsize == 4
+        assert adapter.max_retries.total == 3
+        assert 503 in adapter.max_retries.status_forcelist
+        assert "POST" not in adapter.max_retries.allowed_methods
+
+    with pytest.raises(ValueError, match="at least 1"):
+        MetGetSession(pool_size=0)
@@ -1,11 +1,15 @@
 import argparse
+import copy
 import json
 from datetime import datetime
 from urllib.parse import urlencode
 
+import pytest
 import requests_mock
 
-from metget.metget_status import MetGetStatus
+from metget.metget_api import MetGetClient
+from metget.metget_status import CycleIndex, MetGetStatus
+from metget.metget_status_cache import StatusCache
 
 from .status_json import (
     COAMPS_CTCX_STATUS_JSON,
@@ -528,3 +532,207 @@ def test_status_deepmind_member_filter(capfd) -> None:
         data = json.loads(out)
         assert data == DEEPMIND_STATUS_JSON_MEAN["body"]
         assert data["2026"]["al"]["02"]["members"] == ["mean"]
+
+
+def test_status_cache(capfd, tmp_path, monkeypatch) -> None:
+    """
+    **TEST PURPOSE**: Validates the on-disk status cache, its revalidation, and the refresh bypass
+    **MODULE**: metget_status_cache.StatusCache, metget_api.MetGetClient.status
+    **SCENARIO**: Request the GFS status repeatedly with the status cache enabled
+    **INPUT**: Mocked status response carrying an ETag, then a 304 Not Modified response
+    **EXPECTED**: Fresh entries are served without a request, stale entries are revalidated
+        with If-None-Match, and --refresh always fetches the full response
+    **COVERAGE**: Tests cache hits within the time to live, conditional revalidation, and refresh
+    """
+    monkeypatch.setenv("METGET_CACHE_DIR", str(tmp_path))
+    args = argparse.Namespace()
+    args.model = "gfs"
+    args.format = "json"
+    args.start = None
+    args.end = None
+    args.complete = False
+    args.endpoint = METGET_DMY_ENDPOINT
+    args.apikey = METGET_DMY_APIKEY
+    args.api_version = METGET_API_VERSION
+    args.status_cache = True
+
+    url = METGET_DMY_ENDPOINT + "/status?model=gfs"
+    with requests_mock.Mocker() as m:
+        m.get(url, json=GFS_STATUS_JSON, headers={"ETag": '"v1"'})
+        MetGetStatus(args).get_status()
+        MetGetStatus(args).get_status()
+        assert m.call_count == 1
+        out, err = capfd.readouterr()
+        assert [json.loads(line) for line in out.splitlines()] == [
+            GFS_STATUS_JSON["body"]
+        ] * 2
+
+        args.refresh = True
+        MetGetStatus(args).get_status()
+        assert m.call_count == 2
+        assert "If-None-Match" not in m.last_request.headers
+        capfd.readouterr()
+
+    # ...A stale entry is revalidated instead of downloaded again
+    cache = StatusCache(str(tmp_path / "status.sqlite"), ttl={"synoptic": 0.0})
+    client = MetGetClient(
+        METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, METGET_API_VERSION, status_cache=cache
+    )
+    with requests_mock.Mocker() as m:
+        m.get(url, status_code=304)
+        status = client.status("gfs")
+        assert m.last_request.headers["If-None-Match"] == '"v1"'
+        assert status.data == GFS_STATUS_JSON["body"]
+    cache.close()
+
+
+def test_status_many(capfd) -> None:
+    """
+    **TEST PURPOSE**: Validates the concurrent status overview of several models
+    **MODULE**: metget_status.MetGetStatus, metget_api.MetGetClient.status_many
+    **SCENARIO**: Request the status of a list of models where one query fails
+    **INPUT**: Models 'gfs,gefs,nhc,hwrf' with mocked responses per model and a 404 for hwrf
+    **EXPECTED**: One JSON document keyed by model and one summary table with a row per model
+    **COVERAGE**: Tests model list parsing, concurrent queries, merged output, and per-model errors
+    """
+    responses = {
+        "gfs": GFS_STATUS_JSON,
+        "gefs": GEFS_STATUS_JSON,
+        "nhc": NHC_STATUS_JSON,
+    }
+
+    def status_response(request, context):
+        model = request.qs["model"][0]
+        if model not in responses:
+            context.status_code = 404
+            return {"statusCode": 404, "body": {"message": "Not found"}}
+        return responses[model]
+
+    args = argparse.Namespace()
+    args.model = "gfs,gefs,nhc,hwrf"
+    args.format = "json"
+    args.start = None
+    args.end = None
+    args.complete = False
+    args.endpoint = METGET_DMY_ENDPOINT
+    args.apikey = METGET_DMY_APIKEY
+    args.api_version = METGET_API_VERSION
+
+    with requests_mock.Mocker() as m:
+        m.get(METGET_DMY_ENDPOINT + "/status", json=status_response)
+        MetGetStatus(args).get_status()
+        assert m.call_count == 4
+        out, err = capfd.readouterr()
+        merged = json.loads(out)
+        assert list(merged.keys()) == ["gfs", "gefs", "nhc", "hwrf"]
+        assert merged["gfs"] == GFS_STATUS_JSON["body"]
+        assert "error" in merged["hwrf"]
+
+        args.format = "pretty"
+        MetGetStatus(args).get_status()
+        out, err = capfd.readouterr()
+        rows = {line.split("|")[1].strip(): line for line in out.splitlines()[3:-1]}
+        assert list(rows.keys()) == ["gfs", "gefs", "nhc", "hwrf"]
+        assert "2023-07-10 18:00:00" in rows["gfs"]
+        assert "32 members" in rows["gefs"]
+        assert "error: MetGet returned status code 404" in rows["hwrf"]
+
+    args.model = "gfs,notamodel"
+    with pytest.raises(ValueError, match="Unknown model"):
+        MetGetStatus(args)
+
+
+def test_status_since_last(capfd, tmp_path, monkeypatch) -> None:
+    """
+    **TEST PURPOSE**: Validates that --since-last only reports new and newly completed cycles
+    **MODULE**: metget_status_index.StatusIndex, metget_status.MetGetStatus
+    **SCENARIO**: Query the GFS status three times while the server adds a cycle
+    **INPUT**: GFS status, the same status again, and a status with an incomplete new cycle
+        which completes in the next query
+    **EXPECTED**: All cycles on the first query, nothing on the repeat, then 'new' and 'complete' events
+    **COVERAGE**: Tests the seen-cycle index, event generation, and the JSON/pretty delta output
+    """
+    monkeypatch.setenv("METGET_CACHE_DIR", str(tmp_path))
+    args = argparse.Namespace()
+    args.model = "gfs"
+    args.format = "json"
+    args.start = None
+    args.end = None
+    args.complete = False
+    args.endpoint = METGET_DMY_ENDPOINT
+    args.apikey = METGET_DMY_APIKEY
+    args.api_version = METGET_API_VERSION
+    args.since_last = True
+
+    def events(response) -> list:
+        with requests_mock.Mocker() as m:
+            m.get(METGET_DMY_ENDPOINT + "/status?model=gfs", json=response)
+            MetGetStatus(args).get_status()
+        out, err = capfd.readouterr()
+        return json.loads(out)["events"]
+
+    first = events(GFS_STATUS_JSON)
+    assert len(first) == len(GFS_STATUS_JSON["body"]["cycles"])
+    assert {e["status"] for e in first} == {"complete"}
+    assert events(GFS_STATUS_JSON) == []
+
+    updated = copy.deepcopy(GFS_STATUS_JSON)
+    updated["body"]["cycles"].insert(
+        0, {"cycle": "2023-07-11 00:00:00", "duration": 120}
+    )
+    assert events(updated) == [
+        {"model": "gfs", "cycle": "2023-07-11 00:00:00", "status": "new"}
+    ]
+
+    updated["body"]["cycles_complete"].insert(0, "2023-07-11 00:00:00")
+    args.format = "pretty"
+    with requests_mock.Mocker() as m:
+        m.get(METGET_DMY_ENDPOINT + "/status?model=gfs", json=updated)
+        MetGetStatus(args).get_status()
+    out, err = capfd.readouterr()
+    assert "|  gfs  |   -    | 2023-07-11 00:00:00 | complete |" in out
+    assert out.count("complete |") == 1
+
+
+def test_cycle_index() -> None:
+    """
+    **TEST PURPOSE**: Validates the cycle index used to render generic status tables
+    **MODULE**: metget_status.CycleIndex
+    **SCENARIO**: Index an unsorted multi-day cycle history and select windows of days
+    **INPUT**: Cycles over three days, two of which are complete
+    **EXPECTED**: Rows newest first, day windows selected by bisection, completeness from the set
+    **COVERAGE**: Tests sorting, window bounds, the complete-only filter, and end time computation
+    """
+    data = {
+        "cycles": [
+            {"cycle": "2023-07-02 00:00:00", "duration": 6},
+            {"cycle": "2023-07-03 12:00:00", "duration": 3},
+            {"cycle": "2023-07-01 06:00:00", "duration": 12},
+            {"cycle": "2023-07-02 18:00:00", "duration": 6},
+        ],
+        "cycles_complete": ["2023-07-01 06:00:00", "2023-07-02 18:00:00"],
+    }
+    index = CycleIndex(data)
+    assert len(index) == 4
+    assert index.is_complete("2023-07-02 18:00:00")
+    assert not index.is_complete("2023-07-03 12:00:00")
+
+    rows = list(index.rows())
+    assert [r[0] for r in rows] == [
+        "2023-07-03 12:00:00",
+        "2023-07-02 18:00:00",
+        "2023-07-02 00:00:00",
+        "2023-07-01 06:00:00",
+    ]
+    assert rows[0][1] == datetime(2023, 7, 3, 15)
+
+    day = datetime(2023, 7, 2, 12)
+    assert [r[0] for r in index.rows(day, day)] == [
+        "2023-07-02 18:00:00",
+        "2023-07-02 00:00:00",
+    ]
+    assert [r[0] for r in index.rows(only_complete=True)] == [
+        "2023-07-02 18:00:00",
+        "2023-07-01 06:00:00",
+    ]
+    assert list(index.rows(datetime(2023, 8, 1))) == []
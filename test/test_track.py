@@ -1,6 +1,7 @@
 import argparse
 import json
 import os
+import re
 from datetime import datetime
 from urllib.parse import urlencode
 
@@ -9,6 +10,7 @@ import requests_mock
 
 from metget.metget_track import MetGetTrack, metget_track
 
+from .status_json import JTWC_STATUS_JSON
 from .track_json import NHC_IAN_BESTRACK_JSON, NHC_IAN_FORECAST_JSON
 
 METGET_DMY_ENDPOINT = "https://metget.server.dmy"
@@ -453,3 +455,149 @@ def test_metget_track_function(capfd) -> None:
         out, err = capfd.readouterr()
         out_dict = json.loads(out)
         assert out_dict == NHC_IAN_BESTRACK_JSON["body"]["geojson"]
+
+
+def test_track_store(capfd, monkeypatch, tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates that tracks are served from the local track store
+    **MODULE**: metget_track.MetGetTrack.get_track, metget_track_store.TrackStore
+    **SCENARIO**: Request the same forecast advisory twice, then prefetch a JTWC season
+    **INPUT**: Forecast advisory 012 of storm 09, then --prefetch for the 2026 wp season
+    **EXPECTED**: The advisory is downloaded once and the prefetch only downloads missing tracks
+    **COVERAGE**: Tests track store lookups, the --refresh bypass, and season prefetching
+    """
+    monkeypatch.setenv("METGET_CACHE_DIR", str(tmp_path))
+
+    args = argparse.Namespace()
+    args.type = "forecast"
+    args.storm = 9
+    args.year = 2022
+    args.basin = "al"
+    args.advisory = 12
+    args.endpoint = METGET_DMY_ENDPOINT
+    args.apikey = METGET_DMY_APIKEY
+    args.api_version = METGET_API_VERSION
+    args.track_store = True
+
+    with requests_mock.Mocker() as m:
+        m.get(METGET_DMY_ENDPOINT + "/stormtrack", json=NHC_IAN_FORECAST_JSON)
+
+        MetGetTrack(args).get_track()
+        MetGetTrack(args).get_track()
+        assert m.call_count == 1
+        out, err = capfd.readouterr()
+        lines = out.strip().split("\n")
+        assert len(lines) == 2
+        assert json.loads(lines[1]) == NHC_IAN_FORECAST_JSON["body"]["geojson"]
+
+        args.refresh = True
+        MetGetTrack(args).get_track()
+        assert m.call_count == 2
+        capfd.readouterr()
+
+    args = argparse.Namespace()
+    args.type = None
+    args.storm = None
+    args.year = 2026
+    args.basin = "wp"
+    args.advisory = None
+    args.source = "jtwc"
+    args.prefetch = True
+    args.endpoint = METGET_DMY_ENDPOINT
+    args.apikey = METGET_DMY_APIKEY
+    args.api_version = METGET_API_VERSION
+    args.track_store = True
+
+    with requests_mock.Mocker() as m:
+        m.get(
+            METGET_DMY_ENDPOINT
+            + "/status?"
+            + urlencode({"model": "jtwc", "basin": "wp"}),
+            json=JTWC_STATUS_JSON,
+        )
+        m.get(
+            re.compile(re.escape(METGET_DMY_ENDPOINT + "/stormtrack")),
+            json=NHC_IAN_BESTRACK_JSON,
+        )
+
+        MetGetTrack(args).get_track()
+        out, err = capfd.readouterr()
+        assert out.strip() == "Prefetched 4 tracks for jtwc wp 2026"
+        track_requests = [
+            r for r in m.request_history if r.path.endswith("/stormtrack")
+        ]
+        assert len(track_requests) == 4
+        assert all(r.qs["source"] == ["jtwc"] for r in track_requests)
+
+        MetGetTrack(args).get_track()
+        out, err = capfd.readouterr()
+        assert out.strip() == "Prefetched 0 tracks for jtwc wp 2026"
+        assert m.call_count == 6
+
+
+def test_forecast_track_advisory_range(capfd) -> None:
+    """
+    **TEST PURPOSE**: Validates retrieval of several forecast advisories in one call
+    **MODULE**: metget_track.MetGetTrack.get_track, metget_api.MetGetClient.forecast_tracks
+    **SCENARIO**: Request all advisories, then a range, of JTWC storm 09 in the 2026 wp season
+    **INPUT**: Advisory 'all' and '2-5' with the advisories listed by the JTWC status
+    **EXPECTED**: Only advisories listed by the status are requested and one compact JSON document is printed
+    **COVERAGE**: Tests advisory discovery, range selection, error reporting, and consolidated output
+    """
+    args = argparse.Namespace()
+    args.type = "forecast"
+    args.storm = 9
+    args.year = 2026
+    args.basin = "wp"
+    args.advisory = "all"
+    args.source = "jtwc"
+    args.endpoint = METGET_DMY_ENDPOINT
+    args.apikey = METGET_DMY_APIKEY
+    args.api_version = METGET_API_VERSION
+
+    with requests_mock.Mocker() as m:
+        m.get(
+            METGET_DMY_ENDPOINT
+            + "/status?"
+            + urlencode({"model": "jtwc", "basin": "wp"}),
+            json=JTWC_STATUS_JSON,
+        )
+        m.get(
+            re.compile(re.escape(METGET_DMY_ENDPOINT + "/stormtrack")),
+            json=NHC_IAN_FORECAST_JSON,
+        )
+        m.get(
+            METGET_DMY_ENDPOINT + "/stormtrack?" + urlencode({"advisory": "003"}),
+            status_code=404,
+            json={"statusCode": 404, "body": "Track not found"},
+        )
+
+        metget_track(args)
+        out, err = capfd.readouterr()
+        assert len(out.strip().split("\n")) == 1
+        assert ", " not in out
+        out_dict = json.loads(out)
+        assert out_dict["source"] == "jtwc"
+        assert out_dict["basin"] == "wp"
+        assert out_dict["year"] == 2026
+        assert out_dict["storm"] == "09"
+        assert list(out_dict["advisories"].keys()) == ["001", "002"]
+        assert out_dict["advisories"]["001"] == NHC_IAN_FORECAST_JSON["body"]["geojson"]
+        assert list(out_dict["errors"].keys()) == ["003"]
+
+        args.advisory = "2-5"
+        m.reset_mock()
+        metget_track(args)
+        out, err = capfd.readouterr()
+        out_dict = json.loads(out)
+        assert list(out_dict["advisories"].keys()) == ["002"]
+        advisories = [
+            r.qs["advisory"][0]
+            for r in m.request_history
+            if r.path.endswith("/stormtrack")
+        ]
+        assert sorted(advisories) == ["002", "003"]
+
+    args.advisory = "5-2"
+    with pytest.raises(ValueError, match="Invalid advisory range"):
+        metget_track(args)
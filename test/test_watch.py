@@ -0,0 +1,182 @@
+import argparse
+
+import pytest
+import requests_mock
+
+from metget.metget_build import MetGetBuildRest
+from metget.metget_file_store import FileStore
+from metget.metget_polling import FixedPollingPolicy
+from metget.metget_watch import MetGetWatcher, metget_watch
+
+METGET_DMY_ENDPOINT = "https://metget.server.dmy"
+METGET_DMY_APIKEY = "1234567890"
+METGET_API_VERSION = 2
+
+
+def check_response(request_id: str, status: str) -> dict:
+    """
+    Generates the /check response for a request id and status
+    """
+    return {
+        "json": {
+            "statusCode": 200,
+            "body": {
+                "request_id": request_id,
+                "status": status,
+                "message": "",
+                "destination": f"https://s3.amazonaws.com/metget/{request_id:s}",
+            },
+        },
+        "status_code": 200,
+    }
+
+
+def mock_requests(m, request_statuses: dict) -> None:
+    """
+    Registers the status sequence and output files of each request
+    """
+    for request_id, statuses in request_statuses.items():
+        m.get(
+            f"{METGET_DMY_ENDPOINT}/check?request-id={request_id:s}",
+            [check_response(request_id, s) for s in statuses],
+        )
+        data_url = f"https://s3.amazonaws.com/metget/{request_id:s}"
+        m.get(
+            data_url + "/filelist.json",
+            json={"output_files": [f"{request_id:s}.wnd", f"{request_id:s}.pre"]},
+        )
+        for name, text in (("wnd", "wind"), ("pre", "pressure")):
+            url = data_url + f"/{request_id:s}.{name:s}"
+            m.head(
+                url, headers={"Content-Length": str(len(request_id) + len(text) + 1)}
+            )
+            m.get(url, text=f"{request_id:s} {text:s}")
+
+
+def test_watcher_multiple_requests(tmp_path) -> None:
+    """
+    **TEST PURPOSE**: Validates many requests are polled and downloaded from one process
+    **MODULE**: metget_watch.MetGetWatcher
+    **SCENARIO**: Three requests: one completes after queueing, one completes
+                  immediately, and one fails on the server
+    **INPUT**: Mocked /check sequences and output files per request
+    **EXPECTED**: Completed requests are downloaded into per-request directories
+                  and the failed request is reported with an error message
+    **COVERAGE**: Tests scheduling, per-request downloads, and final state reporting
+    """
+    client = MetGetBuildRest(METGET_DMY_ENDPOINT, METGET_DMY_APIKEY, METGET_API_VERSION)
+    statuses = {
+        "req-a": ["queued", "running", "completed"],
+        "req-b": ["completed"],
+        "req-c": ["queued", "error"],
+    }
+
+    with requests_mock.Mocker() as m:
+        mock_requests(m, statuses)
+        watcher = MetGetWatcher(
+            client, lambda _: FixedPollingPolicy(0.01), max_wait=1.0 / 60.0
+        )
+        for request_id in statuses:
+            watcher.add(request_id, str(tmp_path / request_id))
+        result = watcher.run()
+
+    assert result["req-a"].status == "downloaded"
+    assert result["req-a"].checks == 3
+    assert result["req-b"].status == "downloaded"
+    assert result["req-c"].status == "error"
+    assert (tmp_path / "req-a" / "req-a.wnd").read_text() == "req-a wind"
+    assert (tmp_path / "req-b" / "req-b.pre").read_text() == "req-b pressure"
+    assert (tmp_path / "req-b" / "filelist.json").exists()
+    assert not (tmp_path / "req-c").exists()
+
+
+def test_metget_watch_request_file(tmp_path, capfd) -> None:
+    """
+    **TEST PURPOSE**: Validates the watch command reads request ids from a file
+    **MODULE**: metget_watch.metget_watch
+    **SCENARIO**: Request ids given both on the command line and in a file
+    **INPUT**: One id as an argument and two ids (plus a comment) in a file
+    **EXPECTED**: All three requests are downloaded and listed in the summary
+    **COVERAGE**: Tests the command line entry point and request file parsing
+    """
+    request_file = tmp_path / "requests.txt"
+    request_file.write_text("# ensemble members\nreq-2\n\nreq-3\n")
+
+    args = argparse.Namespace(
+        request_ids=["req-1"],
+        request_file=str(request_file),
+        output_directory=str(tmp_path),
+        check_interval=0.01,
+        poll_policy="fixed",
+        max_check_interval=1.0,
+        max_wait=1.0 / 60.0,
+        max_concurrent_downloads=2,
+        download_workers=2,
+        download_segments=1,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+
+    with requests_mock.Mocker() as m:
+        mock_requests(
+            m,
+            {
+                "req-1": ["running", "completed"],
+                "req-2": ["completed"],
+                "req-3": ["restore", "completed"],
+            },
+        )
+        metget_watch(args)
+
+    out, _ = capfd.readouterr()
+    assert "Waiting for 3 requests" in out
+    for request_id in ("req-1", "req-2", "req-3"):
+        assert (tmp_path / request_id / f"{request_id:s}.wnd").exists()
+        assert request_id in out
+    assert out.count("downloaded") == 3
+
+
+def test_metget_watch_exit_status(tmp_path, capfd, monkeypatch) -> None:
+    """
+    **TEST PURPOSE**: Validates the watch command fails when a request is not downloaded
+    **MODULE**: metget_watch.metget_watch
+    **SCENARIO**: One request completes and one ends in error, with the file store enabled
+    **INPUT**: Two request ids with mocked status sequences
+    **EXPECTED**: The completed request is downloaded, the failed request is named,
+                  the file store is closed, and the command exits with status 1
+    **COVERAGE**: Tests the exit status of the command line entry point
+    """
+    closed = []
+    close = FileStore.close
+    monkeypatch.setattr(
+        FileStore, "close", lambda store: closed.append(store) or close(store)
+    )
+
+    args = argparse.Namespace(
+        request_ids=["req-1", "req-2"],
+        request_file=None,
+        output_directory=str(tmp_path),
+        check_interval=0.01,
+        poll_policy="fixed",
+        max_check_interval=1.0,
+        max_wait=1.0 / 60.0,
+        max_concurrent_downloads=2,
+        download_workers=1,
+        download_segments=1,
+        file_cache=True,
+        endpoint=METGET_DMY_ENDPOINT,
+        apikey=METGET_DMY_APIKEY,
+        api_version=METGET_API_VERSION,
+    )
+
+    with requests_mock.Mocker() as m:
+        mock_requests(m, {"req-1": ["completed"], "req-2": ["running", "error"]})
+        with pytest.raises(SystemExit) as exc_info:
+            metget_watch(args)
+
+    assert exc_info.value.code == 1
+    assert (tmp_path / "req-1" / "req-1.wnd").exists()
+    assert len(closed) == 1
+    out, _ = capfd.readouterr()
+    assert "1 of 2 requests were not downloaded: req-2" in out